@@ -1,10 +1,15 @@
 """AI Chat endpoint — rule-based data querying with natural language interface."""
 
 import re
+import pandas as pd
 from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import Optional
 from app.core.database import get_supabase
+from app.services.data_quality import quality_rollups
+from app.services.imputation import filter_estimated
+from app.services.insight_snapshot import InsightSnapshot
+from app.services.series_changes import HORIZONS, movers
 
 router = APIRouter(prefix="/chat", tags=["AI Chat"])
 
@@ -192,11 +197,11 @@ async def chat(request: ChatRequest):
 
         # Handle data quality queries
         if intent == "data_quality":
-            scores = supabase.table("data_quality_scores").select("overall_score").execute()
-            if scores.data:
-                avg_score = sum(s["overall_score"] for s in scores.data if s["overall_score"]) / max(len(scores.data), 1)
-                good = sum(1 for s in scores.data if s.get("overall_score", 0) and s["overall_score"] > 70)
-                poor = sum(1 for s in scores.data if s.get("overall_score", 0) and s["overall_score"] < 40)
+            continent = quality_rollups(supabase, "continent")
+            if continent:
+                avg_score = float(continent[0]["country_avg_score"] or 0)
+                good = continent[0]["countries_good"] or 0
+                poor = continent[0]["countries_poor"] or 0
                 return ChatResponse(
                     response=f"The continental data quality score averages **{avg_score:.1f}/100**. {good} countries have good data quality (>70), while {poor} countries have poor data quality (<40).",
                     data={"avg_score": round(avg_score, 1), "good_data_countries": good, "poor_data_countries": poor},
@@ -243,6 +248,52 @@ async def chat(request: ChatRequest):
                     ],
                 )
 
+        # Handle trend queries from the shared multi-horizon changes
+        if intent == "trend" and indicator_code:
+            snapshot = InsightSnapshot.published()
+            ind = snapshot.indicators.get(indicator_code)
+            if ind and countries:
+                ms_id = snapshot.country_id(countries[0])
+                changes = snapshot.changes()
+                row = changes[(changes["indicator_code"] == indicator_code) & (changes["member_state_id"] == ms_id)]
+                if not row.empty:
+                    r = row.iloc[0]
+                    name = snapshot.member_state(ms_id)["name"]
+                    lines = []
+                    for h in HORIZONS:
+                        if pd.notna(r[f"change_{h}y"]):
+                            pct = f" ({r[f'pct_change_{h}y']:+.1f}%)" if pd.notna(r[f"pct_change_{h}y"]) else ""
+                            lines.append(f"- **{h}-year** (since {int(r['latest_year'] - r[f'span_{h}y'])}): {r[f'change_{h}y']:+.1f}{pct}")
+                    cagr = f"\n\nAverage growth over 5 years: **{r['cagr_5y']:+.1f}% per year**." if pd.notna(r["cagr_5y"]) else ""
+                    return ChatResponse(
+                        response=(
+                            f"**{name}**'s {ind['name']}: **{r['latest_value']:.1f}{ind.get('unit') or ''}** "
+                            f"({int(r['latest_year'])}).\n\n" + ("\n".join(lines) or "Not enough history to compute changes.") + cagr
+                        ),
+                        data={"country": name, "indicator": ind["name"], "latest_value": float(r["latest_value"]),
+                              "year": int(r["latest_year"])},
+                        suggested_follow_ups=[
+                            f"Which countries improved most on {ind['name']}?",
+                            f"How does {name} rank on {ind['name']}?",
+                        ],
+                    )
+            elif ind:
+                moved = movers(snapshot, ind["id"], horizon=5, limit=3)
+                if moved["countries_compared"]:
+                    risers = ", ".join(f"{m['country']} ({m['pct_change']:+.1f}%)" for m in moved["risers"] if m["pct_change"] is not None)
+                    fallers = ", ".join(f"{m['country']} ({m['pct_change']:+.1f}%)" for m in moved["fallers"] if m["pct_change"] is not None)
+                    return ChatResponse(
+                        response=(
+                            f"Over roughly the last 5 years, **{ind['name']}** was compared for {moved['countries_compared']} countries.\n\n"
+                            f"- **Biggest rises**: {risers or 'none'}\n- **Biggest falls**: {fallers or 'none'}"
+                        ),
+                        data={"indicator": ind["name"], **moved},
+                        suggested_follow_ups=[
+                            f"What is the continental average for {ind['name']}?",
+                            f"Which countries rank highest on {ind['name']}?",
+                        ],
+                    )
+
         # Handle country + indicator query
         if countries and indicator_code:
             iso = countries[0]
@@ -251,7 +302,7 @@ async def chat(request: ChatRequest):
             indicator_res = supabase.table("indicators").select("id, name, unit").eq("code", indicator_code).single().execute()
 
             if country_res.data and indicator_res.data:
-                values = supabase.table("indicator_values").select("year, value").eq(
+                values = filter_estimated(supabase.table("indicator_values").select("year, value")).eq(
                     "member_state_id", country_res.data["id"]
                 ).eq("indicator_id", indicator_res.data["id"]).order("year", desc=True).limit(5).execute()
 
@@ -282,9 +333,9 @@ async def chat(request: ChatRequest):
                 values = supabase.rpc("get_latest_indicator_values", {"p_indicator_id": ind["id"]}).execute() if False else None
 
                 # Fallback: direct query for latest year
-                all_values = supabase.table("indicator_values").select(
+                all_values = filter_estimated(supabase.table("indicator_values").select(
                     "value, year"
-                ).eq("indicator_id", ind["id"]).order("year", desc=True).limit(55).execute()
+                )).eq("indicator_id", ind["id"]).order("year", desc=True).limit(55).execute()
 
                 if all_values.data:
                     latest_year = all_values.data[0]["year"]
@@ -308,9 +359,9 @@ async def chat(request: ChatRequest):
         if intent == "ranking" and indicator_code:
             indicator_res = supabase.table("indicators").select("id, name").eq("code", indicator_code).single().execute()
             if indicator_res.data:
-                values = supabase.table("indicator_values").select(
+                values = filter_estimated(supabase.table("indicator_values").select(
                     "value, year, member_states(name, iso_code)"
-                ).eq("indicator_id", indicator_res.data["id"]).order("year", desc=True).limit(55).execute()
+                )).eq("indicator_id", indicator_res.data["id"]).order("year", desc=True).limit(55).execute()
 
                 if values.data:
                     latest_year = values.data[0]["year"]
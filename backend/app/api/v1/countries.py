@@ -1,8 +1,10 @@
 """Member States endpoints — profiles, scorecards, comparisons."""
 
+from datetime import datetime
 from fastapi import APIRouter, Query
 from app.core.database import get_supabase
 from app.services.analytics_service import get_country_profile
+from app.services.imputation import filter_estimated
 
 router = APIRouter(prefix="/countries", tags=["Member States"])
 
@@ -24,13 +26,20 @@ async def list_countries(region: str | None = None):
 
 
 @router.get("/{iso_code}/profile")
-async def country_profile(iso_code: str):
+async def country_profile(
+    iso_code: str,
+    as_of: datetime | None = Query(default=None, description="Return the profile as published at this time"),
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
+):
     """Get a full country profile with indicators and metrics."""
-    return await get_country_profile(iso_code)
+    return await get_country_profile(iso_code, as_of, include_estimated)
 
 
 @router.get("/{iso_code}/scorecard")
-async def country_scorecard(iso_code: str):
+async def country_scorecard(
+    iso_code: str,
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
+):
     """Get Agenda 2063 scorecard for a country."""
     supabase = get_supabase()
 
@@ -56,8 +65,7 @@ async def country_scorecard(iso_code: str):
 
         for ind in goal_indicators:
             value = (
-                supabase.table("indicator_values")
-                .select("value, year")
+                filter_estimated(supabase.table("indicator_values").select("value, year, data_quality"), include_estimated)
                 .eq("indicator_id", ind["id"])
                 .eq("member_state_id", country_id)
                 .order("year", desc=True)
@@ -71,6 +79,7 @@ async def country_scorecard(iso_code: str):
                     "year": value.data[0]["year"],
                     "unit": ind.get("unit"),
                     "target": ind.get("target_value"),
+                    "estimated": value.data[0].get("data_quality") == "estimated",
                 })
 
         goal_scores.append({
@@ -101,6 +110,7 @@ async def country_scorecard(iso_code: str):
 async def compare_countries(
     countries: str = Query(..., description="Comma-separated ISO codes (e.g., NG,ZA,KE)"),
     indicator_code: str | None = None,
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
 ):
     """Compare multiple countries on key indicators."""
     supabase = get_supabase()
@@ -119,8 +129,10 @@ async def compare_countries(
     comparison = []
     for c in country_data.data:
         query = (
-            supabase.table("indicator_values")
-            .select("value, year, indicators(name, code, unit)")
+            filter_estimated(
+                supabase.table("indicator_values").select("value, year, data_quality, indicators(name, code, unit)"),
+                include_estimated,
+            )
             .eq("member_state_id", c["id"])
             .order("year", desc=True)
         )
@@ -145,6 +157,7 @@ async def compare_countries(
                     "value": v["value"],
                     "year": v["year"],
                     "unit": v["indicators"].get("unit"),
+                    "estimated": v.get("data_quality") == "estimated",
                 })
 
         comparison.append({
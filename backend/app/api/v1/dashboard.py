@@ -1,17 +1,19 @@
 """Dashboard endpoint — KPI summary + recent insights."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from app.services.analytics_service import get_dashboard_summary
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 
 @router.get("/summary")
-async def dashboard_summary():
+async def dashboard_summary(
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
+):
     """
     Get the main dashboard summary with KPIs and recent insights.
 
     Returns continental-level metrics, latest ETL run status,
     and the most recent auto-generated insights.
     """
-    return await get_dashboard_summary()
+    return await get_dashboard_summary(include_estimated)
@@ -1,10 +1,15 @@
 """Data Quality endpoints."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from app.services.data_quality import (
     assess_data_quality,
+    rescore_version,
     get_quality_overview,
     get_quality_by_country,
+    get_quality_flags,
+    get_data_gaps,
+    get_coverage_matrix,
+    get_indicator_coverage,
 )
 
 router = APIRouter(prefix="/data-quality", tags=["Data Quality"])
@@ -23,37 +28,43 @@ async def quality_by_country():
 
 
 @router.post("/assess")
-async def run_assessment():
-    """Trigger a full data quality assessment."""
+async def run_assessment(
+    version_id: int | None = Query(default=None, description="Rescore only the pairs this published data version changed"),
+):
+    """Trigger a full data quality assessment, or rescore the pairs one data version changed."""
+    if version_id is not None:
+        return await rescore_version(version_id)
     return await assess_data_quality()
 
 
+@router.get("/flags")
+async def quality_flags(
+    indicator_id: int | None = None,
+    country: str | None = Query(default=None, description="Country ISO code"),
+    flag_type: str | None = Query(default=None, pattern="^(history_outlier|peer_divergence)$"),
+    min_score: float | None = Query(default=None, description="Minimum absolute robust z-score"),
+    limit: int = Query(default=100, le=1000),
+):
+    """Values flagged as anomalous in the published data — far outside their own history or regional peers."""
+    return await get_quality_flags(indicator_id, country, flag_type, min_score, limit)
+
+
 @router.get("/gaps")
-async def data_gaps():
+async def data_gaps(limit: int = Query(default=100, le=2000)):
     """Identify missing data — countries and indicators with no data."""
-    from app.core.database import get_supabase
-
-    supabase = get_supabase()
-
-    countries = supabase.table("member_states").select("id, name, iso_code").execute()
-    indicators = supabase.table("indicators").select("id, name, code").execute()
-
-    gaps = []
-    for country in countries.data:
-        for indicator in indicators.data:
-            count = (
-                supabase.table("indicator_values")
-                .select("id", count="exact")
-                .eq("member_state_id", country["id"])
-                .eq("indicator_id", indicator["id"])
-                .execute()
-            )
-            if (count.count or 0) == 0:
-                gaps.append({
-                    "country": country["name"],
-                    "iso_code": country["iso_code"],
-                    "indicator": indicator["name"],
-                    "indicator_code": indicator["code"],
-                })
-
-    return {"gaps": gaps[:100], "total_gaps": len(gaps)}
+    return await get_data_gaps(limit)
+
+
+@router.get("/coverage")
+async def coverage_matrix():
+    """Coverage of every indicator × country series, with per-series year bitmaps, for the heatmap."""
+    return await get_coverage_matrix()
+
+
+@router.get("/coverage/{indicator_id}")
+async def indicator_coverage(
+    indicator_id: int,
+    country: str | None = Query(default=None, description="Country ISO code"),
+):
+    """Years reported, coverage and missing years of one indicator, per country."""
+    return await get_indicator_coverage(indicator_id, country)
@@ -1,7 +1,7 @@
 """Gender Analytics endpoints (WGYD)."""
 
 from fastapi import APIRouter
-from app.core.database import get_supabase
+from app.core.database import get_supabase, fetch_all
 from app.services.analytics_service import get_gender_overview
 
 router = APIRouter(prefix="/gender", tags=["Gender Analytics"])
@@ -37,20 +37,23 @@ async def gender_by_country():
 
 
 @router.get("/trends")
-async def gender_trends():
+async def gender_trends(start_year: int | None = None, end_year: int | None = None):
     """Multi-year gender metric trends."""
     supabase = get_supabase()
 
     # Get continental averages per year for women in parliament
-    metrics = (
-        supabase.table("gender_metrics")
-        .select("year, women_parliament_pct, women_labor_force_pct, gender_parity_education")
-        .order("year")
-        .execute()
-    )
+    def _query():
+        query = supabase.table("gender_metrics").select("year, women_parliament_pct, women_labor_force_pct, gender_parity_education")
+        if start_year:
+            query = query.gte("year", start_year)
+        if end_year:
+            query = query.lte("year", end_year)
+        return query.order("year").order("member_state_id")
+
+    metrics = fetch_all(_query)
 
     year_data = {}
-    for m in metrics.data:
+    for m in metrics:
         yr = m["year"]
         if yr not in year_data:
             year_data[yr] = {"parliament": [], "labor": [], "parity": []}
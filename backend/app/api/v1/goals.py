@@ -3,6 +3,9 @@
 from fastapi import APIRouter, Query
 from app.core.database import get_supabase
 from app.services.analytics_service import get_goal_progress_by_region
+from app.services.imputation import filter_estimated
+from app.services.insight_snapshot import InsightSnapshot
+from app.services.projections import PROJECTION_YEARS, goal_progress_view
 
 router = APIRouter(prefix="/goals", tags=["Agenda 2063 Goals"])
 
@@ -20,6 +23,33 @@ async def list_goals():
     return {"goals": result.data, "total": len(result.data)}
 
 
+@router.get("/progress")
+async def goals_progress(
+    scope: str = Query(default="continent", pattern="^(continent|region|country)$"),
+    goal_id: int | None = None,
+    region_id: int | None = None,
+    country: str | None = Query(default=None, description="Country ISO code"),
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
+):
+    """Goal progress now and projected to 2030 and 2063, for the continent, each region or each country."""
+    snapshot = InsightSnapshot.published(include_estimated)
+    member_state_id = None
+    if country:
+        member_state_id = snapshot.country_id(country.upper())
+        if member_state_id is None:
+            return {"error": "Country not found"}
+
+    progress = goal_progress_view(snapshot, scope, goal_id, region_id, member_state_id)
+    return {
+        "scope": scope,
+        "projection_years": list(PROJECTION_YEARS),
+        "data_version_id": snapshot.data_version_id,
+        "include_estimated": include_estimated,
+        "progress": progress,
+        "total": len(progress),
+    }
+
+
 @router.get("/{goal_id}")
 async def get_goal(goal_id: int):
     """Get a specific goal with its indicators."""
@@ -42,7 +72,10 @@ async def get_goal(goal_id: int):
 
 
 @router.get("/{goal_id}/progress")
-async def goal_progress(goal_id: int):
+async def goal_progress(
+    goal_id: int,
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
+):
     """Get progress data for a specific goal over time."""
     supabase = get_supabase()
     goal = supabase.table("goals").select("*").eq("id", goal_id).execute()
@@ -55,8 +88,7 @@ async def goal_progress(goal_id: int):
     progress_data = []
     for ind in indicators.data:
         values = (
-            supabase.table("indicator_values")
-            .select("year, value, member_states(name)")
+            filter_estimated(supabase.table("indicator_values").select("year, value, member_states(name)"), include_estimated)
             .eq("indicator_id", ind["id"])
             .order("year")
             .execute()
@@ -88,9 +120,12 @@ async def goal_progress(goal_id: int):
 
 
 @router.get("/{goal_id}/by-region")
-async def goal_by_region(goal_id: int):
+async def goal_by_region(
+    goal_id: int,
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
+):
     """Get goal progress broken down by AU region."""
-    return await get_goal_progress_by_region(goal_id)
+    return await get_goal_progress_by_region(goal_id, include_estimated)
 
 
 @router.get("/{goal_id}/insights")
@@ -1,8 +1,22 @@
 """Indicator endpoints — time series, rankings, trends."""
 
+from datetime import datetime
 from fastapi import APIRouter, Query
-from app.core.database import get_supabase
+from app.core.database import get_supabase, fetch_all
 from app.services.analytics_service import get_indicator_time_series, get_indicator_ranking
+from app.services.imputation import filter_estimated
+from app.services.insight_snapshot import InsightSnapshot
+from app.services.projections import PROJECTION_YEARS, projection_view
+from app.services.series_changes import HORIZONS, movers
+from app.services.trend_detection import DIRECTIONS, stored_trends, trend_of, trend_record
+
+# Mann-Kendall direction → the wording this endpoint has always used
+_DIRECTION_LABELS = {
+    "increasing": "improving",
+    "decreasing": "declining",
+    "no_trend": "stable",
+    "insufficient_data": "insufficient_data",
+}
 
 router = APIRouter(prefix="/indicators", tags=["Indicators"])
 
@@ -21,9 +35,16 @@ async def list_indicators(goal_id: int | None = None):
 
 
 @router.get("/{indicator_id}/values")
-async def indicator_values(indicator_id: int, country: str | None = None):
+async def indicator_values(
+    indicator_id: int,
+    country: str | None = None,
+    as_of: datetime | None = Query(default=None, description="Return values as published at this time"),
+    start_year: int | None = None,
+    end_year: int | None = None,
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
+):
     """Get time series values for an indicator."""
-    return await get_indicator_time_series(indicator_id, country)
+    return await get_indicator_time_series(indicator_id, country, as_of, start_year, end_year, include_estimated)
 
 
 @router.get("/{indicator_id}/ranking")
@@ -31,32 +52,43 @@ async def indicator_ranking(
     indicator_id: int,
     year: int | None = None,
     limit: int = Query(default=55, le=55),
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
 ):
     """Rank countries by indicator value."""
-    return {"ranking": await get_indicator_ranking(indicator_id, year, limit)}
+    return {"ranking": await get_indicator_ranking(indicator_id, year, limit, include_estimated)}
 
 
 @router.get("/{indicator_id}/trend")
-async def indicator_trend(indicator_id: int):
-    """Get continental trend analysis for an indicator."""
+async def indicator_trend(
+    indicator_id: int,
+    start_year: int | None = None,
+    end_year: int | None = None,
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
+):
+    """Get continental trend analysis for an indicator, optionally over a year range."""
     supabase = get_supabase()
 
     indicator = supabase.table("indicators").select("*").eq("id", indicator_id).execute()
     if not indicator.data:
         return {"error": "Indicator not found"}
 
-    values = (
-        supabase.table("indicator_values")
-        .select("year, value")
-        .eq("indicator_id", indicator_id)
-        .not_.is_("value", "null")
-        .order("year")
-        .execute()
-    )
+    def _query():
+        query = (
+            filter_estimated(supabase.table("indicator_values").select("year, value"), include_estimated)
+            .eq("indicator_id", indicator_id)
+            .not_.is_("value", "null")
+        )
+        if start_year:
+            query = query.gte("year", start_year)
+        if end_year:
+            query = query.lte("year", end_year)
+        return query.order("year").order("member_state_id")
+
+    values = fetch_all(_query)
 
     # Continental average per year
     year_data = {}
-    for v in values.data:
+    for v in values:
         yr = v["year"]
         if yr not in year_data:
             year_data[yr] = []
@@ -74,21 +106,86 @@ async def indicator_trend(indicator_id: int):
         if vals
     ]
 
-    # Determine trend direction
-    if len(trend) >= 3:
-        recent_avg = trend[-1]["avg"]
-        earlier_avg = trend[-3]["avg"]
-        if recent_avg > earlier_avg * 1.05:
-            direction = "improving"
-        elif recent_avg < earlier_avg * 0.95:
-            direction = "declining"
-        else:
-            direction = "stable"
+    # Direction from a Mann-Kendall test on the continental average. The full
+    # series uses the results stored for the published data version, which
+    # are over reported values only.
+    country_trends = None
+    if start_year or end_year:
+        test = trend_of([t["year"] for t in trend], [t["avg"] for t in trend])
     else:
-        direction = "insufficient_data"
+        snapshot = InsightSnapshot.published(include_estimated)
+        rows = []
+        if snapshot.data_version_id and not include_estimated:
+            rows = stored_trends(supabase, snapshot.data_version_id, indicator_id)
+        if not rows:
+            frame = snapshot.trends()
+            part = frame[frame["indicator_id"] == indicator_id].drop(columns="indicator_code")
+            rows = [trend_record(r) for r in part.to_dict("records")]
+        continental = next((r for r in rows if r["member_state_id"] is None), None)
+        test = continental or trend_of([], [])
+        country_trends = {d: sum(1 for r in rows if r["member_state_id"] is not None and r["direction"] == d) for d in DIRECTIONS}
 
     return {
         "indicator": indicator.data[0],
         "trend": trend,
-        "direction": direction,
+        "direction": _DIRECTION_LABELS[test["direction"]],
+        "trend_test": {
+            "method": "mann_kendall",
+            "direction": test["direction"],
+            "n_points": test.get("n_points"),
+            "p_value": test.get("p_value"),
+            "kendall_tau": test.get("kendall_tau"),
+            "sen_slope": test.get("sen_slope"),
+        },
+        "country_trends": country_trends,
+    }
+
+
+@router.get("/{indicator_id}/movers")
+async def indicator_movers(
+    indicator_id: int,
+    horizon: int = Query(default=1, description="Years: 1, 3 or 5"),
+    metric: str = Query(default="pct_change", pattern="^(change|pct_change|cagr)$"),
+    limit: int = Query(default=10, le=55),
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
+):
+    """Countries with the largest rise and fall in an indicator over the horizon."""
+    if horizon not in HORIZONS:
+        return {"error": f"horizon must be one of {', '.join(map(str, HORIZONS))}"}
+    snapshot = InsightSnapshot.published(include_estimated)
+    indicator = next((i for i in snapshot.indicators.values() if i["id"] == indicator_id), None)
+    if not indicator:
+        return {"error": "Indicator not found"}
+
+    return {
+        "indicator": indicator,
+        "horizon": horizon,
+        "metric": metric,
+        "data_version_id": snapshot.data_version_id,
+        **movers(snapshot, indicator_id, horizon, limit, metric),
+    }
+
+
+@router.get("/{indicator_id}/projection")
+async def indicator_projection(
+    indicator_id: int,
+    country: str | None = Query(default=None, description="Country ISO code"),
+    include_estimated: bool = Query(default=False, description="Include imputed estimates for missing years"),
+):
+    """Trend-line projections to 2030 and 2063 and years to target, for the continent, each region and optionally a country."""
+    snapshot = InsightSnapshot.published(include_estimated)
+    indicator = next((i for i in snapshot.indicators.values() if i["id"] == indicator_id), None)
+    if not indicator:
+        return {"error": "Indicator not found"}
+    member_state_id = None
+    if country:
+        member_state_id = snapshot.country_id(country.upper())
+        if member_state_id is None:
+            return {"error": "Country not found"}
+
+    return {
+        "indicator": indicator,
+        "projection_years": list(PROJECTION_YEARS),
+        "data_version_id": snapshot.data_version_id,
+        **projection_view(snapshot, indicator_id, member_state_id),
     }
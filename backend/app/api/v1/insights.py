@@ -1,9 +1,14 @@
 """Insights Engine endpoints — auto-generated findings, alerts, trends."""
 
-from fastapi import APIRouter, Query, Depends
+from datetime import datetime, timezone
+from fastapi import APIRouter, BackgroundTasks, Query, Depends, HTTPException
+from app.core.config import settings
 from app.core.database import get_supabase
-from app.core.auth import require_analyst
-from app.services.insights_engine import generate_all_insights
+from app.core.auth import require_admin, require_analyst
+from app.models.schemas import InsightRuleCreate, InsightRuleUpdate
+from app.services.insight_retention import archive_inactive_insights
+from app.services.insight_rules import validate_rule
+from app.services.insights_engine import RULE_GENERATOR, generate_all_insights
 
 router = APIRouter(prefix="/insights", tags=["Insights Engine"])
 
@@ -106,7 +111,120 @@ async def insights_summary():
 
 
 @router.post("/generate")
-async def trigger_insight_generation(user: dict = Depends(require_analyst)):
-    """Trigger the Insights Engine to regenerate all insights from current data."""
-    result = await generate_all_insights()
+async def trigger_insight_generation(
+    indicators: list[str] | None = Query(default=None, description="Only rerun generators that depend on these codes"),
+    user: dict = Depends(require_analyst),
+):
+    """Trigger the Insights Engine to regenerate all insights, or only those depending on `indicators`."""
+    result = await generate_all_insights(changed_codes=set(indicators) if indicators else None)
     return result
+
+
+@router.get("/runs")
+async def insight_run_history(limit: int = Query(default=20, le=200)):
+    """Per-run insight counts by type and severity, written at publish and kept after archival."""
+    supabase = get_supabase()
+    result = (
+        supabase.table("insight_run_summaries")
+        .select("*")
+        .order("last_generated_at", desc=True)
+        .limit(limit * 24)  # up to 6 types x 4 severities per run
+        .execute()
+    )
+    runs = {}
+    for row in result.data:
+        run = runs.setdefault(row["batch_id"], {
+            "batch_id": row["batch_id"],
+            "etl_run_id": row["etl_run_id"],
+            "generated_at": row["first_generated_at"],
+            "total": 0,
+            "archived": 0,
+            "by_type": {},
+            "by_severity": {},
+        })
+        run["total"] += row["insights"]
+        run["archived"] += row["archived"]
+        run["by_type"][row["type"]] = run["by_type"].get(row["type"], 0) + row["insights"]
+        run["by_severity"][row["severity"]] = run["by_severity"].get(row["severity"], 0) + row["insights"]
+    return {"runs": list(runs.values())[:limit]}
+
+
+@router.post("/archive")
+async def archive_insights_now(
+    older_than_days: int = Query(default=settings.INSIGHTS_RETENTION_DAYS, ge=0),
+    user: dict = Depends(require_admin),
+):
+    """Move inactive insights older than `older_than_days` to the archive now."""
+    return await archive_inactive_insights(older_than_days)
+
+
+# ── Insight Rules ───────────────────────────────────────────────────
+
+def _check_rule(supabase, rule: dict):
+    known = supabase.table("indicators").select("id, target_value").eq("code", rule["indicator_code"]).execute()
+    if not known.data:
+        raise HTTPException(status_code=400, detail=f"Unknown indicator {rule['indicator_code']}")
+    try:
+        validate_rule(rule, known.data[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/rules")
+async def list_insight_rules(active: bool | None = None):
+    """List the data-defined insight rules."""
+    supabase = get_supabase()
+    query = supabase.table("insight_rules").select("*").order("id")
+    if active is not None:
+        query = query.eq("is_active", active)
+    result = query.execute()
+    return {"rules": result.data, "total": len(result.data)}
+
+
+@router.post("/rules")
+async def create_insight_rule(
+    rule: InsightRuleCreate,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(require_analyst),
+):
+    """Add an insight rule. It takes effect at once: rule insights are regenerated."""
+    supabase = get_supabase()
+    row = rule.model_dump(mode="json")
+    _check_rule(supabase, row)
+    try:
+        result = supabase.table("insight_rules").insert(row).execute()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    background_tasks.add_task(generate_all_insights, generator_keys={RULE_GENERATOR})
+    return result.data[0]
+
+
+@router.patch("/rules/{rule_id}")
+async def update_insight_rule(
+    rule_id: int,
+    changes: InsightRuleUpdate,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(require_analyst),
+):
+    """
+    Change or deactivate an insight rule; rule insights are regenerated.
+
+    The rule generator is rerun outright: a deactivated rule, or one moved to
+    another indicator, no longer names the indicator its old insights are for.
+    """
+    supabase = get_supabase()
+    existing = supabase.table("insight_rules").select("*").eq("id", rule_id).execute()
+    if not existing.data:
+        raise HTTPException(status_code=404, detail="Rule not found")
+
+    updates = changes.model_dump(mode="json", exclude_unset=True)
+    merged = {**existing.data[0], **updates}
+    _check_rule(supabase, merged)
+    result = (
+        supabase.table("insight_rules")
+        .update({**updates, "updated_at": datetime.now(timezone.utc).isoformat()})
+        .eq("id", rule_id)
+        .execute()
+    )
+    background_tasks.add_task(generate_all_insights, generator_keys={RULE_GENERATOR})
+    return result.data[0]
@@ -1,11 +1,14 @@
 """ETL Pipeline endpoints — trigger, status, data sources."""
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from app.core.database import get_supabase
 from app.core.auth import require_admin
 from app.services.etl_service import run_etl, seed_database
-from app.services.insights_engine import generate_all_insights
-from app.models.schemas import ETLTriggerRequest
+from app.services.etl_workers import create_sharded_run
+from app.services.backfill import drain_run, prepare_resume
+from app.services.value_history import diff_versions, publish_order, version_for_run
+from app.services.post_load import refresh_after_publish
+from app.models.schemas import BackfillRequest, ETLTriggerRequest
 
 router = APIRouter(prefix="/pipeline", tags=["ETL Pipeline"])
 
@@ -17,23 +20,102 @@ async def trigger_pipeline(
     user: dict = Depends(require_admin),
 ):
     """
-    Trigger a full ETL run: Extract from World Bank → Transform → Load → Generate Insights.
+    Trigger a full ETL run: Extract from every active source → Transform → Load → Generate Insights.
 
     Runs in the background. Check /pipeline/status for progress.
+
+    With `shard_by` set, the run is split into shards on the work queue instead
+    and processed by ETL workers (`python -m app.services.etl_workers`).
     """
+    if request and request.shard_by:
+        try:
+            result = await create_sharded_run(
+                indicator_codes=request.indicators,
+                countries=request.countries,
+                source_names=request.sources,
+                shard_by=request.shard_by,
+                shard_size=request.shard_size,
+            )
+        except (ValueError, RuntimeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {
+            "message": "Sharded ETL run queued. Check /pipeline/runs/{id}/shards for progress.",
+            **result,
+        }
+
     async def _run_pipeline():
         result = await run_etl(
             indicator_codes=request.indicators if request else None,
             countries=request.countries if request else None,
+            source_names=request.sources if request else None,
         )
-        # Auto-generate insights after ETL
-        if result.get("etl_run_id"):
-            await generate_all_insights(result["etl_run_id"])
+        # Re-estimate gaps, then regenerate insights and rescore data quality for what this run changed
+        if result["status"] == "completed":
+            await refresh_after_publish(result["data_version_id"], result["etl_run_id"])
 
     background_tasks.add_task(_run_pipeline)
     return {"message": "ETL pipeline triggered. Check /pipeline/status for progress.", "status": "started"}
 
 
+@router.post("/backfill")
+async def trigger_backfill(
+    request: BackfillRequest,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(require_admin),
+):
+    """
+    Backfill historical data (e.g. 1960–1999) as a sharded run of year windows.
+
+    Windows are processed in the background with bounded concurrency and
+    published together when the last one finishes. An interrupted backfill
+    can be continued with /pipeline/backfill/{run_id}/resume.
+    """
+    if request.start_year > request.end_year:
+        raise HTTPException(status_code=400, detail="start_year must not be after end_year")
+    try:
+        result = await create_sharded_run(
+            indicator_codes=request.indicators,
+            start_year=request.start_year,
+            end_year=request.end_year,
+            source_names=request.sources,
+            shard_by="year",
+            shard_size=request.window_years,
+        )
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    background_tasks.add_task(drain_run, result["etl_run_id"], request.concurrency)
+    return {
+        "message": "Backfill started. Check /pipeline/runs/{id}/shards for progress.",
+        **result,
+    }
+
+
+@router.post("/backfill/{run_id}/resume")
+async def resume_backfill_run(
+    run_id: int,
+    background_tasks: BackgroundTasks,
+    concurrency: int = 4,
+    user: dict = Depends(require_admin),
+):
+    """Continue an interrupted backfill, or re-run only the windows that failed."""
+    try:
+        target = await prepare_resume(run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if target is None:
+        raise HTTPException(status_code=409, detail=f"ETL run {run_id} has finished with no failed windows to resume")
+
+    background_tasks.add_task(drain_run, target, max(1, concurrency))
+    return {
+        "message": "Backfill resume started. Check /pipeline/runs/{id}/shards for progress.",
+        "etl_run_id": target,
+        "resumed_from": run_id,
+    }
+
+
 @router.post("/seed")
 async def seed_db(user: dict = Depends(require_admin)):
     """Seed the database with aspirations, goals, member states, and indicator definitions."""
@@ -67,9 +149,55 @@ async def pipeline_status():
     }
 
 
+@router.get("/runs/{run_id}/shards")
+async def run_shards(run_id: int):
+    """Get shard progress for a sharded ETL run."""
+    supabase = get_supabase()
+
+    run = supabase.table("etl_runs").select("*").eq("id", run_id).execute()
+    if not run.data:
+        return {"error": "ETL run not found"}
+
+    shards = (
+        supabase.table("etl_shards")
+        .select("id, shard_key, status, attempts, lease_owner, heartbeat_at, "
+                "records_processed, records_failed, error_message, completed_at")
+        .eq("etl_run_id", run_id)
+        .order("id")
+        .execute()
+    )
+
+    return {"run": run.data[0], "shards": shards.data}
+
+
+@router.get("/diff")
+async def run_diff(from_run: int, to_run: int, limit: int = 500):
+    """Get the indicator values that changed between two ETL runs."""
+    supabase = get_supabase()
+
+    from_version = version_for_run(supabase, from_run)
+    to_version = version_for_run(supabase, to_run)
+    if from_version is None or to_version is None:
+        return {"error": "ETL run has no published data version"}
+    order = publish_order(supabase, [from_version, to_version])
+    if order[from_version] > order[to_version]:
+        from_version, to_version = to_version, from_version
+
+    changes = diff_versions(supabase, from_version, to_version)
+
+    return {
+        "from_run": from_run,
+        "to_run": to_run,
+        "from_version": from_version,
+        "to_version": to_version,
+        "total_changes": len(changes),
+        "changes": changes[:limit],
+    }
+
+
 @router.get("/sources")
 async def data_sources():
-    """Get status of all data sources."""
+    """Get status of all data sources, in precedence order."""
     supabase = get_supabase()
-    result = supabase.table("data_sources").select("*").execute()
+    result = supabase.table("data_sources").select("*").order("priority").execute()
     return {"sources": result.data}
@@ -1,99 +1,153 @@
 """Data Upload endpoints — Excel/CSV ingestion."""
 
-from fastapi import APIRouter, UploadFile, File, Depends
+import asyncio
+import os
+from datetime import datetime, timezone
+import structlog
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Depends
 from app.core.database import get_supabase
 from app.core.auth import require_analyst
-import pandas as pd
-import io
+from app.core.config import settings
+from app.core.executors import run_cpu_bound
+from app.services.data_versions import create_version, discard_version, stage_values, publish_version
+from app.services.post_load import refresh_after_publish
+from app.services.uploads import (
+    MAX_UPLOAD_YEAR, create_job, duplicate_result, find_loaded, finish_upload, get_job, ingest_upload, load_lookups,
+    record_upload, run_upload_job, spool_to_disk, update_job,
+)
+
+logger = structlog.get_logger()
 
 router = APIRouter(prefix="/upload", tags=["Data Upload"])
 
 
 @router.post("/excel")
-async def upload_excel(file: UploadFile = File(...), user: dict = Depends(require_analyst)):
+async def upload_excel(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    user: dict = Depends(require_analyst),
+):
     """
     Upload supplementary data from Excel/CSV files.
 
-    Expects columns: country_iso, indicator_code, year, value
+    Expects columns: country_iso, indicator_code, year, value. The file is
+    spooled to disk and loaded in chunks, so its size does not bound memory.
+    A file identical to one already loaded is not parsed again, and only rows
+    that differ from the stored values are written.
     """
     supabase = get_supabase()
-
+    path = ledger_id = None
     try:
-        contents = await file.read()
-        if file.filename.endswith(".csv"):
-            df = pd.read_csv(io.BytesIO(contents))
+        path, content_hash, size = await spool_to_disk(file, file.filename)
+        previous = find_loaded(supabase, content_hash)
+        if previous:
+            record_upload(supabase, content_hash, file.filename, size, user.get("id"), duplicate_of=previous["id"])
+            result = duplicate_result(previous)
         else:
-            df = pd.read_excel(io.BytesIO(contents))
-
-        required_cols = {"country_iso", "indicator_code", "year", "value"}
-        if not required_cols.issubset(set(df.columns)):
-            return {
-                "status": "error",
-                "filename": file.filename,
-                "records_processed": 0,
-                "records_failed": 0,
-                "errors": [f"Missing required columns. Expected: {required_cols}. Got: {set(df.columns)}"],
-            }
+            ledger_id = record_upload(supabase, content_hash, file.filename, size, user.get("id"))
+            # Parsing, validation and staging are synchronous; keep the event loop free
+            result = await asyncio.to_thread(ingest_upload, supabase, path, file.filename, ledger_id)
+    except Exception as e:
+        if ledger_id:
+            finish_upload(supabase, ledger_id, {"status": "failed"}, None)
+        result = {"records_processed": 0, "records_failed": 0, "errors": [str(e)], "data_version_id": None}
+    finally:
+        if path:
+            os.unlink(path)
 
-        # Build lookups
-        countries = supabase.table("member_states").select("id, iso_code").execute()
-        country_lookup = {c["iso_code"]: c["id"] for c in countries.data}
-
-        indicators = supabase.table("indicators").select("id, code").execute()
-        indicator_lookup = {i["code"]: i["id"] for i in indicators.data}
-
-        processed = 0
-        failed = 0
-        errors = []
-
-        for _, row in df.iterrows():
-            try:
-                country_id = country_lookup.get(str(row["country_iso"]).upper())
-                indicator_id = indicator_lookup.get(str(row["indicator_code"]))
-
-                if not country_id:
-                    errors.append(f"Unknown country: {row['country_iso']}")
-                    failed += 1
-                    continue
-                if not indicator_id:
-                    errors.append(f"Unknown indicator: {row['indicator_code']}")
-                    failed += 1
-                    continue
-
-                supabase.table("indicator_values").upsert({
-                    "indicator_id": indicator_id,
-                    "member_state_id": country_id,
-                    "year": int(row["year"]),
-                    "value": float(row["value"]) if pd.notna(row["value"]) else None,
-                    "data_quality": "verified",
-                    "source_detail": f"Manual upload: {file.filename}",
-                }, on_conflict="indicator_id,member_state_id,year").execute()
-                processed += 1
-
-            except Exception as e:
-                failed += 1
-                errors.append(str(e))
-
-        return {
-            "status": "completed",
-            "filename": file.filename,
-            "records_processed": processed,
-            "records_failed": failed,
-            "errors": errors[:20],
-        }
+    version_id = result.pop("data_version_id")
+    if version_id:
+        background_tasks.add_task(refresh_after_publish, version_id)
 
+    return {
+        "status": result.pop("status", "error"),
+        "filename": file.filename,
+        **result,
+    }
+
+
+@router.post("/jobs", status_code=202)
+async def create_upload_job(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    user: dict = Depends(require_analyst),
+):
+    """
+    Accept an Excel/CSV upload and load it in the background.
+
+    Same columns and validation as /upload/excel. Returns at once with a job id;
+    poll /upload/jobs/{job_id} for progress. A file identical to one already
+    loaded gets no job.
+    """
+    supabase = get_supabase()
+    path, content_hash, size = await spool_to_disk(file, file.filename)
+    previous = find_loaded(supabase, content_hash)
+    if previous:
+        os.unlink(path)
+        record_upload(supabase, content_hash, file.filename, size, user.get("id"), duplicate_of=previous["id"])
+        result = duplicate_result(previous)
+        result.pop("data_version_id")
+        return {"job_id": None, "filename": file.filename, **result}
+
+    job_id = create_job(supabase, file.filename, user.get("id"))
+    ledger_id = record_upload(supabase, content_hash, file.filename, size, user.get("id"), upload_job_id=job_id)
+    background_tasks.add_task(_run_upload_job, job_id, ledger_id, path, file.filename)
+    return {"job_id": job_id, "status": "queued", "filename": file.filename}
+
+
+async def _run_upload_job(job_id: int, ledger_id: int, path: str, filename: str):
+    """Parse and stage in the process pool, then publish and run the post-load work here."""
+    supabase = get_supabase()
+    version_id = None
+    try:
+        result = await run_cpu_bound(run_upload_job, job_id, path, filename, pool="uploads")
+        version_id = result["data_version_id"]
+        changed = 0
+        if version_id:
+            update_job(supabase, job_id, status="publishing")
+            changed = await asyncio.to_thread(publish_version, supabase, version_id)
+        update_job(
+            supabase, job_id,
+            status="completed" if result["status"] == "completed" else "failed",
+            error_message=None if result["status"] == "completed" else result["errors"][0],
+            data_version_id=version_id,
+            records_changed=changed,
+            finished_at=datetime.now(timezone.utc).isoformat(),
+            **{k: result[k] for k in ("rows_parsed", "rows_loaded", "rows_unchanged", "rows_failed", "errors", "rows_per_sec")},
+        )
+        finish_upload(supabase, ledger_id, result, version_id if changed else None)
     except Exception as e:
-        return {
-            "status": "error",
-            "filename": file.filename,
-            "records_processed": 0,
-            "records_failed": 0,
-            "errors": [str(e)],
-        }
+        logger.error("upload_job_failed", job_id=job_id, error=str(e))
+        if version_id:
+            discard_version(supabase, version_id)
+        update_job(
+            supabase, job_id, status="failed", error_message=str(e),
+            finished_at=datetime.now(timezone.utc).isoformat(),
+        )
+        finish_upload(supabase, ledger_id, {"status": "failed"}, None)
+        return
+    finally:
+        os.unlink(path)
+
+    if changed:
+        await refresh_after_publish(version_id)
+
+
+@router.get("/jobs/{job_id}")
+async def upload_job_status(job_id: int, user: dict = Depends(require_analyst)):
+    """Progress of an upload job: rows parsed, loaded and failed, the error sample and throughput."""
+    job = get_job(get_supabase(), job_id)
+    if not job:
+        return {"error": "Upload job not found"}
+    return job
 
 
 @router.post("/form")
-async def submit_form_data(payload: dict, user: dict = Depends(require_analyst)):
+async def submit_form_data(
+    payload: dict,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(require_analyst),
+):
     """
     Submit data entries via form (JSON).
 
@@ -105,15 +159,11 @@ async def submit_form_data(payload: dict, user: dict = Depends(require_analyst))
     if not entries:
         return {"status": "error", "records_inserted": 0, "errors": ["No entries provided"]}
 
-    # Build lookups
-    countries = supabase.table("member_states").select("id, iso_code").execute()
-    country_lookup = {c["iso_code"]: c["id"] for c in countries.data}
-
-    indicators = supabase.table("indicators").select("id, code").execute()
-    indicator_lookup = {i["code"]: i["id"] for i in indicators.data}
+    country_lookup, indicator_lookup = load_lookups(supabase)
 
     inserted = 0
     errors = []
+    rows = {}
 
     for entry in entries:
         try:
@@ -131,23 +181,29 @@ async def submit_form_data(payload: dict, user: dict = Depends(require_analyst))
             if not indicator_id:
                 errors.append(f"Unknown indicator: {code}")
                 continue
-            if year < 2000 or year > 2030:
+            if year < settings.BACKFILL_START_YEAR or year > MAX_UPLOAD_YEAR:
                 errors.append(f"Year out of range: {year}")
                 continue
 
-            supabase.table("indicator_values").upsert({
+            rows[(indicator_id, country_id, year)] = {
                 "indicator_id": indicator_id,
                 "member_state_id": country_id,
                 "year": year,
                 "value": value,
                 "data_quality": "verified",
                 "source_detail": "Manual form entry",
-            }, on_conflict="indicator_id,member_state_id,year").execute()
+            }
             inserted += 1
 
         except Exception as e:
             errors.append(str(e))
 
+    if rows:
+        version_id = create_version(supabase, "form")
+        stage_values(supabase, version_id, list(rows.values()))
+        if publish_version(supabase, version_id):
+            background_tasks.add_task(refresh_after_publish, version_id)
+
     return {
         "status": "completed" if inserted > 0 else "error",
         "records_inserted": inserted,
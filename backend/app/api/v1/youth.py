@@ -1,7 +1,7 @@
 """Youth Analytics endpoints (WGYD)."""
 
 from fastapi import APIRouter
-from app.core.database import get_supabase
+from app.core.database import get_supabase, fetch_all
 from app.services.analytics_service import get_youth_overview
 
 router = APIRouter(prefix="/youth", tags=["Youth Analytics"])
@@ -79,18 +79,21 @@ async def youth_employment():
 
 
 @router.get("/trends")
-async def youth_trends():
+async def youth_trends(start_year: int | None = None, end_year: int | None = None):
     """Multi-year youth metric trends."""
     supabase = get_supabase()
-    metrics = (
-        supabase.table("youth_metrics")
-        .select("year, youth_unemployment_pct, secondary_enrollment_pct")
-        .order("year")
-        .execute()
-    )
+    def _query():
+        query = supabase.table("youth_metrics").select("year, youth_unemployment_pct, secondary_enrollment_pct")
+        if start_year:
+            query = query.gte("year", start_year)
+        if end_year:
+            query = query.lte("year", end_year)
+        return query.order("year").order("member_state_id")
+
+    metrics = fetch_all(_query)
 
     year_data = {}
-    for m in metrics.data:
+    for m in metrics:
         yr = m["year"]
         if yr not in year_data:
             year_data[yr] = {"unemployment": [], "enrollment": []}
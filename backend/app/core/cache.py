@@ -0,0 +1,59 @@
+"""In-process cache for derived data, invalidated whenever a new data version is published."""
+
+import time
+from typing import Any, Callable
+import structlog
+from app.core.database import get_supabase
+
+logger = structlog.get_logger()
+
+# How long a process trusts its view of the data_state pointer before re-reading it.
+# Publishes in this process invalidate immediately; other processes within this window.
+VERSION_TTL_SECONDS = 5.0
+
+_entries: dict[Any, Any] = {}
+_state: dict[str, Any] = {"token": None, "checked_at": 0.0}
+
+
+def _read_token() -> tuple:
+    supabase = get_supabase()
+    result = supabase.table("data_state").select("published_version_id, insights_batch_id").execute()
+    if not result.data:
+        return (None, None)
+    row = result.data[0]
+    return (row.get("published_version_id"), row.get("insights_batch_id"))
+
+
+def data_token() -> tuple:
+    """(published data version, active insights batch) — changes on every publish."""
+    now = time.monotonic()
+    if now - _state["checked_at"] > VERSION_TTL_SECONDS:
+        try:
+            token = _read_token()
+        except Exception as e:
+            logger.warning("data_state_read_failed", error=str(e))
+            token = _state["token"]
+        _state["checked_at"] = now
+        if token != _state["token"]:
+            _entries.clear()
+            _state["token"] = token
+    return _state["token"]
+
+
+def data_version() -> int | None:
+    """Currently published data version id."""
+    return data_token()[0]
+
+
+def cached(key: Any, compute: Callable[[], Any]) -> Any:
+    """Return the cached value for key under the current data version, computing it on a miss."""
+    data_token()
+    if key not in _entries:
+        _entries[key] = compute()
+    return _entries[key]
+
+
+def invalidate():
+    """Drop every cached entry and force the pointer to be re-read on next access."""
+    _entries.clear()
+    _state["checked_at"] = 0.0
@@ -27,6 +27,37 @@ class Settings(BaseSettings):
     # Logging
     LOG_LEVEL: str = "INFO"
 
+    # Data coverage — the year window regular ETL runs load and data quality scores against
+    DATA_START_YEAR: int = 2000
+    DATA_END_YEAR: int = 2024
+    # Earliest year a historical backfill may load
+    BACKFILL_START_YEAR: int = 1960
+
+    # ETL source connectors — request budget shared by all sources (each also has its own)
+    ETL_GLOBAL_RATE_PER_SEC: float = 10.0
+    ETL_HTTP_TIMEOUT: float = 120.0
+
+    # Process pool for CPU-bound work (0 runs it in threads instead)
+    CPU_WORKERS: int = 4
+    # Separate process pool for upload jobs, so they never queue ahead of insight generators (0: threads)
+    UPLOAD_WORKERS: int = 1
+    # Seconds one insight generator may run before its results are dropped
+    INSIGHT_GENERATOR_TIMEOUT: float = 60.0
+
+    # Uploaded files are parsed and validated this many rows at a time (bounds memory)
+    UPLOAD_PARSE_CHUNK_ROWS: int = 20000
+    # Rows per bulk upsert when staging an uploaded file
+    UPLOAD_CHUNK_SIZE: int = 2000
+    # Upload jobs and ledger entries with no progress for this long are failed (their process died; 0 disables)
+    UPLOAD_JOB_STALE_MINUTES: int = 120
+
+    # Insights retention — inactive insights older than this move to insights_archive
+    INSIGHTS_RETENTION_DAYS: int = 30
+    INSIGHTS_ARCHIVE_BATCH_SIZE: int = 5000
+    INSIGHTS_ARCHIVE_PAUSE_SECONDS: float = 0.5
+    # How often the API runs the archiver (0 disables it; use the CLI or endpoint instead)
+    INSIGHTS_ARCHIVE_INTERVAL_HOURS: float = 24.0
+
     @property
     def cors_origins_list(self) -> List[str]:
         try:
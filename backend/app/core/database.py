@@ -48,3 +48,20 @@ async def close_pg_pool():
         await _pg_pool.close()
         _pg_pool = None
         logger.info("pg_pool_closed")
+
+
+def fetch_all(build_query, page_size: int = 1000) -> list[dict]:
+    """
+    Run a PostgREST query page by page and return every row.
+
+    PostgREST caps rows per response, so large reads are paged with .range().
+    `build_query` must return a fresh, ordered query builder on each call.
+    """
+    rows = []
+    start = 0
+    while True:
+        page = build_query().range(start, start + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
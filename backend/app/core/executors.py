@@ -0,0 +1,74 @@
+"""
+Process pools for CPU-bound work. Insight generation and similar number
+crunching share the "cpu" pool; upload jobs get their own "uploads" pool, so
+a long upload never queues ahead of generators whose timeouts are running.
+"""
+
+import asyncio
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import structlog
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+_process_pools: dict[str, ProcessPoolExecutor] = {}
+
+
+def _pool_size(name: str) -> int:
+    return {"cpu": settings.CPU_WORKERS, "uploads": settings.UPLOAD_WORKERS}[name]
+
+
+def get_process_pool(name: str = "cpu") -> ProcessPoolExecutor | None:
+    """Get or create a named process pool. None when its worker count is 0 (run in threads)."""
+    workers = _pool_size(name)
+    if name not in _process_pools and workers > 0:
+        # spawn, not fork: the API process runs threads (asyncio, HTTP clients)
+        _process_pools[name] = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info("process_pool_initialized", pool=name, workers=workers)
+    return _process_pools.get(name)
+
+
+def shutdown_process_pool(name: str | None = None, wait: bool = True):
+    """Shut down one pool, or all of them; the next get_process_pool() starts a fresh one."""
+    for pool_name in [name] if name else list(_process_pools):
+        pool = _process_pools.pop(pool_name, None)
+        if pool:
+            pool.shutdown(wait=wait, cancel_futures=True)
+            logger.info("process_pool_closed", pool=pool_name)
+
+
+def warm_process_pool(*modules: str, pool: str = "cpu"):
+    """
+    Start a pool's workers and import `modules` in them now, so the first real
+    task does not pay for process start-up and heavy imports (pandas, numpy).
+    """
+    executor = get_process_pool(pool)
+    if executor is None:
+        return
+    for _ in range(_pool_size(pool)):
+        for module in modules:
+            executor.submit(importlib.import_module, module)
+
+
+async def run_cpu_bound(fn, *args, pool: str = "cpu"):
+    """
+    Run `fn(*args)` in the named process pool, or in a thread when that pool is disabled.
+
+    `fn` and its arguments must be picklable. A worker that dies breaks the
+    whole pool; it is replaced so the next call gets working processes.
+    """
+    executor = get_process_pool(pool)
+    if executor is None:
+        return await asyncio.to_thread(fn, *args)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    except BrokenProcessPool:
+        logger.error("process_pool_broken", pool=pool)
+        shutdown_process_pool(pool, wait=False)
+        raise
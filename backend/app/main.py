@@ -6,6 +6,7 @@ into actionable insights for evidence-based decision-making across the
 African Union's 55 member states and 20 Agenda 2063 goals.
 """
 
+import asyncio
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -16,6 +17,9 @@ import structlog
 
 from app.core.config import settings
 from app.core.database import get_supabase, get_pg_pool, close_pg_pool
+from app.core.executors import shutdown_process_pool, warm_process_pool
+from app.services.insight_retention import run_retention_schedule
+from app.services.uploads import run_stale_upload_sweep
 from app.api.v1.router import api_router
 
 logger = structlog.get_logger()
@@ -46,10 +50,32 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning("postgres_pool_failed", error=str(e))
 
+    # Start CPU workers in the background so the first insights run or upload job is not a cold start
+    try:
+        warm_process_pool("app.services.insights_engine")
+        warm_process_pool("app.services.uploads", pool="uploads")
+    except Exception as e:
+        logger.warning("process_pool_warm_failed", error=str(e))
+
+    # Move retired insights to the archive on a schedule
+    retention_task = None
+    if settings.INSIGHTS_ARCHIVE_INTERVAL_HOURS > 0:
+        retention_task = asyncio.create_task(run_retention_schedule())
+
+    # Upload jobs run in this process and die with it: fail the ones a previous process left unfinished
+    upload_sweep_task = None
+    if settings.UPLOAD_JOB_STALE_MINUTES > 0:
+        upload_sweep_task = asyncio.create_task(run_stale_upload_sweep())
+
     yield
 
     # Shutdown
+    if retention_task:
+        retention_task.cancel()
+    if upload_sweep_task:
+        upload_sweep_task.cancel()
     await close_pg_pool()
+    shutdown_process_pool()
     logger.info("application_shutdown")
 
 
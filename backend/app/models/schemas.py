@@ -222,6 +222,40 @@ class InsightsSummary(BaseModel):
     latest_generated: Optional[datetime] = None
 
 
+class InsightRuleBase(BaseModel):
+    indicator_code: str
+    aggregation: str = "count"  # count, mean or each
+    comparison: str  # >, >=, <, <=
+    threshold: float
+    min_countries: int = Field(default=1, ge=1)
+    top_n: int = Field(default=5, ge=1, le=55)
+    type: InsightType = InsightType.ALERT
+    severity: InsightSeverity
+    goal_number: Optional[int] = Field(default=None, ge=1, le=20)
+    title_template: str
+    description_template: str
+    is_active: bool = True
+
+
+class InsightRuleCreate(InsightRuleBase):
+    key: str = Field(..., pattern=r"^[a-z0-9_]+$")
+
+
+class InsightRuleUpdate(BaseModel):
+    indicator_code: Optional[str] = None
+    aggregation: Optional[str] = None
+    comparison: Optional[str] = None
+    threshold: Optional[float] = None
+    min_countries: Optional[int] = Field(default=None, ge=1)
+    top_n: Optional[int] = Field(default=None, ge=1, le=55)
+    type: Optional[InsightType] = None
+    severity: Optional[InsightSeverity] = None
+    goal_number: Optional[int] = Field(default=None, ge=1, le=20)
+    title_template: Optional[str] = None
+    description_template: Optional[str] = None
+    is_active: Optional[bool] = None
+
+
 # ── ETL Pipeline ────────────────────────────────────────────────────
 
 class ETLRunResponse(BaseModel):
@@ -241,6 +275,18 @@ class ETLTriggerRequest(BaseModel):
     indicators: Optional[List[str]] = None  # Specific indicator codes, or all
     countries: Optional[List[str]] = None  # Specific ISO codes, or all 55
     years: Optional[List[int]] = None  # Specific years, or default range
+    sources: Optional[List[str]] = None  # Connector names (world_bank, un_sdg, afdb), or all active
+    shard_by: Optional[str] = None  # "indicator", "country" or "year" — enqueue shards for workers
+    shard_size: int = Field(default=4, ge=1)  # Indicators, countries or years per shard
+
+
+class BackfillRequest(BaseModel):
+    start_year: int = Field(default=1960, ge=1960)
+    end_year: int = Field(default=1999, le=2100)
+    window_years: int = Field(default=10, ge=1)  # Years per shard
+    concurrency: int = Field(default=4, ge=1, le=16)  # Windows processed at once
+    indicators: Optional[List[str]] = None  # Specific indicator codes, or all
+    sources: Optional[List[str]] = None  # Connector names, or all active
 
 
 class DataSourceResponse(BaseModel):
@@ -251,6 +297,8 @@ class DataSourceResponse(BaseModel):
     last_refresh: Optional[datetime] = None
     record_count: Optional[int] = None
     status: str = "active"
+    connector: Optional[str] = None
+    priority: Optional[int] = None
 
     model_config = {"from_attributes": True}
 
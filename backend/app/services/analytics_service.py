@@ -3,20 +3,26 @@ Analytics Service — Aggregations, trends, comparisons, and rankings.
 """
 
 import structlog
-from app.core.database import get_supabase
+from datetime import datetime
+from app.core.cache import cached
+from app.core.database import get_supabase, fetch_all
+from app.services.imputation import filter_estimated
+from app.services.value_history import resolve_version, values_as_of
 
 logger = structlog.get_logger()
 
 
-async def get_dashboard_summary() -> dict:
-    """Build the main dashboard KPI summary."""
+async def get_dashboard_summary(include_estimated: bool = False) -> dict:
+    """Build the main dashboard KPI summary, from reported values unless estimates are included."""
     supabase = get_supabase()
 
     # Counts
     states = supabase.table("member_states").select("id", count="exact").execute()
     goals = supabase.table("goals").select("id", count="exact").execute()
     indicators = supabase.table("indicators").select("id", count="exact").execute()
-    data_points = supabase.table("indicator_values").select("id", count="exact").execute()
+    data_points = filter_estimated(
+        supabase.table("indicator_values").select("id", count="exact"), include_estimated,
+    ).execute()
 
     # Latest ETL run
     latest_etl = (
@@ -46,32 +52,32 @@ async def get_dashboard_summary() -> dict:
     kpis = []
 
     # GDP per capita
-    gdp = await _get_continental_average("NY.GDP.PCAP.CD")
+    gdp = await _get_continental_average("NY.GDP.PCAP.CD", include_estimated)
     if gdp is not None:
         kpis.append({"label": "Avg GDP per Capita", "value": f"${gdp:,.0f}", "target": "$12,000", "unit": "USD"})
 
     # Life expectancy
-    le = await _get_continental_average("SP.DYN.LE00.IN")
+    le = await _get_continental_average("SP.DYN.LE00.IN", include_estimated)
     if le is not None:
         kpis.append({"label": "Avg Life Expectancy", "value": f"{le:.1f} years", "target": "75 years", "unit": "years"})
 
     # Women in parliament
-    wip = await _get_continental_average("SG.GEN.PARL.ZS")
+    wip = await _get_continental_average("SG.GEN.PARL.ZS", include_estimated)
     if wip is not None:
         kpis.append({"label": "Women in Parliament", "value": f"{wip:.1f}%", "target": "50%", "unit": "%"})
 
     # Youth unemployment
-    yu = await _get_continental_average("SL.UEM.1524.ZS")
+    yu = await _get_continental_average("SL.UEM.1524.ZS", include_estimated)
     if yu is not None:
         kpis.append({"label": "Youth Unemployment", "value": f"{yu:.1f}%", "target": "<6%", "unit": "%"})
 
     # Internet access
-    ia = await _get_continental_average("IT.NET.USER.ZS")
+    ia = await _get_continental_average("IT.NET.USER.ZS", include_estimated)
     if ia is not None:
         kpis.append({"label": "Internet Penetration", "value": f"{ia:.1f}%", "target": "100%", "unit": "%"})
 
     # Electricity access
-    ea = await _get_continental_average("EG.ELC.ACCS.ZS")
+    ea = await _get_continental_average("EG.ELC.ACCS.ZS", include_estimated)
     if ea is not None:
         kpis.append({"label": "Electricity Access", "value": f"{ea:.1f}%", "target": "100%", "unit": "%"})
 
@@ -87,8 +93,15 @@ async def get_dashboard_summary() -> dict:
     }
 
 
-async def _get_continental_average(indicator_code: str) -> float | None:
+async def _get_continental_average(indicator_code: str, include_estimated: bool = False) -> float | None:
     """Get the average of the most recent values across all countries for an indicator."""
+    return cached(
+        ("continental_average", indicator_code, include_estimated),
+        lambda: _compute_continental_average(indicator_code, include_estimated),
+    )
+
+
+def _compute_continental_average(indicator_code: str, include_estimated: bool = False) -> float | None:
     supabase = get_supabase()
 
     indicator = supabase.table("indicators").select("id").eq("code", indicator_code).execute()
@@ -96,8 +109,9 @@ async def _get_continental_average(indicator_code: str) -> float | None:
         return None
 
     values = (
-        supabase.table("indicator_values")
-        .select("member_state_id, year, value")
+        filter_estimated(
+            supabase.table("indicator_values").select("member_state_id, year, value"), include_estimated,
+        )
         .eq("indicator_id", indicator.data[0]["id"])
         .order("year", desc=True)
         .execute()
@@ -114,48 +128,96 @@ async def _get_continental_average(indicator_code: str) -> float | None:
     return sum(latest) / len(latest) if latest else None
 
 
-async def get_indicator_time_series(indicator_id: int, country_iso: str | None = None) -> dict:
-    """Get time series for an indicator, optionally filtered by country."""
+async def get_indicator_time_series(
+    indicator_id: int,
+    country_iso: str | None = None,
+    as_of: datetime | None = None,
+    start_year: int | None = None,
+    end_year: int | None = None,
+    include_estimated: bool = False,
+) -> dict:
+    """
+    Get time series for an indicator, optionally filtered by country, year range and/or as of a past time.
+    Estimated values are left out unless `include_estimated`; as-of reads always return what was published.
+    """
     supabase = get_supabase()
 
     indicator = supabase.table("indicators").select("*").eq("id", indicator_id).execute()
     if not indicator.data:
         return {"error": "Indicator not found"}
 
-    query = (
-        supabase.table("indicator_values")
-        .select("year, value, member_states(name, iso_code)")
-        .eq("indicator_id", indicator_id)
-        .order("year")
-    )
-
+    country_id = None
     if country_iso:
         # Get country ID
         country = supabase.table("member_states").select("id").eq("iso_code", country_iso.upper()).execute()
         if country.data:
-            query = query.eq("member_state_id", country.data[0]["id"])
+            country_id = country.data[0]["id"]
 
-    result = query.execute()
-
-    return {
+    response = {
         "indicator_id": indicator_id,
         "indicator_name": indicator.data[0]["name"],
         "unit": indicator.data[0].get("unit"),
         "country": country_iso,
-        "values": [
-            {"year": v["year"], "value": v["value"], "country": v.get("member_states", {}).get("name")}
-            for v in result.data
-        ],
     }
 
+    if as_of:
+        version_id = resolve_version(supabase, as_of)
+        names = {
+            c["id"]: c["name"]
+            for c in supabase.table("member_states").select("id, name").execute().data
+        }
+        rows = sorted(
+            (
+                v for v in values_as_of(supabase, version_id, indicator_id, country_id)
+                if (not start_year or v["year"] >= start_year) and (not end_year or v["year"] <= end_year)
+            ),
+            key=lambda v: v["year"],
+        )
+        response["as_of"] = as_of.isoformat()
+        response["data_version_id"] = version_id
+        response["values"] = [
+            {"year": v["year"], "value": v["value"], "country": names.get(v["member_state_id"])}
+            for v in rows
+        ]
+        return response
+
+    def _query():
+        query = filter_estimated(
+            supabase.table("indicator_values").select("year, value, data_quality, member_states(name, iso_code)"),
+            include_estimated,
+        ).eq("indicator_id", indicator_id)
+        if country_id:
+            query = query.eq("member_state_id", country_id)
+        if start_year:
+            query = query.gte("year", start_year)
+        if end_year:
+            query = query.lte("year", end_year)
+        return query.order("year").order("member_state_id")
+
+    # A full backfilled history spans more rows than one PostgREST page
+    response["values"] = [
+        {
+            "year": v["year"],
+            "value": v["value"],
+            "country": v.get("member_states", {}).get("name"),
+            "estimated": v.get("data_quality") == "estimated",
+        }
+        for v in fetch_all(_query)
+    ]
+    return response
+
 
-async def get_indicator_ranking(indicator_id: int, year: int | None = None, limit: int = 55) -> list[dict]:
+async def get_indicator_ranking(
+    indicator_id: int, year: int | None = None, limit: int = 55, include_estimated: bool = False,
+) -> list[dict]:
     """Rank countries by an indicator value."""
     supabase = get_supabase()
 
     query = (
-        supabase.table("indicator_values")
-        .select("value, year, member_states(name, iso_code, regions(name))")
+        filter_estimated(
+            supabase.table("indicator_values").select("value, year, data_quality, member_states(name, iso_code, regions(name))"),
+            include_estimated,
+        )
         .eq("indicator_id", indicator_id)
         .not_.is_("value", "null")
         .order("value", desc=True)
@@ -186,12 +248,13 @@ async def get_indicator_ranking(indicator_id: int, year: int | None = None, limi
             "value": v["value"],
             "year": v["year"],
             "region": v.get("member_states", {}).get("regions", {}).get("name") if v.get("member_states", {}).get("regions") else None,
+            "estimated": v.get("data_quality") == "estimated",
         }
         for i, v in enumerate(filtered[:limit])
     ]
 
 
-async def get_goal_progress_by_region(goal_id: int) -> dict:
+async def get_goal_progress_by_region(goal_id: int, include_estimated: bool = False) -> dict:
     """Get average progress for a goal broken down by region."""
     supabase = get_supabase()
 
@@ -206,8 +269,7 @@ async def get_goal_progress_by_region(goal_id: int) -> dict:
     region_data = {}
     for ind in indicators.data:
         values = (
-            supabase.table("indicator_values")
-            .select("value, member_states(region_id)")
+            filter_estimated(supabase.table("indicator_values").select("value, member_states(region_id)"), include_estimated)
             .eq("indicator_id", ind["id"])
             .not_.is_("value", "null")
             .order("year", desc=True)
@@ -289,8 +351,8 @@ async def get_youth_overview() -> dict:
     }
 
 
-async def get_country_profile(iso_code: str) -> dict:
-    """Get comprehensive country profile."""
+async def get_country_profile(iso_code: str, as_of: datetime | None = None, include_estimated: bool = False) -> dict:
+    """Get comprehensive country profile, optionally as the dashboard showed it at a past time."""
     supabase = get_supabase()
 
     country = (
@@ -306,18 +368,34 @@ async def get_country_profile(iso_code: str) -> dict:
     country_id = country_data["id"]
 
     # Latest indicator values
-    values = (
-        supabase.table("indicator_values")
-        .select("value, year, indicators(name, code, unit, goals(number, name))")
-        .eq("member_state_id", country_id)
-        .order("year", desc=True)
-        .execute()
-    )
+    if as_of:
+        version_id = resolve_version(supabase, as_of)
+        indicators = {
+            i["id"]: i
+            for i in supabase.table("indicators").select("id, name, code, unit, goals(number, name)").execute().data
+        }
+        history = values_as_of(supabase, version_id, member_state_id=country_id)
+        value_rows = [
+            {"value": v["value"], "year": v["year"], "indicators": indicators.get(v["indicator_id"], {})}
+            for v in sorted(history, key=lambda v: v["year"], reverse=True)
+        ]
+    else:
+        values = (
+            filter_estimated(
+                supabase.table("indicator_values")
+                .select("value, year, data_quality, indicators(name, code, unit, goals(number, name))"),
+                include_estimated,
+            )
+            .eq("member_state_id", country_id)
+            .order("year", desc=True)
+            .execute()
+        )
+        value_rows = values.data
 
     # Deduplicate by indicator
     seen = set()
     key_indicators = []
-    for v in values.data:
+    for v in value_rows:
         ind = v.get("indicators", {})
         code = ind.get("code")
         if code and code not in seen:
@@ -329,6 +407,7 @@ async def get_country_profile(iso_code: str) -> dict:
                 "year": v["year"],
                 "unit": ind.get("unit"),
                 "goal": ind.get("goals", {}).get("name") if ind.get("goals") else None,
+                "estimated": v.get("data_quality") == "estimated",
             })
 
     # Gender metrics
@@ -351,9 +430,13 @@ async def get_country_profile(iso_code: str) -> dict:
         .execute()
     )
 
-    return {
+    profile = {
         "country": country_data,
         "key_indicators": key_indicators,
         "gender_metrics": gender.data[0] if gender.data else None,
         "youth_metrics": youth.data[0] if youth.data else None,
     }
+    if as_of:
+        profile["as_of"] = as_of.isoformat()
+        profile["data_version_id"] = version_id
+    return profile
@@ -0,0 +1,171 @@
+"""
+Historical Backfill — Loads pre-2000 history as a sharded run of year windows.
+
+The requested range is split into windows of `window_years` and enqueued as
+`etl_shards`, so every window is a resumable checkpoint: a window that finished
+stays finished, an interrupted one is re-claimed once its lease expires, and a
+failed one can be re-run on its own. Windows stage into the run's data version
+and are published together through the bulk path when the last one finishes.
+
+Run from the command line with:
+
+    python -m app.services.backfill --start-year 1960 --end-year 1999
+    python -m app.services.backfill --resume 42
+"""
+
+import argparse
+import asyncio
+import structlog
+from app.core.config import settings
+from app.core.database import get_supabase, close_pg_pool
+from app.services.etl_workers import create_sharded_run, run_worker, worker_name, _require_pool
+
+logger = structlog.get_logger()
+
+DEFAULT_WINDOW_YEARS = 10
+DEFAULT_CONCURRENCY = 4
+
+
+async def drain_run(etl_run_id: int, concurrency: int = DEFAULT_CONCURRENCY) -> int:
+    """Process a run's shards with `concurrency` in-process workers. Returns shards processed."""
+    counts = await asyncio.gather(*[
+        run_worker(worker_id=worker_name(), etl_run_id=etl_run_id, exit_when_idle=True)
+        for _ in range(max(1, concurrency))
+    ])
+    return sum(counts)
+
+
+def _run_summary(etl_run_id: int) -> dict:
+    supabase = get_supabase()
+    run = (
+        supabase.table("etl_runs")
+        .select("id, status, records_processed, records_failed, shards_total, shards_completed, shards_failed")
+        .eq("id", etl_run_id)
+        .single()
+        .execute()
+    )
+    return {"etl_run_id": etl_run_id, **run.data}
+
+
+async def run_backfill(
+    start_year: int = settings.BACKFILL_START_YEAR,
+    end_year: int = settings.DATA_START_YEAR - 1,
+    window_years: int = DEFAULT_WINDOW_YEARS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    indicator_codes: list[str] | None = None,
+    countries: list[str] | None = None,
+    source_names: list[str] | None = None,
+) -> dict:
+    """Backfill [start_year, end_year] in year windows with bounded concurrency."""
+    if start_year < settings.BACKFILL_START_YEAR:
+        raise ValueError(f"Backfill cannot start before {settings.BACKFILL_START_YEAR}")
+
+    run = await create_sharded_run(
+        indicator_codes, countries, start_year, end_year,
+        shard_by="year", shard_size=window_years, source_names=source_names,
+    )
+    logger.info(
+        "backfill_started",
+        run_id=run["etl_run_id"],
+        start_year=start_year,
+        end_year=end_year,
+        windows=run["shards_total"],
+        concurrency=concurrency,
+    )
+    await drain_run(run["etl_run_id"], concurrency)
+    return _run_summary(run["etl_run_id"])
+
+
+async def prepare_resume(etl_run_id: int) -> int | None:
+    """
+    Work out which run resuming a backfill has to drain.
+
+    A run that is still open (the process died mid-way) is drained again;
+    its workers wait for windows still leased by the dead process until the
+    lease expires, then re-claim them. A finished run with failed windows gets
+    a new run covering only those windows. Returns None when there is nothing
+    left to resume; raises ValueError for an unknown run.
+    """
+    pool = await _require_pool()
+    async with pool.acquire() as conn:
+        run = await conn.fetchrow("SELECT status, source_names FROM etl_runs WHERE id = $1", etl_run_id)
+        if run is None:
+            raise ValueError(f"ETL run {etl_run_id} not found")
+        status = run["status"]
+        failed = await conn.fetch(
+            """
+            SELECT shard_key, indicator_codes, countries, start_year, end_year
+            FROM etl_shards
+            WHERE etl_run_id = $1 AND status = 'failed'
+            ORDER BY start_year
+            """,
+            etl_run_id,
+        )
+
+    if status == "running":
+        logger.info("backfill_resumed", run_id=etl_run_id)
+        return etl_run_id
+
+    if not failed:
+        logger.info("backfill_nothing_to_resume", run_id=etl_run_id, status=status)
+        return None
+
+    run = await create_sharded_run(shards=[
+        {
+            "shard_key": row["shard_key"],
+            "indicator_codes": list(row["indicator_codes"]),
+            "countries": list(row["countries"]) if row["countries"] else None,
+            "start_year": row["start_year"],
+            "end_year": row["end_year"],
+        }
+        for row in failed
+    ], source_names=list(run["source_names"]) if run["source_names"] else None)
+    logger.info(
+        "backfill_retry_started",
+        run_id=run["etl_run_id"],
+        resumed_from=etl_run_id,
+        windows=run["shards_total"],
+    )
+    return run["etl_run_id"]
+
+
+async def resume_backfill(etl_run_id: int, concurrency: int = DEFAULT_CONCURRENCY) -> dict:
+    """Pick a backfill up where it stopped (see prepare_resume) and drain it."""
+    target = await prepare_resume(etl_run_id)
+    if target is None:
+        return _run_summary(etl_run_id)
+    await drain_run(target, concurrency)
+    if target == etl_run_id:
+        return _run_summary(etl_run_id)
+    return {**_run_summary(target), "resumed_from": etl_run_id}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill historical indicator values in year windows.")
+    parser.add_argument("--start-year", type=int, default=settings.BACKFILL_START_YEAR)
+    parser.add_argument("--end-year", type=int, default=settings.DATA_START_YEAR - 1)
+    parser.add_argument("--window-years", type=int, default=DEFAULT_WINDOW_YEARS)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--indicators", nargs="*", default=None, help="World Bank codes (default: all)")
+    parser.add_argument("--sources", nargs="*", default=None, help="Connector names (default: all active)")
+    parser.add_argument("--resume", type=int, default=None, help="Resume the backfill with this ETL run id")
+    args = parser.parse_args()
+
+    async def _main():
+        try:
+            if args.resume:
+                result = await resume_backfill(args.resume, args.concurrency)
+            else:
+                result = await run_backfill(
+                    args.start_year, args.end_year, args.window_years,
+                    args.concurrency, args.indicators, source_names=args.sources,
+                )
+            print(result)
+        finally:
+            await close_pg_pool()
+
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+African Development Bank Data Portal connector.
+
+Reads the portal's JSON data endpoint:
+
+    GET {api_url}/data/{dataset}?indicator=...&country=NGA,KEN&from=2000&to=2024&page=1
+    → {"data": [{"country": "NGA", "indicator": "...", "period": "2020", "value": 3.6}], "pages": 1}
+"""
+
+from app.services.connectors.base import Connector
+
+ISO3_CODES = {
+    "DZ": "DZA", "AO": "AGO", "BJ": "BEN", "BW": "BWA", "BF": "BFA", "BI": "BDI", "CV": "CPV",
+    "CM": "CMR", "CF": "CAF", "TD": "TCD", "KM": "COM", "CG": "COG", "CD": "COD", "CI": "CIV",
+    "DJ": "DJI", "EG": "EGY", "GQ": "GNQ", "ER": "ERI", "SZ": "SWZ", "ET": "ETH", "GA": "GAB",
+    "GM": "GMB", "GH": "GHA", "GN": "GIN", "GW": "GNB", "KE": "KEN", "LS": "LSO", "LR": "LBR",
+    "LY": "LBY", "MG": "MDG", "MW": "MWI", "ML": "MLI", "MR": "MRT", "MU": "MUS", "MA": "MAR",
+    "MZ": "MOZ", "NA": "NAM", "NE": "NER", "NG": "NGA", "RW": "RWA", "ST": "STP", "SN": "SEN",
+    "SC": "SYC", "SL": "SLE", "SO": "SOM", "ZA": "ZAF", "SS": "SSD", "SD": "SDN", "TZ": "TZA",
+    "TG": "TGO", "TN": "TUN", "UG": "UGA", "ZM": "ZMB", "ZW": "ZWE",
+}
+
+
+class AfDBConnector(Connector):
+    name = "afdb"
+    DATASET = "AFDBSEI"  # Socio-Economic Indicators database
+    INDICATOR_MAP = {
+        "NY.GDP.PCAP.CD": "GDP_PC_USD",
+        "GC.TAX.TOTL.GD.ZS": "TAX_REV_GDP",
+        "NV.AGR.TOTL.ZS": "AGR_VA_GDP",
+        "NV.IND.MANF.ZS": "MANUF_VA_GDP",
+        "BX.KLT.DINV.WD.GD.ZS": "FDI_IN_GDP",
+        "EG.ELC.ACCS.ZS": "ELEC_ACCESS",
+        "IT.CEL.SETS.P2": "MOBILE_SUB_100",
+    }
+
+    async def fetch_page(self, source_code, countries, start_year, end_year, page):
+        params = {
+            "indicator": source_code,
+            "country": ",".join(ISO3_CODES[c] for c in countries if c in ISO3_CODES),
+            "from": start_year,
+            "to": end_year,
+            "page": page,
+        }
+        data = (await self.get(f"{self.base_url}/data/{self.DATASET}", params)).json()
+        return data.get("data") or [], data.get("pages") or 1
+
+    def parse(self, record, indicator_code):
+        if record.get("value") is None:
+            return None
+        try:
+            value = float(record["value"])
+            year = int(str(record["period"])[:4])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return {
+            "country_iso": record.get("country"),
+            "country_iso2": None,
+            "indicator_code": indicator_code,
+            "year": year,
+            "value": value,
+            "source_code": record.get("indicator"),
+        }
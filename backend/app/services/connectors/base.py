@@ -0,0 +1,112 @@
+"""
+Connector interface — what every source must provide to feed the ETL pipeline.
+
+A connector knows how to ask one external API for one indicator: it maps the
+canonical indicator code (the World Bank code stored in `indicators.code`) and
+ISO2 country codes to the source's own codes, walks the source's paging, and
+turns each raw record into the common record shape the transform stage expects:
+
+    {"country_iso2", "country_iso", "indicator_code", "year", "value", "source_code"}
+
+Concrete connectors implement `fetch_page` and `parse`; `extract` walks the pages.
+"""
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+import httpx
+import structlog
+
+logger = structlog.get_logger()
+
+
+class RateLimiter:
+    """Token bucket shared by every request drawn against one budget."""
+
+    def __init__(self, rate_per_sec: float, burst: int = 1):
+        self.rate = max(float(rate_per_sec), 0.001)
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Connector(ABC):
+    """Base class for a registered data source."""
+
+    # Key of the connector in data_sources.connector
+    name: str = ""
+    # Canonical indicator code → source code. Unmapped indicators are skipped.
+    INDICATOR_MAP: dict[str, str] = {}
+
+    def __init__(self, source: dict, client: httpx.AsyncClient, global_limiter: RateLimiter):
+        self.source_id = source["id"]
+        self.source_name = source["name"]
+        self.priority = source.get("priority") or 100
+        self.base_url = (source.get("api_url") or "").rstrip("/")
+        self.client = client
+        self._global = global_limiter
+        self._limiter = RateLimiter(source.get("rate_limit_per_sec") or 5)
+        self.semaphore = asyncio.Semaphore(source.get("max_concurrency") or 4)
+
+    def source_indicator(self, indicator_code: str) -> str | None:
+        return self.INDICATOR_MAP.get(indicator_code)
+
+    async def get(self, url: str, params: dict) -> httpx.Response:
+        """GET under both the per-source and the global rate budget."""
+        await self._limiter.acquire()
+        await self._global.acquire()
+        resp = await self.client.get(url, params=params)
+        resp.raise_for_status()
+        return resp
+
+    @abstractmethod
+    async def fetch_page(
+        self, source_code: str, countries: list[str], start_year: int, end_year: int, page: int,
+    ) -> tuple[list[dict], int]:
+        """Fetch one page of raw records. Returns (records, total_pages)."""
+
+    @abstractmethod
+    def parse(self, record: dict, indicator_code: str) -> dict | None:
+        """Map one raw record to the common shape, or None to drop it."""
+
+    async def extract(
+        self, indicator_code: str, countries: list[str], start_year: int, end_year: int,
+    ) -> list[dict]:
+        """Fetch every page of an indicator and return parsed records."""
+        source_code = self.source_indicator(indicator_code)
+        if not source_code:
+            return []
+
+        async with self.semaphore:
+            records, total_pages = await self.fetch_page(source_code, countries, start_year, end_year, 1)
+            pages = [records]
+            for page in range(2, total_pages + 1):
+                page_records, _ = await self.fetch_page(source_code, countries, start_year, end_year, page)
+                pages.append(page_records)
+
+        parsed = []
+        for page_records in pages:
+            for record in page_records:
+                rec = self.parse(record, indicator_code)
+                if rec is not None and start_year <= rec["year"] <= end_year:
+                    parsed.append(rec)
+
+        logger.info(
+            "connector_fetch_success",
+            source=self.name,
+            indicator=indicator_code,
+            records=len(parsed),
+        )
+        return parsed
@@ -0,0 +1,98 @@
+"""
+Connector registry and concurrent fan-out.
+
+Every connector class is registered here under the key stored in
+`data_sources.connector`; the row supplies its base URL, rate budget and
+precedence. `extract_all` fetches every (source, indicator) pair at once,
+bounded by each source's concurrency and rate budget and a global rate budget
+shared by all of them.
+"""
+
+import asyncio
+import httpx
+import structlog
+from app.core.config import settings
+from app.services.connectors.base import Connector, RateLimiter
+from app.services.connectors.world_bank import WorldBankConnector
+from app.services.connectors.un_sdg import UNSDGConnector
+from app.services.connectors.afdb import AfDBConnector
+
+logger = structlog.get_logger()
+
+CONNECTORS: dict[str, type[Connector]] = {
+    WorldBankConnector.name: WorldBankConnector,
+    UNSDGConnector.name: UNSDGConnector,
+    AfDBConnector.name: AfDBConnector,
+}
+
+
+def load_sources(supabase, names: list[str] | None = None) -> list[dict]:
+    """Active data_sources rows that have a registered connector, best precedence first."""
+    result = (
+        supabase.table("data_sources")
+        .select("id, name, api_url, connector, priority, rate_limit_per_sec, max_concurrency")
+        .eq("status", "active")
+        .not_.is_("connector", "null")
+        .order("priority")
+        .execute()
+    )
+    sources = []
+    for row in result.data:
+        if row["connector"] not in CONNECTORS:
+            logger.warning("connector_not_registered", connector=row["connector"])
+            continue
+        if names and row["connector"] not in names:
+            continue
+        sources.append(row)
+    return sources
+
+
+async def extract_all(
+    sources: list[dict],
+    indicator_codes: list[str],
+    countries: list[str],
+    start_year: int,
+    end_year: int,
+) -> dict:
+    """
+    Fetch every indicator from every source concurrently.
+
+    Returns {"records": {indicator_code: [record, ...]},
+             "errors": {indicator_code: [message, ...]},
+             "sources": {connector: {"data_source_id", "records", "errors"}}}.
+    Each record carries the `data_source_id` and `priority` of its source.
+    """
+    global_limiter = RateLimiter(settings.ETL_GLOBAL_RATE_PER_SEC, burst=len(sources) or 1)
+    records = {code: [] for code in indicator_codes}
+    errors = {code: [] for code in indicator_codes}
+    stats = {
+        s["connector"]: {"data_source_id": s["id"], "records": 0, "errors": 0}
+        for s in sources
+    }
+
+    async with httpx.AsyncClient(timeout=settings.ETL_HTTP_TIMEOUT) as client:
+        connectors = [CONNECTORS[s["connector"]](s, client, global_limiter) for s in sources]
+
+        async def _fetch(connector: Connector, indicator_code: str):
+            try:
+                fetched = await connector.extract(indicator_code, countries, start_year, end_year)
+            except Exception as e:
+                stats[connector.name]["errors"] += 1
+                errors[indicator_code].append(f"{connector.name}: {e}")
+                logger.error("connector_fetch_error", source=connector.name, indicator=indicator_code, error=str(e))
+                return
+            for rec in fetched:
+                rec["data_source_id"] = connector.source_id
+                rec["priority"] = connector.priority
+                rec["source_detail"] = f"{connector.source_name} ({rec['source_code']})"
+            records[indicator_code].extend(fetched)
+            stats[connector.name]["records"] += len(fetched)
+
+        await asyncio.gather(*[
+            _fetch(connector, code)
+            for connector in connectors
+            for code in indicator_codes
+            if connector.source_indicator(code)
+        ])
+
+    return {"records": records, "errors": errors, "sources": stats}
@@ -0,0 +1,70 @@
+"""UN SDG Global Database connector (unstats.un.org/sdgapi/v1)."""
+
+from app.services.connectors.base import Connector
+
+# ISO2 → UN M49 area code used by the SDG API
+M49_CODES = {
+    "DZ": "12", "AO": "24", "BJ": "204", "BW": "72", "BF": "854", "BI": "108", "CV": "132",
+    "CM": "120", "CF": "140", "TD": "148", "KM": "174", "CG": "178", "CD": "180", "CI": "384",
+    "DJ": "262", "EG": "818", "GQ": "226", "ER": "232", "SZ": "748", "ET": "231", "GA": "266",
+    "GM": "270", "GH": "288", "GN": "324", "GW": "624", "KE": "404", "LS": "426", "LR": "430",
+    "LY": "434", "MG": "450", "MW": "454", "ML": "466", "MR": "478", "MU": "480", "MA": "504",
+    "MZ": "508", "NA": "516", "NE": "562", "NG": "566", "RW": "646", "ST": "678", "SN": "686",
+    "SC": "690", "SL": "694", "SO": "706", "ZA": "710", "SS": "728", "SD": "729", "TZ": "834",
+    "TG": "768", "TN": "788", "UG": "800", "ZM": "894", "ZW": "716",
+}
+ISO2_BY_M49 = {m49: iso2 for iso2, m49 in M49_CODES.items()}
+
+# Dimension values that denote the headline (all-population) series
+TOTAL_DIMENSIONS = {"BOTHSEX", "ALLAGE", "ALLAREA", "_T", "_Z"}
+
+
+class UNSDGConnector(Connector):
+    name = "un_sdg"
+    INDICATOR_MAP = {
+        "SI.POV.DDAY": "SI_POV_DAY1",
+        "SH.STA.MMRT": "SH_STA_MORT",
+        "SH.DYN.MORT": "SH_DYN_MORT",
+        "SH.STA.BRTC.ZS": "SH_STA_BRTC",
+        "SH.HIV.INCD.TL.P3": "SH_HIV_INCD",
+        "SP.ADO.TFRT": "SP_DYN_ADKL",
+        "SG.GEN.PARL.ZS": "SG_GEN_PARL",
+        "EG.ELC.ACCS.ZS": "EG_ELC_ACCS",
+        "EG.FEC.RNEW.ZS": "EG_FEC_RNEW",
+        "NV.IND.MANF.ZS": "NV_IND_MANF",
+        "IT.NET.USER.ZS": "IT_USE_ii99",
+    }
+    PAGE_SIZE = 1000
+
+    async def fetch_page(self, source_code, countries, start_year, end_year, page):
+        params = {
+            "seriesCode": source_code,
+            "areaCode": [M49_CODES[c] for c in countries if c in M49_CODES],
+            "timePeriodStart": start_year,
+            "timePeriodEnd": end_year,
+            "page": page,
+            "pageSize": self.PAGE_SIZE,
+        }
+        data = (await self.get(f"{self.base_url}/sdg/Series/Data", params)).json()
+        return data.get("data") or [], data.get("totalPages") or 1
+
+    def parse(self, record, indicator_code):
+        dimensions = record.get("dimensions") or {}
+        if any(v not in TOTAL_DIMENSIONS for v in dimensions.values()):
+            return None
+        iso2 = ISO2_BY_M49.get(str(record.get("geoAreaCode")))
+        value = record.get("value")
+        if not iso2 or value in (None, "", "NaN"):
+            return None
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        return {
+            "country_iso": None,
+            "country_iso2": iso2,
+            "indicator_code": indicator_code,
+            "year": int(float(record["timePeriodStart"])),
+            "value": value,
+            "source_code": record.get("series"),
+        }
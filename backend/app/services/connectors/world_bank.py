@@ -0,0 +1,62 @@
+"""World Bank Indicators API connector (api.worldbank.org/v2)."""
+
+from app.services.connectors.base import Connector
+
+# Indicators mapped to Agenda 2063 goals
+WB_INDICATORS = {
+    "NY.GDP.PCAP.CD": "GDP per capita (current US$)",
+    "SI.POV.DDAY": "Poverty headcount ratio ($2.15/day)",
+    "SE.ADT.LITR.ZS": "Adult literacy rate",
+    "SE.PRM.ENRR": "Primary school enrollment",
+    "SE.SEC.ENRR": "Secondary school enrollment",
+    "SP.DYN.LE00.IN": "Life expectancy at birth",
+    "SH.STA.MMRT": "Maternal mortality ratio",
+    "SH.DYN.MORT": "Under-5 mortality rate",
+    "NV.IND.MANF.ZS": "Manufacturing value added (% GDP)",
+    "BX.KLT.DINV.WD.GD.ZS": "FDI net inflows (% GDP)",
+    "NV.AGR.TOTL.ZS": "Agriculture value added (% GDP)",
+    "EN.ATM.CO2E.PC": "CO2 emissions per capita",
+    "EG.FEC.RNEW.ZS": "Renewable energy consumption (%)",
+    "IT.NET.USER.ZS": "Internet users (% population)",
+    "IT.CEL.SETS.P2": "Mobile subscriptions per 100",
+    "EG.ELC.ACCS.ZS": "Access to electricity (%)",
+    "SG.GEN.PARL.ZS": "Women in parliament (%)",
+    "SE.ENR.PRIM.FM.ZS": "Gender parity index (primary)",
+    "SL.TLF.CACT.FE.ZS": "Female labor force participation",
+    "SL.UEM.1524.ZS": "Youth unemployment (%)",
+    "SH.STA.BRTC.ZS": "Births attended by skilled staff (%)",
+    "GC.TAX.TOTL.GD.ZS": "Tax revenue (% GDP)",
+    "SP.ADO.TFRT": "Adolescent fertility rate",
+    "SH.HIV.INCD.TL.P3": "HIV incidence (per 1,000)",
+}
+
+
+class WorldBankConnector(Connector):
+    name = "world_bank"
+    # Canonical codes are World Bank codes
+    INDICATOR_MAP = {code: code for code in WB_INDICATORS}
+
+    async def fetch_page(self, source_code, countries, start_year, end_year, page):
+        url = f"{self.base_url}/country/{';'.join(countries)}/indicator/{source_code}"
+        params = {
+            "format": "json",
+            "per_page": 10000,
+            "date": f"{start_year}:{end_year}",
+            "page": page,
+        }
+        data = (await self.get(url, params)).json()
+        if not data or len(data) < 2:
+            return [], 1
+        return data[1] or [], data[0].get("pages", 1)
+
+    def parse(self, record, indicator_code):
+        if record.get("value") is None:
+            return None
+        return {
+            "country_iso": record["countryiso3code"],
+            "country_iso2": record["country"]["id"],
+            "indicator_code": indicator_code,
+            "year": int(record["date"]),
+            "value": float(record["value"]),
+            "source_code": indicator_code,
+        }
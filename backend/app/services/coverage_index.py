@@ -0,0 +1,177 @@
+"""
+Coverage Index — which years every (indicator, country) series has data for,
+held as one bitset per series.
+
+Bit k of a series' bitset is set when the series has a value for
+`first_year + k`. The bitsets are a uint64 array of shape
+indicator × country × words, built in one vectorized pass from the snapshot
+values and memoized on the snapshot (`InsightSnapshot.coverage()`). The
+published snapshot is reloaded whenever a load publishes a new data version,
+so the index is rebuilt with it and never goes stale.
+
+Gaps (series with no data at all), coverage percentages and missing-year
+lists are then bit operations in memory; `heatmap()` is the whole matrix as
+one compact payload. Coverage percentages are over the expected window
+(`DATA_START_YEAR`–`DATA_END_YEAR`), as in data quality scoring; the bitsets
+span every observed year as well, so backfilled history is not a gap.
+
+    python -m app.services.coverage_index --benchmark
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+
+WORD_BITS = 64
+
+# Set bits in each byte value, for popcounts without numpy>=2's bitwise_count
+_POPCOUNT = np.array([bin(b).count("1") for b in range(256)], dtype=np.uint8)
+
+
+class CoverageIndex:
+    """Read-only once built. Rows and columns are indicator and member state ids in ascending order."""
+
+    def __init__(self, values: pd.DataFrame, indicator_ids, member_state_ids,
+                 window: tuple[int, int] = (settings.DATA_START_YEAR, settings.DATA_END_YEAR)):
+        self.indicator_ids = np.sort(np.asarray(list(indicator_ids), dtype=int))
+        self.member_state_ids = np.sort(np.asarray(list(member_state_ids), dtype=int))
+        self.window = window
+
+        obs = values.dropna(subset=["value"])
+        obs = obs[obs["indicator_id"].isin(self.indicator_ids) & obs["member_state_id"].isin(self.member_state_ids)]
+        years = obs["year"].to_numpy(dtype=int)
+        self.first_year = int(min(years.min(), window[0])) if len(years) else window[0]
+        self.last_year = int(max(years.max(), window[1])) if len(years) else window[1]
+        n_words = (self.last_year - self.first_year) // WORD_BITS + 1
+
+        offset = years - self.first_year
+        self._bits = np.zeros((len(self.indicator_ids), len(self.member_state_ids), n_words), dtype=np.uint64)
+        np.bitwise_or.at(
+            self._bits,
+            (
+                np.searchsorted(self.indicator_ids, obs["indicator_id"].to_numpy(dtype=int)),
+                np.searchsorted(self.member_state_ids, obs["member_state_id"].to_numpy(dtype=int)),
+                offset // WORD_BITS,
+            ),
+            np.left_shift(np.uint64(1), (offset % WORD_BITS).astype(np.uint64)),
+        )
+
+    def _mask(self, first_year: int, last_year: int) -> np.ndarray:
+        """One word array with the bits for first_year..last_year set."""
+        bits = np.zeros(self._bits.shape[-1] * WORD_BITS, dtype=bool)
+        lo, hi = max(first_year - self.first_year, 0), min(last_year - self.first_year, len(bits) - 1)
+        bits[lo:hi + 1] = True
+        return np.packbits(bits, bitorder="little").view(np.uint64)
+
+    def counts(self, first_year: int | None = None, last_year: int | None = None) -> np.ndarray:
+        """Years with data per series (indicator × country), within the window by default."""
+        first_year, last_year = first_year or self.window[0], last_year or self.window[1]
+        masked = self._bits & self._mask(first_year, last_year)
+        return _POPCOUNT[masked.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+    def coverage_pct(self, first_year: int | None = None, last_year: int | None = None) -> np.ndarray:
+        """Share of the window's years with data per series, as a percentage."""
+        first_year, last_year = first_year or self.window[0], last_year or self.window[1]
+        return self.counts(first_year, last_year) / max(last_year - first_year + 1, 1) * 100
+
+    def gaps(self) -> list[tuple[int, int]]:
+        """(indicator_id, member_state_id) of every series with no data in any year."""
+        i, c = np.nonzero(~self._bits.any(axis=-1))
+        return list(zip(self.indicator_ids[i].tolist(), self.member_state_ids[c].tolist()))
+
+    def _position(self, indicator_id: int, member_state_id: int) -> tuple[int, int] | None:
+        i = np.searchsorted(self.indicator_ids, indicator_id)
+        c = np.searchsorted(self.member_state_ids, member_state_id)
+        if i == len(self.indicator_ids) or c == len(self.member_state_ids):
+            return None
+        if self.indicator_ids[i] != indicator_id or self.member_state_ids[c] != member_state_id:
+            return None
+        return int(i), int(c)
+
+    def years(self, indicator_id: int, member_state_id: int) -> list[int]:
+        """Years the series has data for, ascending."""
+        position = self._position(indicator_id, member_state_id)
+        if position is None:
+            return []
+        bits = np.unpackbits(self._bits[position].view(np.uint8), bitorder="little")
+        return (np.flatnonzero(bits) + self.first_year).tolist()
+
+    def missing_years(self, indicator_id: int, member_state_id: int,
+                      first_year: int | None = None, last_year: int | None = None) -> list[int]:
+        """Years in the window (the expected years by default) the series has no data for."""
+        first_year, last_year = first_year or self.window[0], last_year or self.window[1]
+        present = set(self.years(indicator_id, member_state_id))
+        return [y for y in range(first_year, last_year + 1) if y not in present]
+
+    def bitmaps(self) -> list[list[str]]:
+        """Each series' bitset as a hex string (bit 0 = first_year), indicator rows × country columns."""
+        words = self._bits.reshape(-1, self._bits.shape[-1])
+        values = [sum(int(w) << (WORD_BITS * k) for k, w in enumerate(row)) for row in words]
+        hexes = [format(v, "x") for v in values]
+        n_ms = len(self.member_state_ids)
+        return [hexes[r * n_ms:(r + 1) * n_ms] for r in range(len(self.indicator_ids))]
+
+    def heatmap(self) -> dict:
+        """The whole matrix: ids for rows and columns, window coverage and every bitset."""
+        return {
+            "first_year": self.first_year,
+            "last_year": self.last_year,
+            "window": list(self.window),
+            "indicator_ids": self.indicator_ids.tolist(),
+            "member_state_ids": self.member_state_ids.tolist(),
+            "coverage_pct": np.round(self.coverage_pct(), 1).tolist(),
+            "bitmaps": self.bitmaps(),
+        }
+
+
+def benchmark(sizes: list[tuple[int, int, int]], repeat: int = 3, seed: int = 0) -> list[dict]:
+    """Time building the index and answering gaps/coverage on synthetic (indicators, countries, years) panels."""
+    rng = np.random.default_rng(seed)
+    results = []
+    for n_indicators, n_countries, n_years in sizes:
+        ind, ms, yr = np.meshgrid(
+            np.arange(n_indicators), np.arange(n_countries), np.arange(2024 - n_years + 1, 2025), indexing="ij",
+        )
+        values = pd.DataFrame({
+            "indicator_id": ind.ravel(),
+            "member_state_id": ms.ravel(),
+            "year": yr.ravel(),
+            "value": 1.0,
+        }).sample(frac=0.7, random_state=seed)
+
+        build, query = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            index = CoverageIndex(values, range(n_indicators), range(n_countries))
+            build.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            index.gaps()
+            index.coverage_pct()
+            query.append((time.perf_counter() - started) * 1000)
+        results.append({
+            "indicators": n_indicators,
+            "countries": n_countries,
+            "years": n_years,
+            "values": len(values),
+            "build_ms": round(min(build), 2),
+            "query_ms": round(min(query), 2),
+            "index_bytes": index._bits.nbytes,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-series coverage bitsets.")
+    parser.add_argument("--benchmark", action="store_true", help="Time build and queries on synthetic panels")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for row in benchmark([(24, 55, 25), (24, 55, 65), (500, 55, 65)], args.repeat):
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
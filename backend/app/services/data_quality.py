@@ -1,87 +1,226 @@
 """
 Data Quality Service — Validates data completeness, timeliness, and consistency.
+
+After every load only the (indicator, country) pairs its data version changed
+are rescored. Country, indicator and continental totals live in
+`data_quality_rollups` and move by difference with each write, together with
+names, averages and the continental headline figures, so the overview
+endpoints and chat read a few dozen precomputed rows.
+
+Gaps, coverage percentages and missing years are answered from the per-series
+year bitsets in coverage_index, built once per published data version.
+
+Values that look wrong — far outside their own history or their regional
+peers — are flagged by anomaly_detection after every insights run and read
+here from `data_quality_flags`.
 """
 
+import argparse
+import time
+import numpy as np
+import pandas as pd
 import structlog
 from datetime import datetime, timezone
-from app.core.database import get_supabase
+from app.core.cache import data_version
+from app.core.config import settings
+from app.core.database import get_supabase, fetch_all
+from app.services.imputation import filter_estimated
+from app.services.insight_snapshot import InsightSnapshot
+from app.services.value_history import changed_pairs
 
 logger = structlog.get_logger()
 
-# Expected year range
-EXPECTED_YEARS = list(range(2000, 2025))
+# Expected year range. Scoring reads only these years, so backfilled history
+# neither inflates completeness nor adds reads to the assessment.
+EXPECTED_YEARS = list(range(settings.DATA_START_YEAR, settings.DATA_END_YEAR + 1))
 EXPECTED_YEAR_COUNT = len(EXPECTED_YEARS)
 
 
-async def assess_data_quality() -> dict:
-    """Run a full data quality assessment across all countries and indicators."""
+# A year-over-year move larger than this (as a fraction of the previous value) is suspicious
+JUMP_RATIO = 2.0
+
+# Consistency points lost per suspicious jump
+JUMP_PENALTY = 20
+
+
+def score_pairs(values: pd.DataFrame, indicator_ids, member_state_ids, current_year: int | None = None) -> pd.DataFrame:
+    """
+    Completeness, timeliness, consistency and overall score for every
+    (country, indicator) pair at once.
+
+    `values` has indicator_id, member_state_id, year and value columns. Every
+    pair in indicator_ids × member_state_ids gets a row, including pairs with
+    no data (scored 0). Consistency counts jumps between consecutive reported
+    values, so a gap in reporting does not hide one.
+    """
+    current_year = current_year or datetime.now().year
+    indicator_ids = np.sort(np.asarray(list(indicator_ids), dtype=int))
+    member_state_ids = np.sort(np.asarray(list(member_state_ids), dtype=int))
+    years = np.asarray(EXPECTED_YEARS)
+
+    obs = values.dropna(subset=["value"])
+    obs = obs[
+        obs["year"].between(EXPECTED_YEARS[0], EXPECTED_YEARS[-1])
+        & obs["indicator_id"].isin(indicator_ids)
+        & obs["member_state_id"].isin(member_state_ids)
+    ]
+
+    # indicator × country × year, NaN where nothing was reported
+    cube = np.full((len(indicator_ids), len(member_state_ids), len(years)), np.nan)
+    cube[
+        np.searchsorted(indicator_ids, obs["indicator_id"].to_numpy(dtype=int)),
+        np.searchsorted(member_state_ids, obs["member_state_id"].to_numpy(dtype=int)),
+        obs["year"].to_numpy(dtype=int) - years[0],
+    ] = obs["value"].to_numpy(dtype=float)
+    present = ~np.isnan(cube)
+    reported = present.sum(axis=2)
+
+    # Completeness: % of expected years with data
+    completeness = reported / EXPECTED_YEAR_COUNT * 100 if EXPECTED_YEAR_COUNT else np.zeros(reported.shape)
+
+    # Timeliness: how old is the latest data
+    last = len(years) - 1 - np.argmax(present[..., ::-1], axis=2)
+    timeliness = np.where(reported > 0, current_year - years[last], -1)
+
+    # Consistency: jumps between each value and the previous reported value
+    position = np.where(present, np.arange(len(years)), -1)
+    previous = np.maximum.accumulate(position, axis=2)[..., :-1]
+    prev_values = np.take_along_axis(cube, np.maximum(previous, 0), axis=2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        jumps = (
+            present[..., 1:] & (previous >= 0) & (prev_values != 0)
+            & (np.abs((cube[..., 1:] - prev_values) / prev_values) > JUMP_RATIO)
+        ).sum(axis=2)
+    consistency = np.where(reported > 0, np.maximum(0, 100 - jumps * JUMP_PENALTY), 0)
+
+    # Overall score
+    t_score = np.where(reported > 0, np.maximum(0, 100 - timeliness * 15), 0)
+    overall = completeness * 0.4 + t_score * 0.3 + consistency * 0.3
+
+    ind, ms = np.meshgrid(indicator_ids, member_state_ids, indexing="ij")
+    return pd.DataFrame({
+        "member_state_id": ms.ravel(),
+        "indicator_id": ind.ravel(),
+        "completeness_pct": np.round(completeness, 2).ravel(),
+        "timeliness_years": pd.array(np.where(reported > 0, timeliness, -1).ravel(), dtype="Int64"),
+        "consistency_score": np.round(consistency.astype(float), 2).ravel(),
+        "overall_score": np.round(overall, 2).ravel(),
+    }).assign(timeliness_years=lambda f: f["timeliness_years"].mask(f["timeliness_years"] < 0))
+
+
+def _score_records(scores: pd.DataFrame, assessed_at: str) -> list[dict]:
+    return [
+        {
+            "member_state_id": int(r.member_state_id),
+            "indicator_id": int(r.indicator_id),
+            "completeness_pct": float(r.completeness_pct),
+            "timeliness_years": None if pd.isna(r.timeliness_years) else int(r.timeliness_years),
+            "consistency_score": float(r.consistency_score),
+            "overall_score": float(r.overall_score),
+            "assessed_at": assessed_at,
+        }
+        for r in scores.itertuples()
+    ]
+
+
+def _pair_values(supabase, pairs: set[tuple[int, int]]) -> pd.DataFrame:
+    """Reported values in the expected years for just these (indicator_id, member_state_id) pairs."""
+    indicator_ids = sorted({i for i, _ in pairs})
+    member_state_ids = sorted({m for _, m in pairs})
+    rows = fetch_all(
+        lambda: filter_estimated(supabase.table("indicator_values").select("indicator_id, member_state_id, year, value"))
+        .in_("indicator_id", indicator_ids)
+        .in_("member_state_id", member_state_ids)
+        .gte("year", EXPECTED_YEARS[0])
+        .lte("year", EXPECTED_YEARS[-1])
+        .order("id")
+    )
+    return pd.DataFrame(rows, columns=["indicator_id", "member_state_id", "year", "value"])
+
+
+def store_scores(supabase, records: list[dict]) -> int:
+    """Upsert scores for any set of pairs; the rollups move by the difference in the same transaction."""
+    if not records:
+        return 0
+    return supabase.rpc("store_quality_scores", {"p_scores": records}).execute().data or 0
+
+
+async def assess_data_quality(pairs: set[tuple[int, int]] | None = None) -> dict:
+    """
+    Score data quality for every country-indicator pair, or only the given
+    (indicator_id, member_state_id) pairs.
+
+    A full assessment reads every value in one call (the insights snapshot);
+    a partial one reads only the touched pairs' values. Either way the pairs
+    are scored in one vectorized pass and written in one call that also
+    applies the change to the country, indicator and continental rollups.
+    """
     supabase = get_supabase()
+    started = time.perf_counter()
+    if pairs is None:
+        snapshot = InsightSnapshot.load(supabase)
+        values = snapshot.values
+        indicator_ids = [i["id"] for i in snapshot.indicators.values()]
+        member_state_ids = snapshot.member_state_ids()
+    else:
+        pairs = {(int(i), int(m)) for i, m in pairs}
+        values = _pair_values(supabase, pairs) if pairs else pd.DataFrame(
+            columns=["indicator_id", "member_state_id", "year", "value"],
+        )
+        indicator_ids = {i for i, _ in pairs}
+        member_state_ids = {m for _, m in pairs}
+    load_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    score_started = time.perf_counter()
+    scores = score_pairs(values, indicator_ids, member_state_ids)
+    if pairs is not None:
+        # Scoring covers touched indicators × touched countries; keep the touched pairs
+        scores = scores[scores.set_index(["indicator_id", "member_state_id"]).index.isin(list(pairs))]
+    records = _score_records(scores, datetime.now(timezone.utc).isoformat())
+    score_ms = round((time.perf_counter() - score_started) * 1000, 1)
+
+    write_started = time.perf_counter()
+    store_scores(supabase, records)
+    write_ms = round((time.perf_counter() - write_started) * 1000, 1)
+
+    summary = {
+        "total_scores": len(records),
+        "status": "completed",
+        "scope": "full" if pairs is None else "pairs",
+        "load_ms": load_ms,
+        "score_ms": score_ms,
+        "write_ms": write_ms,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info("data_quality_assessed", **summary)
+    return summary
+
+
+async def rescore_version(version_id: int) -> dict:
+    """Rescore only the pairs a published data version changed."""
+    pairs = changed_pairs(get_supabase(), version_id)
+    return await assess_data_quality(pairs)
+
 
-    countries = supabase.table("member_states").select("id, name").execute()
-    indicators = supabase.table("indicators").select("id, name, code").execute()
-
-    scores = []
-    for country in countries.data:
-        for indicator in indicators.data:
-            values = (
-                supabase.table("indicator_values")
-                .select("year, value, data_quality")
-                .eq("member_state_id", country["id"])
-                .eq("indicator_id", indicator["id"])
-                .execute()
-            )
-
-            years_with_data = [v["year"] for v in values.data if v["value"] is not None]
-
-            # Completeness: % of expected years with data
-            completeness = (len(years_with_data) / EXPECTED_YEAR_COUNT) * 100 if EXPECTED_YEAR_COUNT else 0
-
-            # Timeliness: how old is the latest data
-            timeliness = (datetime.now().year - max(years_with_data)) if years_with_data else None
-
-            # Consistency: check for suspicious jumps (>200% year-over-year change)
-            sorted_values = sorted(
-                [(v["year"], v["value"]) for v in values.data if v["value"] is not None],
-                key=lambda x: x[0],
-            )
-            inconsistencies = 0
-            for i in range(1, len(sorted_values)):
-                prev_val = sorted_values[i - 1][1]
-                curr_val = sorted_values[i][1]
-                if prev_val != 0 and abs((curr_val - prev_val) / prev_val) > 2:
-                    inconsistencies += 1
-            consistency = max(0, 100 - (inconsistencies * 20)) if sorted_values else 0
-
-            # Overall score
-            t_score = max(0, 100 - (timeliness * 15)) if timeliness is not None else 0
-            overall = (completeness * 0.4 + t_score * 0.3 + consistency * 0.3)
-
-            scores.append({
-                "member_state_id": country["id"],
-                "indicator_id": indicator["id"],
-                "completeness_pct": round(completeness, 2),
-                "timeliness_years": timeliness,
-                "consistency_score": round(consistency, 2),
-                "overall_score": round(overall, 2),
-                "assessed_at": datetime.now(timezone.utc).isoformat(),
-            })
-
-    # Batch upsert scores (in chunks)
-    for i in range(0, len(scores), 200):
-        chunk = scores[i:i + 200]
-        supabase.table("data_quality_scores").upsert(chunk).execute()
-
-    logger.info("data_quality_assessed", total_scores=len(scores))
-    return {"total_scores": len(scores), "status": "completed"}
+def quality_rollups(supabase, scope: str | None = None) -> list[dict]:
+    """Precomputed rollup rows (country, indicator, continent) with names and averages."""
+    query = supabase.table("data_quality_rollups").select(
+        "scope, scope_id, name, code, pairs, avg_score, avg_completeness, empty_pairs, "
+        "country_avg_score, countries_good, countries_poor, sample_gaps"
+    ).gt("pairs", 0)
+    if scope:
+        query = query.eq("scope", scope)
+    return query.execute().data
 
 
 async def get_quality_overview() -> dict:
     """Get continental data quality overview."""
     supabase = get_supabase()
 
-    scores = supabase.table("data_quality_scores").select("overall_score, member_state_id, indicator_id").execute()
+    rollups = quality_rollups(supabase)
+    continent = next((r for r in rollups if r["scope"] == "continent"), None)
 
-    if not scores.data:
+    if not continent:
         return {
             "continental_avg_score": 0,
             "countries_with_good_data": 0,
@@ -91,52 +230,19 @@ async def get_quality_overview() -> dict:
             "gaps": [],
         }
 
-    # Average by country
-    country_scores = {}
-    for s in scores.data:
-        cid = s["member_state_id"]
-        if cid not in country_scores:
-            country_scores[cid] = []
-        country_scores[cid].append(s["overall_score"])
-
-    country_avgs = {cid: sum(vals) / len(vals) for cid, vals in country_scores.items()}
-    overall_avg = sum(country_avgs.values()) / len(country_avgs) if country_avgs else 0
-
-    good = len([v for v in country_avgs.values() if v > 70])
-    poor = len([v for v in country_avgs.values() if v < 40])
-
-    # Average by indicator
-    indicator_scores = {}
-    for s in scores.data:
-        iid = s["indicator_id"]
-        if iid not in indicator_scores:
-            indicator_scores[iid] = []
-        indicator_scores[iid].append(s["overall_score"])
-
-    indicator_avgs = {iid: sum(vals) / len(vals) for iid, vals in indicator_scores.items()}
-
-    # Get indicator names
-    indicators = supabase.table("indicators").select("id, name").execute()
-    ind_names = {i["id"]: i["name"] for i in indicators.data}
-
-    sorted_indicators = sorted(indicator_avgs.items(), key=lambda x: x[1], reverse=True)
-    most_complete = [{"indicator": ind_names.get(iid, ""), "score": round(v, 1)} for iid, v in sorted_indicators[:5]]
-    least_complete = [{"indicator": ind_names.get(iid, ""), "score": round(v, 1)} for iid, v in sorted_indicators[-5:]]
-
-    # Identify gaps (country-indicator combos with 0 data)
-    gaps = [
-        {"member_state_id": s["member_state_id"], "indicator_id": s["indicator_id"]}
-        for s in scores.data
-        if s["overall_score"] == 0
-    ]
+    sorted_indicators = sorted(
+        (r for r in rollups if r["scope"] == "indicator"), key=lambda r: float(r["avg_score"]), reverse=True,
+    )
+    most_complete = [{"indicator": r["name"] or "", "score": float(r["avg_score"])} for r in sorted_indicators[:5]]
+    least_complete = [{"indicator": r["name"] or "", "score": float(r["avg_score"])} for r in sorted_indicators[-5:]]
 
     return {
-        "continental_avg_score": round(overall_avg, 1),
-        "countries_with_good_data": good,
-        "countries_with_poor_data": poor,
+        "continental_avg_score": round(float(continent["country_avg_score"] or 0), 1),
+        "countries_with_good_data": continent["countries_good"] or 0,
+        "countries_with_poor_data": continent["countries_poor"] or 0,
         "most_complete_indicators": most_complete,
         "least_complete_indicators": least_complete,
-        "gaps": gaps[:20],
+        "gaps": continent["sample_gaps"] or [],
     }
 
 
@@ -144,29 +250,209 @@ async def get_quality_by_country() -> list[dict]:
     """Get data quality scores aggregated by country."""
     supabase = get_supabase()
 
-    scores = supabase.table("data_quality_scores").select("overall_score, completeness_pct, member_state_id").execute()
-    countries = supabase.table("member_states").select("id, name, iso_code").execute()
-
-    country_names = {c["id"]: {"name": c["name"], "iso_code": c["iso_code"]} for c in countries.data}
-
-    country_scores = {}
-    for s in scores.data:
-        cid = s["member_state_id"]
-        if cid not in country_scores:
-            country_scores[cid] = {"overall": [], "completeness": []}
-        country_scores[cid]["overall"].append(s["overall_score"])
-        if s.get("completeness_pct") is not None:
-            country_scores[cid]["completeness"].append(s["completeness_pct"])
-
-    result = []
-    for cid, vals in country_scores.items():
-        info = country_names.get(cid, {})
-        result.append({
-            "country_name": info.get("name"),
-            "iso_code": info.get("iso_code"),
-            "overall_score": round(sum(vals["overall"]) / len(vals["overall"]), 1),
-            "completeness": round(sum(vals["completeness"]) / len(vals["completeness"]), 1) if vals["completeness"] else 0,
-            "indicators_covered": len(vals["overall"]),
-        })
+    result = [
+        {
+            "country_name": r["name"],
+            "iso_code": r["code"],
+            "overall_score": float(r["avg_score"]),
+            "completeness": float(r["avg_completeness"]) if r["avg_completeness"] is not None else 0,
+            "indicators_covered": r["pairs"],
+        }
+        for r in quality_rollups(supabase, "country")
+    ]
 
     return sorted(result, key=lambda x: x["overall_score"], reverse=True)
+
+
+async def get_quality_flags(
+    indicator_id: int | None = None,
+    country: str | None = None,
+    flag_type: str | None = None,
+    min_score: float | None = None,
+    limit: int = 100,
+) -> dict:
+    """Anomaly flags for the published data version, most extreme first."""
+    supabase = get_supabase()
+    version_id = data_version()
+    if version_id is None:
+        return {"flags": [], "total": 0, "data_version_id": None}
+
+    country_id = None
+    if country:
+        found = supabase.table("member_states").select("id").eq("iso_code", country.upper()).execute()
+        if not found.data:
+            return {"flags": [], "total": 0, "data_version_id": version_id}
+        country_id = found.data[0]["id"]
+
+    def _query():
+        query = (
+            supabase.table("data_quality_flags")
+            .select("indicator_id, year, value, flag_type, score, expected, member_states(name, iso_code), indicators(name, code, unit)")
+            .eq("data_version_id", version_id)
+        )
+        if indicator_id:
+            query = query.eq("indicator_id", indicator_id)
+        if country_id:
+            query = query.eq("member_state_id", country_id)
+        if flag_type:
+            query = query.eq("flag_type", flag_type)
+        return query.order("id")
+
+    flags = fetch_all(_query)
+    if min_score is not None:
+        flags = [f for f in flags if abs(f["score"]) >= min_score]
+    flags.sort(key=lambda f: abs(f["score"]), reverse=True)
+
+    return {"flags": flags[:limit], "total": len(flags), "data_version_id": version_id}
+
+
+async def get_data_gaps(limit: int = 100) -> dict:
+    """Country-indicator pairs with no data in any year, from the published coverage index."""
+    snapshot = InsightSnapshot.published()
+    indicators = {i["id"]: i for i in snapshot.indicators.values()}
+    gaps = []
+    for indicator_id, member_state_id in snapshot.coverage().gaps():
+        ms = snapshot.member_state(member_state_id)
+        gaps.append({
+            "country": ms["name"],
+            "iso_code": ms["iso_code"],
+            "indicator": indicators[indicator_id]["name"],
+            "indicator_code": indicators[indicator_id]["code"],
+        })
+    gaps.sort(key=lambda g: (g["country"] or "", g["indicator_code"]))
+    return {"gaps": gaps[:limit], "total_gaps": len(gaps), "data_version_id": snapshot.data_version_id}
+
+
+async def get_coverage_matrix() -> dict:
+    """The full indicator × country coverage matrix for the heatmap, in one payload."""
+    snapshot = InsightSnapshot.published()
+    index = snapshot.coverage()
+    indicators = {i["id"]: i for i in snapshot.indicators.values()}
+    return {
+        "data_version_id": snapshot.data_version_id,
+        "indicators": [
+            {"id": i, "code": indicators[i]["code"], "name": indicators[i]["name"]} for i in index.indicator_ids.tolist()
+        ],
+        "countries": [
+            {"id": c, "iso_code": snapshot.member_state(c)["iso_code"], "name": snapshot.member_state(c)["name"]}
+            for c in index.member_state_ids.tolist()
+        ],
+        **index.heatmap(),
+    }
+
+
+async def get_indicator_coverage(indicator_id: int, country: str | None = None) -> dict:
+    """Coverage and missing years of one indicator for every country, or one country."""
+    snapshot = InsightSnapshot.published()
+    indicator = next((i for i in snapshot.indicators.values() if i["id"] == indicator_id), None)
+    if not indicator:
+        return {"error": "Indicator not found"}
+    index = snapshot.coverage()
+    member_state_ids = index.member_state_ids.tolist()
+    if country:
+        member_state_id = snapshot.country_id(country.upper())
+        if member_state_id is None:
+            return {"error": "Country not found"}
+        member_state_ids = [member_state_id]
+
+    row = int(np.searchsorted(index.indicator_ids, indicator_id))
+    counts = index.counts()[row]
+    coverage = index.coverage_pct()[row]
+    columns = {c: k for k, c in enumerate(index.member_state_ids.tolist())}
+    countries = []
+    for member_state_id in member_state_ids:
+        ms = snapshot.member_state(member_state_id)
+        years = index.years(indicator_id, member_state_id)
+        countries.append({
+            "country": ms["name"],
+            "iso_code": ms["iso_code"],
+            "years_reported": int(counts[columns[member_state_id]]),
+            "coverage_pct": round(float(coverage[columns[member_state_id]]), 1),
+            "latest_year": years[-1] if years else None,
+            "missing_years": index.missing_years(indicator_id, member_state_id),
+        })
+    countries.sort(key=lambda c: c["coverage_pct"])
+
+    return {
+        "indicator": indicator,
+        "window": list(index.window),
+        "data_version_id": snapshot.data_version_id,
+        "countries": countries,
+    }
+
+
+def benchmark(repeat: int = 3, seed: int = 0) -> dict:
+    """
+    Time the in-memory part of a rescore — `score_pairs` and building the rows
+    to store — on a synthetic 24-indicator × 55-country panel over the expected
+    years. Reading the changed pairs and their values and the
+    `store_quality_scores` write are excluded; `benchmark_rescore` times those.
+    """
+    rng = np.random.default_rng(seed)
+    ind, ms, yr = np.meshgrid(np.arange(1, 25), np.arange(1, 56), np.asarray(EXPECTED_YEARS), indexing="ij")
+    values = pd.DataFrame({
+        "indicator_id": ind.ravel(),
+        "member_state_id": ms.ravel(),
+        "year": yr.ravel(),
+        "value": rng.lognormal(3, 1, size=yr.size),
+    }).sample(frac=0.8, random_state=seed)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        scores = score_pairs(values, range(1, 25), range(1, 56))
+        _score_records(scores, datetime.now(timezone.utc).isoformat())
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "scope": "score only (no reads or writes)",
+        "pairs": len(scores),
+        "values": len(values),
+        "best_ms": round(min(timings), 1),
+    }
+
+
+async def benchmark_rescore(version_id: int, repeat: int = 3) -> dict:
+    """
+    Time `rescore_version` end to end against the configured database: the
+    version's changed pairs, their values, scoring and the write. Rewriting
+    unchanged scores leaves the rollups where they are, so it is safe to
+    repeat on a published version.
+    """
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        summary = await rescore_version(version_id)
+        runs.append({**summary, "total_ms": round((time.perf_counter() - started) * 1000, 1)})
+    best = min(runs, key=lambda r: r["total_ms"])
+    return {
+        "scope": "end to end",
+        "data_version_id": version_id,
+        "pairs": best["total_scores"],
+        "best_ms": best["total_ms"],
+        # The rest of total_ms is reading the version's changed pairs
+        **{k: best[k] for k in ("load_ms", "score_ms", "write_ms")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Data quality assessment.")
+    parser.add_argument("--benchmark", action="store_true", help="Time scoring on a synthetic panel")
+    parser.add_argument(
+        "--benchmark-version", type=int, metavar="ID",
+        help="Time rescoring a published data version end to end against the database",
+    )
+    parser.add_argument("--assess", action="store_true", help="Run a full assessment against the database")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(benchmark())
+    if args.benchmark_version:
+        import asyncio
+        print(asyncio.run(benchmark_rescore(args.benchmark_version)))
+    if args.assess:
+        import asyncio
+        print(asyncio.run(assess_data_quality()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Data Versions — Blue/green publication of loaded indicator values.
+
+Loaders stage rows under a new data version; `publish_version` merges them into
+`indicator_values` and flips the `data_state` pointer in a single transaction,
+so readers always see a complete snapshot and never wait on the loader.
+"""
+
+import structlog
+from datetime import datetime, timezone
+from app.core.cache import invalidate
+
+logger = structlog.get_logger()
+
+STAGE_CHUNK_SIZE = 500
+
+# Published versions between full checkpoints of indicator_values (see value_history)
+CHECKPOINT_INTERVAL = 20
+
+
+def create_version(supabase, source: str = "etl", etl_run_id: int | None = None) -> int:
+    """Open a new staging version for a load."""
+    row = {"source": source, "status": "staging"}
+    if etl_run_id:
+        row["etl_run_id"] = etl_run_id
+    result = supabase.table("data_versions").insert(row).execute()
+    return result.data[0]["id"]
+
+
+def stage_values(supabase, version_id: int, rows: list[dict], chunk_size: int = STAGE_CHUNK_SIZE) -> int:
+    """Write indicator value rows into the shadow table for a version, one bulk upsert per chunk."""
+    for i in range(0, len(rows), chunk_size):
+        chunk = [{**r, "data_version_id": version_id} for r in rows[i:i + chunk_size]]
+        supabase.table("indicator_values_staging").upsert(
+            chunk,
+            on_conflict="data_version_id,indicator_id,member_state_id,year",
+        ).execute()
+    return len(rows)
+
+
+def stage_deletions(supabase, version_id: int, cells: list[dict], chunk_size: int = STAGE_CHUNK_SIZE) -> int:
+    """
+    Stage the removal of estimated cells (indicator_id, member_state_id, year).
+    Publishing removes each cell only if it still holds an estimate.
+    """
+    rows = [
+        {
+            "indicator_id": c["indicator_id"],
+            "member_state_id": c["member_state_id"],
+            "year": c["year"],
+            "value": None,
+            "data_quality": "estimated",
+            "deleted": True,
+        }
+        for c in cells
+    ]
+    return stage_values(supabase, version_id, rows, chunk_size)
+
+
+def publish_version(supabase, version_id: int) -> int:
+    """Atomically publish a staged version. Returns the number of cells it changed or removed."""
+    result = supabase.rpc(
+        "publish_data_version",
+        {"p_version_id": version_id, "p_checkpoint_interval": CHECKPOINT_INTERVAL},
+    ).execute()
+    invalidate()
+    changed = result.data or 0
+    logger.info("data_version_published", version_id=version_id, records_changed=changed)
+    return changed
+
+
+def discard_version(supabase, version_id: int):
+    """Throw away a staged version that will not be published."""
+    supabase.rpc("discard_data_version", {"p_version_id": version_id}).execute()
+    logger.info("data_version_discarded", version_id=version_id)
+
+
+def analyses_stored(supabase, version_id: int) -> bool:
+    """Whether a version's trends, anomaly flags and projections are already stored."""
+    result = supabase.table("data_versions").select("analyses_stored_at").eq("id", version_id).execute()
+    return bool(result.data and result.data[0]["analyses_stored_at"])
+
+
+def mark_analyses_stored(supabase, version_id: int):
+    """Record that a version's trends, anomaly flags and projections are stored."""
+    supabase.table("data_versions").update(
+        {"analyses_stored_at": datetime.now(timezone.utc).isoformat()}
+    ).eq("id", version_id).execute()
+
+
+def publish_insights(
+    supabase,
+    batch_id: str,
+    insights: list[dict],
+    generators: list[str] | None = None,
+) -> dict:
+    """
+    Publish a generated insight batch by difference, in one transaction.
+
+    Insights whose fingerprint is already active keep their row; new ones are
+    inserted; active insights missing from the batch are retired (all of them,
+    or only those from `generators` when given).
+    Returns {"inserted", "unchanged", "retired"}.
+    """
+    result = supabase.rpc(
+        "publish_insight_batch",
+        {"p_batch_id": batch_id, "p_insights": insights, "p_generators": generators},
+    ).execute()
+    counts = result.data or {"inserted": 0, "unchanged": 0, "retired": 0}
+    if counts["inserted"] or counts["retired"]:
+        invalidate()
+    return counts
@@ -1,20 +1,21 @@
 """
-ETL Service — Extracts data from World Bank API for all 55 AU member states.
+ETL Service — Extracts data from the registered sources for all 55 AU member states.
 
-Pipeline: Extract (World Bank API) → Transform (clean, validate) → Load (Supabase)
+Pipeline: Extract (World Bank, UN SDG, AfDB connectors, concurrently)
+    → Transform (clean, validate, resolve source precedence) → Load (Supabase)
 """
 
-import httpx
 import structlog
 from datetime import datetime, timezone
 from typing import Optional
-from app.core.database import get_supabase
+from app.core.config import settings
+from app.core.database import fetch_all, get_supabase
+from app.services.connectors.registry import extract_all, load_sources
+from app.services.connectors.world_bank import WB_INDICATORS
+from app.services.data_versions import STAGE_CHUNK_SIZE, create_version, discard_version, stage_values, publish_version
 
 logger = structlog.get_logger()
 
-# World Bank API base
-WB_BASE = "https://api.worldbank.org/v2"
-
 # All 55 AU member states (ISO2 codes)
 AU_COUNTRIES = [
     "DZ", "AO", "BJ", "BW", "BF", "BI", "CV", "CM", "CF", "TD",
@@ -25,34 +26,6 @@ AU_COUNTRIES = [
     "TN", "UG", "ZM", "ZW",
 ]
 
-# Indicators mapped to Agenda 2063 goals
-WB_INDICATORS = {
-    "NY.GDP.PCAP.CD": "GDP per capita (current US$)",
-    "SI.POV.DDAY": "Poverty headcount ratio ($2.15/day)",
-    "SE.ADT.LITR.ZS": "Adult literacy rate",
-    "SE.PRM.ENRR": "Primary school enrollment",
-    "SE.SEC.ENRR": "Secondary school enrollment",
-    "SP.DYN.LE00.IN": "Life expectancy at birth",
-    "SH.STA.MMRT": "Maternal mortality ratio",
-    "SH.DYN.MORT": "Under-5 mortality rate",
-    "NV.IND.MANF.ZS": "Manufacturing value added (% GDP)",
-    "BX.KLT.DINV.WD.GD.ZS": "FDI net inflows (% GDP)",
-    "NV.AGR.TOTL.ZS": "Agriculture value added (% GDP)",
-    "EN.ATM.CO2E.PC": "CO2 emissions per capita",
-    "EG.FEC.RNEW.ZS": "Renewable energy consumption (%)",
-    "IT.NET.USER.ZS": "Internet users (% population)",
-    "IT.CEL.SETS.P2": "Mobile subscriptions per 100",
-    "EG.ELC.ACCS.ZS": "Access to electricity (%)",
-    "SG.GEN.PARL.ZS": "Women in parliament (%)",
-    "SE.ENR.PRIM.FM.ZS": "Gender parity index (primary)",
-    "SL.TLF.CACT.FE.ZS": "Female labor force participation",
-    "SL.UEM.1524.ZS": "Youth unemployment (%)",
-    "SH.STA.BRTC.ZS": "Births attended by skilled staff (%)",
-    "GC.TAX.TOTL.GD.ZS": "Tax revenue (% GDP)",
-    "SP.ADO.TFRT": "Adolescent fertility rate",
-    "SH.HIV.INCD.TL.P3": "HIV incidence (per 1,000)",
-}
-
 # Gender-specific indicators for the gender_metrics table
 GENDER_INDICATORS = {
     "SG.GEN.PARL.ZS": "women_parliament_pct",
@@ -69,79 +42,6 @@ YOUTH_INDICATORS = {
 }
 
 
-async def fetch_world_bank_indicator(
-    indicator_code: str,
-    countries: list[str] | None = None,
-    start_year: int = 2000,
-    end_year: int = 2024,
-) -> list[dict]:
-    """Fetch a single indicator from World Bank API for specified countries."""
-    country_str = ";".join(countries or AU_COUNTRIES)
-    url = f"{WB_BASE}/country/{country_str}/indicator/{indicator_code}"
-    params = {
-        "format": "json",
-        "per_page": 10000,
-        "date": f"{start_year}:{end_year}",
-    }
-
-    all_records = []
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        try:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-
-            if not data or len(data) < 2:
-                logger.warning("wb_empty_response", indicator=indicator_code)
-                return []
-
-            records = data[1] or []
-            for record in records:
-                if record.get("value") is not None:
-                    all_records.append({
-                        "country_iso": record["countryiso3code"],
-                        "country_iso2": record["country"]["id"],
-                        "country_name": record["country"]["value"],
-                        "indicator_code": indicator_code,
-                        "indicator_name": record["indicator"]["value"],
-                        "year": int(record["date"]),
-                        "value": float(record["value"]),
-                    })
-
-            # Handle pagination
-            total_pages = data[0].get("pages", 1)
-            for page in range(2, total_pages + 1):
-                params["page"] = page
-                resp = await client.get(url, params=params)
-                resp.raise_for_status()
-                page_data = resp.json()
-                if page_data and len(page_data) >= 2 and page_data[1]:
-                    for record in page_data[1]:
-                        if record.get("value") is not None:
-                            all_records.append({
-                                "country_iso": record["countryiso3code"],
-                                "country_iso2": record["country"]["id"],
-                                "country_name": record["country"]["value"],
-                                "indicator_code": indicator_code,
-                                "indicator_name": record["indicator"]["value"],
-                                "year": int(record["date"]),
-                                "value": float(record["value"]),
-                            })
-
-            logger.info(
-                "wb_fetch_success",
-                indicator=indicator_code,
-                records=len(all_records),
-            )
-
-        except httpx.HTTPError as e:
-            logger.error("wb_fetch_error", indicator=indicator_code, error=str(e))
-        except Exception as e:
-            logger.error("wb_parse_error", indicator=indicator_code, error=str(e))
-
-    return all_records
-
-
 def _build_country_lookup(supabase) -> dict:
     """Build ISO code → member_state_id lookup."""
     result = supabase.table("member_states").select("id, iso_code, iso3_code").execute()
@@ -159,102 +59,98 @@ def _build_indicator_lookup(supabase) -> dict:
     return {row["code"]: row["id"] for row in result.data if row.get("code")}
 
 
+async def _extract(
+    supabase,
+    indicator_codes: list[str],
+    countries: list[str] | None,
+    start_year: int,
+    end_year: int,
+    source_names: list[str] | None = None,
+) -> dict:
+    """Fan out to every active source at once. See connectors.registry.extract_all."""
+    sources = load_sources(supabase, source_names)
+    if not sources:
+        raise ValueError("No active data source with a registered connector")
+    return await extract_all(sources, indicator_codes, countries or AU_COUNTRIES, start_year, end_year)
+
+
+def _record_source_stats(supabase, source_stats: dict):
+    """Stamp each source that returned data with its refresh time and record count."""
+    now = datetime.now(timezone.utc).isoformat()
+    for stats in source_stats.values():
+        if stats["records"]:
+            supabase.table("data_sources").update({
+                "last_refresh": now,
+                "record_count": stats["records"],
+            }).eq("id", stats["data_source_id"]).execute()
+
+
 async def run_etl(
     indicator_codes: list[str] | None = None,
     countries: list[str] | None = None,
-    start_year: int = 2000,
-    end_year: int = 2024,
+    start_year: int = settings.DATA_START_YEAR,
+    end_year: int = settings.DATA_END_YEAR,
+    source_names: list[str] | None = None,
 ) -> dict:
     """
     Run the full ETL pipeline.
 
     1. Create ETL run record
-    2. Fetch data from World Bank API
-    3. Transform and validate
-    4. Load into Supabase
-    5. Update gender/youth metric tables
-    6. Return summary
+    2. Fetch data from every active source concurrently
+    3. Transform, validate and resolve source precedence
+    4. Stage into a new data version
+    5. Publish the version atomically
+    6. Update gender/youth metric tables from the published cells
+    7. Return summary
+
+    If any step fails the run is marked failed and its staged version discarded.
     """
     supabase = get_supabase()
     indicators_to_fetch = indicator_codes or list(WB_INDICATORS.keys())
+    sources = load_sources(supabase, source_names)
 
     # Create ETL run record
     run_data = supabase.table("etl_runs").insert({
-        "data_source_id": 1,  # World Bank
+        # A single-source run keeps pointing at its source; multi-source runs list them in source_stats
+        "data_source_id": sources[0]["id"] if len(sources) == 1 else None,
+        "source_names": source_names,
         "status": "running",
         "started_at": datetime.now(timezone.utc).isoformat(),
     }).execute()
     etl_run_id = run_data.data[0]["id"]
-
-    # Build lookups
-    country_lookup = _build_country_lookup(supabase)
-    indicator_lookup = _build_indicator_lookup(supabase)
-
-    total_processed = 0
-    total_failed = 0
+    data_version_id = create_version(supabase, "etl", etl_run_id)
 
     logger.info(
         "etl_started",
         run_id=etl_run_id,
         indicators=len(indicators_to_fetch),
+        sources=[s["connector"] for s in sources],
     )
 
-    for indicator_code in indicators_to_fetch:
-        try:
-            records = await fetch_world_bank_indicator(
-                indicator_code, countries, start_year, end_year,
-            )
-
-            indicator_id = indicator_lookup.get(indicator_code)
-            if not indicator_id:
-                logger.warning("indicator_not_in_db", code=indicator_code)
-                continue
-
-            # Batch upsert into indicator_values
-            batch = []
-            for rec in records:
-                country_id = country_lookup.get(rec["country_iso2"]) or country_lookup.get(rec["country_iso"])
-                if not country_id:
-                    continue
-
-                batch.append({
-                    "indicator_id": indicator_id,
-                    "member_state_id": country_id,
-                    "year": rec["year"],
-                    "value": rec["value"],
-                    "data_quality": "verified",
-                    "source_detail": f"World Bank API ({rec['indicator_code']})",
-                })
-
-            if batch:
-                # Upsert in chunks of 500
-                for i in range(0, len(batch), 500):
-                    chunk = batch[i:i + 500]
-                    supabase.table("indicator_values").upsert(
-                        chunk,
-                        on_conflict="indicator_id,member_state_id,year",
-                    ).execute()
-                total_processed += len(batch)
-
-            # Update gender_metrics table if applicable
-            if indicator_code in GENDER_INDICATORS:
-                col = GENDER_INDICATORS[indicator_code]
-                await _update_gender_metrics(supabase, records, country_lookup, col)
-
-            # Update youth_metrics table if applicable
-            if indicator_code in YOUTH_INDICATORS:
-                col = YOUTH_INDICATORS[indicator_code]
-                await _update_youth_metrics(supabase, records, country_lookup, col)
-
-            logger.info(
-                "indicator_loaded",
-                code=indicator_code,
-                records=len(batch),
-            )
-
-        except Exception as e:
-            total_failed += 1
-            logger.error("etl_indicator_error", code=indicator_code, error=str(e))
+    try:
+        result = await load_indicators(
+            indicators_to_fetch, data_version_id, countries, start_year, end_year, source_names,
+        )
+        # Readers switch to the new data in one step
+        publish_version(supabase, data_version_id)
+        update_metric_tables(supabase, data_version_id)
+    except Exception as e:
+        logger.error("etl_failed", run_id=etl_run_id, error=str(e))
+        discard_version(supabase, data_version_id)
+        supabase.table("etl_runs").update({
+            "status": "failed",
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+            "error_message": str(e)[:2000],
+        }).eq("id", etl_run_id).execute()
+        return {
+            "etl_run_id": etl_run_id,
+            "data_version_id": data_version_id,
+            "status": "failed",
+            "error": str(e),
+        }
+
+    total_processed = result["records_processed"]
+    total_failed = result["records_failed"]
 
     # Update ETL run record
     supabase.table("etl_runs").update({
@@ -262,6 +158,7 @@ async def run_etl(
         "completed_at": datetime.now(timezone.utc).isoformat(),
         "records_processed": total_processed,
         "records_failed": total_failed,
+        "source_stats": result["sources"],
     }).eq("id", etl_run_id).execute()
 
     logger.info(
@@ -273,66 +170,172 @@ async def run_etl(
 
     return {
         "etl_run_id": etl_run_id,
+        "data_version_id": data_version_id,
         "status": "completed",
         "records_processed": total_processed,
         "records_failed": total_failed,
         "indicators_fetched": len(indicators_to_fetch),
+        "sources": result["sources"],
     }
 
 
-async def _update_gender_metrics(supabase, records, country_lookup, column):
-    """Upsert a gender metric column from fetched records."""
+def _transform(records: list[dict], indicator_id: int, country_lookup: dict) -> list[dict]:
+    """
+    Map records to indicator_values rows, one per (country, year).
+
+    When several sources report the same cell the one with the lowest
+    `data_sources.priority` wins; ties go to the lower source id.
+    """
+    best = {}
     for rec in records:
         country_id = country_lookup.get(rec["country_iso2"]) or country_lookup.get(rec["country_iso"])
         if not country_id:
             continue
+        key = (country_id, rec["year"])
+        rank = (rec["priority"], rec["data_source_id"])
+        if key in best and best[key][0] <= rank:
+            continue
+        best[key] = (rank, {
+            "indicator_id": indicator_id,
+            "member_state_id": country_id,
+            "year": rec["year"],
+            "value": rec["value"],
+            "data_quality": "verified",
+            "data_source_id": rec["data_source_id"],
+            "source_detail": rec["source_detail"],
+        })
+    return [row for _, row in best.values()]
+
+
+async def _load_indicator(
+    supabase,
+    indicator_code: str,
+    records: list[dict],
+    country_lookup: dict,
+    indicator_lookup: dict,
+    data_version_id: int,
+) -> int:
+    """Transform and stage one indicator's extracted records. Returns the number of rows staged."""
+    indicator_id = indicator_lookup.get(indicator_code)
+    if not indicator_id:
+        logger.warning("indicator_not_in_db", code=indicator_code)
+        return 0
+
+    batch = _transform(records, indicator_id, country_lookup)
+
+    # Stage rows for the run's data version
+    if batch:
+        stage_values(supabase, data_version_id, batch)
 
-        # Check if row exists
-        existing = (
-            supabase.table("gender_metrics")
-            .select("id")
-            .eq("member_state_id", country_id)
-            .eq("year", rec["year"])
-            .execute()
-        )
+    logger.info(
+        "indicator_loaded",
+        code=indicator_code,
+        records=len(batch),
+    )
+    return len(batch)
 
-        if existing.data:
-            supabase.table("gender_metrics").update(
-                {column: rec["value"]}
-            ).eq("id", existing.data[0]["id"]).execute()
-        else:
-            supabase.table("gender_metrics").insert({
-                "member_state_id": country_id,
-                "year": rec["year"],
-                column: rec["value"],
-            }).execute()
 
+async def load_indicators(
+    indicator_codes: list[str],
+    data_version_id: int,
+    countries: list[str] | None = None,
+    start_year: int = settings.DATA_START_YEAR,
+    end_year: int = settings.DATA_END_YEAR,
+    source_names: list[str] | None = None,
+) -> dict:
+    """
+    Extract a set of indicators from every source and stage them into an existing data version.
 
-async def _update_youth_metrics(supabase, records, country_lookup, column):
-    """Upsert a youth metric column from fetched records."""
-    for rec in records:
-        country_id = country_lookup.get(rec["country_iso2"]) or country_lookup.get(rec["country_iso"])
-        if not country_id:
+    Used by run_etl and by shard workers, which report their counts back to the
+    parent run; the version is published once the last shard finishes.
+    """
+    supabase = get_supabase()
+    country_lookup = _build_country_lookup(supabase)
+    indicator_lookup = _build_indicator_lookup(supabase)
+
+    extracted = await _extract(supabase, indicator_codes, countries, start_year, end_year, source_names)
+    _record_source_stats(supabase, extracted["sources"])
+
+    processed = 0
+    failed = 0
+    errors = []
+    for indicator_code in indicator_codes:
+        records = extracted["records"].get(indicator_code, [])
+        # An indicator fails only if no source delivered it
+        if not records and extracted["errors"].get(indicator_code):
+            failed += 1
+            errors.extend(f"{indicator_code}: {e}" for e in extracted["errors"][indicator_code])
             continue
+        try:
+            processed += await _load_indicator(
+                supabase, indicator_code, records,
+                country_lookup, indicator_lookup, data_version_id,
+            )
+        except Exception as e:
+            failed += 1
+            errors.append(f"{indicator_code}: {e}")
+            logger.error("etl_indicator_error", code=indicator_code, error=str(e))
+
+    return {
+        "records_processed": processed,
+        "records_failed": failed,
+        "errors": errors,
+        "sources": extracted["sources"],
+    }
+
 
-        existing = (
-            supabase.table("youth_metrics")
-            .select("id")
-            .eq("member_state_id", country_id)
-            .eq("year", rec["year"])
-            .execute()
+def update_metric_tables(supabase, data_version_id: int) -> int:
+    """
+    Copy the gender and youth indicator cells a published version changed into
+    gender_metrics / youth_metrics.
+
+    Runs after publish, from the version's deltas, so the metric tables only
+    ever hold published values. Returns the number of cells written.
+    """
+    indicator_lookup = _build_indicator_lookup(supabase)
+    targets = {
+        indicator_lookup[code]: (table, column)
+        for table, mapping in (("gender_metrics", GENDER_INDICATORS), ("youth_metrics", YOUTH_INDICATORS))
+        for code, column in mapping.items()
+        if code in indicator_lookup
+    }
+    if not targets:
+        return 0
+
+    changed = fetch_all(
+        lambda: supabase.table("value_deltas")
+        .select("indicator_id, member_state_id, year, new_value")
+        .eq("data_version_id", data_version_id)
+        .in_("indicator_id", list(targets))
+        .order("indicator_id").order("member_state_id").order("year")
+    )
+    by_indicator = {}
+    for row in changed:
+        by_indicator.setdefault(row["indicator_id"], []).append(
+            {"member_state_id": row["member_state_id"], "year": row["year"], "value": row["new_value"]}
         )
+    for indicator_id, rows in by_indicator.items():
+        table, column = targets[indicator_id]
+        _upsert_metric_column(supabase, table, rows, column)
+    return len(changed)
 
-        if existing.data:
-            supabase.table("youth_metrics").update(
-                {column: rec["value"]}
-            ).eq("id", existing.data[0]["id"]).execute()
-        else:
-            supabase.table("youth_metrics").insert({
-                "member_state_id": country_id,
-                "year": rec["year"],
-                column: rec["value"],
-            }).execute()
+
+def _upsert_metric_column(supabase, table, rows, column):
+    """
+    Bulk upsert one column of a (member_state_id, year) metrics table.
+
+    Only the given column is written, so other columns filled by earlier
+    indicators are left untouched on conflict.
+    """
+    batch = [
+        {"member_state_id": r["member_state_id"], "year": r["year"], column: r["value"]}
+        for r in rows
+    ]
+    for i in range(0, len(batch), STAGE_CHUNK_SIZE):
+        supabase.table(table).upsert(
+            batch[i:i + STAGE_CHUNK_SIZE],
+            on_conflict="member_state_id,year",
+        ).execute()
 
 
 async def seed_database():
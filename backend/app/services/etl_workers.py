@@ -0,0 +1,562 @@
+"""
+ETL Workers — Splits a run into shards and processes them from a Postgres work queue.
+
+A sharded run is one `etl_runs` row plus N `etl_shards` rows (indicator groups,
+country groups or year windows). Any number of worker processes, on any node, claim shards with
+`SELECT ... FOR UPDATE SKIP LOCKED`, keep their lease alive with heartbeats, and
+fold their counts into the parent run as each shard finishes.
+
+The worker that closes a run publishes (or discards) its data version under a
+finalize lease. If it dies before doing so, any worker picks the run up once
+that lease lapses, so a closed run never leaves its version staged. The
+finalizer renews the lease until its post-run work is done.
+
+Run local workers with:
+
+    python -m app.services.etl_workers --workers 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import uuid
+import structlog
+from app.core.config import settings
+from app.core.database import get_supabase, get_pg_pool, close_pg_pool
+from app.services.connectors.registry import load_sources
+from app.services.etl_service import AU_COUNTRIES, WB_INDICATORS, load_indicators, update_metric_tables
+from app.services.data_versions import publish_version, discard_version
+
+logger = structlog.get_logger()
+
+LEASE_SECONDS = 120
+HEARTBEAT_SECONDS = 30
+POLL_SECONDS = 5
+
+_CLAIM_SQL = """
+    UPDATE etl_shards
+    SET status = 'running',
+        lease_owner = $1,
+        lease_expires_at = NOW() + make_interval(secs => $2),
+        heartbeat_at = NOW(),
+        attempts = attempts + 1
+    WHERE id = (
+        SELECT id FROM etl_shards
+        WHERE (status = 'pending' OR (status = 'running' AND lease_expires_at < NOW()))
+          AND attempts < max_attempts
+          AND ($3::int IS NULL OR etl_run_id = $3)
+        ORDER BY id
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, etl_run_id, shard_key, indicator_codes, countries, start_year, end_year, attempts,
+        (SELECT v.id FROM data_versions v WHERE v.etl_run_id = etl_shards.etl_run_id) AS data_version_id,
+        (SELECT r.source_names FROM etl_runs r WHERE r.id = etl_shards.etl_run_id) AS source_names
+"""
+
+_HEARTBEAT_SQL = """
+    UPDATE etl_shards
+    SET heartbeat_at = NOW(), lease_expires_at = NOW() + make_interval(secs => $3)
+    WHERE id = $1 AND lease_owner = $2 AND status = 'running'
+"""
+
+# Shards whose lease expired on their last allowed attempt will never be claimed
+# again; fail them so the parent run can still finish.
+_REAP_SQL = """
+    UPDATE etl_shards
+    SET status = 'failed', lease_owner = NULL, completed_at = NOW(),
+        error_message = COALESCE(error_message, 'Lease expired after ' || attempts || ' attempts')
+    WHERE id IN (
+        SELECT id FROM etl_shards
+        WHERE status = 'running' AND lease_expires_at < NOW() AND attempts >= max_attempts
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, etl_run_id
+"""
+
+# Closed runs whose version is still staged and whose finalizer's lease lapsed
+_CLAIM_FINALIZE_SQL = """
+    UPDATE etl_runs r
+    SET finalize_lease_owner = $2, finalize_lease_expires_at = NOW() + make_interval(secs => $1)
+    FROM data_versions v
+    WHERE v.etl_run_id = r.id AND v.status = 'staging'
+      AND r.status IN ('completed', 'failed') AND r.shards_total > 0
+      AND (r.finalize_lease_expires_at IS NULL OR r.finalize_lease_expires_at < NOW())
+    RETURNING r.id, r.status
+"""
+
+_FINALIZE_HEARTBEAT_SQL = """
+    UPDATE etl_runs
+    SET finalize_lease_expires_at = NOW() + make_interval(secs => $3)
+    WHERE id = $1 AND finalize_lease_owner = $2
+"""
+
+
+def worker_name() -> str:
+    """Unique lease owner for this process."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _chunks(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def plan_shards(
+    indicator_codes: list[str] | None = None,
+    countries: list[str] | None = None,
+    start_year: int = settings.DATA_START_YEAR,
+    end_year: int = settings.DATA_END_YEAR,
+    shard_by: str = "indicator",
+    shard_size: int = 4,
+) -> list[dict]:
+    """Split a run into shards of indicator groups, country groups or year windows."""
+    indicator_codes = indicator_codes or list(WB_INDICATORS.keys())
+    shard_size = max(1, shard_size)
+
+    if shard_by == "indicator":
+        return [
+            {
+                "shard_key": f"indicators:{i}",
+                "indicator_codes": group,
+                "countries": countries,
+                "start_year": start_year,
+                "end_year": end_year,
+            }
+            for i, group in enumerate(_chunks(indicator_codes, shard_size))
+        ]
+    if shard_by == "country":
+        return [
+            {
+                "shard_key": f"countries:{i}",
+                "indicator_codes": indicator_codes,
+                "countries": group,
+                "start_year": start_year,
+                "end_year": end_year,
+            }
+            for i, group in enumerate(_chunks(countries or AU_COUNTRIES, shard_size))
+        ]
+    if shard_by == "year":
+        if start_year > end_year:
+            raise ValueError(f"start_year {start_year} is after end_year {end_year}")
+        return [
+            {
+                "shard_key": f"years:{year}-{min(year + shard_size - 1, end_year)}",
+                "indicator_codes": indicator_codes,
+                "countries": countries,
+                "start_year": year,
+                "end_year": min(year + shard_size - 1, end_year),
+            }
+            for year in range(start_year, end_year + 1, shard_size)
+        ]
+    raise ValueError(f"Unknown shard_by: {shard_by}")
+
+
+async def _require_pool():
+    pool = await get_pg_pool()
+    if pool is None:
+        raise RuntimeError("Sharded ETL requires DATABASE_URL (direct PostgreSQL connection)")
+    return pool
+
+
+async def create_sharded_run(
+    indicator_codes: list[str] | None = None,
+    countries: list[str] | None = None,
+    start_year: int = settings.DATA_START_YEAR,
+    end_year: int = settings.DATA_END_YEAR,
+    shard_by: str = "indicator",
+    shard_size: int = 4,
+    shards: list[dict] | None = None,
+    source_names: list[str] | None = None,
+) -> dict:
+    """
+    Create the parent ETL run and enqueue its shards in one transaction.
+
+    Pass `shards` to enqueue an explicit plan (e.g. the failed windows of an
+    earlier run) instead of planning one from the other arguments. Every shard
+    extracts from `source_names` (connector names), or all active sources.
+    """
+    if shards is None:
+        shards = plan_shards(indicator_codes, countries, start_year, end_year, shard_by, shard_size)
+    if not shards:
+        raise ValueError("Nothing to run: the shard plan is empty")
+    sources = load_sources(get_supabase(), source_names)
+    if not sources:
+        raise ValueError("No active data source with a registered connector")
+    pool = await _require_pool()
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            etl_run_id = await conn.fetchval(
+                """
+                INSERT INTO etl_runs (data_source_id, source_names, status, started_at, shards_total)
+                VALUES ($1, $2, 'running', NOW(), $3)
+                RETURNING id
+                """,
+                # As in run_etl: a single-source run points at its source
+                sources[0]["id"] if len(sources) == 1 else None,
+                source_names,
+                len(shards),
+            )
+            # All shards stage into one version, published when the run completes
+            await conn.execute(
+                "INSERT INTO data_versions (etl_run_id, source, status) VALUES ($1, 'etl', 'staging')",
+                etl_run_id,
+            )
+            await conn.executemany(
+                """
+                INSERT INTO etl_shards
+                    (etl_run_id, shard_key, indicator_codes, countries, start_year, end_year)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                """,
+                [
+                    (etl_run_id, s["shard_key"], s["indicator_codes"], s["countries"],
+                     s["start_year"], s["end_year"])
+                    for s in shards
+                ],
+            )
+
+    logger.info("etl_sharded_run_created", run_id=etl_run_id, shards=len(shards), shard_by=shard_by)
+    return {"etl_run_id": etl_run_id, "status": "running", "shards_total": len(shards)}
+
+
+async def claim_shard(worker_id: str, etl_run_id: int | None = None) -> dict | None:
+    """Lease the next claimable shard, or return None if the queue is empty."""
+    pool = await _require_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(_CLAIM_SQL, worker_id, LEASE_SECONDS, etl_run_id)
+    return dict(row) if row else None
+
+
+async def heartbeat(shard_id: int, worker_id: str) -> bool:
+    """Extend the lease. Returns False if the lease was lost to another worker."""
+    pool = await _require_pool()
+    async with pool.acquire() as conn:
+        result = await conn.execute(_HEARTBEAT_SQL, shard_id, worker_id, LEASE_SECONDS)
+    return result.endswith(" 1")
+
+
+async def _finalize_run(conn, etl_run_id: int, worker_id: str) -> str | None:
+    """
+    Close the parent run once every shard has finished. Returns the final status.
+
+    The caller gets the finalize lease and must then call `_on_run_finished`.
+    """
+    return await conn.fetchval(
+        """
+        UPDATE etl_runs
+        SET status = CASE WHEN shards_failed = shards_total THEN 'failed' ELSE 'completed' END,
+            completed_at = NOW(),
+            finalize_lease_owner = $3,
+            finalize_lease_expires_at = NOW() + make_interval(secs => $2)
+        WHERE id = $1 AND status = 'running'
+          AND shards_completed + shards_failed >= shards_total
+        RETURNING status
+        """,
+        etl_run_id, LEASE_SECONDS, worker_id,
+    )
+
+
+async def complete_shard(shard: dict, worker_id: str, result: dict, failed: bool = False) -> str | None:
+    """
+    Record a finished shard and fold its counts into the parent run.
+
+    Returns the run's final status if this shard was the last one, else None.
+    """
+    pool = await _require_pool()
+    status = "failed" if failed else "completed"
+    error = "; ".join(result.get("errors", []))[:2000] or None
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            updated = await conn.fetchval(
+                """
+                UPDATE etl_shards
+                SET status = $3, records_processed = $4, records_failed = $5,
+                    error_message = $6, completed_at = NOW(), lease_owner = NULL
+                WHERE id = $1 AND lease_owner = $2 AND status = 'running'
+                RETURNING id
+                """,
+                shard["id"], worker_id, status,
+                result.get("records_processed", 0), result.get("records_failed", 0), error,
+            )
+            if updated is None:
+                # Lease expired and the shard was re-claimed; the new owner reports it.
+                logger.warning("etl_shard_lease_lost", shard_id=shard["id"], worker=worker_id)
+                return None
+
+            await conn.execute(
+                """
+                UPDATE etl_runs
+                SET records_processed = records_processed + $2,
+                    records_failed = records_failed + $3,
+                    shards_completed = shards_completed + $4,
+                    shards_failed = shards_failed + $5
+                WHERE id = $1
+                """,
+                shard["etl_run_id"],
+                result.get("records_processed", 0), result.get("records_failed", 0),
+                0 if failed else 1, 1 if failed else 0,
+            )
+            return await _finalize_run(conn, shard["etl_run_id"], worker_id)
+
+
+async def reap_expired_shards(worker_id: str) -> list[tuple[int, str]]:
+    """Fail shards that exhausted their attempts. Returns (run_id, status) for runs this closed."""
+    pool = await _require_pool()
+    finished = []
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            rows = await conn.fetch(_REAP_SQL)
+            for row in rows:
+                await conn.execute(
+                    "UPDATE etl_runs SET shards_failed = shards_failed + 1 WHERE id = $1",
+                    row["etl_run_id"],
+                )
+            for run_id in {row["etl_run_id"] for row in rows}:
+                status = await _finalize_run(conn, run_id, worker_id)
+                if status:
+                    finished.append((run_id, status))
+    return finished
+
+
+async def has_leased_shards(etl_run_id: int) -> bool:
+    """Whether any of a run's shards is still held under a live lease."""
+    pool = await _require_pool()
+    async with pool.acquire() as conn:
+        return await conn.fetchval(
+            """
+            SELECT EXISTS (
+                SELECT 1 FROM etl_shards
+                WHERE etl_run_id = $1 AND status = 'running' AND lease_expires_at >= NOW()
+            )
+            """,
+            etl_run_id,
+        )
+
+
+async def claim_unfinalized_runs(worker_id: str) -> list[tuple[int, str]]:
+    """Take over closed runs whose finalizer died. Returns (run_id, status) for each."""
+    pool = await _require_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(_CLAIM_FINALIZE_SQL, LEASE_SECONDS, worker_id)
+    for row in rows:
+        logger.warning("etl_run_finalize_recovered", run_id=row["id"], status=row["status"])
+    return [(row["id"], row["status"]) for row in rows]
+
+
+async def renew_finalize_lease(etl_run_id: int, worker_id: str) -> bool:
+    """Extend a run's finalize lease. Returns False if another worker took the run over."""
+    pool = await _require_pool()
+    async with pool.acquire() as conn:
+        result = await conn.execute(_FINALIZE_HEARTBEAT_SQL, etl_run_id, worker_id, LEASE_SECONDS)
+    return result.endswith(" 1")
+
+
+async def release_shard(shard_id: int, worker_id: str):
+    """Hand a shard back to the queue, without spending one of its attempts."""
+    pool = await _require_pool()
+    async with pool.acquire() as conn:
+        await conn.execute(
+            """
+            UPDATE etl_shards
+            SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL,
+                attempts = GREATEST(attempts - 1, 0)
+            WHERE id = $1 AND lease_owner = $2 AND status = 'running'
+            """,
+            shard_id, worker_id,
+        )
+
+
+async def _keep_alive(shard_id: int, worker_id: str, task: asyncio.Task) -> bool:
+    """Heartbeat until the shard finishes; cancel the work and return True if the lease is lost."""
+    while not task.done():
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        try:
+            if not await heartbeat(shard_id, worker_id):
+                logger.warning("etl_shard_lease_lost", shard_id=shard_id, worker=worker_id)
+                task.cancel()
+                return True
+        except Exception as e:
+            logger.error("etl_shard_heartbeat_error", shard_id=shard_id, error=str(e))
+    return False
+
+
+async def _keep_finalizing(etl_run_id: int, worker_id: str, task: asyncio.Task) -> bool:
+    """Renew the finalize lease until the post-run work finishes; cancel it and return True if the run is lost."""
+    while not task.done():
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        try:
+            if not await renew_finalize_lease(etl_run_id, worker_id):
+                logger.warning("etl_run_finalize_lease_lost", run_id=etl_run_id, worker=worker_id)
+                task.cancel()
+                return True
+        except Exception as e:
+            logger.error("etl_run_finalize_heartbeat_error", run_id=etl_run_id, error=str(e))
+    return False
+
+
+async def process_shard(shard: dict, worker_id: str) -> str | None:
+    """Run one claimed shard under a heartbeat. Returns the run's final status if it finished."""
+    logger.info(
+        "etl_shard_started",
+        shard_id=shard["id"],
+        run_id=shard["etl_run_id"],
+        key=shard["shard_key"],
+        attempt=shard["attempts"],
+        worker=worker_id,
+    )
+
+    work = asyncio.create_task(load_indicators(
+        list(shard["indicator_codes"]),
+        shard["data_version_id"],
+        list(shard["countries"]) if shard["countries"] else None,
+        shard["start_year"],
+        shard["end_year"],
+        list(shard["source_names"]) if shard["source_names"] else None,
+    ))
+    keep_alive = asyncio.create_task(_keep_alive(shard["id"], worker_id, work))
+
+    try:
+        result = await work
+        failed = result["records_failed"] > 0 and result["records_processed"] == 0
+    except asyncio.CancelledError:
+        if keep_alive.done() and not keep_alive.cancelled() and keep_alive.result():
+            # Lease lost — another worker owns the shard now.
+            return None
+        # The worker itself is being stopped: give the shard back first
+        work.cancel()
+        await release_shard(shard["id"], worker_id)
+        raise
+    except Exception as e:
+        result = {"records_processed": 0, "records_failed": len(shard["indicator_codes"]), "errors": [str(e)]}
+        failed = True
+    finally:
+        keep_alive.cancel()
+
+    final_status = await complete_shard(shard, worker_id, result, failed=failed)
+    logger.info(
+        "etl_shard_completed",
+        shard_id=shard["id"],
+        run_id=shard["etl_run_id"],
+        processed=result["records_processed"],
+        failed=result["records_failed"],
+    )
+    return final_status
+
+
+async def _publish_run(etl_run_id: int, status: str):
+    """Publish (or discard) a closed run's staged version, then do the post-run work."""
+    supabase = get_supabase()
+    version = (
+        supabase.table("data_versions").select("id")
+        .eq("etl_run_id", etl_run_id).eq("status", "staging")
+        .execute()
+    )
+    if not version.data:
+        return
+    if status == "completed":
+        from app.services.post_load import refresh_after_publish
+        await asyncio.to_thread(publish_version, supabase, version.data[0]["id"])
+        await asyncio.to_thread(update_metric_tables, supabase, version.data[0]["id"])
+        await refresh_after_publish(version.data[0]["id"], etl_run_id)
+    else:
+        await asyncio.to_thread(discard_version, supabase, version.data[0]["id"])
+
+
+async def _on_run_finished(etl_run_id: int, status: str, worker_id: str):
+    """
+    Post-run work, done by whichever worker holds the run's finalize lease.
+
+    The lease is renewed until the work is done, so a slow publish or insights
+    run is not handed to a second worker. Safe to repeat: a version that is no
+    longer staged is left alone.
+    """
+    logger.info("etl_sharded_run_completed", run_id=etl_run_id, status=status)
+    work = asyncio.create_task(_publish_run(etl_run_id, status))
+    keep_alive = asyncio.create_task(_keep_finalizing(etl_run_id, worker_id, work))
+    try:
+        await work
+    except asyncio.CancelledError:
+        if keep_alive.done() and not keep_alive.cancelled() and keep_alive.result():
+            # Lease lost — another worker finishes the run now.
+            return
+        work.cancel()
+        raise
+    finally:
+        keep_alive.cancel()
+
+
+async def run_worker(
+    worker_id: str | None = None,
+    etl_run_id: int | None = None,
+    exit_when_idle: bool = False,
+) -> int:
+    """
+    Claim and process shards until the queue is empty (or forever).
+
+    With `exit_when_idle` and a run id, the queue only counts as empty once
+    none of the run's shards is leased either: a shard held by a worker that
+    died is re-claimed when its lease expires rather than left behind.
+    A failed iteration (database error, failed publish) is logged and the
+    loop carries on. Returns the number of shards this worker processed.
+    """
+    worker_id = worker_id or worker_name()
+    processed = 0
+    logger.info("etl_worker_started", worker=worker_id, run_id=etl_run_id)
+
+    while True:
+        try:
+            for run_id, status in await reap_expired_shards(worker_id) + await claim_unfinalized_runs(worker_id):
+                await _on_run_finished(run_id, status, worker_id)
+
+            shard = await claim_shard(worker_id, etl_run_id)
+            if shard is None:
+                if exit_when_idle and not (etl_run_id and await has_leased_shards(etl_run_id)):
+                    break
+                await asyncio.sleep(POLL_SECONDS)
+                continue
+
+            final_status = await process_shard(shard, worker_id)
+            processed += 1
+            if final_status:
+                await _on_run_finished(shard["etl_run_id"], final_status, worker_id)
+        except Exception as e:
+            # Whatever this worker held is picked up again once its lease lapses
+            logger.error("etl_worker_iteration_failed", worker=worker_id, error=str(e))
+            await asyncio.sleep(POLL_SECONDS)
+
+    logger.info("etl_worker_stopped", worker=worker_id, shards=processed)
+    return processed
+
+
+def _worker_process(etl_run_id: int | None, exit_when_idle: bool):
+    async def _main():
+        try:
+            await run_worker(etl_run_id=etl_run_id, exit_when_idle=exit_when_idle)
+        finally:
+            await close_pg_pool()
+
+    asyncio.run(_main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ETL shard workers against the Postgres work queue.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of local worker processes")
+    parser.add_argument("--run-id", type=int, default=None, help="Only process shards of this ETL run")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Stop once no shard can be claimed")
+    args = parser.parse_args()
+
+    procs = [
+        multiprocessing.Process(target=_worker_process, args=(args.run_id, args.exit_when_idle))
+        for _ in range(max(1, args.workers))
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
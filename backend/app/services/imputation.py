@@ -0,0 +1,288 @@
+"""
+Imputation — estimates for missing (indicator, country, year) cells, so
+continental and regional averages do not swing with whichever countries
+happened to report in a given year.
+
+Every missing cell in the expected window is filled by the first of three
+methods that applies, all computed together over the indicator × country ×
+year tensor:
+
+1. interpolated: linear interpolation between the nearest reported values on
+   either side, when at most `MAX_INTERPOLATION_GAP` years are missing
+   between them.
+2. carried_forward: the last reported value, for up to `CARRY_FORWARD_YEARS`
+   years after it.
+3. regional_median: the median of the region's reported values that year
+   (at least `MIN_REGIONAL_PEERS` of them), shifted by the country's usual
+   difference from that median in the years it did report.
+
+Nothing is estimated past the latest year any country reported an
+indicator, and estimates of series that are never negative are floored at 0.
+Estimates are computed from reported values only, never from other
+estimates.
+
+`refresh_estimates()` runs after each load, before insights are generated
+(`post_load.refresh_after_publish`). It publishes new and changed
+estimates as one data version (source 'imputation'), with the rows flagged
+`data_quality = 'estimated'`, and removes estimates for cells that no longer
+qualify. A publish never lets an estimate replace a
+reported value, and a reported value always replaces an estimate.
+Analytics read reported values only unless asked to `include_estimated`.
+
+    python -m app.services.imputation --benchmark
+"""
+
+import argparse
+import time
+import warnings
+import numpy as np
+import pandas as pd
+import structlog
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.services.data_versions import create_version, publish_version, stage_deletions, stage_values
+from app.services.insight_snapshot import InsightSnapshot
+from app.services.trend_detection import row_medians
+
+logger = structlog.get_logger()
+
+# Most missing years between two reports that are still bridged by a straight line
+MAX_INTERPOLATION_GAP = 5
+
+# Years a last report is carried forward
+CARRY_FORWARD_YEARS = 2
+
+# Reporting countries a region needs, for an indicator and year, before its median is used
+MIN_REGIONAL_PEERS = 3
+
+METHODS = ("interpolated", "carried_forward", "regional_median")
+
+ESTIMATE_COLUMNS = ["indicator_id", "member_state_id", "year", "value", "method"]
+
+KEYS = ["indicator_id", "member_state_id", "year"]
+
+
+def _medians(values: np.ndarray) -> np.ndarray:
+    """NaN-aware median over the last axis, any number of leading axes."""
+    return row_medians(values.reshape(-1, values.shape[-1])).reshape(values.shape[:-1])
+
+
+def impute(values: pd.DataFrame, regions: dict[int, int | None],
+           window: tuple[int, int] = (settings.DATA_START_YEAR, settings.DATA_END_YEAR)) -> pd.DataFrame:
+    """
+    `values` has indicator_id, member_state_id, year and value columns (reported
+    values only); `regions` maps every member_state_id to its region_id.
+
+    Returns one row per estimated cell in the window, with `ESTIMATE_COLUMNS`.
+    """
+    obs = values.dropna(subset=["value"])[["indicator_id", "member_state_id", "year", "value"]]
+    obs = obs.astype({"indicator_id": int, "member_state_id": int, "year": int, "value": float})
+    obs = obs[obs["year"] <= window[1]]
+    if obs.empty:
+        return pd.DataFrame(columns=ESTIMATE_COLUMNS)
+
+    # indicator × country × year, NaN where nothing was reported. Earlier
+    # history is kept so the first years of the window can be bridged.
+    indicators = np.sort(obs["indicator_id"].unique())
+    countries = np.sort(np.union1d(obs["member_state_id"].unique(), list(regions)).astype(int))
+    years = np.arange(min(obs["year"].min(), window[0]), window[1] + 1)
+    cube = np.full((len(indicators), len(countries), len(years)), np.nan)
+    cube[
+        np.searchsorted(indicators, obs["indicator_id"].to_numpy()),
+        np.searchsorted(countries, obs["member_state_id"].to_numpy()),
+        obs["year"].to_numpy() - years[0],
+    ] = obs["value"].to_numpy()
+    n_years = len(years)
+    position = np.arange(n_years)
+    present = ~np.isnan(cube)
+
+    # Nearest report at or before / at or after each year (-1 / n_years where there is none)
+    previous = np.maximum.accumulate(np.where(present, position, -1), axis=2)
+    following = n_years - 1 - np.maximum.accumulate(np.where(present[..., ::-1], position, -1), axis=2)[..., ::-1]
+    prev_value = np.take_along_axis(cube, np.clip(previous, 0, n_years - 1), axis=2)
+    next_value = np.take_along_axis(cube, np.clip(following, 0, n_years - 1), axis=2)
+
+    # Nothing past the last year anyone reported the indicator, and only inside the window
+    horizon = np.where(present.any(axis=1), position, -1).max(axis=1)  # indicator → last year index
+    open_cell = ~present & (position <= horizon[:, None, None]) & (years >= window[0])
+
+    estimate = np.full(cube.shape, np.nan)
+    method = np.zeros(cube.shape, dtype=np.int8)  # 1-based index into METHODS
+
+    span = following - previous
+    bridged = open_cell & (previous >= 0) & (following < n_years) & (span - 1 <= MAX_INTERPOLATION_GAP)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        line = prev_value + (next_value - prev_value) * (position - previous) / span
+    estimate[bridged] = line[bridged]
+    method[bridged] = 1
+
+    carried = open_cell & ~bridged & (previous >= 0) & (position - previous <= CARRY_FORWARD_YEARS)
+    estimate[carried] = prev_value[carried]
+    method[carried] = 2
+
+    # Regional median per indicator and year, plus each country's usual offset from it
+    remaining = open_cell & (method == 0)
+    region_of = np.array([regions.get(int(ms)) or -1 for ms in countries])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for region in np.unique(region_of[region_of >= 0]):
+            members = region_of == region
+            if not remaining[:, members, :].any():
+                continue
+            block = np.moveaxis(cube[:, members, :], 1, -1)  # indicator × year × members
+            median = _medians(block)
+            median[(~np.isnan(block)).sum(axis=-1) < MIN_REGIONAL_PEERS] = np.nan
+            offset = _medians(cube[:, members, :] - median[:, None, :])  # indicator × members
+            fill = median[:, None, :] + np.nan_to_num(offset)[..., None]
+            target = remaining[:, members, :] & ~np.isnan(fill)
+            part = estimate[:, members, :]
+            part[target] = fill[target]
+            estimate[:, members, :] = part
+            tagged = method[:, members, :]
+            tagged[target] = 3
+            method[:, members, :] = tagged
+
+    # Series that are never negative stay that way
+    non_negative = np.nanmin(cube, axis=(1, 2)) >= 0
+    estimate = np.where(non_negative[:, None, None], np.maximum(estimate, 0), estimate)
+
+    i, c, y = np.nonzero(method > 0)
+    return pd.DataFrame({
+        "indicator_id": indicators[i],
+        "member_state_id": countries[c],
+        "year": years[y],
+        "value": estimate[i, c, y],
+        "method": np.asarray(METHODS)[method[i, c, y] - 1],
+    })
+
+
+def estimate_record(row: dict) -> dict:
+    """An estimate as a staging row."""
+    return {
+        "indicator_id": int(row["indicator_id"]),
+        "member_state_id": int(row["member_state_id"]),
+        "year": int(row["year"]),
+        "value": round(float(row["value"]), 6),
+        "data_quality": "estimated",
+        "source_detail": f"Estimated: {row['method'].replace('_', ' ')}",
+    }
+
+
+def estimate_changes(estimates: pd.DataFrame, current: pd.DataFrame) -> tuple[list[dict], list[dict]]:
+    """
+    Compare fresh estimates with the stored ones (`current`, KEYS and value).
+
+    Returns (rows, removed): staging rows for new estimates and ones whose
+    value moved, and the cells of stored estimates that no longer qualify.
+    """
+    merged = estimates.merge(
+        current[KEYS + ["value"]].rename(columns={"value": "current"}), on=KEYS, how="left",
+    )
+    stale = merged["current"].isna() | ~np.isclose(
+        merged["value"].round(6), merged["current"].astype(float), rtol=0, atol=1e-6,
+    )
+    rows = [estimate_record(r) for r in merged[stale].to_dict("records")]
+
+    # Estimated cells that no longer qualify (e.g. the gap grew too long or the region lost peers)
+    kept = current[KEYS].merge(estimates[KEYS], on=KEYS, how="left", indicator=True)
+    removed = [
+        {k: int(r[k]) for k in KEYS}
+        for r in kept[kept["_merge"] == "left_only"].to_dict("records")
+    ]
+    return rows, removed
+
+
+async def refresh_estimates() -> dict:
+    """Re-impute every missing cell from the reported data; publish changed estimates and drop stale ones."""
+    supabase = get_supabase()
+    started = time.perf_counter()
+    snapshot = InsightSnapshot.load(supabase, include_estimated=True)
+    reported = snapshot.values[~snapshot.values["estimated"]]
+    current = snapshot.values[snapshot.values["estimated"]]
+
+    impute_started = time.perf_counter()
+    regions = {ms: snapshot.member_state(ms)["region_id"] for ms in snapshot.member_state_ids()}
+    estimates = impute(reported, regions)
+    impute_ms = round((time.perf_counter() - impute_started) * 1000, 1)
+
+    rows, removed = estimate_changes(estimates, current)
+
+    version_id = None
+    published = 0
+    if rows or removed:
+        version_id = create_version(supabase, "imputation")
+        stage_values(supabase, version_id, rows)
+        stage_deletions(supabase, version_id, removed)
+        published = publish_version(supabase, version_id)
+
+    summary = {
+        "estimates": len(estimates),
+        "by_method": estimates["method"].value_counts().to_dict(),
+        "staged": len(rows),
+        "removed": len(removed),
+        "published": published,
+        "data_version_id": version_id,
+        "impute_ms": impute_ms,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info("estimates_refreshed", **summary)
+    return summary
+
+
+def filter_estimated(query, include_estimated: bool = False):
+    """Leave estimated rows out of an indicator_values query unless they were asked for."""
+    if include_estimated:
+        return query
+    return query.or_("data_quality.is.null,data_quality.neq.estimated")
+
+
+def benchmark(sizes: list[tuple[int, int, int]], repeat: int = 3, seed: int = 0) -> list[dict]:
+    """Time `impute` on synthetic (indicators, countries, years) panels with ~30% of values missing."""
+    rng = np.random.default_rng(seed)
+    results = []
+    for n_indicators, n_countries, n_years in sizes:
+        ind, ms, yr = np.meshgrid(
+            np.arange(n_indicators), np.arange(n_countries), np.arange(2024 - n_years + 1, 2025), indexing="ij",
+        )
+        value = 50 + rng.normal(0, 1, size=(n_indicators, n_countries, 1)) * (yr - 2000) + rng.normal(0, 2, yr.shape)
+        values = pd.DataFrame({
+            "indicator_id": ind.ravel(),
+            "member_state_id": ms.ravel(),
+            "year": yr.ravel(),
+            "value": value.ravel(),
+        }).sample(frac=0.7, random_state=seed)
+        regions = {c: c % 5 for c in range(n_countries)}
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            estimates = impute(values, regions, (2024 - n_years + 1, 2024))
+            timings.append((time.perf_counter() - started) * 1000)
+        results.append({
+            "indicators": n_indicators,
+            "countries": n_countries,
+            "years": n_years,
+            "values": len(values),
+            "best_ms": round(min(timings), 1),
+            "estimates": estimates["method"].value_counts().to_dict(),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate missing indicator values.")
+    parser.add_argument("--benchmark", action="store_true", help="Time imputation on synthetic panels")
+    parser.add_argument("--refresh", action="store_true", help="Re-impute and publish estimates")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for row in benchmark([(24, 55, 25), (24, 55, 65), (100, 55, 30)], args.repeat):
+            print(row)
+    if args.refresh:
+        import asyncio
+        print(asyncio.run(refresh_estimates()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Insights Retention — Moves retired insights out of the live `insights` table.
+
+Inactive insights generated more than `INSIGHTS_RETENTION_DAYS` ago are moved
+into the compact `insights_archive` table by `archive_inactive_insights()`, one
+batch per call of the `archive_insights` SQL function, which also counts them as
+archived in the run's `insight_run_summaries`. Batches
+are small and spaced out so the job never holds long locks or competes with
+a publish. The API runs it on a schedule; it can also be run by hand:
+
+    python -m app.services.insight_retention --older-than-days 30
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+import structlog
+from app.core.config import settings
+from app.core.database import get_supabase
+
+logger = structlog.get_logger()
+
+
+async def archive_inactive_insights(
+    older_than_days: int = settings.INSIGHTS_RETENTION_DAYS,
+    batch_size: int = settings.INSIGHTS_ARCHIVE_BATCH_SIZE,
+    pause_seconds: float = settings.INSIGHTS_ARCHIVE_PAUSE_SECONDS,
+    max_batches: int | None = None,
+) -> dict:
+    """Archive inactive insights older than `older_than_days`, one batch per transaction."""
+    supabase = get_supabase()
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat()
+    started = time.perf_counter()
+    archived = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        # The supabase client is synchronous; keep the event loop free between batches
+        result = await asyncio.to_thread(
+            lambda: supabase.rpc(
+                "archive_insights", {"p_cutoff": cutoff, "p_batch_size": batch_size},
+            ).execute()
+        )
+        moved = result.data or 0
+        archived += moved
+        batches += 1
+        if moved < batch_size:
+            break
+        await asyncio.sleep(pause_seconds)
+
+    summary = {
+        "archived": archived,
+        "batches": batches,
+        "cutoff": cutoff,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info("insights_archived", **summary)
+    return summary
+
+
+async def run_retention_schedule():
+    """Archive on a fixed interval for the life of the process. Started from the API lifespan."""
+    interval = settings.INSIGHTS_ARCHIVE_INTERVAL_HOURS * 3600
+    while True:
+        try:
+            await archive_inactive_insights()
+        except Exception as e:
+            logger.error("insights_archive_failed", error=str(e))
+        await asyncio.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive inactive insights past the retention age.")
+    parser.add_argument("--older-than-days", type=int, default=settings.INSIGHTS_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.INSIGHTS_ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--pause-seconds", type=float, default=settings.INSIGHTS_ARCHIVE_PAUSE_SECONDS)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+
+    result = asyncio.run(archive_inactive_insights(
+        args.older_than_days, args.batch_size, args.pause_seconds, args.max_batches,
+    ))
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
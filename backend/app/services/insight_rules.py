@@ -0,0 +1,196 @@
+"""
+Insight Rules — threshold insights defined as data in the `insight_rules` table.
+
+A rule names an indicator, a comparison against a threshold, an aggregation,
+a severity, a goal and text templates. All active rules are compiled into
+column arrays and evaluated together over the snapshot's latest
+country × indicator matrix: one vectorized pass, however many rules there are.
+Adding or tuning a rule is a row change, not a deploy.
+
+Aggregations:
+- count: one insight when at least `min_countries` countries match
+- mean:  one insight when the continental average matches
+- each:  one insight per matching country (the `top_n` most extreme)
+
+Templates use str.format fields, e.g. "{count} countries above {threshold:g}%".
+"""
+
+import string
+import warnings
+import numpy as np
+import structlog
+
+logger = structlog.get_logger()
+
+AGGREGATIONS = ("count", "mean", "each")
+COMPARISONS = (">", ">=", "<", "<=")
+
+# Fields available to title/description templates
+TEMPLATE_FIELDS = {
+    "indicator", "indicator_name", "unit", "threshold", "target",
+    "count", "total", "mean", "min", "max", "countries",
+    "country", "value",  # each rules only
+}
+
+_SAMPLE_FIELDS = {
+    "indicator": "SL.UEM.1524.ZS", "indicator_name": "Youth unemployment", "unit": "%",
+    "threshold": 30.0, "target": 6.0, "count": 3, "total": 50, "mean": 12.5, "min": 1.0,
+    "max": 40.0, "countries": "A (40.0%), B (35.0%)", "country": "A", "value": 40.0,
+}
+
+
+def validate_rule(rule: dict, indicator: dict | None = None):
+    """
+    Raise ValueError if a rule definition cannot be compiled or rendered.
+
+    With the rule's `indicator` row, templates that use `{target}` are rejected
+    when the indicator has no target_value to fill it with.
+    """
+    if rule.get("aggregation", "count") not in AGGREGATIONS:
+        raise ValueError(f"aggregation must be one of {', '.join(AGGREGATIONS)}")
+    if rule.get("comparison") not in COMPARISONS:
+        raise ValueError(f"comparison must be one of {', '.join(COMPARISONS)}")
+    for name in ("title_template", "description_template"):
+        template = rule.get(name) or ""
+        try:
+            fields = {f for _, f, _, _ in string.Formatter().parse(template) if f is not None}
+        except ValueError as e:
+            raise ValueError(f"{name}: {e}")
+        unknown = fields - TEMPLATE_FIELDS
+        if unknown:
+            raise ValueError(f"{name}: unknown fields {', '.join(sorted(unknown))}")
+        if "target" in fields and indicator is not None and indicator.get("target_value") is None:
+            raise ValueError(f"{name}: {rule.get('indicator_code')} has no target_value to fill {{target}}")
+        try:
+            template.format_map(_SAMPLE_FIELDS)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"{name}: {e}")
+
+
+def _compare(values: np.ndarray, ops: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """Apply each rule's comparison to its column. NaN (no data) never matches."""
+    with np.errstate(invalid="ignore"):
+        return np.select(
+            [ops == 0, ops == 1, ops == 2, ops == 3],
+            [values > thresholds, values >= thresholds, values < thresholds, values <= thresholds],
+            default=False,
+        )
+
+
+def _format_value(value: float, unit: str | None) -> str:
+    return f"{value:,.1f}%" if unit == "%" else f"{value:,.1f}"
+
+
+def evaluate_rules(snapshot) -> list[dict]:
+    """Evaluate every active rule in the snapshot and return the insights that fire."""
+    matrix, member_state_ids, columns = snapshot.latest_matrix()
+    rules = [r for r in snapshot.rules if r["indicator_code"] in columns]
+    if not rules:
+        return []
+
+    # Compile: one entry per rule in each array
+    cols = np.array([columns[r["indicator_code"]] for r in rules])
+    ops = np.array([COMPARISONS.index(r["comparison"]) for r in rules])
+    thresholds = np.array([float(r["threshold"]) for r in rules])
+    is_mean = np.array([r["aggregation"] == "mean" for r in rules])
+    min_countries = np.array([r.get("min_countries") or 1 for r in rules])
+
+    # Evaluate: countries × rules
+    values = matrix[:, cols]
+    matches = _compare(values, ops, thresholds)
+    count = matches.sum(axis=0)
+    total = (~np.isnan(values)).sum(axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        mean = np.nanmean(values, axis=0)
+        low = np.nanmin(values, axis=0)
+        high = np.nanmax(values, axis=0)
+    fired = np.where(is_mean, _compare(mean[None, :], ops, thresholds)[0], count >= min_countries)
+    fired &= total > 0
+
+    # Matching countries, most extreme first ('>' rules descending, '<' ascending)
+    direction = np.where(ops <= 1, -1.0, 1.0)
+    order = np.argsort(np.where(matches, values * direction, np.inf), axis=0, kind="stable")
+
+    insights = []
+    for j in np.flatnonzero(fired):
+        rule = rules[j]
+        top = order[:min(count[j], rule.get("top_n") or 5), j]
+        try:
+            insights.extend(_render(
+                snapshot, rule, member_state_ids[top], values[top, j],
+                {
+                    "threshold": float(thresholds[j]),
+                    "count": int(count[j]),
+                    "total": int(total[j]),
+                    "mean": float(mean[j]),
+                    "min": float(low[j]),
+                    "max": float(high[j]),
+                },
+            ))
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning("insight_rule_render_failed", rule=rule["key"], error=str(e))
+
+    logger.info("insight_rules_evaluated", rules=len(rules), fired=int(fired.sum()), insights=len(insights))
+    return insights
+
+
+def _render(snapshot, rule: dict, member_state_ids: np.ndarray, values: np.ndarray, stats: dict) -> list[dict]:
+    ind = snapshot.indicators[rule["indicator_code"]]
+    unit = ind.get("unit")
+    target = float(ind["target_value"]) if ind.get("target_value") is not None else None
+    top = [
+        {**snapshot.member_state(int(ms_id)), "member_state_id": int(ms_id), "value": float(v)}
+        for ms_id, v in zip(member_state_ids, values)
+    ]
+    fields = {
+        "indicator": rule["indicator_code"],
+        "indicator_name": ind.get("name"),
+        "unit": unit or "",
+        "target": target,
+        "countries": ", ".join(f"{c['name']} ({_format_value(c['value'], unit)})" for c in top),
+        **stats,
+    }
+    evidence = {
+        "indicator": rule["indicator_code"],
+        "rule": rule["key"],
+        "comparison": rule["comparison"],
+        "threshold": stats["threshold"],
+        "countries_matching": stats["count"],
+        "total_countries": stats["total"],
+        "continental_avg": round(stats["mean"], 2),
+        "target": target,
+    }
+    base = {
+        "type": rule["type"],
+        "severity": rule["severity"],
+        "goal_id": snapshot.goal_id(rule["goal_number"]) if rule.get("goal_number") else None,
+        "indicator_id": ind["id"],
+    }
+
+    if rule["aggregation"] != "each":
+        return [{
+            **base,
+            "title": rule["title_template"].format_map(fields),
+            "description": rule["description_template"].format_map(fields),
+            "evidence": {
+                **evidence,
+                "countries": [
+                    {"country": c["name"], "iso_code": c["iso_code"], "value": round(c["value"], 2)}
+                    for c in top
+                ],
+            },
+        }]
+
+    insights = []
+    for c in top:
+        per_country = {**fields, "country": c["name"], "value": c["value"]}
+        insights.append({
+            **base,
+            "title": rule["title_template"].format_map(per_country),
+            "description": rule["description_template"].format_map(per_country),
+            "evidence": {**evidence, "country": c["name"], "iso_code": c["iso_code"], "value": round(c["value"], 2)},
+            "member_state_id": c["member_state_id"],
+            "region_id": c["region_id"],
+        })
+    return insights
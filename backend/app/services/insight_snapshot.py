@@ -0,0 +1,235 @@
+"""
+Insight Snapshot — a read-only, in-memory view of all indicator data for one
+insights run.
+
+Loaded with a single `insights_snapshot()` call, which returns indicator values
+as parallel column arrays plus the indicator, country and goal dimensions.
+Values are held in a pandas frame; the latest observation of every
+(indicator, country) series is computed once for all indicators at load time,
+and multi-horizon changes (see series_changes), trend tests (see
+trend_detection), anomaly flags (see anomaly_detection), projections (see
+projections) and year coverage bitsets (see coverage_index) once on first
+use, so generators never query the database for data.
+
+Estimated values (see imputation) are dropped at load unless the snapshot is
+loaded with `include_estimated`, so everything derived from it is over
+reported values by default.
+"""
+
+import numpy as np
+import pandas as pd
+import structlog
+from app.core.cache import cached
+from app.core.database import get_supabase
+from app.services.anomaly_detection import detect_anomalies
+from app.services.coverage_index import CoverageIndex
+from app.services.projections import goal_progress, project_series
+from app.services.series_changes import compute_changes
+from app.services.trend_detection import detect_trends
+
+logger = structlog.get_logger()
+
+
+class InsightSnapshot:
+    """Shared by every generator in a run. Treat everything it returns as read-only."""
+
+    def __init__(self, payload: dict, include_estimated: bool = False):
+        self.data_version_id = payload.get("data_version_id")
+        self.include_estimated = include_estimated
+        self.indicators = {i["code"]: i for i in payload.get("indicators") or [] if i.get("code")}
+        self._goal_ids = {g["number"]: g["id"] for g in payload.get("goals") or []}
+        self._regions_by_id = {
+            c["region_id"]: c["region_name"] for c in payload.get("countries") or [] if c.get("region_id")
+        }
+        self._countries = {c["id"]: c for c in payload.get("countries") or []}
+        self.rules = payload.get("rules") or []
+
+        codes = {i["id"]: code for code, i in self.indicators.items()}
+        frame = pd.DataFrame(payload.get("values") or {
+            "indicator_id": [], "member_state_id": [], "year": [], "value": [],
+        })
+        # Imputed values (see imputation) only when asked for; every analysis is on reported data by default
+        frame["estimated"] = frame["estimated"].fillna(False).astype(bool) if "estimated" in frame else False
+        if not include_estimated:
+            frame = frame[~frame["estimated"]].reset_index(drop=True)
+        frame["indicator_code"] = frame["indicator_id"].map(codes)
+        self.values = frame
+
+        # Newest first within each (indicator, country) series
+        ordered = frame.sort_values(
+            ["indicator_code", "member_state_id", "year"], ascending=[True, True, False],
+        )
+        rank = ordered.groupby(["indicator_code", "member_state_id"]).cumcount()
+        self._latest = ordered[rank == 0].set_index(["indicator_code", "member_state_id"])
+
+        self._latest_cache: dict[str, list[dict]] = {}
+        self._yoy_cache: dict[str, list[dict]] = {}
+        self._matrix = None
+        self._changes = None
+        self._trends = None
+        self._anomalies = None
+        self._projections = None
+        self._goal_progress = None
+        self._coverage = None
+
+    @classmethod
+    def load(cls, supabase, include_estimated: bool = False) -> "InsightSnapshot":
+        payload = supabase.rpc("insights_snapshot", {}).execute().data or {}
+        snapshot = cls(payload, include_estimated)
+        logger.info(
+            "insight_snapshot_loaded",
+            data_version_id=snapshot.data_version_id,
+            values=len(snapshot.values),
+            indicators=len(snapshot.indicators),
+            include_estimated=include_estimated,
+        )
+        return snapshot
+
+    @classmethod
+    def published(cls, include_estimated: bool = False) -> "InsightSnapshot":
+        """Snapshot of the published data, loaded once per data version and shared by API requests."""
+        return cached(
+            ("insight_snapshot", include_estimated), lambda: cls.load(get_supabase(), include_estimated),
+        )
+
+    def changes(self) -> pd.DataFrame:
+        """Multi-horizon changes for every (indicator, country) series; see series_changes."""
+        if self._changes is None:
+            changes = compute_changes(self.values)
+            changes["indicator_code"] = changes["indicator_id"].map(
+                {i["id"]: code for code, i in self.indicators.items()}
+            )
+            self._changes = changes
+        return self._changes
+
+    def trends(self) -> pd.DataFrame:
+        """Mann-Kendall / Theil-Sen results for every series and continental average; see trend_detection."""
+        if self._trends is None:
+            trends = detect_trends(self.values)
+            trends["indicator_code"] = trends["indicator_id"].map(
+                {i["id"]: code for code, i in self.indicators.items()}
+            )
+            self._trends = trends
+        return self._trends
+
+    def anomalies(self) -> pd.DataFrame:
+        """Values far outside their own history or their regional peers; see anomaly_detection."""
+        if self._anomalies is None:
+            anomalies = detect_anomalies(self.values, self._regions())
+            anomalies["indicator_code"] = anomalies["indicator_id"].map(
+                {i["id"]: code for code, i in self.indicators.items()}
+            )
+            self._anomalies = anomalies
+        return self._anomalies
+
+    def projections(self) -> pd.DataFrame:
+        """2030/2063 projections and years-to-target for every series and average; see projections."""
+        if self._projections is None:
+            self._projections = project_series(self.values, self.indicators, self._regions())
+        return self._projections
+
+    def goal_progress(self) -> pd.DataFrame:
+        """Goal progress now and projected, per country, region and the continent."""
+        if self._goal_progress is None:
+            self._goal_progress = goal_progress(self.projections(), self.indicators)
+        return self._goal_progress
+
+    def coverage(self) -> CoverageIndex:
+        """Per-series year bitsets for gap and coverage queries; see coverage_index."""
+        if self._coverage is None:
+            self._coverage = CoverageIndex(
+                self.values, [i["id"] for i in self.indicators.values()], self.member_state_ids(),
+            )
+        return self._coverage
+
+    def _regions(self) -> dict[int, int | None]:
+        return {ms_id: c.get("region_id") for ms_id, c in self._countries.items()}
+
+    def member_state(self, member_state_id: int) -> dict:
+        c = self._countries.get(member_state_id, {})
+        region = {"name": c["region_name"]} if c.get("region_name") else None
+        return {
+            "name": c.get("name"),
+            "iso_code": c.get("iso_code"),
+            "region_id": c.get("region_id"),
+            "regions": region,
+        }
+
+    def latest(self, indicator_code: str) -> list[dict]:
+        """The most recent value per country for an indicator."""
+        if indicator_code not in self._latest_cache:
+            rows = []
+            if indicator_code in self._latest.index.get_level_values(0):
+                part = self._latest.loc[indicator_code]
+                for member_state_id, row in part.iterrows():
+                    rows.append({
+                        "indicator_id": int(row["indicator_id"]),
+                        "member_state_id": int(member_state_id),
+                        "year": int(row["year"]),
+                        "value": None if pd.isna(row["value"]) else float(row["value"]),
+                        "member_states": self.member_state(int(member_state_id)),
+                    })
+            self._latest_cache[indicator_code] = rows
+        return self._latest_cache[indicator_code]
+
+    def year_over_year(self, indicator_code: str) -> list[dict]:
+        """
+        Change between the two most recent observations of each country.
+
+        `pct_change` is over the whole gap between them; `annual_pct_change`
+        divides it by `gap_years`, so a jump across a multi-year gap in
+        reporting is not mistaken for a one-year move.
+        """
+        if indicator_code not in self._yoy_cache:
+            frame = self.changes()
+            pair = frame[(frame["indicator_code"] == indicator_code) & frame["pct_change"].notna()]
+            changes = []
+            for r in pair.itertuples():
+                ms = self.member_state(int(r.member_state_id))
+                changes.append({
+                    "member_state_id": int(r.member_state_id),
+                    "country_name": ms["name"],
+                    "iso_code": ms["iso_code"],
+                    "latest_year": int(r.latest_year),
+                    "latest_value": float(r.latest_value),
+                    "previous_year": int(r.previous_year),
+                    "previous_value": float(r.previous_value),
+                    "gap_years": int(r.gap_years),
+                    "pct_change": round(float(r.pct_change), 2),
+                    "annual_pct_change": round(float(r.annual_pct_change), 2),
+                    "change_5y": None if pd.isna(r.change_5y) else float(r.change_5y),
+                    "cagr_5y": None if pd.isna(r.cagr_5y) else round(float(r.cagr_5y), 2),
+                    "region_id": ms["region_id"],
+                })
+            self._yoy_cache[indicator_code] = changes
+        return self._yoy_cache[indicator_code]
+
+    def latest_matrix(self) -> tuple[np.ndarray, np.ndarray, dict[str, int]]:
+        """
+        Latest values as a country × indicator matrix (NaN where a country has no data).
+
+        Returns (matrix, member_state_ids, {indicator_code: column}).
+        """
+        if self._matrix is None:
+            wide = self._latest["value"].astype(float).unstack(level=0)
+            self._matrix = (
+                wide.to_numpy(dtype=float),
+                wide.index.to_numpy(dtype=int),
+                {code: col for col, code in enumerate(wide.columns)},
+            )
+        return self._matrix
+
+    def member_state_ids(self) -> list[int]:
+        return list(self._countries)
+
+    def country_id(self, iso_code: str) -> int | None:
+        return next((c["id"] for c in self._countries.values() if c.get("iso_code") == iso_code), None)
+
+    def region_name(self, region_id: int) -> str | None:
+        return self._regions_by_id.get(region_id)
+
+    def goal_id(self, goal_number: int) -> int | None:
+        return self._goal_ids.get(goal_number)
+
+    def indicators_with_targets(self) -> list[dict]:
+        return [i for i in self.indicators.values() if i.get("target_value") is not None]
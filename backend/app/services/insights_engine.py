@@ -6,23 +6,126 @@ After each ETL run, this engine analyzes loaded data and creates
 insight records as first-class database objects.
 """
 
+import asyncio
+import hashlib
+import json
+import math
+import pickle
+import time
+import uuid
+import numpy as np
+import pandas as pd
 import structlog
 from datetime import datetime, timezone
+from app.core.config import settings
 from app.core.database import get_supabase
+from app.core.executors import get_process_pool, run_cpu_bound
+from app.services.anomaly_detection import Z_THRESHOLD, persist_anomalies
+from app.services.data_versions import analyses_stored, mark_analyses_stored, publish_insights
+from app.services.insight_rules import evaluate_rules
+from app.services.insight_snapshot import InsightSnapshot
+from app.services.projections import INVERTED_INDICATORS, TARGET_YEAR, persist_projections, progress_pct
+from app.services.trend_detection import ALPHA, persist_trends
+from app.services.value_history import changed_indicators
 
 logger = structlog.get_logger()
 
 
-async def generate_all_insights(etl_run_id: int | None = None) -> dict:
-    """
-    Run all insight generators and return summary.
+# Registered generators, in run order. Each declares the indicator codes it reads.
+GENERATORS = []
+
+# Dependency markers for generators that read every indicator with a 2063 target,
+# every indicator named by an active insight rule, and every indicator
+TARGETED_INDICATORS = "targeted"
+RULE_INDICATORS = "rules"
+ALL_INDICATORS = "all"
+
+# Generator that evaluates insight_rules; rerun on its own whenever a rule changes
+RULE_GENERATOR = "rule_insights"
+
+# Anomaly alerts published per run, most extreme first
+MAX_ANOMALY_ALERTS = 10
+
+
+def _generator(*depends_on: str):
+    """Register an insight generator and the indicator codes it depends on."""
+    def register(fn):
+        fn.key = fn.__name__.removeprefix("_generate_")
+        fn.depends_on = frozenset(depends_on)
+        GENERATORS.append(fn)
+        return fn
+    return register
 
-    Called after each ETL run to auto-generate insights.
+
+def affected_generators(changed_codes: set[str] | None, snapshot: InsightSnapshot) -> list:
+    """Generators whose inputs include a changed indicator (all of them when changed is None)."""
+    if changed_codes is None:
+        return list(GENERATORS)
+    markers = {
+        TARGETED_INDICATORS: {i["code"] for i in snapshot.indicators_with_targets()},
+        RULE_INDICATORS: {r["indicator_code"] for r in snapshot.rules},
+        ALL_INDICATORS: set(snapshot.indicators),
+    }
+    affected = []
+    for gen in GENERATORS:
+        deps = set(gen.depends_on)
+        for marker, codes in markers.items():
+            if marker in deps:
+                deps = (deps - {marker}) | codes
+        if deps & changed_codes:
+            affected.append(gen)
+    return affected
+
+
+async def generate_all_insights(
+    etl_run_id: int | None = None,
+    changed_codes: set[str] | None = None,
+    generator_keys: set[str] | None = None,
+) -> dict:
+    """
+    Run insight generators and return summary.
+
+    Called after each ETL run to auto-generate insights. All data is read once
+    into a shared snapshot that every generator computes from. Generators only
+    build insights in memory; the set is then published in one call, so the
+    feed is never empty or partial while generation is in progress. Insights
+    are matched to the active set by fingerprint: unchanged ones keep their
+    row and id, and only new or changed ones are written.
+
+    Generators run concurrently in the shared process pool, each under its own
+    timeout. One that fails or times out contributes nothing and keeps its
+    previous insights active; the others are unaffected. Per-generator timings
+    are returned and recorded on the ETL run.
+
+    With `changed_codes`, only generators that depend on one of those indicator
+    codes are rerun, and only their insights are replaced; every other active
+    insight stays as it is. With `generator_keys`, exactly those generators are
+    rerun, whatever changed.
+
+    Trend tests, anomaly flags and projections are stored once per data
+    version, the first time insights are generated for it.
     """
     supabase = get_supabase()
-
-    # Deactivate old insights before generating new ones
-    supabase.table("insights").update({"is_active": False}).eq("is_active", True).execute()
+    started = time.perf_counter()
+    snapshot = InsightSnapshot.load(supabase)
+    load_ms = round((time.perf_counter() - started) * 1000, 1)
+    compute_started = time.perf_counter()
+
+    # Trend tests, anomaly flags and projections are stored once per data version, whether or not
+    # any generator reruns: readers look them up by the published version
+    trends_ms = anomalies_ms = projections_ms = None
+    version_id = snapshot.data_version_id
+    if version_id is not None and not analyses_stored(supabase, version_id):
+        trends_started = time.perf_counter()
+        persist_trends(supabase, snapshot)
+        trends_ms = round((time.perf_counter() - trends_started) * 1000, 1)
+        anomalies_started = time.perf_counter()
+        persist_anomalies(supabase, snapshot)
+        anomalies_ms = round((time.perf_counter() - anomalies_started) * 1000, 1)
+        projections_started = time.perf_counter()
+        persist_projections(supabase, snapshot)
+        projections_ms = round((time.perf_counter() - projections_started) * 1000, 1)
+        mark_analyses_stored(supabase, version_id)
 
     insights_count = {
         "finding": 0,
@@ -33,128 +136,206 @@ async def generate_all_insights(etl_run_id: int | None = None) -> dict:
         "milestone": 0,
     }
 
-    generators = [
-        _generate_gender_findings,
-        _generate_youth_alerts,
-        _generate_health_findings,
-        _generate_education_findings,
-        _generate_economic_findings,
-        _generate_infrastructure_findings,
-        _generate_regional_comparisons,
-        _generate_milestone_insights,
-        _generate_trend_insights,
-        _generate_recommendations,
-    ]
-
-    for gen in generators:
-        try:
-            results = await gen(supabase, etl_run_id)
-            for r in results:
-                insights_count[r["type"]] += 1
-        except Exception as e:
-            logger.error("insight_generation_error", generator=gen.__name__, error=str(e))
+    if generator_keys is not None:
+        generators = [gen for gen in GENERATORS if gen.key in generator_keys]
+    else:
+        generators = affected_generators(changed_codes, snapshot)
+    if not generators:
+        logger.info("insights_up_to_date", changed=sorted(changed_codes or []))
+        return {"total_insights": 0, "by_type": insights_count, "generators": []}
+
+    # Generators are independent: run them all at once, each in its own worker
+    batch_id = uuid.uuid4().hex
+    # Changes are computed once here and shipped to the workers with the snapshot. Trends, anomaly
+    # flags and projections ship only if they were stored above; otherwise each generator that
+    # reads them computes them in its own worker.
+    snapshot.changes()
+    shipped = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL) if get_process_pool() else None
+    runs = await asyncio.gather(*[
+        _run_isolated(gen, snapshot, shipped, batch_id, etl_run_id) for gen in generators
+    ])
+
+    batch = []
+    timings = []
+    for results, timing in runs:
+        for r in results:
+            insights_count[r["type"]] += 1
+        batch.extend(results)
+        timings.append(timing)
 
     total = sum(insights_count.values())
+    compute_ms = round((time.perf_counter() - compute_started) * 1000, 1)
+
+    # A generator that failed keeps its previous insights rather than losing them
+    succeeded = [t["generator"] for t in timings if t["status"] == "ok"]
+    if changed_codes is None and generator_keys is None and len(succeeded) == len(generators):
+        replace = None
+    else:
+        replace = succeeded
+
+    # Write new or changed insights and retire the ones they replace in one step
+    publish_started = time.perf_counter()
+    published = publish_insights(supabase, batch_id, batch, replace)
+    publish_ms = round((time.perf_counter() - publish_started) * 1000, 1)
 
-    # Update ETL run with insights count
+    # Update ETL run with insights count and per-generator timings
     if etl_run_id:
         supabase.table("etl_runs").update(
-            {"insights_generated": total}
+            {"insights_generated": total, "insight_stats": timings}
         ).eq("id", etl_run_id).execute()
 
-    logger.info("insights_generated", total=total, breakdown=insights_count)
-    return {"total_insights": total, "by_type": insights_count}
+    logger.info(
+        "insights_generated",
+        total=total,
+        breakdown=insights_count,
+        generators=[gen.key for gen in generators],
+        failed=[t["generator"] for t in timings if t["status"] != "ok"],
+        published=published,
+        load_ms=load_ms,
+        trends_ms=trends_ms,
+        anomalies_ms=anomalies_ms,
+        projections_ms=projections_ms,
+        compute_ms=compute_ms,
+        publish_ms=publish_ms,
+    )
+    return {
+        "total_insights": total,
+        "by_type": insights_count,
+        "generators": [gen.key for gen in generators],
+        "published": published,
+        "load_ms": load_ms,
+        "trends_ms": trends_ms,
+        "anomalies_ms": anomalies_ms,
+        "projections_ms": projections_ms,
+        "compute_ms": compute_ms,
+        "publish_ms": publish_ms,
+        "timings": timings,
+    }
+
+
+def _run_generator(key: str, batch_id: str, shipped: bytes, etl_run_id: int | None) -> tuple[list[dict], float]:
+    """
+    Process-pool entry point: run one generator and return (insights, compute_ms).
+
+    The pickled snapshot is unpickled once per worker per run and reused by
+    every generator that worker picks up.
+    """
+    if _worker_snapshot["batch_id"] != batch_id:
+        _worker_snapshot["snapshot"] = pickle.loads(shipped)
+        _worker_snapshot["batch_id"] = batch_id
+    gen = next(g for g in GENERATORS if g.key == key)
+    started = time.perf_counter()
+    results = gen(_worker_snapshot["snapshot"], etl_run_id)
+    return results, round((time.perf_counter() - started) * 1000, 1)
+
+
+# Snapshot cached inside a pool worker, keyed by the run it belongs to
+_worker_snapshot: dict = {"batch_id": None, "snapshot": None}
+
+
+def _run_in_thread(gen, snapshot: InsightSnapshot, etl_run_id: int | None) -> tuple[list[dict], float]:
+    started = time.perf_counter()
+    results = gen(snapshot, etl_run_id)
+    return results, round((time.perf_counter() - started) * 1000, 1)
 
 
-def _insert_insight(supabase, insight: dict, etl_run_id: int | None = None) -> dict:
-    """Insert a single insight record."""
+async def _run_isolated(
+    gen, snapshot: InsightSnapshot, shipped: bytes | None, batch_id: str, etl_run_id: int | None,
+) -> tuple[list[dict], dict]:
+    """
+    Run one generator under its own timeout. A failure or timeout yields no
+    insights for that generator and never affects the others.
+    """
+    started = time.perf_counter()
+    timing = {"generator": gen.key, "status": "ok", "insights": 0}
+    try:
+        if shipped is None:
+            call = run_cpu_bound(_run_in_thread, gen, snapshot, etl_run_id)
+        else:
+            call = run_cpu_bound(_run_generator, gen.key, batch_id, shipped, etl_run_id)
+        results, compute_ms = await asyncio.wait_for(call, settings.INSIGHT_GENERATOR_TIMEOUT)
+    except asyncio.TimeoutError:
+        # The worker cannot be interrupted; its late result is simply discarded
+        results, compute_ms = [], None
+        timing.update(status="timeout", error=f"exceeded {settings.INSIGHT_GENERATOR_TIMEOUT}s")
+        logger.error("insight_generator_timeout", generator=gen.key, timeout=settings.INSIGHT_GENERATOR_TIMEOUT)
+    except Exception as e:
+        results, compute_ms = [], None
+        timing.update(status="error", error=str(e))
+        logger.error("insight_generation_error", generator=gen.key, error=str(e))
+
+    for r in results:
+        r["generator"] = gen.key
+        r["fingerprint"] = fingerprint(r)
+    timing["insights"] = len(results)
+    timing["compute_ms"] = compute_ms
+    timing["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("insight_generator_finished", **timing)
+    return results, timing
+
+
+async def refresh_insights_for_version(version_id: int, etl_run_id: int | None = None) -> dict:
+    """Regenerate only the insights that depend on indicators a published version changed."""
+    changed = changed_indicators(get_supabase(), version_id)
+    return await generate_all_insights(etl_run_id, changed_codes=changed)
+
+
+def _bucket(value):
+    """Round floats to 2 significant figures so noise-level changes keep the same fingerprint."""
+    if isinstance(value, bool) or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return float(f"{value:.2g}") if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _bucket(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_bucket(v) for v in value]
+    return value
+
+
+def fingerprint(insight: dict) -> str:
+    """
+    Stable identity of an insight's content: generator, type, severity, scope,
+    indicator and evidence (countries and bucketed key numbers). Titles and
+    descriptions are left out because they carry unrounded numbers.
+    """
+    key = {
+        "generator": insight.get("generator"),
+        "type": insight["type"],
+        "severity": insight["severity"],
+        "goal_id": insight.get("goal_id"),
+        "indicator_id": insight.get("indicator_id"),
+        "member_state_id": insight.get("member_state_id"),
+        "region_id": insight.get("region_id"),
+        "evidence": _bucket(insight.get("evidence") or {}),
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _new_insight(insight: dict, etl_run_id: int | None = None) -> dict:
+    """Stamp an insight for the batch being generated. Nothing is written yet."""
     insight["generated_at"] = datetime.now(timezone.utc).isoformat()
-    insight["is_active"] = True
-    insight["included_in_report"] = False
     if etl_run_id:
         insight["etl_run_id"] = etl_run_id
-    result = supabase.table("insights").insert(insight).execute()
-    return result.data[0] if result.data else insight
-
-
-def _get_latest_values(supabase, indicator_code: str) -> list[dict]:
-    """Get the most recent value per country for an indicator."""
-    indicator = supabase.table("indicators").select("id").eq("code", indicator_code).execute()
-    if not indicator.data:
-        return []
-    indicator_id = indicator.data[0]["id"]
-
-    # Get all values, ordered by year desc
-    values = (
-        supabase.table("indicator_values")
-        .select("*, member_states(name, iso_code, region_id, regions(name))")
-        .eq("indicator_id", indicator_id)
-        .order("year", desc=True)
-        .execute()
-    )
+    return insight
 
-    # Keep only the latest value per country
-    seen = set()
-    latest = []
-    for v in values.data:
-        cid = v["member_state_id"]
-        if cid not in seen:
-            seen.add(cid)
-            latest.append(v)
-    return latest
-
-
-def _get_year_over_year(supabase, indicator_code: str) -> list[dict]:
-    """Get year-over-year changes for an indicator by country."""
-    indicator = supabase.table("indicators").select("id").eq("code", indicator_code).execute()
-    if not indicator.data:
-        return []
-    indicator_id = indicator.data[0]["id"]
-
-    values = (
-        supabase.table("indicator_values")
-        .select("*, member_states(name, iso_code, region_id)")
-        .eq("indicator_id", indicator_id)
-        .order("year", desc=True)
-        .execute()
-    )
 
-    # Group by country
-    by_country = {}
-    for v in values.data:
-        cid = v["member_state_id"]
-        if cid not in by_country:
-            by_country[cid] = []
-        by_country[cid].append(v)
-
-    changes = []
-    for cid, vals in by_country.items():
-        if len(vals) >= 2:
-            latest = vals[0]
-            previous = vals[1]
-            if latest["value"] is not None and previous["value"] is not None and previous["value"] != 0:
-                pct_change = ((latest["value"] - previous["value"]) / abs(previous["value"])) * 100
-                changes.append({
-                    "member_state_id": cid,
-                    "country_name": latest["member_states"]["name"],
-                    "iso_code": latest["member_states"]["iso_code"],
-                    "latest_year": latest["year"],
-                    "latest_value": latest["value"],
-                    "previous_year": previous["year"],
-                    "previous_value": previous["value"],
-                    "pct_change": round(pct_change, 2),
-                    "region_id": latest["member_states"].get("region_id"),
-                })
-    return changes
+# ── Rule Insights ───────────────────────────────────────────────────
+
+@_generator(RULE_INDICATORS)
+def _generate_rule_insights(snapshot, etl_run_id) -> list[dict]:
+    # Threshold alerts and recommendations defined as data in insight_rules
+    return [_new_insight(insight, etl_run_id) for insight in evaluate_rules(snapshot)]
 
 
 # ── Gender Findings ─────────────────────────────────────────────────
 
-async def _generate_gender_findings(supabase, etl_run_id) -> list[dict]:
+@_generator("SG.GEN.PARL.ZS")
+def _generate_gender_findings(snapshot, etl_run_id) -> list[dict]:
     insights = []
 
     # Women in parliament analysis
-    latest = _get_latest_values(supabase, "SG.GEN.PARL.ZS")
+    latest = snapshot.latest("SG.GEN.PARL.ZS")
     if latest:
         above_30 = [v for v in latest if v["value"] and v["value"] >= 30]
         below_15 = [v for v in latest if v["value"] and v["value"] < 15]
@@ -163,7 +344,7 @@ async def _generate_gender_findings(supabase, etl_run_id) -> list[dict]:
         if total_with_data > 0:
             avg = sum(v["value"] for v in latest if v["value"]) / total_with_data
 
-            insights.append(_insert_insight(supabase, {
+            insights.append(_new_insight({
                 "type": "finding",
                 "severity": "warning" if len(above_30) < total_with_data * 0.3 else "neutral",
                 "title": f"Only {len(above_30)} of {total_with_data} AU member states have >30% women in parliament",
@@ -180,7 +361,7 @@ async def _generate_gender_findings(supabase, etl_run_id) -> list[dict]:
                     "total_countries": total_with_data,
                     "target": 50,
                 },
-                "goal_id": _get_goal_id(supabase, 17),
+                "goal_id": snapshot.goal_id(17),
             }, etl_run_id))
 
         # Top and bottom performers
@@ -188,7 +369,7 @@ async def _generate_gender_findings(supabase, etl_run_id) -> list[dict]:
         if len(sorted_vals) >= 3:
             top3 = sorted_vals[:3]
             bottom3 = sorted_vals[-3:]
-            insights.append(_insert_insight(supabase, {
+            insights.append(_new_insight({
                 "type": "comparison",
                 "severity": "neutral",
                 "title": "Women in parliament: Top vs bottom AU performers",
@@ -205,7 +386,7 @@ async def _generate_gender_findings(supabase, etl_run_id) -> list[dict]:
                     "top_3": [{"country": v["member_states"]["name"], "value": v["value"]} for v in top3],
                     "bottom_3": [{"country": v["member_states"]["name"], "value": v["value"]} for v in bottom3],
                 },
-                "goal_id": _get_goal_id(supabase, 17),
+                "goal_id": snapshot.goal_id(17),
             }, etl_run_id))
 
     return insights
@@ -213,84 +394,58 @@ async def _generate_gender_findings(supabase, etl_run_id) -> list[dict]:
 
 # ── Youth Alerts ────────────────────────────────────────────────────
 
-async def _generate_youth_alerts(supabase, etl_run_id) -> list[dict]:
+@_generator("SL.UEM.1524.ZS")
+def _generate_youth_alerts(snapshot, etl_run_id) -> list[dict]:
     insights = []
 
-    # Youth unemployment
-    latest = _get_latest_values(supabase, "SL.UEM.1524.ZS")
-    if latest:
-        high_unemployment = [v for v in latest if v["value"] and v["value"] > 30]
-        total_with_data = len([v for v in latest if v["value"] is not None])
-
-        if high_unemployment:
-            countries = ", ".join(
-                f"{v['member_states']['name']} ({v['value']:.1f}%)"
-                for v in sorted(high_unemployment, key=lambda x: x["value"], reverse=True)[:5]
-            )
-            insights.append(_insert_insight(supabase, {
+    # Countries above the youth unemployment threshold are reported by insight_rules;
+    # this flags sharp year-over-year rises
+    changes = snapshot.year_over_year("SL.UEM.1524.ZS")
+    worsening = [c for c in changes if c["annual_pct_change"] > 10]  # >10% increase per year
+    if worsening:
+        for c in sorted(worsening, key=lambda x: x["annual_pct_change"], reverse=True)[:3]:
+            since = "year-over-year" if c["gap_years"] == 1 else f"since {c['previous_year']}"
+            insights.append(_new_insight({
                 "type": "alert",
-                "severity": "critical",
-                "title": f"{len(high_unemployment)} AU countries have youth unemployment above 30%",
+                "severity": "warning",
+                "title": f"Youth unemployment in {c['country_name']} rose {c['pct_change']:.0f}% {since}",
                 "description": (
-                    f"Critical youth employment crisis: {len(high_unemployment)} member states report "
-                    f"youth unemployment rates exceeding 30%. Highest: {countries}. "
-                    f"The Agenda 2063 target is below 6%."
+                    f"Youth unemployment in {c['country_name']} increased from "
+                    f"{c['previous_value']:.1f}% ({c['previous_year']}) to "
+                    f"{c['latest_value']:.1f}% ({c['latest_year']}), a {c['pct_change']:.1f}% increase."
                 ),
                 "evidence": {
                     "indicator": "SL.UEM.1524.ZS",
-                    "countries_above_30": len(high_unemployment),
-                    "target": 6,
-                    "highest": [
-                        {"country": v["member_states"]["name"], "value": round(v["value"], 1)}
-                        for v in sorted(high_unemployment, key=lambda x: x["value"], reverse=True)[:5]
-                    ],
+                    "country": c["country_name"],
+                    "iso_code": c["iso_code"],
+                    "previous": c["previous_value"],
+                    "current": c["latest_value"],
+                    "change_pct": c["pct_change"],
+                    "gap_years": c["gap_years"],
+                    "annual_change_pct": c["annual_pct_change"],
                 },
-                "goal_id": _get_goal_id(supabase, 18),
+                "goal_id": snapshot.goal_id(18),
+                "member_state_id": c["member_state_id"],
             }, etl_run_id))
 
-        # Year-over-year changes
-        changes = _get_year_over_year(supabase, "SL.UEM.1524.ZS")
-        worsening = [c for c in changes if c["pct_change"] > 10]  # >10% increase
-        if worsening:
-            for c in sorted(worsening, key=lambda x: x["pct_change"], reverse=True)[:3]:
-                insights.append(_insert_insight(supabase, {
-                    "type": "alert",
-                    "severity": "warning",
-                    "title": f"Youth unemployment in {c['country_name']} rose {c['pct_change']:.0f}% year-over-year",
-                    "description": (
-                        f"Youth unemployment in {c['country_name']} increased from "
-                        f"{c['previous_value']:.1f}% ({c['previous_year']}) to "
-                        f"{c['latest_value']:.1f}% ({c['latest_year']}), a {c['pct_change']:.1f}% increase."
-                    ),
-                    "evidence": {
-                        "indicator": "SL.UEM.1524.ZS",
-                        "country": c["country_name"],
-                        "iso_code": c["iso_code"],
-                        "previous": c["previous_value"],
-                        "current": c["latest_value"],
-                        "change_pct": c["pct_change"],
-                    },
-                    "goal_id": _get_goal_id(supabase, 18),
-                    "member_state_id": c["member_state_id"],
-                }, etl_run_id))
-
     return insights
 
 
 # ── Health Findings ─────────────────────────────────────────────────
 
-async def _generate_health_findings(supabase, etl_run_id) -> list[dict]:
+@_generator("SP.DYN.LE00.IN")
+def _generate_health_findings(snapshot, etl_run_id) -> list[dict]:
     insights = []
 
     # Life expectancy
-    latest = _get_latest_values(supabase, "SP.DYN.LE00.IN")
+    latest = snapshot.latest("SP.DYN.LE00.IN")
     if latest:
         with_data = [v for v in latest if v["value"] is not None]
         if with_data:
             avg = sum(v["value"] for v in with_data) / len(with_data)
             below_60 = [v for v in with_data if v["value"] < 60]
 
-            insights.append(_insert_insight(supabase, {
+            insights.append(_new_insight({
                 "type": "finding",
                 "severity": "warning" if avg < 65 else "neutral",
                 "title": f"Continental average life expectancy: {avg:.1f} years (target: 75)",
@@ -305,33 +460,7 @@ async def _generate_health_findings(supabase, etl_run_id) -> list[dict]:
                     "countries_below_60": len(below_60),
                     "target": 75,
                 },
-                "goal_id": _get_goal_id(supabase, 3),
-            }, etl_run_id))
-
-    # Maternal mortality
-    latest_mmr = _get_latest_values(supabase, "SH.STA.MMRT")
-    if latest_mmr:
-        with_data = [v for v in latest_mmr if v["value"] is not None]
-        critical = [v for v in with_data if v["value"] > 500]
-        if critical:
-            insights.append(_insert_insight(supabase, {
-                "type": "alert",
-                "severity": "critical",
-                "title": f"{len(critical)} AU countries have maternal mortality >500 per 100,000",
-                "description": (
-                    f"{len(critical)} member states report maternal mortality ratios exceeding "
-                    f"500 per 100,000 live births — critically above the Agenda 2063 target of 50."
-                ),
-                "evidence": {
-                    "indicator": "SH.STA.MMRT",
-                    "countries_above_500": len(critical),
-                    "target": 50,
-                    "highest": [
-                        {"country": v["member_states"]["name"], "value": round(v["value"])}
-                        for v in sorted(critical, key=lambda x: x["value"], reverse=True)[:5]
-                    ],
-                },
-                "goal_id": _get_goal_id(supabase, 3),
+                "goal_id": snapshot.goal_id(3),
             }, etl_run_id))
 
     return insights
@@ -339,17 +468,18 @@ async def _generate_health_findings(supabase, etl_run_id) -> list[dict]:
 
 # ── Education Findings ──────────────────────────────────────────────
 
-async def _generate_education_findings(supabase, etl_run_id) -> list[dict]:
+@_generator("SE.ADT.LITR.ZS")
+def _generate_education_findings(snapshot, etl_run_id) -> list[dict]:
     insights = []
 
-    latest = _get_latest_values(supabase, "SE.ADT.LITR.ZS")
+    latest = snapshot.latest("SE.ADT.LITR.ZS")
     if latest:
         with_data = [v for v in latest if v["value"] is not None]
         if with_data:
             avg = sum(v["value"] for v in with_data) / len(with_data)
             below_50 = [v for v in with_data if v["value"] < 50]
 
-            insights.append(_insert_insight(supabase, {
+            insights.append(_new_insight({
                 "type": "finding",
                 "severity": "warning" if len(below_50) > 5 else "neutral",
                 "title": f"Continental adult literacy rate: {avg:.1f}% (target: 100%)",
@@ -363,7 +493,7 @@ async def _generate_education_findings(supabase, etl_run_id) -> list[dict]:
                     "countries_below_50": len(below_50),
                     "target": 100,
                 },
-                "goal_id": _get_goal_id(supabase, 2),
+                "goal_id": snapshot.goal_id(2),
             }, etl_run_id))
 
     return insights
@@ -371,17 +501,18 @@ async def _generate_education_findings(supabase, etl_run_id) -> list[dict]:
 
 # ── Economic Findings ───────────────────────────────────────────────
 
-async def _generate_economic_findings(supabase, etl_run_id) -> list[dict]:
+@_generator("NY.GDP.PCAP.CD")
+def _generate_economic_findings(snapshot, etl_run_id) -> list[dict]:
     insights = []
 
-    latest = _get_latest_values(supabase, "NY.GDP.PCAP.CD")
+    latest = snapshot.latest("NY.GDP.PCAP.CD")
     if latest:
         with_data = [v for v in latest if v["value"] is not None]
         if with_data:
             avg = sum(v["value"] for v in with_data) / len(with_data)
             below_1000 = [v for v in with_data if v["value"] < 1000]
 
-            insights.append(_insert_insight(supabase, {
+            insights.append(_new_insight({
                 "type": "finding",
                 "severity": "neutral",
                 "title": f"Continental average GDP per capita: ${avg:,.0f} (target: $12,000)",
@@ -396,7 +527,7 @@ async def _generate_economic_findings(supabase, etl_run_id) -> list[dict]:
                     "countries_below_1000": len(below_1000),
                     "target": 12000,
                 },
-                "goal_id": _get_goal_id(supabase, 1),
+                "goal_id": snapshot.goal_id(1),
             }, etl_run_id))
 
     return insights
@@ -404,18 +535,19 @@ async def _generate_economic_findings(supabase, etl_run_id) -> list[dict]:
 
 # ── Infrastructure Findings ─────────────────────────────────────────
 
-async def _generate_infrastructure_findings(supabase, etl_run_id) -> list[dict]:
+@_generator("IT.NET.USER.ZS")
+def _generate_infrastructure_findings(snapshot, etl_run_id) -> list[dict]:
     insights = []
 
     # Internet usage
-    latest = _get_latest_values(supabase, "IT.NET.USER.ZS")
+    latest = snapshot.latest("IT.NET.USER.ZS")
     if latest:
         with_data = [v for v in latest if v["value"] is not None]
         if with_data:
             avg = sum(v["value"] for v in with_data) / len(with_data)
             below_20 = [v for v in with_data if v["value"] < 20]
 
-            insights.append(_insert_insight(supabase, {
+            insights.append(_new_insight({
                 "type": "finding",
                 "severity": "warning" if avg < 40 else "neutral",
                 "title": f"Internet penetration: {avg:.1f}% continental average (target: 100%)",
@@ -430,42 +562,16 @@ async def _generate_infrastructure_findings(supabase, etl_run_id) -> list[dict]:
                     "countries_below_20": len(below_20),
                     "target": 100,
                 },
-                "goal_id": _get_goal_id(supabase, 10),
+                "goal_id": snapshot.goal_id(10),
             }, etl_run_id))
 
-    # Electricity access
-    latest_elec = _get_latest_values(supabase, "EG.ELC.ACCS.ZS")
-    if latest_elec:
-        with_data = [v for v in latest_elec if v["value"] is not None]
-        if with_data:
-            avg = sum(v["value"] for v in with_data) / len(with_data)
-            below_50 = [v for v in with_data if v["value"] < 50]
-
-            if len(below_50) > 10:
-                insights.append(_insert_insight(supabase, {
-                    "type": "alert",
-                    "severity": "warning",
-                    "title": f"{len(below_50)} AU countries have <50% electricity access",
-                    "description": (
-                        f"Electricity access remains below 50% in {len(below_50)} member states. "
-                        f"Continental average is {avg:.1f}%. Universal electricity access is a "
-                        f"prerequisite for Agenda 2063 Goal 10 (world-class infrastructure)."
-                    ),
-                    "evidence": {
-                        "indicator": "EG.ELC.ACCS.ZS",
-                        "continental_avg": round(avg, 1),
-                        "countries_below_50": len(below_50),
-                        "target": 100,
-                    },
-                    "goal_id": _get_goal_id(supabase, 10),
-                }, etl_run_id))
-
     return insights
 
 
 # ── Regional Comparisons ───────────────────────────────────────────
 
-async def _generate_regional_comparisons(supabase, etl_run_id) -> list[dict]:
+@_generator("NY.GDP.PCAP.CD", "SP.DYN.LE00.IN", "IT.NET.USER.ZS")
+def _generate_regional_comparisons(snapshot, etl_run_id) -> list[dict]:
     insights = []
 
     # Compare regions on key indicators
@@ -474,7 +580,7 @@ async def _generate_regional_comparisons(supabase, etl_run_id) -> list[dict]:
         ("SP.DYN.LE00.IN", "life expectancy"),
         ("IT.NET.USER.ZS", "internet penetration"),
     ]:
-        latest = _get_latest_values(supabase, indicator_code)
+        latest = snapshot.latest(indicator_code)
         if not latest:
             continue
 
@@ -501,7 +607,7 @@ async def _generate_regional_comparisons(supabase, etl_run_id) -> list[dict]:
                 worst = min(region_avgs, key=region_avgs.get)
 
                 if region_avgs[best] != region_avgs[worst]:
-                    insights.append(_insert_insight(supabase, {
+                    insights.append(_new_insight({
                         "type": "comparison",
                         "severity": "neutral",
                         "title": f"{label.title()}: {best} leads ({region_avgs[best]:,.1f}), {worst} lags ({region_avgs[worst]:,.1f})",
@@ -523,17 +629,18 @@ async def _generate_regional_comparisons(supabase, etl_run_id) -> list[dict]:
 
 # ── Milestone Insights ──────────────────────────────────────────────
 
-async def _generate_milestone_insights(supabase, etl_run_id) -> list[dict]:
+@_generator(TARGETED_INDICATORS)
+def _generate_milestone_insights(snapshot, etl_run_id) -> list[dict]:
     insights = []
+    projections = snapshot.projections()
+    continental = projections[projections["scope"] == "continent"].set_index("indicator_id")
 
     # Check goals with indicators that have targets
-    indicators = supabase.table("indicators").select("*").not_.is_("target_value", "null").execute()
-
-    for ind in indicators.data:
+    for ind in snapshot.indicators_with_targets():
         if ind["target_value"] is None:
             continue
 
-        latest = _get_latest_values(supabase, ind["code"])
+        latest = snapshot.latest(ind["code"])
         if not latest:
             continue
 
@@ -545,21 +652,9 @@ async def _generate_milestone_insights(supabase, etl_run_id) -> list[dict]:
         target = float(ind["target_value"])
 
         # Calculate progress (handle inverted indicators like mortality)
-        inverted = ind["code"] in ["SH.STA.MMRT", "SH.DYN.MORT", "SI.POV.DDAY", "SL.UEM.1524.ZS", "EN.ATM.CO2E.PC", "SP.ADO.TFRT", "SH.HIV.INCD.TL.P3"]
-
-        if inverted:
-            baseline = ind.get("baseline_value") or (avg * 2)
-            if baseline > target:
-                progress = max(0, min(100, ((baseline - avg) / (baseline - target)) * 100))
-            else:
-                progress = 100 if avg <= target else 0
-        else:
-            if target > 0:
-                progress = min(100, (avg / target) * 100)
-            else:
-                progress = 0
-
-        progress = round(progress, 1)
+        inverted = ind["code"] in INVERTED_INDICATORS
+        baseline = ind.get("baseline_value")
+        progress = round(float(progress_pct(avg, target, np.nan if baseline is None else baseline, inverted)), 1)
 
         if progress >= 60:
             severity = "positive"
@@ -571,15 +666,38 @@ async def _generate_milestone_insights(supabase, etl_run_id) -> list[dict]:
             severity = "critical"
             status = "significantly off track"
 
+        # Where the continental trend leads by 2063
+        projection = continental.loc[ind["id"]] if ind["id"] in continental.index else None
+        outlook = ""
+        evidence = {}
+        if projection is not None and not pd.isna(projection["slope"]):
+            years_to_target = projection["years_to_target"]
+            reach_year = None if pd.isna(years_to_target) else int(projection["last_year"] + years_to_target)
+            if reach_year is None:
+                outlook = " At the current trend the target is not reached."
+            elif reach_year <= TARGET_YEAR:
+                outlook = f" At the current trend the target is reached by {reach_year}."
+            elif reach_year <= 2100:
+                outlook = f" At the current trend the target is reached only in {reach_year}, after {TARGET_YEAR}."
+            else:
+                outlook = " At the current trend the target is not reached this century."
+            evidence = {
+                "trend_per_year": round(float(projection["slope"]), 4),
+                "projected_2030": round(float(projection["projected_2030"]), 2),
+                "projected_2063": round(float(projection["projected_2063"]), 2),
+                "progress_2063_pct": round(float(projection["progress_2063"]), 1),
+                "target_reached_year": reach_year,
+            }
+
         # Only generate for notable milestones
         if progress >= 50 or progress <= 20:
-            insights.append(_insert_insight(supabase, {
+            insights.append(_new_insight({
                 "type": "milestone",
                 "severity": severity,
                 "title": f"{ind['name']}: {progress}% toward 2063 target — {status}",
                 "description": (
                     f"Continental average for {ind['name']} is {avg:,.1f} {ind.get('unit', '')}. "
-                    f"Target: {target:,.1f}. Progress: {progress}% — {status}."
+                    f"Target: {target:,.1f}. Progress: {progress}% — {status}.{outlook}"
                 ),
                 "evidence": {
                     "indicator": ind["code"],
@@ -587,6 +705,7 @@ async def _generate_milestone_insights(supabase, etl_run_id) -> list[dict]:
                     "target": target,
                     "progress_pct": progress,
                     "countries_reporting": len(with_data),
+                    **evidence,
                 },
                 "goal_id": ind.get("goal_id"),
                 "indicator_id": ind["id"],
@@ -597,8 +716,10 @@ async def _generate_milestone_insights(supabase, etl_run_id) -> list[dict]:
 
 # ── Trend Insights ──────────────────────────────────────────────────
 
-async def _generate_trend_insights(supabase, etl_run_id) -> list[dict]:
+@_generator("SG.GEN.PARL.ZS", "SP.DYN.LE00.IN", "IT.NET.USER.ZS", "EG.ELC.ACCS.ZS")
+def _generate_trend_insights(snapshot, etl_run_id) -> list[dict]:
     insights = []
+    trends = snapshot.trends()
 
     for indicator_code, label in [
         ("SG.GEN.PARL.ZS", "Women in parliament"),
@@ -606,55 +727,126 @@ async def _generate_trend_insights(supabase, etl_run_id) -> list[dict]:
         ("IT.NET.USER.ZS", "Internet penetration"),
         ("EG.ELC.ACCS.ZS", "Electricity access"),
     ]:
-        changes = _get_year_over_year(supabase, indicator_code)
-        if not changes:
+        # Countries with enough history for a Mann-Kendall test
+        series = trends[
+            (trends["indicator_code"] == indicator_code)
+            & trends["member_state_id"].notna()
+            & (trends["direction"] != "insufficient_data")
+        ]
+        if series.empty:
             continue
 
-        improving = [c for c in changes if c["pct_change"] > 5]
-        declining = [c for c in changes if c["pct_change"] < -5]
-
-        if len(improving) > len(changes) * 0.6 and len(changes) >= 10:
-            insights.append(_insert_insight(supabase, {
+        tested = len(series)
+        improving = int((series["direction"] == "increasing").sum())
+        declining = int((series["direction"] == "decreasing").sum())
+        continental = trends[(trends["indicator_code"] == indicator_code) & trends["member_state_id"].isna()]
+        slope = continental["sen_slope"].iloc[0] if not continental.empty else None
+        evidence = {
+            "indicator": indicator_code,
+            "method": "mann_kendall",
+            "alpha": ALPHA,
+            "improving_countries": improving,
+            "declining_countries": declining,
+            "total_countries": tested,
+            "median_country_slope": round(float(series["sen_slope"].median()), 4),
+            "continental_slope": None if slope is None or pd.isna(slope) else round(float(slope), 4),
+        }
+
+        if improving > tested * 0.6 and tested >= 10:
+            insights.append(_new_insight({
                 "type": "trend",
                 "severity": "positive",
-                "title": f"{label}: Positive continental trend — {len(improving)} of {len(changes)} countries improving",
+                "title": f"{label}: Positive continental trend — {improving} of {tested} countries improving",
                 "description": (
-                    f"{label} is improving across the continent. {len(improving)} of {len(changes)} "
-                    f"countries with data show positive year-over-year changes."
+                    f"{label} is improving across the continent. {improving} of {tested} "
+                    f"countries with enough data show a statistically significant upward trend."
                 ),
-                "evidence": {
-                    "indicator": indicator_code,
-                    "improving_countries": len(improving),
-                    "total_countries": len(changes),
-                    "declining_countries": len(declining),
-                },
+                "evidence": evidence,
             }, etl_run_id))
-        elif len(declining) > len(changes) * 0.4 and declining:
-            insights.append(_insert_insight(supabase, {
+        elif declining > tested * 0.4 and declining:
+            insights.append(_new_insight({
                 "type": "trend",
                 "severity": "warning",
-                "title": f"{label}: Concerning trend — {len(declining)} countries declining",
+                "title": f"{label}: Concerning trend — {declining} countries declining",
                 "description": (
-                    f"{label} is declining in {len(declining)} of {len(changes)} countries. "
+                    f"{label} shows a statistically significant decline in {declining} of {tested} countries. "
                     f"This warrants attention and potential intervention."
                 ),
-                "evidence": {
-                    "indicator": indicator_code,
-                    "declining_countries": len(declining),
-                    "total_countries": len(changes),
-                },
+                "evidence": evidence,
             }, etl_run_id))
 
     return insights
 
 
+# ── Anomaly Alerts ──────────────────────────────────────────────────
+
+@_generator(ALL_INDICATORS)
+def _generate_anomaly_alerts(snapshot, etl_run_id) -> list[dict]:
+    insights = []
+
+    # Only a series' newest value: older flags are data-quality work, not news
+    flags = snapshot.anomalies()
+    latest = snapshot.changes()[["indicator_id", "member_state_id", "latest_year"]]
+    recent = flags.merge(latest, on=["indicator_id", "member_state_id"])
+    recent = recent[recent["year"] == recent["latest_year"]]
+    recent = recent.assign(magnitude=recent["score"].abs()).sort_values("magnitude", ascending=False)
+    recent = recent.drop_duplicates(["indicator_id", "member_state_id"]).head(MAX_ANOMALY_ALERTS)
+
+    for f in recent.to_dict("records"):
+        ind = snapshot.indicators.get(f["indicator_code"])
+        if not ind:
+            continue
+        ms = snapshot.member_state(int(f["member_state_id"]))
+        unit = ind.get("unit")
+
+        def fmt(value):
+            return f"{value:,.1f}%" if unit == "%" else f"{value:,.1f} {unit}" if unit else f"{value:,.1f}"
+
+        direction = "above" if f["score"] > 0 else "below"
+        if f["flag_type"] == "history_outlier":
+            title = f"{ind['name']} in {ms['name']} is far {direction} its own trend ({f['year']})"
+            baseline = f"its trend of {fmt(f['expected'])}"
+        else:
+            region = (ms.get("regions") or {}).get("name") or "regional"
+            title = f"{ind['name']} in {ms['name']} has moved away from {region} peers ({f['year']})"
+            baseline = f"a {region} median of {fmt(f['expected'])}"
+
+        insights.append(_new_insight({
+            "type": "alert",
+            "severity": "warning",
+            "title": title,
+            "description": (
+                f"The {f['year']} value of {fmt(f['value'])} is {direction} {baseline} "
+                f"(robust z-score {f['score']:+.1f}). Check the source data before it is reported."
+            ),
+            "evidence": {
+                "indicator": f["indicator_code"],
+                "country": ms["name"],
+                "iso_code": ms["iso_code"],
+                "year": int(f["year"]),
+                "value": round(float(f["value"]), 4),
+                "expected": round(float(f["expected"]), 4),
+                "check": f["flag_type"],
+                "method": "robust_z",
+                "score": round(float(f["score"]), 2),
+                "threshold": Z_THRESHOLD,
+            },
+            "indicator_id": ind["id"],
+            "member_state_id": int(f["member_state_id"]),
+            "region_id": ms["region_id"],
+        }, etl_run_id))
+
+    return insights
+
+
 # ── Recommendations ─────────────────────────────────────────────────
 
-async def _generate_recommendations(supabase, etl_run_id) -> list[dict]:
+@_generator("SL.UEM.1524.ZS")
+def _generate_recommendations(snapshot, etl_run_id) -> list[dict]:
     insights = []
 
     # Recommendation: Youth employment intervention
-    latest_youth = _get_latest_values(supabase, "SL.UEM.1524.ZS")
+    latest_youth = snapshot.latest("SL.UEM.1524.ZS")
     if latest_youth:
         critical = [v for v in latest_youth if v["value"] and v["value"] > 25]
         if len(critical) >= 5:
@@ -669,7 +861,7 @@ async def _generate_recommendations(supabase, etl_run_id) -> list[dict]:
                 by_region[rname].append(v["member_states"]["name"])
 
             worst_region = max(by_region, key=lambda r: len(by_region[r]))
-            insights.append(_insert_insight(supabase, {
+            insights.append(_new_insight({
                 "type": "recommendation",
                 "severity": "warning",
                 "title": f"Prioritize youth employment interventions in {worst_region} ({len(by_region[worst_region])} countries above 25%)",
@@ -684,37 +876,7 @@ async def _generate_recommendations(supabase, etl_run_id) -> list[dict]:
                     "countries": by_region[worst_region],
                     "target": 6,
                 },
-                "goal_id": _get_goal_id(supabase, 18),
-            }, etl_run_id))
-
-    # Recommendation: Digital infrastructure
-    latest_internet = _get_latest_values(supabase, "IT.NET.USER.ZS")
-    if latest_internet:
-        low_internet = [v for v in latest_internet if v["value"] and v["value"] < 25]
-        if len(low_internet) >= 5:
-            insights.append(_insert_insight(supabase, {
-                "type": "recommendation",
-                "severity": "warning",
-                "title": f"Accelerate digital infrastructure in {len(low_internet)} underconnected AU states",
-                "description": (
-                    f"{len(low_internet)} AU member states have internet penetration below 25%. "
-                    f"Digital infrastructure investment is critical for Agenda 2063 Goal 10 "
-                    f"and enabling e-governance, digital trade, and modern service delivery."
-                ),
-                "evidence": {
-                    "indicator": "IT.NET.USER.ZS",
-                    "countries_below_25": len(low_internet),
-                    "countries": [v["member_states"]["name"] for v in low_internet[:10]],
-                },
-                "goal_id": _get_goal_id(supabase, 10),
+                "goal_id": snapshot.goal_id(18),
             }, etl_run_id))
 
     return insights
-
-
-# ── Helpers ─────────────────────────────────────────────────────────
-
-def _get_goal_id(supabase, goal_number: int) -> int | None:
-    """Get goal database ID from goal number."""
-    result = supabase.table("goals").select("id").eq("number", goal_number).execute()
-    return result.data[0]["id"] if result.data else None
@@ -0,0 +1,32 @@
+"""
+Post-Load — the work every published load (ETL run, upload, form entry) is
+followed by, in the one order that leaves the stored analyses readable.
+
+`refresh_estimates()` may publish an 'imputation' data version, which moves
+the published pointer. Trend tests, anomaly flags and projections are stored
+per data version and read back by the published one, so estimates are
+refreshed first and the insights run that stores the analyses comes after,
+against the version readers will actually see. Data quality scores are kept
+per (indicator, country) pair over reported values, so rescoring the load's
+pairs is unaffected by the order.
+"""
+
+import structlog
+from app.services.data_quality import rescore_version
+from app.services.imputation import refresh_estimates
+from app.services.insights_engine import refresh_insights_for_version
+
+logger = structlog.get_logger()
+
+
+async def refresh_after_publish(version_id: int, etl_run_id: int | None = None) -> dict:
+    """Re-estimate gaps, then regenerate insights and rescore data quality for what a published version changed."""
+    estimates = await refresh_estimates()
+    insights = await refresh_insights_for_version(version_id, etl_run_id)
+    quality = await rescore_version(version_id)
+    logger.info(
+        "post_load_refreshed",
+        data_version_id=version_id,
+        imputation_version_id=estimates.get("data_version_id"),
+    )
+    return {"estimates": estimates, "insights": insights, "data_quality": quality}
@@ -0,0 +1,340 @@
+"""
+Projections — 2030 and 2063 projections, years-to-target and goal progress
+for every (indicator, country) series, every regional average and every
+continental average, fitted in one batched least-squares solve.
+
+Each series gets a straight line fitted to its last `FIT_YEARS` years of
+data. All series are rows of one series × year matrix and the normal
+equations are solved for all of them at once from masked sums, so the fit
+costs the same handful of array operations however many series there are.
+
+Progress toward an indicator's 2063 target follows the milestone rules: the
+value as a share of the target, or for indicators where lower is better
+(`INVERTED_INDICATORS`), the share of the way from the baseline down to the
+target. Goal progress is the mean progress of the goal's targeted indicators,
+for each country, region and the continent; the continental figure is
+written to `goals.current_progress`.
+
+Results are memoized on the snapshot (`InsightSnapshot.projections()`) and
+stored per data version by `persist_projections()`.
+"""
+
+import warnings
+import numpy as np
+import pandas as pd
+import structlog
+
+logger = structlog.get_logger()
+
+PROJECTION_YEARS = (2030, 2063)
+TARGET_YEAR = 2063
+
+# Years of each series' most recent data the trend line is fitted to
+FIT_YEARS = 10
+
+# Observations a series needs within the fit window to be projected
+MIN_POINTS = 3
+
+# A year enters a regional or continental average only when at least this share of the
+# countries that ever report the indicator there reported it that year
+MIN_COVERAGE = 0.5
+
+# Indicators where lower values are better
+INVERTED_INDICATORS = frozenset({
+    "SH.STA.MMRT", "SH.DYN.MORT", "SI.POV.DDAY", "SL.UEM.1524.ZS",
+    "EN.ATM.CO2E.PC", "SP.ADO.TFRT", "SH.HIV.INCD.TL.P3",
+})
+
+SCOPES = ("country", "region", "continent")
+
+PROJECTION_COLUMNS = [
+    "indicator_id", "scope", "member_state_id", "region_id", "n_points", "last_year", "last_value",
+    "slope", "fitted", "target", "progress_pct",
+    *[f"{name}_{year}" for year in PROJECTION_YEARS for name in ("projected", "progress")],
+    "years_to_target",
+]
+
+
+def progress_pct(value, target, baseline, inverted) -> np.ndarray:
+    """
+    Progress toward target in percent, 0–100. Arrays broadcast together.
+
+    Lower-is-better indicators measure the way from `baseline` down to the
+    target; without a baseline, twice the value is used.
+    """
+    value, target, baseline, inverted = np.broadcast_arrays(
+        np.asarray(value, dtype=float), np.asarray(target, dtype=float),
+        np.asarray(baseline, dtype=float), np.asarray(inverted, dtype=bool),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        base = np.where(np.isnan(baseline), value * 2, baseline)
+        lower = np.where(
+            base > target,
+            (base - value) / (base - target) * 100,
+            np.where(value <= target, 100.0, 0.0),
+        )
+        higher = np.where(target > 0, value / target * 100, 0.0)
+        progress = np.clip(np.where(inverted, lower, higher), 0, 100)
+    return np.where(np.isnan(value) | np.isnan(target), np.nan, progress)
+
+
+def fit_lines(matrix: np.ndarray, years: np.ndarray, window: int = FIT_YEARS) -> dict[str, np.ndarray]:
+    """
+    Least-squares line per row of a series × year matrix (NaN where a year is
+    missing), over each row's last `window` years of data.
+
+    Returns n_points, last_year, last_value, slope (units per year) and
+    fitted (the line's value at last_year), one entry per row.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    years = np.asarray(years, dtype=float)
+    observed = ~np.isnan(matrix)
+    any_data = observed.any(axis=1)
+    last = np.where(any_data, matrix.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1), 0)
+    last_year = np.where(any_data, years[last], np.nan)
+    last_value = np.where(any_data, matrix[np.arange(len(matrix)), last], np.nan)
+
+    # Centre on each row's last year so the intercept is the fitted latest value
+    t = years[None, :] - last_year[:, None]
+    mask = observed & (t > -window)
+    w = mask.astype(float)
+    y = np.where(mask, matrix, 0.0)
+    t = np.where(mask, t, 0.0)
+
+    n = w.sum(axis=1)
+    st, sy = t.sum(axis=1), y.sum(axis=1)
+    stt, sty = (t * t).sum(axis=1), (t * y).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        det = n * stt - st * st
+        slope = (n * sty - st * sy) / det
+        fitted = (sy - slope * st) / n
+    ok = (n >= MIN_POINTS) & (det > 0)
+    return {
+        "n_points": n.astype(int),
+        "last_year": last_year,
+        "last_value": last_value,
+        "slope": np.where(ok, slope, np.nan),
+        "fitted": np.where(ok, fitted, np.nan),
+    }
+
+
+def _series_matrix(obs: pd.DataFrame, regions: dict[int, int | None]) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """Country series, regional and continental yearly means stacked as rows; returns (keys, matrix, years)."""
+    years = np.arange(obs["year"].min(), obs["year"].max() + 1)
+    obs = obs.assign(region_id=obs["member_state_id"].map(regions))
+
+    countries = obs.pivot_table(
+        index=["indicator_id", "member_state_id"], columns="year", values="value", aggfunc="last",
+    ).reindex(columns=years)
+
+    def _averages(frame: pd.DataFrame, index) -> pd.DataFrame:
+        # Years reported by too few countries would swing the average with its membership
+        means = frame.pivot_table(index=index, columns="year", values="value", aggfunc="mean").reindex(columns=years)
+        counts = frame.pivot_table(index=index, columns="year", values="value", aggfunc="count").reindex(
+            index=means.index, columns=years,
+        ).fillna(0)
+        reporting = frame.groupby(index)["member_state_id"].nunique().reindex(means.index)
+        return means.where(counts.ge(reporting * MIN_COVERAGE, axis=0))
+
+    by_region = _averages(obs.dropna(subset=["region_id"]), ["indicator_id", "region_id"])
+    continent = _averages(obs, "indicator_id")
+
+    ms_ids = countries.index.get_level_values(1).to_numpy()
+    keys = pd.DataFrame({
+        "indicator_id": np.concatenate([
+            countries.index.get_level_values(0).to_numpy(),
+            by_region.index.get_level_values(0).to_numpy(),
+            continent.index.to_numpy(),
+        ]).astype(int),
+        "scope": ["country"] * len(countries) + ["region"] * len(by_region) + ["continent"] * len(continent),
+        "member_state_id": pd.array(list(ms_ids) + [None] * (len(by_region) + len(continent)), dtype="Int64"),
+        "region_id": pd.array(
+            [regions.get(int(ms)) for ms in ms_ids]
+            + list(by_region.index.get_level_values(1).astype(int))
+            + [None] * len(continent),
+            dtype="Int64",
+        ),
+    })
+    matrix = np.vstack([countries.to_numpy(float), by_region.to_numpy(float), continent.to_numpy(float)])
+    return keys, matrix, years
+
+
+def project_series(values: pd.DataFrame, indicators: dict[str, dict], regions: dict[int, int | None]) -> pd.DataFrame:
+    """
+    `values` has indicator_id, member_state_id, year and value columns;
+    `indicators` is {code: indicator} with id, target_value and baseline_value;
+    `regions` maps member_state_id to region_id.
+
+    Returns one row per series (scope country, region or continent) with the
+    fit, `projected_<year>` values, `progress_pct` now and `progress_<year>`
+    projected, and `years_to_target` (0 when met, NaN when the trend does not
+    reach the target).
+    """
+    obs = values.dropna(subset=["value"])[["indicator_id", "member_state_id", "year", "value"]]
+    obs = obs.astype({"indicator_id": int, "member_state_id": int, "year": int, "value": float})
+    if obs.empty:
+        return pd.DataFrame(columns=PROJECTION_COLUMNS)
+
+    keys, matrix, years = _series_matrix(obs, regions)
+    fit = fit_lines(matrix, years)
+    out = pd.concat([keys, pd.DataFrame(fit)], axis=1)
+
+    by_id = {i["id"]: (code, i) for code, i in indicators.items()}
+
+    def _number(ind_id, field):
+        v = by_id.get(ind_id, (None, {}))[1].get(field)
+        return np.nan if v is None else float(v)
+
+    ids = out["indicator_id"].to_numpy()
+    target = np.array([_number(i, "target_value") for i in ids])
+    baseline = np.array([_number(i, "baseline_value") for i in ids])
+    inverted = np.array([by_id.get(i, (None,))[0] in INVERTED_INDICATORS for i in ids])
+    # Without a baseline, progress measures from twice the current value (as milestones do)
+    baseline = np.where(np.isnan(baseline), out["last_value"].to_numpy() * 2, baseline)
+
+    slope, fitted, last_year = fit["slope"], fit["fitted"], fit["last_year"]
+    # A series that has never been negative is not projected below zero
+    floor = np.where(np.nanmin(np.where(np.isnan(matrix), np.inf, matrix), axis=1) >= 0, 0.0, -np.inf)
+    out["target"] = target
+    out["progress_pct"] = progress_pct(out["last_value"], target, baseline, inverted)
+    for year in PROJECTION_YEARS:
+        projected = np.maximum(fitted + slope * (year - last_year), floor)
+        out[f"projected_{year}"] = projected
+        out[f"progress_{year}"] = progress_pct(projected, target, baseline, inverted)
+
+    # Years until the trend line reaches the target, from the latest observation
+    with np.errstate(divide="ignore", invalid="ignore"):
+        met = np.where(inverted, out["last_value"] <= target, out["last_value"] >= target)
+        crossing = (target - fitted) / slope
+        toward = np.where(inverted, slope < 0, slope > 0)
+        out["years_to_target"] = np.where(
+            np.isnan(target), np.nan,
+            np.where(met, 0.0, np.where(toward & (crossing > 0), np.ceil(crossing), np.nan)),
+        )
+    return out
+
+
+def goal_progress(projections: pd.DataFrame, indicators: dict[str, dict]) -> pd.DataFrame:
+    """
+    Mean progress of each goal's targeted indicators, now and projected, per
+    (goal, scope, member_state_id, region_id).
+    """
+    goal_of = {i["id"]: i.get("goal_id") for i in indicators.values()}
+    targeted = projections[projections["target"].notna() & projections["progress_pct"].notna()]
+    targeted = targeted.assign(goal_id=targeted["indicator_id"].map(goal_of)).dropna(subset=["goal_id"])
+    keys = ["goal_id", "scope", "member_state_id", "region_id"]
+    metrics = ["progress_pct"] + [f"progress_{y}" for y in PROJECTION_YEARS]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        rolled = (
+            targeted.groupby(keys, dropna=False)
+            .agg(**{m: (m, "mean") for m in metrics}, indicators=("indicator_id", "nunique"))
+            .reset_index()
+        )
+    rolled["goal_id"] = rolled["goal_id"].astype(int)
+    return rolled
+
+
+def _json(value, digits: int = 4):
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), digits)
+
+
+def _int(value):
+    return None if value is None or pd.isna(value) else int(value)
+
+
+def projection_record(row: dict) -> dict:
+    """A projection row as JSON-ready values."""
+    record = {
+        "indicator_id": int(row["indicator_id"]),
+        "scope": row["scope"],
+        "member_state_id": _int(row["member_state_id"]),
+        "region_id": _int(row["region_id"]),
+        "n_points": int(row["n_points"]),
+        "last_year": _int(row["last_year"]),
+        "last_value": _json(row["last_value"], 6),
+        "slope": _json(row["slope"], 6),
+        "fitted": _json(row["fitted"], 6),
+        "target": _json(row["target"], 6),
+        "progress_pct": _json(row["progress_pct"], 2),
+        "years_to_target": _int(row["years_to_target"]),
+    }
+    for year in PROJECTION_YEARS:
+        record[f"projected_{year}"] = _json(row[f"projected_{year}"], 6)
+        record[f"progress_{year}"] = _json(row[f"progress_{year}"], 2)
+    return record
+
+
+def goal_progress_record(row: dict) -> dict:
+    record = {
+        "goal_id": int(row["goal_id"]),
+        "scope": row["scope"],
+        "member_state_id": _int(row["member_state_id"]),
+        "region_id": _int(row["region_id"]),
+        "indicators": int(row["indicators"]),
+        "progress_pct": _json(row["progress_pct"], 2),
+    }
+    for year in PROJECTION_YEARS:
+        record[f"progress_{year}"] = _json(row[f"progress_{year}"], 2)
+    return record
+
+
+def persist_projections(supabase, snapshot) -> dict:
+    """Store the snapshot's projections and goal progress for its data version and update goals.current_progress."""
+    if snapshot.data_version_id is None:
+        return {"projections": 0, "goals": 0}
+    stored = supabase.rpc("store_projections", {
+        "p_version_id": snapshot.data_version_id,
+        "p_projections": [projection_record(r) for r in snapshot.projections().to_dict("records")],
+        "p_goal_progress": [goal_progress_record(r) for r in snapshot.goal_progress().to_dict("records")],
+    }).execute().data or {"projections": 0, "goals": 0}
+    logger.info("projections_stored", data_version_id=snapshot.data_version_id, **stored)
+    return stored
+
+
+def projection_view(snapshot, indicator_id: int, member_state_id: int | None = None) -> dict:
+    """Continental, regional and (optionally) one country's projection for an indicator."""
+    frame = snapshot.projections()
+    rows = frame[frame["indicator_id"] == indicator_id]
+    if member_state_id is not None:
+        rows = rows[(rows["scope"] != "country") | (rows["member_state_id"] == member_state_id)]
+    else:
+        rows = rows[rows["scope"] != "country"]
+
+    view = {"continent": None, "regions": [], "country": None}
+    for r in rows.to_dict("records"):
+        record = projection_record(r)
+        if r["scope"] == "continent":
+            view["continent"] = record
+        elif r["scope"] == "region":
+            view["regions"].append({**record, "region": snapshot.region_name(record["region_id"])})
+        else:
+            view["country"] = {**record, **snapshot.member_state(record["member_state_id"])}
+    return view
+
+
+def goal_progress_view(snapshot, scope: str = "continent", goal_id: int | None = None,
+                       region_id: int | None = None, member_state_id: int | None = None) -> list[dict]:
+    """Goal progress rows at one scope, with region and country names."""
+    frame = snapshot.goal_progress()
+    rows = frame[frame["scope"] == scope]
+    if goal_id is not None:
+        rows = rows[rows["goal_id"] == goal_id]
+    if region_id is not None:
+        rows = rows[rows["region_id"] == region_id]
+    if member_state_id is not None:
+        rows = rows[rows["member_state_id"] == member_state_id]
+
+    result = []
+    for r in rows.to_dict("records"):
+        record = goal_progress_record(r)
+        if record["region_id"] is not None:
+            record["region"] = snapshot.region_name(record["region_id"])
+        if record["member_state_id"] is not None:
+            ms = snapshot.member_state(record["member_state_id"])
+            record["country"] = ms["name"]
+            record["iso_code"] = ms["iso_code"]
+        result.append(record)
+    return result
@@ -7,6 +7,7 @@ import io
 import structlog
 from datetime import datetime, timezone
 from app.core.database import get_supabase
+from app.services.imputation import filter_estimated
 
 logger = structlog.get_logger()
 
@@ -161,8 +162,7 @@ async def generate_country_profile_report(iso_code: str) -> dict:
 
     # Key indicators
     values = (
-        supabase.table("indicator_values")
-        .select("value, year, indicators(name, code, unit, target_value)")
+        filter_estimated(supabase.table("indicator_values").select("value, year, indicators(name, code, unit, target_value)"))
         .eq("member_state_id", country_id)
         .order("year", desc=True)
         .execute()
@@ -0,0 +1,109 @@
+"""
+Series Changes — 1-, 3- and 5-year changes, CAGR and gap-aware deltas for
+every (indicator, country) series, computed in one vectorized pass.
+
+The result is a frame with one row per series, memoized on the snapshot
+(`InsightSnapshot.changes()`). Insight runs compute it once and ship it to the
+generator workers with the snapshot; the API uses `InsightSnapshot.published()`,
+which is cached per data version. Either way trend insights, alerts, chat and
+/indicators/{id}/movers all read the same numbers.
+
+Horizons are gap-aware: the h-year change compares the latest observation with
+the most recent one at or before (latest_year - h), but never reaches back
+more than 2h years. `span_<h>y` records the actual number of years compared.
+"""
+
+import numpy as np
+import pandas as pd
+
+HORIZONS = (1, 3, 5)
+
+SERIES_KEYS = ["indicator_id", "member_state_id"]
+
+
+def compute_changes(values: pd.DataFrame) -> pd.DataFrame:
+    """
+    `values` has indicator_id, member_state_id, year and value columns.
+
+    Returns one row per series with latest/previous observations, `gap_years`,
+    `pct_change` and `annual_pct_change` between the two most recent
+    observations, and for each horizon h: `value_<h>y`, `span_<h>y`,
+    `change_<h>y`, `pct_change_<h>y` and `cagr_<h>y` (percent per year).
+    """
+    obs = values.dropna(subset=["value"])[SERIES_KEYS + ["year", "value"]]
+    obs = obs.astype({"indicator_id": int, "member_state_id": int, "year": int, "value": float})
+    obs = obs.sort_values(SERIES_KEYS + ["year"], ascending=[True, True, False])
+    rank = obs.groupby(SERIES_KEYS).cumcount()
+
+    out = obs[rank == 0].rename(columns={"year": "latest_year", "value": "latest_value"})
+    previous = obs[rank == 1].rename(columns={"year": "previous_year", "value": "previous_value"})
+    out = out.merge(previous, on=SERIES_KEYS, how="left").reset_index(drop=True)
+
+    latest = out["latest_value"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["gap_years"] = out["latest_year"] - out["previous_year"]
+        prev = out["previous_value"].to_numpy()
+        out["pct_change"] = np.where(prev != 0, (latest - prev) / np.abs(prev) * 100, np.nan)
+        out["annual_pct_change"] = out["pct_change"] / out["gap_years"]
+
+    # Every horizon in one as-of join: latest observation at or before the target year
+    history = obs.sort_values("year")
+    for h in HORIZONS:
+        targets = out[SERIES_KEYS + ["latest_year"]].assign(target_year=out["latest_year"] - h)
+        matched = pd.merge_asof(
+            targets.reset_index().sort_values("target_year"),
+            history.rename(columns={"year": "past_year", "value": "past_value"}),
+            left_on="target_year",
+            right_on="past_year",
+            by=SERIES_KEYS,
+            direction="backward",
+            tolerance=h,
+        ).set_index("index").sort_index()
+
+        past = matched["past_value"].to_numpy()
+        span = (matched["latest_year"] - matched["past_year"]).to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[f"value_{h}y"] = past
+            out[f"span_{h}y"] = span
+            out[f"change_{h}y"] = latest - past
+            out[f"pct_change_{h}y"] = np.where(past != 0, (latest - past) / np.abs(past) * 100, np.nan)
+            out[f"cagr_{h}y"] = np.where(
+                (past > 0) & (latest > 0), (np.power(latest / past, 1 / span) - 1) * 100, np.nan,
+            )
+
+    return out
+
+
+def movers(snapshot, indicator_id: int, horizon: int = 1, limit: int = 10, metric: str = "pct_change") -> dict:
+    """Countries whose value rose and fell the most over `horizon` years (metric: change, pct_change or cagr)."""
+    column = f"{metric}_{horizon}y"
+    frame = snapshot.changes()
+    series = frame[(frame["indicator_id"] == indicator_id) & frame[column].notna()]
+    ranked = series.sort_values(column, ascending=False)
+
+    def _round(value, digits: int):
+        return None if pd.isna(value) else round(float(value), digits)
+
+    def _rows(part: pd.DataFrame) -> list[dict]:
+        rows = []
+        for r in part.to_dict("records"):
+            ms = snapshot.member_state(int(r["member_state_id"]))
+            rows.append({
+                "member_state_id": int(r["member_state_id"]),
+                "country": ms["name"],
+                "iso_code": ms["iso_code"],
+                "latest_year": int(r["latest_year"]),
+                "latest_value": _round(r["latest_value"], 4),
+                "past_year": int(r["latest_year"] - r[f"span_{horizon}y"]),
+                "past_value": _round(r[f"value_{horizon}y"], 4),
+                "change": _round(r[f"change_{horizon}y"], 4),
+                "pct_change": _round(r[f"pct_change_{horizon}y"], 2),
+                "cagr": _round(r[f"cagr_{horizon}y"], 2),
+            })
+        return rows
+
+    return {
+        "risers": _rows(ranked[ranked[column] > 0].head(limit)),
+        "fallers": _rows(ranked[ranked[column] < 0].tail(limit).iloc[::-1]),
+        "countries_compared": len(series),
+    }
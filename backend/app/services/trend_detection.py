@@ -0,0 +1,251 @@
+"""
+Trend Detection — Mann-Kendall significance tests and Theil-Sen slopes for
+every (indicator, country) series and every continental average, in one batch.
+
+Series are pivoted into a series × year matrix and every pairwise comparison
+is taken at once over the upper triangle of year pairs, so the whole batch is
+a handful of array operations however many series there are. Missing years
+are NaN and simply drop out of the pairs. Large batches are processed in
+chunks of series to bound memory.
+
+- Mann-Kendall S is the sum of signs of all later-minus-earlier differences;
+  its variance is tie-corrected and z is continuity-corrected. p is two-sided.
+- The Theil-Sen slope is the median of all pairwise slopes (units per year),
+  the intercept the median of value - slope × (year - first_year).
+
+A series needs at least `MIN_POINTS` observations; a trend is significant
+at `ALPHA`. Results are memoized on the snapshot (`InsightSnapshot.trends()`)
+and stored per data version in `series_trends` by `persist_trends()`.
+
+A benchmark over synthetic panels of the production shape and larger:
+
+    python -m app.services.trend_detection --benchmark
+"""
+
+import argparse
+import math
+import time
+import warnings
+import numpy as np
+import pandas as pd
+import structlog
+
+logger = structlog.get_logger()
+
+ALPHA = 0.05
+MIN_POINTS = 4
+
+# Upper bound on pairwise cells (series × year pairs) held in memory at once
+CHUNK_CELLS = 4_000_000
+
+DIRECTIONS = ("increasing", "decreasing", "no_trend", "insufficient_data")
+
+RESULT_COLUMNS = [
+    "n_points", "first_year", "last_year", "mk_s", "mk_z", "p_value",
+    "kendall_tau", "sen_slope", "sen_intercept", "direction",
+]
+
+_erfc = np.frompyfunc(math.erfc, 1, 1)
+
+
+def row_medians(values: np.ndarray) -> np.ndarray:
+    """Median of each row ignoring NaN (NaN for empty rows). Sort-based: much faster than np.nanmedian."""
+    if values.shape[1] == 0:
+        return np.full(len(values), np.nan)
+    ordered = np.sort(values, axis=1)  # NaN sorts last
+    k = (~np.isnan(values)).sum(axis=1)
+    rows = np.arange(len(values))
+    lo = ordered[rows, (np.maximum(k, 1) - 1) // 2]
+    hi = ordered[rows, np.maximum(k, 1) // 2]
+    return np.where(k > 0, (lo + hi) / 2, np.nan)
+
+
+def mann_kendall(matrix: np.ndarray, years: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Test every row of a series × year matrix (NaN where a year is missing).
+
+    Returns one array per `RESULT_COLUMNS` entry, one element per row.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    years = np.asarray(years, dtype=float)
+    n_series, n_years = matrix.shape
+    i, j = np.triu_indices(n_years, k=1)
+    chunk = max(1, CHUNK_CELLS // max(len(i), n_years * n_years, 1))
+
+    s = np.zeros(n_series)
+    ties = np.zeros(n_series)
+    slope = np.full(n_series, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows
+        for start in range(0, n_series, chunk):
+            part = matrix[start:start + chunk]
+            diffs = part[:, j] - part[:, i]
+            s[start:start + chunk] = np.nansum(np.sign(diffs), axis=1)
+            slope[start:start + chunk] = row_medians(diffs / (years[j] - years[i]))
+
+            # Tie correction: an observation tied with t values (itself included) adds (t-1)(2t+5),
+            # so each tie group of size t adds t(t-1)(2t+5) in total
+            t = (part[:, :, None] == part[:, None, :]).sum(axis=2)
+            ties[start:start + chunk] = np.where(np.isnan(part), 0, (t - 1) * (2 * t + 5)).sum(axis=1)
+
+    observed = ~np.isnan(matrix)
+    n = observed.sum(axis=1)
+    first_year = np.where(n > 0, years[np.argmax(observed, axis=1)], np.nan)
+    last_year = np.where(n > 0, years[n_years - 1 - np.argmax(observed[:, ::-1], axis=1)], np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        variance = (n * (n - 1) * (2 * n + 5) - ties) / 18
+        z = np.where(variance > 0, (s - np.sign(s)) / np.sqrt(variance), 0.0)
+        p = _erfc(np.abs(z) / math.sqrt(2)).astype(float)
+        tau = np.where(n > 1, s / (n * (n - 1) / 2), np.nan)
+        intercept = row_medians(matrix - slope[:, None] * (years[None, :] - first_year[:, None]))
+
+    enough = n >= MIN_POINTS
+    significant = enough & (p < ALPHA)
+    direction = np.select(
+        [~enough, significant & (s > 0), significant & (s < 0)],
+        ["insufficient_data", "increasing", "decreasing"],
+        default="no_trend",
+    )
+    return {
+        "n_points": n,
+        "first_year": first_year,
+        "last_year": last_year,
+        "mk_s": s,
+        "mk_z": np.where(enough, z, np.nan),
+        "p_value": np.where(enough, p, np.nan),
+        "kendall_tau": np.where(enough, tau, np.nan),
+        "sen_slope": np.where(enough, slope, np.nan),
+        "sen_intercept": np.where(enough, intercept, np.nan),
+        "direction": direction,
+    }
+
+
+def detect_trends(values: pd.DataFrame) -> pd.DataFrame:
+    """
+    `values` has indicator_id, member_state_id, year and value columns.
+
+    Returns one row per country series plus one continental row per indicator
+    (member_state_id NA, tested on the yearly mean across countries), with the
+    `RESULT_COLUMNS`.
+    """
+    obs = values.dropna(subset=["value"])[["indicator_id", "member_state_id", "year", "value"]]
+    obs = obs.astype({"indicator_id": int, "member_state_id": int, "year": int, "value": float})
+    if obs.empty:
+        return pd.DataFrame(columns=["indicator_id", "member_state_id", *RESULT_COLUMNS])
+
+    countries = obs.pivot_table(
+        index=["indicator_id", "member_state_id"], columns="year", values="value", aggfunc="last",
+    )
+    continental = obs.pivot_table(index="indicator_id", columns="year", values="value", aggfunc="mean")
+    continental = continental.reindex(columns=countries.columns)
+
+    years = countries.columns.to_numpy()
+    matrix = np.vstack([countries.to_numpy(dtype=float), continental.to_numpy(dtype=float)])
+    keys = pd.DataFrame({
+        "indicator_id": np.concatenate([
+            countries.index.get_level_values(0).to_numpy(), continental.index.to_numpy(),
+        ]),
+        "member_state_id": pd.array(
+            list(countries.index.get_level_values(1)) + [None] * len(continental), dtype="Int64",
+        ),
+    })
+    return pd.concat([keys, pd.DataFrame(mann_kendall(matrix, years))], axis=1)
+
+
+def trend_of(years: list[int], values: list[float]) -> dict:
+    """Mann-Kendall / Theil-Sen result for a single series, as a JSON-ready dict."""
+    if not years:
+        return {"n_points": 0, "direction": "insufficient_data"}
+    span = np.arange(min(years), max(years) + 1)
+    row = np.full((1, len(span)), np.nan)
+    row[0, np.asarray(years) - span[0]] = values
+    result = mann_kendall(row, span)
+    return trend_record({k: v[0] for k, v in result.items()})
+
+
+def trend_record(row: dict) -> dict:
+    """Round a result row and turn NaN/NA into None."""
+    def _value(key, value):
+        if value is None or pd.isna(value):
+            return None
+        if key in ("n_points", "first_year", "last_year", "mk_s", "indicator_id", "member_state_id"):
+            return int(value)
+        if key == "direction":
+            return str(value)
+        return round(float(value), 6)
+    return {key: _value(key, value) for key, value in row.items()}
+
+
+def persist_trends(supabase, snapshot) -> int:
+    """Store the snapshot's trend results for its data version, replacing any earlier ones."""
+    if snapshot.data_version_id is None:
+        return 0
+    rows = [trend_record(r) for r in snapshot.trends().drop(columns="indicator_code").to_dict("records")]
+    stored = supabase.rpc(
+        "store_series_trends", {"p_version_id": snapshot.data_version_id, "p_trends": rows},
+    ).execute().data or 0
+    logger.info("series_trends_stored", data_version_id=snapshot.data_version_id, series=stored)
+    return stored
+
+
+def stored_trends(supabase, data_version_id: int, indicator_id: int) -> list[dict]:
+    """Stored results for one indicator in a data version (country rows and the continental row)."""
+    return (
+        supabase.table("series_trends")
+        .select("*")
+        .eq("data_version_id", data_version_id)
+        .eq("indicator_id", indicator_id)
+        .execute()
+        .data
+    )
+
+
+def benchmark(sizes: list[tuple[int, int, int]], repeat: int = 3, seed: int = 0) -> list[dict]:
+    """Time `detect_trends` on synthetic (indicators, countries, years) panels with ~10% of values missing."""
+    rng = np.random.default_rng(seed)
+    results = []
+    for n_indicators, n_countries, n_years in sizes:
+        ind, ms, yr = np.meshgrid(
+            np.arange(n_indicators), np.arange(n_countries), np.arange(2000, 2000 + n_years), indexing="ij",
+        )
+        slope = rng.normal(0, 1, size=(n_indicators, n_countries, 1))
+        value = 50 + slope * (yr - 2000) + rng.normal(0, 5, size=yr.shape)
+        values = pd.DataFrame({
+            "indicator_id": ind.ravel(),
+            "member_state_id": ms.ravel(),
+            "year": yr.ravel(),
+            "value": value.ravel(),
+        }).sample(frac=0.9, random_state=seed)
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            trends = detect_trends(values)
+            timings.append((time.perf_counter() - started) * 1000)
+        results.append({
+            "indicators": n_indicators,
+            "countries": n_countries,
+            "years": n_years,
+            "series": len(trends),
+            "best_ms": round(min(timings), 1),
+            "significant": int(trends["direction"].isin(["increasing", "decreasing"]).sum()),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mann-Kendall / Theil-Sen trend detection.")
+    parser.add_argument("--benchmark", action="store_true", help="Time the batch on synthetic panels")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        # 24 indicators × 55 member states is the production shape
+        for row in benchmark([(24, 55, 25), (24, 55, 65), (100, 55, 65), (500, 55, 30)], args.repeat):
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,671 @@
+"""
+Uploads — streaming validation and bulk staging of supplementary data files.
+
+An uploaded file (country_iso, indicator_code, year, value) is spooled to
+disk and read back in chunks of `UPLOAD_PARSE_CHUNK_ROWS` rows: CSVs with
+pandas' chunked reader, Excel workbooks with openpyxl in read-only mode, one
+row at a time. Each chunk is validated and staged before the next is parsed,
+so peak memory is one chunk whatever the file size.
+
+Validation works on a whole chunk: ISO and indicator codes are mapped to ids
+with one hash join each, and every row's first problem is found with column
+masks, never row by row. Valid rows are staged as one data version in bulk
+upserts of `UPLOAD_CHUNK_SIZE` rows; a cell repeated in the file keeps its
+last row.
+
+Every file is fingerprinted by the sha256 of its bytes while it is spooled
+and recorded in `upload_ledger`. A file whose bytes were already loaded
+completely, with nothing published since, is answered from the ledger
+without being parsed. Otherwise each
+validated chunk is compared with the stored cells through per-row digests
+(`row_digests`), and only the rows that differ are staged, so re-sending a
+slightly edited file rewrites just the edited rows.
+
+Large files can be loaded as upload jobs instead: the file is accepted at
+once and `run_upload_job` parses and stages it in the process pool, writing
+rows parsed, loaded and failed, the error sample and throughput to its
+`upload_jobs` row after every chunk; the API publishes it when it is done.
+A job runs inside the API process and is not resumed after a restart, so
+`fail_stale_uploads` fails jobs and ledger entries whose heartbeat has not
+moved for `UPLOAD_JOB_STALE_MINUTES` and discards their staged versions.
+
+    python -m app.services.uploads --benchmark
+    python -m app.services.uploads --benchmark-file data.csv
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+import structlog
+from app.core.config import settings
+from app.core.database import fetch_all, get_supabase
+from app.services.data_versions import create_version, discard_version, publish_version, stage_values
+from app.services.value_history import publish_order
+
+logger = structlog.get_logger()
+
+REQUIRED_COLUMNS = ["country_iso", "indicator_code", "year", "value"]
+
+KEYS = ["indicator_id", "member_state_id", "year"]
+
+# Latest year an upload may carry (targets and plans run ahead of the data)
+MAX_UPLOAD_YEAR = 2030
+
+# Bytes read from the request per write to the spool file
+SPOOL_READ_BYTES = 1 << 20
+
+# Error messages returned with an upload result
+ERROR_SAMPLE_SIZE = 20
+
+
+class MissingColumnsError(ValueError):
+    """The file's header lacks required columns."""
+
+    def __init__(self, columns):
+        super().__init__(
+            f"Missing required columns. Expected: {set(REQUIRED_COLUMNS)}. Got: {set(columns)}"
+        )
+
+
+async def spool_to_disk(file, filename: str) -> tuple[str, str, int]:
+    """
+    Copy an upload to a temporary file a block at a time, hashing it on the
+    way. Returns (path, sha256 hex digest, size in bytes); the caller removes
+    the file.
+    """
+    suffix = os.path.splitext(filename or "")[1]
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as spool:
+        while block := await file.read(SPOOL_READ_BYTES):
+            digest.update(block)
+            size += len(block)
+            spool.write(block)
+    return spool.name, digest.hexdigest(), size
+
+
+def _check_header(columns) -> None:
+    if any(c not in columns for c in REQUIRED_COLUMNS):
+        raise MissingColumnsError(columns)
+
+
+def _csv_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    _check_header(pd.read_csv(path, nrows=0).columns)
+    # Chunks keep a running index, so row numbers stay file-wide
+    with pd.read_csv(path, chunksize=chunk_size) as reader:
+        yield from reader
+
+
+def _excel_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(c).strip() if c is not None else None for c in next(rows, ())]
+        while header and header[-1] is None:
+            header.pop()
+        _check_header(header)
+
+        batch, index = [], []
+        for position, row in enumerate(rows):
+            row = row[:len(header)]
+            if all(c is None for c in row):
+                continue
+            batch.append(row)
+            index.append(position)
+            if len(batch) == chunk_size:
+                yield pd.DataFrame.from_records(batch, columns=header, index=index)
+                batch, index = [], []
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=header, index=index)
+    finally:
+        workbook.close()
+
+
+def iter_upload_chunks(
+    path: str, filename: str, chunk_size: int = settings.UPLOAD_PARSE_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    The file as frames of at most `chunk_size` rows; CSV by extension, anything
+    else as an Excel workbook (first sheet). Each frame's index is the row's
+    position among the data rows, so index + 2 is its spreadsheet row.
+    Raises MissingColumnsError from the first chunk when the header is wrong.
+    """
+    if filename.endswith(".csv"):
+        return _csv_chunks(path, chunk_size)
+    return _excel_chunks(path, chunk_size)
+
+
+def validate_rows(
+    df: pd.DataFrame,
+    country_ids: dict[str, int],
+    indicator_ids: dict[str, int],
+    source_detail: str,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Split a chunk of an upload into staging rows and errors.
+
+    Returns (valid, errors): `valid` has one row per cell with the staging
+    columns; `errors` has the spreadsheet row number (header is row 1) and a
+    message for every rejected row.
+    """
+    iso = df["country_iso"].astype("string").str.strip().str.upper()
+    code = df["indicator_code"].astype("string").str.strip()
+    member_state_id = iso.map(country_ids)
+    indicator_id = code.map(indicator_ids)
+    year = pd.to_numeric(df["year"], errors="coerce")
+    value = pd.to_numeric(df["value"], errors="coerce")
+
+    unknown_country = member_state_id.isna()
+    unknown_indicator = indicator_id.isna()
+    bad_year = year.isna() | (year != np.floor(year))
+    year_out_of_range = ~bad_year & ((year < settings.BACKFILL_START_YEAR) | (year > MAX_UPLOAD_YEAR))
+    bad_value = value.isna() & df["value"].notna()
+
+    # Each row's first problem, in the order a user would fix them
+    checks = [
+        (unknown_country, "Unknown country: " + df["country_iso"].astype("string").fillna("")),
+        (unknown_indicator, "Unknown indicator: " + df["indicator_code"].astype("string").fillna("")),
+        (bad_year, "Invalid year: " + df["year"].astype("string").fillna("")),
+        (year_out_of_range, "Year out of range: " + year.where(~bad_year).astype("Int64").astype("string")),
+        (bad_value, "Invalid value: " + df["value"].astype("string")),
+    ]
+    message = pd.Series(pd.NA, index=df.index, dtype="string")
+    for mask, text in reversed(checks):
+        message = message.mask(mask.to_numpy(dtype=bool), text)
+    failed = message.notna().to_numpy()
+
+    errors = pd.DataFrame({"row": df.index[failed].to_numpy() + 2, "error": message[failed].to_numpy()})
+    valid = pd.DataFrame({
+        "indicator_id": indicator_id[~failed].astype(int),
+        "member_state_id": member_state_id[~failed].astype(int),
+        "year": year[~failed].astype(int),
+        "value": value[~failed],
+    })
+    valid = valid.drop_duplicates(subset=KEYS, keep="last")
+    valid["data_quality"] = "verified"
+    valid["source_detail"] = source_detail
+    return valid.reset_index(drop=True), errors
+
+
+def staging_records(valid: pd.DataFrame) -> list[dict]:
+    """Validated rows as JSON-ready dicts (NaN values become null)."""
+    return valid.astype(object).where(valid.notna(), None).to_dict("records")
+
+
+def row_digests(df: pd.DataFrame) -> np.ndarray:
+    """One 64-bit digest per row over the cell and what would be stored in it."""
+    return pd.util.hash_pandas_object(
+        df[KEYS + ["value", "data_quality"]].astype(
+            {"indicator_id": "int64", "member_state_id": "int64", "year": "int64", "value": "float64", "data_quality": object},
+        ),
+        index=False,
+    ).to_numpy()
+
+
+def stored_cells(supabase, valid: pd.DataFrame) -> pd.DataFrame:
+    """The stored rows for the cells in `valid` (only those that exist)."""
+    rows = []
+    cells = valid[KEYS].to_dict("records")
+    for i in range(0, len(cells), settings.UPLOAD_CHUNK_SIZE):
+        part = cells[i:i + settings.UPLOAD_CHUNK_SIZE]
+        rows += fetch_all(
+            lambda: supabase.rpc("stored_cells", {"p_cells": part})
+            .order("indicator_id").order("member_state_id").order("year")
+        )
+    return pd.DataFrame(rows, columns=KEYS + ["value", "data_quality", "data_source_id"])
+
+
+def cell_keys(df: pd.DataFrame) -> np.ndarray:
+    """(indicator_id, member_state_id, year) packed into one int64 per row."""
+    return (
+        (df["indicator_id"].to_numpy(dtype=np.int64) << 40)
+        | (df["member_state_id"].to_numpy(dtype=np.int64) << 16)
+        | df["year"].to_numpy(dtype=np.int64)
+    )
+
+
+def drop_unchanged(supabase, valid: pd.DataFrame, staged: np.ndarray) -> tuple[pd.DataFrame, int]:
+    """
+    Rows of `valid` that would change a stored cell, and how many were dropped.
+
+    A row is unchanged when the cell already holds the same value and quality
+    flag and no connector source (an upload would take the cell over from one).
+    Cells already staged from earlier chunks (`staged`, sorted `cell_keys`) are
+    always kept, so the file's last row for a cell still wins.
+    """
+    if valid.empty:
+        return valid, 0
+    stored = stored_cells(supabase, valid)
+    stored = stored[stored["data_source_id"].isna()]
+    if stored.empty:
+        return valid, 0
+    stored = stored.assign(value=pd.to_numeric(stored["value"]))
+    same = np.isin(row_digests(valid), row_digests(stored)) & ~np.isin(cell_keys(valid), staged)
+    return valid[~same].reset_index(drop=True), int(same.sum())
+
+
+def load_lookups(supabase) -> tuple[dict[str, int], dict[str, int]]:
+    """ISO code → member_state_id and indicator code → indicator_id."""
+    countries = supabase.table("member_states").select("id, iso_code").execute()
+    indicators = supabase.table("indicators").select("id, code").execute()
+    return (
+        {c["iso_code"]: c["id"] for c in countries.data},
+        {i["code"]: i["id"] for i in indicators.data},
+    )
+
+
+def stage_upload(supabase, path: str, filename: str, progress: Callable[[dict], None] | None = None) -> dict:
+    """
+    Validate a spooled upload chunk by chunk and stage its valid rows as one
+    data version, left unpublished. Returns the result counts with the staged
+    `data_version_id` (None when nothing was valid). `progress`, if given, is
+    called with the running counts and the staged `data_version_id` after
+    each chunk.
+    """
+    started = time.perf_counter()
+    country_ids, indicator_ids = load_lookups(supabase)
+    source_detail = f"Manual upload: {filename}"
+    rows = staged = unchanged = failed = 0
+    sample: list[str] = []
+    staged_cells = np.empty(0, dtype=np.int64)
+    version_id = None
+
+    def counts() -> dict:
+        duration = time.perf_counter() - started
+        return {
+            "rows_parsed": rows,
+            "rows_loaded": staged,
+            "rows_unchanged": unchanged,
+            "rows_failed": failed,
+            "errors": sample,
+            "rows_per_sec": int(rows / duration) if duration > 0 else None,
+        }
+
+    try:
+        for chunk in iter_upload_chunks(path, filename):
+            valid, errors = validate_rows(chunk, country_ids, indicator_ids, source_detail)
+            rows += len(chunk)
+            failed += len(errors)
+            sample += [f"Row {r.row}: {r.error}" for r in errors.head(ERROR_SAMPLE_SIZE - len(sample)).itertuples()]
+            valid, same = drop_unchanged(supabase, valid, staged_cells)
+            unchanged += same
+            if len(valid):
+                if version_id is None:
+                    version_id = create_version(supabase, "upload")
+                # Later chunks overwrite earlier ones, so a repeated cell keeps its last row
+                staged += stage_values(supabase, version_id, staging_records(valid), settings.UPLOAD_CHUNK_SIZE)
+                staged_cells = np.union1d(staged_cells, cell_keys(valid))
+            if progress:
+                progress({**counts(), "data_version_id": version_id})
+    except MissingColumnsError as e:
+        if version_id is not None:
+            discard_version(supabase, version_id)
+        return {"status": "error", **counts(), "errors": [str(e)], "data_version_id": None}
+    except Exception:
+        if version_id is not None:
+            discard_version(supabase, version_id)
+        raise
+
+    logger.info(
+        "upload_staged", filename=filename, rows=rows, staged=staged, unchanged=unchanged, failed=failed,
+        version_id=version_id,
+        duration_ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+    return {"status": "completed", **counts(), "data_version_id": version_id}
+
+
+def ingest_upload(supabase, path: str, filename: str, ledger_id: int | None = None) -> dict:
+    """
+    Stage a spooled upload, publish it atomically and close its ledger entry.
+    Returns the response counts; `data_version_id` is set when the publish
+    changed anything.
+    """
+    started = time.perf_counter()
+
+    def heartbeat(counts: dict):
+        touch_upload(supabase, ledger_id, counts["data_version_id"])
+
+    result = stage_upload(supabase, path, filename, heartbeat if ledger_id is not None else None)
+    version_id = result["data_version_id"]
+    published_version = version_id if version_id is not None and publish_version(supabase, version_id) else None
+    if ledger_id is not None:
+        finish_upload(supabase, ledger_id, result, published_version)
+
+    duration = time.perf_counter() - started
+    return {
+        "status": result["status"],
+        "records_processed": result["rows_parsed"] - result["rows_failed"],
+        "records_loaded": result["rows_loaded"],
+        "records_unchanged": result["rows_unchanged"],
+        "records_failed": result["rows_failed"],
+        "errors": result["errors"],
+        "rows_per_sec": int(result["rows_parsed"] / duration) if result["rows_parsed"] and duration > 0 else None,
+        "data_version_id": published_version,
+    }
+
+
+def find_loaded(supabase, content_hash: str) -> dict | None:
+    """
+    The latest completed load of a file with these bytes, if nothing has been
+    published over it since. Otherwise the file is loaded again, so sending it
+    restores the values a later load changed.
+    """
+    result = (
+        supabase.table("upload_ledger")
+        .select("*")
+        .eq("content_hash", content_hash)
+        .eq("status", "completed")
+        .order("id", desc=True)
+        .limit(1)
+        .execute()
+    )
+    if not result.data or published_since(supabase, result.data[0]):
+        return None
+    return result.data[0]
+
+
+def published_since(supabase, entry: dict) -> bool:
+    """
+    Whether a data version was published after a ledger entry's own, or after
+    the entry finished when its load changed nothing. Imputation versions are
+    ignored: estimates never replace the reported values an upload writes.
+    """
+    query = (
+        supabase.table("data_versions")
+        .select("id")
+        .eq("status", "published")
+        .neq("source", "imputation")
+    )
+    version_id = entry["data_version_id"]
+    seq = publish_order(supabase, [version_id]).get(version_id) if version_id else None
+    query = query.gt("publish_seq", seq) if seq is not None else query.gt("published_at", entry["finished_at"])
+    return bool(query.limit(1).execute().data)
+
+
+def record_upload(
+    supabase, content_hash: str, filename: str, size_bytes: int,
+    user_id: str | None = None, duplicate_of: int | None = None, upload_job_id: int | None = None,
+) -> int:
+    """Add a file to the ledger: processing, or a duplicate of an earlier completed load."""
+    row = {
+        "content_hash": content_hash,
+        "filename": filename,
+        "size_bytes": size_bytes,
+        "status": "duplicate" if duplicate_of else "processing",
+    }
+    if duplicate_of:
+        row["duplicate_of"] = duplicate_of
+        row["finished_at"] = datetime.now(timezone.utc).isoformat()
+    if user_id:
+        row["created_by"] = user_id
+    if upload_job_id:
+        row["upload_job_id"] = upload_job_id
+    return supabase.table("upload_ledger").insert(row).execute().data[0]["id"]
+
+
+def touch_upload(supabase, ledger_id: int, data_version_id: int | None):
+    """Heartbeat of a ledger entry being loaded, with the version it is staging."""
+    supabase.table("upload_ledger").update({
+        "data_version_id": data_version_id,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("id", ledger_id).execute()
+
+
+def finish_upload(supabase, ledger_id: int, result: dict, data_version_id: int | None):
+    """
+    Close a ledger entry with the load's counts (`stage_upload`'s result, or
+    just a status for a load that broke). Only completed entries short-circuit
+    later uploads.
+    """
+    supabase.table("upload_ledger").update({
+        "status": "completed" if result["status"] == "completed" else "failed",
+        "rows_parsed": result.get("rows_parsed", 0),
+        "rows_loaded": result.get("rows_loaded", 0),
+        "rows_unchanged": result.get("rows_unchanged", 0),
+        "rows_failed": result.get("rows_failed", 0),
+        "data_version_id": data_version_id,
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("id", ledger_id).execute()
+
+
+def duplicate_result(previous: dict) -> dict:
+    """Response for a file whose bytes were already loaded."""
+    return {
+        "status": "duplicate",
+        "duplicate_of": previous["id"],
+        "records_processed": 0,
+        "records_loaded": 0,
+        "records_unchanged": previous["rows_parsed"] - previous["rows_failed"],
+        "records_failed": 0,
+        "errors": [f"Identical to {previous['filename']}, already loaded (upload {previous['id']})"],
+        "data_version_id": None,
+    }
+
+
+def create_job(supabase, filename: str, user_id: str | None = None) -> int:
+    """Record a queued upload job."""
+    row = {"filename": filename, "status": "queued"}
+    if user_id:
+        row["created_by"] = user_id
+    return supabase.table("upload_jobs").insert(row).execute().data[0]["id"]
+
+
+def update_job(supabase, job_id: int, **fields):
+    """Write job fields; every write is also the job's heartbeat (`updated_at`)."""
+    fields["updated_at"] = datetime.now(timezone.utc).isoformat()
+    supabase.table("upload_jobs").update(fields).eq("id", job_id).execute()
+
+
+def get_job(supabase, job_id: int) -> dict | None:
+    result = supabase.table("upload_jobs").select("*").eq("id", job_id).execute()
+    return result.data[0] if result.data else None
+
+
+def run_upload_job(job_id: int, path: str, filename: str) -> dict:
+    """
+    Process-pool entry point for an upload job: parse, validate and stage the
+    spooled file, writing progress and the staged version to the job row
+    after every chunk. The caller publishes the staged version.
+    """
+    supabase = get_supabase()
+    update_job(supabase, job_id, status="parsing", started_at=datetime.now(timezone.utc).isoformat())
+    return stage_upload(supabase, path, filename, lambda counts: update_job(supabase, job_id, **counts))
+
+
+def fail_stale_uploads(supabase, older_than_minutes: int = settings.UPLOAD_JOB_STALE_MINUTES) -> dict:
+    """
+    Fail upload jobs and ledger entries whose heartbeat (`updated_at`, bumped
+    after every staged chunk) is more than `older_than_minutes` old, and
+    discard the versions they were staging. Their process died, so nothing
+    else will ever close them. A live upload keeps beating, however long it runs.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    cutoff = (datetime.now(timezone.utc) - timedelta(minutes=older_than_minutes)).isoformat()
+    message = f"Interrupted: no progress for {older_than_minutes} minutes (the API restarted or the job died)"
+
+    jobs = (
+        supabase.table("upload_jobs")
+        .update({"status": "failed", "error_message": message, "finished_at": now, "updated_at": now})
+        .in_("status", ["queued", "parsing", "publishing"])
+        .lt("updated_at", cutoff)
+        .execute()
+    ).data
+    # A job's ledger entry is closed with its job; one without a job beats on its own
+    ledger = []
+    failed = {"status": "failed", "finished_at": now, "updated_at": now}
+    if jobs:
+        ledger += (
+            supabase.table("upload_ledger").update(failed)
+            .eq("status", "processing")
+            .in_("upload_job_id", [j["id"] for j in jobs])
+            .execute()
+        ).data
+    ledger += (
+        supabase.table("upload_ledger").update(failed)
+        .eq("status", "processing")
+        .is_("upload_job_id", "null")
+        .lt("updated_at", cutoff)
+        .execute()
+    ).data
+
+    staged = {row["data_version_id"] for row in jobs + ledger if row.get("data_version_id")}
+    for version_id in staged:
+        discard_version(supabase, version_id)  # leaves a version that did get published alone
+
+    summary = {"jobs": len(jobs), "ledger": len(ledger), "versions_discarded": len(staged)}
+    if any(summary.values()):
+        logger.warning("stale_uploads_failed", older_than_minutes=older_than_minutes, **summary)
+    return summary
+
+
+async def run_stale_upload_sweep():
+    """Fail stale uploads at startup and every `UPLOAD_JOB_STALE_MINUTES` after. Started from the API lifespan."""
+    while True:
+        try:
+            await asyncio.to_thread(fail_stale_uploads, get_supabase())
+        except Exception as e:
+            logger.error("stale_upload_sweep_failed", error=str(e))
+        await asyncio.sleep(settings.UPLOAD_JOB_STALE_MINUTES * 60)
+
+
+def _stand_in_client(country_ids: dict[str, int], indicator_ids: dict[str, int]):
+    """
+    A PostgREST client answered in-process, for timing the staging path without
+    a database: lookups come from the given maps, no cell is stored yet and
+    every write is accepted. Also returns the running request count and bytes sent.
+    """
+    from types import SimpleNamespace
+    import httpx
+    from postgrest import SyncPostgrestClient
+
+    sent = {"requests": 0, "bytes": 0}
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        sent["requests"] += 1
+        sent["bytes"] += len(request.content)
+        table = request.url.path.rsplit("/", 1)[-1]
+        if table == "member_states":
+            body = [{"id": i, "iso_code": code} for code, i in country_ids.items()]
+        elif table == "indicators":
+            body = [{"id": i, "code": code} for code, i in indicator_ids.items()]
+        elif table == "data_versions":
+            body = [{"id": 1}]
+        else:
+            body = []
+        return httpx.Response(200, json=body)
+
+    client = SyncPostgrestClient("http://stand-in")
+    client.session = httpx.Client(base_url="http://stand-in", transport=httpx.MockTransport(handle))
+    return SimpleNamespace(table=client.from_, rpc=client.rpc), sent
+
+
+def benchmark(sizes: list[int], error_rate: float = 0.02, seed: int = 0) -> list[dict]:
+    """
+    Stage synthetic CSV uploads of each size through `stage_upload`, with
+    ~`error_rate` of rows bad: parsing, validation, the stored-cell comparison
+    and the chunked staging upserts, encoded as they would be sent. Requests are
+    answered in-process, so network and database time and the publish are
+    excluded (`benchmark_file` times those). Reports throughput, requests and
+    bytes sent, and the peak memory allocated (flat in the file size when
+    streaming works).
+    """
+    rng = np.random.default_rng(seed)
+    country_ids = {f"C{i}": i for i in range(55)}
+    indicator_ids = {f"IND.{i}": i for i in range(24)}
+    results = []
+    for n in sizes:
+        df = pd.DataFrame({
+            "country_iso": rng.choice(list(country_ids), n),
+            "indicator_code": rng.choice(list(indicator_ids), n),
+            "year": rng.integers(2000, 2025, n),
+            "value": rng.normal(50, 10, n).round(3),
+        })
+        df.loc[rng.random(n) < error_rate, "country_iso"] = "XX"
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as f:
+            path = f.name
+        df.to_csv(path, index=False)
+        size_mb = os.path.getsize(path) / 1e6
+        del df
+
+        try:
+            client, sent = _stand_in_client(country_ids, indicator_ids)
+            started = time.perf_counter()
+            result = stage_upload(client, path, path)
+            elapsed = time.perf_counter() - started
+            requests, sent_mb = sent["requests"], sent["bytes"] / 1e6
+            # Separate pass: tracing allocations slows everything down
+            tracemalloc.start()
+            stage_upload(client, path, path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        finally:
+            os.unlink(path)
+        results.append({
+            "rows": n,
+            "file_mb": round(size_mb, 1),
+            "staged": result["rows_loaded"],
+            "errors": result["rows_failed"],
+            "requests": requests,
+            "sent_mb": round(sent_mb, 1),
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": int(n / elapsed),
+            "peak_mb": round(peak / 1e6, 1),
+        })
+    return results
+
+
+def benchmark_file(path: str) -> dict:
+    """
+    Stage and publish a real file against the configured database, timing each
+    step. This loads the file like an upload does (without a ledger entry), so
+    point it at a staging database.
+    """
+    supabase = get_supabase()
+    started = time.perf_counter()
+    result = stage_upload(supabase, path, os.path.basename(path))
+    staged = time.perf_counter()
+    version_id = result["data_version_id"]
+    changed = publish_version(supabase, version_id) if version_id is not None else 0
+    published = time.perf_counter()
+    return {
+        "rows": result["rows_parsed"],
+        "staged": result["rows_loaded"],
+        "unchanged": result["rows_unchanged"],
+        "errors": result["rows_failed"],
+        "changed": changed,
+        "data_version_id": version_id,
+        "stage_seconds": round(staged - started, 2),
+        "publish_seconds": round(published - staged, 2),
+        "rows_per_sec": int(result["rows_parsed"] / (published - started)) if result["rows_parsed"] else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload validation.")
+    parser.add_argument("--benchmark", action="store_true", help="Time streaming validation and staging on synthetic CSVs")
+    parser.add_argument(
+        "--benchmark-file", metavar="PATH",
+        help="Stage and publish a file against the configured database, timing each step (loads the file)",
+    )
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for row in benchmark([20_000, 200_000, 500_000]):
+            print(row)
+    if args.benchmark_file:
+        print(benchmark_file(args.benchmark_file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Value History — As-of reads and version diffs over indicator_values.
+
+Each published data version records only the cells it changed (`value_deltas`),
+with a full checkpoint every few versions. Past states are rebuilt in Postgres
+from the nearest checkpoint, so a read never replays the whole history.
+
+History runs in publish order (`data_versions.publish_seq`), not id order: an
+ETL run creates its version when it starts and publishes it when it ends, so
+versions published in between have higher ids.
+"""
+
+from datetime import datetime
+from app.core.database import fetch_all
+
+
+def resolve_version(supabase, as_of: datetime) -> int:
+    """Latest data version published at or before as_of (0 = before any version)."""
+    result = (
+        supabase.table("data_versions")
+        .select("id")
+        .eq("status", "published")
+        .lte("published_at", as_of.isoformat())
+        .order("publish_seq", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return result.data[0]["id"] if result.data else 0
+
+
+def version_for_run(supabase, etl_run_id: int) -> int | None:
+    """Data version published by an ETL run."""
+    result = (
+        supabase.table("data_versions")
+        .select("id")
+        .eq("etl_run_id", etl_run_id)
+        .eq("status", "published")
+        .execute()
+    )
+    return result.data[0]["id"] if result.data else None
+
+
+def publish_order(supabase, version_ids: list[int]) -> dict[int, int]:
+    """publish_seq of each published version."""
+    result = (
+        supabase.table("data_versions")
+        .select("id, publish_seq")
+        .in_("id", version_ids)
+        .eq("status", "published")
+        .execute()
+    )
+    return {row["id"]: row["publish_seq"] for row in result.data}
+
+
+def values_as_of(
+    supabase,
+    version_id: int,
+    indicator_id: int | None = None,
+    member_state_id: int | None = None,
+) -> list[dict]:
+    """indicator_values rows (indicator_id, member_state_id, year, value) as of a version."""
+    params = {
+        "p_version_id": version_id,
+        "p_indicator_id": indicator_id,
+        "p_member_state_id": member_state_id,
+    }
+    return fetch_all(
+        lambda: supabase.rpc("indicator_values_as_of", params)
+        .order("indicator_id").order("member_state_id").order("year")
+    )
+
+
+def diff_versions(supabase, from_version: int, to_version: int) -> list[dict]:
+    """Cells whose value differs between two versions (from_version published first)."""
+    params = {"p_from": from_version, "p_to": to_version}
+    return fetch_all(
+        lambda: supabase.rpc("data_version_diff", params)
+        .order("indicator_id").order("member_state_id").order("year")
+    )
+
+
+def changed_indicators(supabase, version_id: int) -> set[str]:
+    """Codes of the indicators a published version changed."""
+    result = supabase.rpc("data_version_indicators", {"p_version_id": version_id}).execute()
+    return {row["code"] for row in result.data or []}
+
+
+def changed_pairs(supabase, version_id: int) -> set[tuple[int, int]]:
+    """(indicator_id, member_state_id) of every series a published version changed."""
+    result = supabase.rpc("data_version_pairs", {"p_version_id": version_id}).execute()
+    return {(row["indicator_id"], row["member_state_id"]) for row in result.data or []}
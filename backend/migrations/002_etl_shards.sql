@@ -0,0 +1,37 @@
+-- ============================================================
+-- ETL Work Queue — a run split into shards claimed by workers
+-- ============================================================
+
+-- Shards of a sharded ETL run. Workers claim a shard with
+-- SELECT ... FOR UPDATE SKIP LOCKED, hold it under a lease that they
+-- extend with heartbeats, and report their counts back to etl_runs.
+CREATE TABLE IF NOT EXISTS etl_shards (
+    id SERIAL PRIMARY KEY,
+    etl_run_id INTEGER NOT NULL REFERENCES etl_runs(id) ON DELETE CASCADE,
+    shard_key TEXT NOT NULL,
+    indicator_codes TEXT[] NOT NULL,
+    countries TEXT[],  -- NULL = all 55 member states
+    start_year INTEGER NOT NULL,
+    end_year INTEGER NOT NULL,
+    status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    lease_owner TEXT,
+    lease_expires_at TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    records_processed INTEGER DEFAULT 0,
+    records_failed INTEGER DEFAULT 0,
+    error_message TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    completed_at TIMESTAMPTZ,
+    UNIQUE(etl_run_id, shard_key)
+);
+
+-- Shard progress aggregated on the parent run
+ALTER TABLE etl_runs ADD COLUMN IF NOT EXISTS shards_total INTEGER DEFAULT 0;
+ALTER TABLE etl_runs ADD COLUMN IF NOT EXISTS shards_completed INTEGER DEFAULT 0;
+ALTER TABLE etl_runs ADD COLUMN IF NOT EXISTS shards_failed INTEGER DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_etl_shards_run ON etl_shards(etl_run_id);
+CREATE INDEX IF NOT EXISTS idx_etl_shards_claimable ON etl_shards(id)
+    WHERE status IN ('pending', 'running');
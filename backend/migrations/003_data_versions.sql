@@ -0,0 +1,113 @@
+-- ============================================================
+-- Blue/Green Data Versions — loads write to a shadow version and
+-- are published with a single atomic flip
+-- ============================================================
+
+-- One row per load (ETL run, upload, form entry)
+CREATE TABLE IF NOT EXISTS data_versions (
+    id SERIAL PRIMARY KEY,
+    etl_run_id INTEGER REFERENCES etl_runs(id) ON DELETE SET NULL,
+    source TEXT NOT NULL DEFAULT 'etl' CHECK (source IN ('etl', 'upload', 'form')),
+    status TEXT DEFAULT 'staging' CHECK (status IN ('staging', 'published', 'discarded')),
+    records_published INTEGER DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    published_at TIMESTAMPTZ
+);
+
+-- Shadow copy of the rows a version will publish. Readers never see these.
+CREATE TABLE IF NOT EXISTS indicator_values_staging (
+    data_version_id INTEGER NOT NULL REFERENCES data_versions(id) ON DELETE CASCADE,
+    indicator_id INTEGER NOT NULL REFERENCES indicators(id) ON DELETE CASCADE,
+    member_state_id INTEGER NOT NULL REFERENCES member_states(id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    value NUMERIC,
+    data_quality TEXT DEFAULT 'verified' CHECK (data_quality IN ('verified', 'estimated', 'missing')),
+    source_detail TEXT,
+    PRIMARY KEY (data_version_id, indicator_id, member_state_id, year)
+);
+
+-- Single-row pointer to what readers currently see. Caches key on it.
+CREATE TABLE IF NOT EXISTS data_state (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    published_version_id INTEGER REFERENCES data_versions(id),
+    insights_batch_id TEXT,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+INSERT INTO data_state (id) VALUES (TRUE) ON CONFLICT DO NOTHING;
+
+-- Insights are written inactive under a batch id and activated together
+ALTER TABLE insights ADD COLUMN IF NOT EXISTS batch_id TEXT;
+CREATE INDEX IF NOT EXISTS idx_insights_batch ON insights(batch_id);
+
+-- Merge a staged version into indicator_values and move the pointer, all in
+-- one transaction. Readers keep seeing the previous snapshot until commit.
+CREATE OR REPLACE FUNCTION publish_data_version(p_version_id INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    -- Serialize publishers on the pointer row
+    PERFORM 1 FROM data_state WHERE id FOR UPDATE;
+
+    UPDATE data_versions SET status = 'published', published_at = NOW()
+    WHERE id = p_version_id AND status = 'staging';
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'data version % is not staged', p_version_id;
+    END IF;
+
+    INSERT INTO indicator_values (indicator_id, member_state_id, year, value, data_quality, source_detail)
+    SELECT indicator_id, member_state_id, year, value, data_quality, source_detail
+    FROM indicator_values_staging
+    WHERE data_version_id = p_version_id
+    ON CONFLICT (indicator_id, member_state_id, year) DO UPDATE
+    SET value = EXCLUDED.value,
+        data_quality = EXCLUDED.data_quality,
+        source_detail = EXCLUDED.source_detail;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    DELETE FROM indicator_values_staging WHERE data_version_id = p_version_id;
+
+    UPDATE data_versions SET records_published = v_count WHERE id = p_version_id;
+    UPDATE data_state SET published_version_id = p_version_id, updated_at = NOW() WHERE id;
+
+    RETURN v_count;
+END;
+$$;
+
+-- Drop a staged version that will never be published (failed run)
+CREATE OR REPLACE FUNCTION discard_data_version(p_version_id INTEGER)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM indicator_values_staging WHERE data_version_id = p_version_id;
+    UPDATE data_versions SET status = 'discarded'
+    WHERE id = p_version_id AND status = 'staging';
+END;
+$$;
+
+-- Swap the active insight set for a freshly generated batch in one transaction
+CREATE OR REPLACE FUNCTION publish_insights(p_batch_id TEXT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    PERFORM 1 FROM data_state WHERE id FOR UPDATE;
+
+    UPDATE insights SET is_active = FALSE
+    WHERE is_active AND batch_id IS DISTINCT FROM p_batch_id;
+
+    UPDATE insights SET is_active = TRUE
+    WHERE batch_id = p_batch_id AND NOT is_active;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    UPDATE data_state SET insights_batch_id = p_batch_id, updated_at = NOW() WHERE id;
+
+    RETURN v_count;
+END;
+$$;
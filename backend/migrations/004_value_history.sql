@@ -0,0 +1,209 @@
+-- ============================================================
+-- Value History — compact per-version deltas, periodic checkpoints
+-- and as-of reconstruction of indicator_values
+-- ============================================================
+
+-- Only the (indicator, country, year) cells a version actually changed
+CREATE TABLE IF NOT EXISTS value_deltas (
+    data_version_id INTEGER NOT NULL REFERENCES data_versions(id) ON DELETE CASCADE,
+    indicator_id INTEGER NOT NULL,
+    member_state_id INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    op CHAR(1) NOT NULL CHECK (op IN ('I', 'U')),  -- I = new cell, U = changed value
+    old_value NUMERIC,
+    new_value NUMERIC,
+    PRIMARY KEY (data_version_id, indicator_id, member_state_id, year)
+);
+
+-- Full copy of indicator_values as it stood right after a checkpoint version
+CREATE TABLE IF NOT EXISTS value_checkpoints (
+    data_version_id INTEGER NOT NULL REFERENCES data_versions(id) ON DELETE CASCADE,
+    indicator_id INTEGER NOT NULL,
+    member_state_id INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    value NUMERIC,
+    PRIMARY KEY (data_version_id, indicator_id, member_state_id, year)
+);
+
+ALTER TABLE data_versions ADD COLUMN IF NOT EXISTS records_changed INTEGER DEFAULT 0;
+ALTER TABLE data_versions ADD COLUMN IF NOT EXISTS is_checkpoint BOOLEAN DEFAULT FALSE;
+
+CREATE INDEX IF NOT EXISTS idx_value_deltas_indicator ON value_deltas(indicator_id, data_version_id);
+CREATE INDEX IF NOT EXISTS idx_value_deltas_country ON value_deltas(member_state_id, data_version_id);
+CREATE INDEX IF NOT EXISTS idx_data_versions_published ON data_versions(published_at) WHERE status = 'published';
+CREATE INDEX IF NOT EXISTS idx_data_versions_checkpoint ON data_versions(id) WHERE is_checkpoint;
+
+-- Publish now records a delta of the changed cells, merges only those, and
+-- writes a checkpoint every p_checkpoint_interval published versions.
+DROP FUNCTION IF EXISTS publish_data_version(INTEGER);
+
+CREATE OR REPLACE FUNCTION publish_data_version(p_version_id INTEGER, p_checkpoint_interval INTEGER DEFAULT 20)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_changed INTEGER;
+    v_since_checkpoint INTEGER;
+BEGIN
+    PERFORM 1 FROM data_state WHERE id FOR UPDATE;
+
+    UPDATE data_versions SET status = 'published', published_at = NOW()
+    WHERE id = p_version_id AND status = 'staging';
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'data version % is not staged', p_version_id;
+    END IF;
+
+    INSERT INTO value_deltas (data_version_id, indicator_id, member_state_id, year, op, old_value, new_value)
+    SELECT p_version_id, s.indicator_id, s.member_state_id, s.year,
+           CASE WHEN iv.id IS NULL THEN 'I' ELSE 'U' END, iv.value, s.value
+    FROM indicator_values_staging s
+    LEFT JOIN indicator_values iv
+      ON iv.indicator_id = s.indicator_id
+     AND iv.member_state_id = s.member_state_id
+     AND iv.year = s.year
+    WHERE s.data_version_id = p_version_id
+      AND (iv.id IS NULL OR iv.value IS DISTINCT FROM s.value OR iv.data_quality IS DISTINCT FROM s.data_quality);
+    GET DIAGNOSTICS v_changed = ROW_COUNT;
+
+    -- Merge only the changed cells
+    INSERT INTO indicator_values (indicator_id, member_state_id, year, value, data_quality, source_detail)
+    SELECT s.indicator_id, s.member_state_id, s.year, s.value, s.data_quality, s.source_detail
+    FROM indicator_values_staging s
+    JOIN value_deltas d
+      ON d.data_version_id = p_version_id
+     AND d.indicator_id = s.indicator_id
+     AND d.member_state_id = s.member_state_id
+     AND d.year = s.year
+    WHERE s.data_version_id = p_version_id
+    ON CONFLICT (indicator_id, member_state_id, year) DO UPDATE
+    SET value = EXCLUDED.value,
+        data_quality = EXCLUDED.data_quality,
+        source_detail = EXCLUDED.source_detail;
+
+    DELETE FROM indicator_values_staging WHERE data_version_id = p_version_id;
+
+    SELECT COUNT(*) INTO v_since_checkpoint
+    FROM data_versions
+    WHERE status = 'published'
+      AND id > COALESCE((SELECT MAX(id) FROM data_versions WHERE is_checkpoint), 0);
+
+    -- The first published version is always a checkpoint so history has a base
+    IF v_since_checkpoint >= p_checkpoint_interval
+       OR NOT EXISTS (SELECT 1 FROM data_versions WHERE is_checkpoint) THEN
+        INSERT INTO value_checkpoints (data_version_id, indicator_id, member_state_id, year, value)
+        SELECT p_version_id, indicator_id, member_state_id, year, value FROM indicator_values;
+        UPDATE data_versions SET is_checkpoint = TRUE WHERE id = p_version_id;
+    END IF;
+
+    UPDATE data_versions SET records_published = v_changed, records_changed = v_changed
+    WHERE id = p_version_id;
+    UPDATE data_state SET published_version_id = p_version_id, updated_at = NOW() WHERE id;
+
+    RETURN v_changed;
+END;
+$$;
+
+-- indicator_values as they stood right after p_version_id was published
+-- (0 = before the first version). Reconstructs from the nearest checkpoint:
+-- forward through later deltas, or backward through earlier ones when no
+-- checkpoint precedes the version. Never replays the full history.
+CREATE OR REPLACE FUNCTION indicator_values_as_of(
+    p_version_id INTEGER,
+    p_indicator_id INTEGER DEFAULT NULL,
+    p_member_state_id INTEGER DEFAULT NULL
+)
+RETURNS TABLE (indicator_id INTEGER, member_state_id INTEGER, year INTEGER, value NUMERIC)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_checkpoint INTEGER;
+BEGIN
+    SELECT MAX(id) INTO v_checkpoint FROM data_versions WHERE is_checkpoint AND id <= p_version_id;
+
+    IF v_checkpoint IS NOT NULL THEN
+        -- Forward: checkpoint, then the newest delta per cell up to the version
+        RETURN QUERY
+        SELECT DISTINCT ON (k.indicator_id, k.member_state_id, k.year)
+               k.indicator_id, k.member_state_id, k.year, k.value
+        FROM (
+            SELECT c.indicator_id, c.member_state_id, c.year, c.value, c.data_version_id AS v
+            FROM value_checkpoints c
+            WHERE c.data_version_id = v_checkpoint
+              AND (p_indicator_id IS NULL OR c.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR c.member_state_id = p_member_state_id)
+            UNION ALL
+            SELECT d.indicator_id, d.member_state_id, d.year, d.new_value, d.data_version_id
+            FROM value_deltas d
+            WHERE d.data_version_id > v_checkpoint AND d.data_version_id <= p_version_id
+              AND (p_indicator_id IS NULL OR d.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR d.member_state_id = p_member_state_id)
+        ) k
+        ORDER BY k.indicator_id, k.member_state_id, k.year, k.v DESC;
+        RETURN;
+    END IF;
+
+    -- Backward: next checkpoint (or the live table), undoing the oldest delta
+    -- per cell made after the version. Cells first inserted later are dropped.
+    SELECT MIN(id) INTO v_checkpoint FROM data_versions WHERE is_checkpoint AND id > p_version_id;
+
+    RETURN QUERY
+    SELECT k.indicator_id, k.member_state_id, k.year, k.value
+    FROM (
+        SELECT DISTINCT ON (u.indicator_id, u.member_state_id, u.year)
+               u.indicator_id, u.member_state_id, u.year, u.value, u.dropped
+        FROM (
+            SELECT d.indicator_id, d.member_state_id, d.year, d.old_value AS value,
+                   d.op = 'I' AS dropped, d.data_version_id AS v
+            FROM value_deltas d
+            WHERE d.data_version_id > p_version_id
+              AND (v_checkpoint IS NULL OR d.data_version_id <= v_checkpoint)
+              AND (p_indicator_id IS NULL OR d.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR d.member_state_id = p_member_state_id)
+            UNION ALL
+            SELECT c.indicator_id, c.member_state_id, c.year, c.value, FALSE, 2147483647
+            FROM value_checkpoints c
+            WHERE v_checkpoint IS NOT NULL AND c.data_version_id = v_checkpoint
+              AND (p_indicator_id IS NULL OR c.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR c.member_state_id = p_member_state_id)
+            UNION ALL
+            SELECT iv.indicator_id, iv.member_state_id, iv.year, iv.value, FALSE, 2147483647
+            FROM indicator_values iv
+            WHERE v_checkpoint IS NULL
+              AND (p_indicator_id IS NULL OR iv.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR iv.member_state_id = p_member_state_id)
+        ) u
+        ORDER BY u.indicator_id, u.member_state_id, u.year, u.v ASC
+    ) k
+    WHERE NOT k.dropped
+    ORDER BY k.indicator_id, k.member_state_id, k.year;
+END;
+$$;
+
+-- Cells that differ between two published versions (p_from < p_to)
+CREATE OR REPLACE FUNCTION data_version_diff(p_from INTEGER, p_to INTEGER)
+RETURNS TABLE (
+    indicator_id INTEGER, member_state_id INTEGER, year INTEGER,
+    from_value NUMERIC, to_value NUMERIC, is_new BOOLEAN
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT f.indicator_id, f.member_state_id, f.year, f.old_value, l.new_value, f.op = 'I'
+    FROM (
+        SELECT DISTINCT ON (indicator_id, member_state_id, year)
+               indicator_id, member_state_id, year, op, old_value
+        FROM value_deltas
+        WHERE data_version_id > p_from AND data_version_id <= p_to
+        ORDER BY indicator_id, member_state_id, year, data_version_id ASC
+    ) f
+    JOIN (
+        SELECT DISTINCT ON (indicator_id, member_state_id, year)
+               indicator_id, member_state_id, year, new_value
+        FROM value_deltas
+        WHERE data_version_id > p_from AND data_version_id <= p_to
+        ORDER BY indicator_id, member_state_id, year, data_version_id DESC
+    ) l USING (indicator_id, member_state_id, year)
+    WHERE f.op = 'I' OR f.old_value IS DISTINCT FROM l.new_value
+    ORDER BY f.indicator_id, f.member_state_id, f.year;
+$$;
@@ -0,0 +1,97 @@
+-- ============================================================
+-- Source Connectors — one data_sources row per registered connector,
+-- with rate budgets and precedence between sources
+-- ============================================================
+
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS connector TEXT UNIQUE;
+-- Lower wins when several sources report the same (indicator, country, year)
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS priority INTEGER DEFAULT 100;
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS rate_limit_per_sec NUMERIC DEFAULT 5;
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS max_concurrency INTEGER DEFAULT 4;
+
+UPDATE data_sources SET connector = 'world_bank', priority = 10, rate_limit_per_sec = 10
+WHERE name = 'World Bank API' AND connector IS NULL;
+
+INSERT INTO data_sources (name, api_url, source_type, status, connector, priority, rate_limit_per_sec, max_concurrency)
+VALUES
+    ('UN SDG Indicators API', 'https://unstats.un.org/sdgapi/v1/', 'api', 'active', 'un_sdg', 20, 2, 2),
+    ('AfDB Data Portal', 'https://dataportal.opendataforafrica.org/api/1.0/', 'api', 'active', 'afdb', 30, 2, 2)
+ON CONFLICT (connector) DO NOTHING;
+
+-- Per-source counts of the last run that touched each source
+ALTER TABLE etl_runs ADD COLUMN IF NOT EXISTS source_stats JSONB;
+
+-- Which source a value came from
+ALTER TABLE indicator_values ADD COLUMN IF NOT EXISTS data_source_id INTEGER REFERENCES data_sources(id);
+ALTER TABLE indicator_values_staging ADD COLUMN IF NOT EXISTS data_source_id INTEGER REFERENCES data_sources(id);
+
+-- Publish as in 004, but a staged cell from a lower-precedence source never
+-- replaces a value from a higher-precedence one. Manual rows (no source) always apply.
+CREATE OR REPLACE FUNCTION publish_data_version(p_version_id INTEGER, p_checkpoint_interval INTEGER DEFAULT 20)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_changed INTEGER;
+    v_since_checkpoint INTEGER;
+BEGIN
+    PERFORM 1 FROM data_state WHERE id FOR UPDATE;
+
+    UPDATE data_versions SET status = 'published', published_at = NOW()
+    WHERE id = p_version_id AND status = 'staging';
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'data version % is not staged', p_version_id;
+    END IF;
+
+    INSERT INTO value_deltas (data_version_id, indicator_id, member_state_id, year, op, old_value, new_value)
+    SELECT p_version_id, s.indicator_id, s.member_state_id, s.year,
+           CASE WHEN iv.id IS NULL THEN 'I' ELSE 'U' END, iv.value, s.value
+    FROM indicator_values_staging s
+    LEFT JOIN indicator_values iv
+      ON iv.indicator_id = s.indicator_id
+     AND iv.member_state_id = s.member_state_id
+     AND iv.year = s.year
+    LEFT JOIN data_sources cur ON cur.id = iv.data_source_id
+    LEFT JOIN data_sources inc ON inc.id = s.data_source_id
+    WHERE s.data_version_id = p_version_id
+      AND (iv.id IS NULL OR iv.value IS DISTINCT FROM s.value OR iv.data_quality IS DISTINCT FROM s.data_quality
+           OR iv.data_source_id IS DISTINCT FROM s.data_source_id)
+      AND NOT (cur.id IS NOT NULL AND inc.id IS NOT NULL AND cur.priority < inc.priority);
+    GET DIAGNOSTICS v_changed = ROW_COUNT;
+
+    INSERT INTO indicator_values (indicator_id, member_state_id, year, value, data_quality, source_detail, data_source_id)
+    SELECT s.indicator_id, s.member_state_id, s.year, s.value, s.data_quality, s.source_detail, s.data_source_id
+    FROM indicator_values_staging s
+    JOIN value_deltas d
+      ON d.data_version_id = p_version_id
+     AND d.indicator_id = s.indicator_id
+     AND d.member_state_id = s.member_state_id
+     AND d.year = s.year
+    WHERE s.data_version_id = p_version_id
+    ON CONFLICT (indicator_id, member_state_id, year) DO UPDATE
+    SET value = EXCLUDED.value,
+        data_quality = EXCLUDED.data_quality,
+        source_detail = EXCLUDED.source_detail,
+        data_source_id = EXCLUDED.data_source_id;
+
+    DELETE FROM indicator_values_staging WHERE data_version_id = p_version_id;
+
+    SELECT COUNT(*) INTO v_since_checkpoint
+    FROM data_versions
+    WHERE status = 'published'
+      AND id > COALESCE((SELECT MAX(id) FROM data_versions WHERE is_checkpoint), 0);
+
+    IF v_since_checkpoint >= p_checkpoint_interval
+       OR NOT EXISTS (SELECT 1 FROM data_versions WHERE is_checkpoint) THEN
+        INSERT INTO value_checkpoints (data_version_id, indicator_id, member_state_id, year, value)
+        SELECT p_version_id, indicator_id, member_state_id, year, value FROM indicator_values;
+        UPDATE data_versions SET is_checkpoint = TRUE WHERE id = p_version_id;
+    END IF;
+
+    UPDATE data_versions SET records_published = v_changed, records_changed = v_changed
+    WHERE id = p_version_id;
+    UPDATE data_state SET published_version_id = p_version_id, updated_at = NOW() WHERE id;
+
+    RETURN v_changed;
+END;
+$$;
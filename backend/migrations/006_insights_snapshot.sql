@@ -0,0 +1,42 @@
+-- ============================================================
+-- Insights Snapshot — everything the insights engine reads, in one
+-- round trip, with indicator values as parallel column arrays
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION insights_snapshot()
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'data_version_id', (SELECT published_version_id FROM data_state WHERE id),
+        'values', (
+            SELECT json_build_object(
+                'indicator_id', COALESCE(json_agg(v.indicator_id ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json),
+                'member_state_id', COALESCE(json_agg(v.member_state_id ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json),
+                'year', COALESCE(json_agg(v.year ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json),
+                'value', COALESCE(json_agg(v.value ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json)
+            )
+            FROM indicator_values v
+        ),
+        'indicators', (
+            SELECT COALESCE(json_agg(json_build_object(
+                'id', i.id, 'code', i.code, 'name', i.name, 'unit', i.unit, 'goal_id', i.goal_id,
+                'baseline_value', i.baseline_value, 'target_value', i.target_value
+            ) ORDER BY i.id), '[]'::json)
+            FROM indicators i
+        ),
+        'countries', (
+            SELECT COALESCE(json_agg(json_build_object(
+                'id', ms.id, 'name', ms.name, 'iso_code', ms.iso_code,
+                'region_id', ms.region_id, 'region_name', r.name
+            ) ORDER BY ms.id), '[]'::json)
+            FROM member_states ms
+            LEFT JOIN regions r ON r.id = ms.region_id
+        ),
+        'goals', (
+            SELECT COALESCE(json_agg(json_build_object('id', g.id, 'number', g.number) ORDER BY g.number), '[]'::json)
+            FROM goals g
+        )
+    );
+$$;
@@ -0,0 +1,42 @@
+-- ============================================================
+-- Insight Batches — a generated insight set is inserted and swapped
+-- in with a single call, in one transaction
+-- ============================================================
+
+-- Keeps retiring the previous active set cheap however large the table grows
+CREATE INDEX IF NOT EXISTS idx_insights_active_batch ON insights(batch_id) WHERE is_active;
+
+-- Insert a whole batch (a JSON array of insight objects) already active and
+-- retire every other active insight. Readers see the old set until commit.
+CREATE OR REPLACE FUNCTION publish_insight_batch(p_batch_id TEXT, p_insights JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    PERFORM 1 FROM data_state WHERE id FOR UPDATE;
+
+    INSERT INTO insights (
+        type, severity, title, description, evidence, goal_id, indicator_id,
+        member_state_id, region_id, generated_at, etl_run_id, is_active,
+        included_in_report, batch_id
+    )
+    SELECT r.type, r.severity, r.title, r.description, r.evidence, r.goal_id, r.indicator_id,
+           r.member_state_id, r.region_id, COALESCE(r.generated_at, NOW()), r.etl_run_id, TRUE,
+           FALSE, p_batch_id
+    FROM jsonb_to_recordset(COALESCE(p_insights, '[]'::jsonb)) AS r(
+        type TEXT, severity TEXT, title TEXT, description TEXT, evidence JSONB,
+        goal_id INTEGER, indicator_id INTEGER, member_state_id INTEGER, region_id INTEGER,
+        generated_at TIMESTAMPTZ, etl_run_id INTEGER
+    );
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    UPDATE insights SET is_active = FALSE
+    WHERE is_active AND batch_id IS DISTINCT FROM p_batch_id;
+
+    UPDATE data_state SET insights_batch_id = p_batch_id, updated_at = NOW() WHERE id;
+
+    RETURN v_count;
+END;
+$$;
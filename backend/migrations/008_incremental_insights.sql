@@ -0,0 +1,60 @@
+-- ============================================================
+-- Incremental Insights — insights remember which generator made them,
+-- so a partial regeneration replaces only that generator's set
+-- ============================================================
+
+ALTER TABLE insights ADD COLUMN IF NOT EXISTS generator TEXT;
+CREATE INDEX IF NOT EXISTS idx_insights_active_generator ON insights(generator) WHERE is_active;
+
+-- p_generators = NULL retires every active insight (full regeneration);
+-- otherwise only active insights from the listed generators are retired.
+DROP FUNCTION IF EXISTS publish_insight_batch(TEXT, JSONB);
+
+CREATE OR REPLACE FUNCTION publish_insight_batch(p_batch_id TEXT, p_insights JSONB, p_generators TEXT[] DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    PERFORM 1 FROM data_state WHERE id FOR UPDATE;
+
+    INSERT INTO insights (
+        type, severity, title, description, evidence, goal_id, indicator_id,
+        member_state_id, region_id, generated_at, etl_run_id, is_active,
+        included_in_report, batch_id, generator
+    )
+    SELECT r.type, r.severity, r.title, r.description, r.evidence, r.goal_id, r.indicator_id,
+           r.member_state_id, r.region_id, COALESCE(r.generated_at, NOW()), r.etl_run_id, TRUE,
+           FALSE, p_batch_id, r.generator
+    FROM jsonb_to_recordset(COALESCE(p_insights, '[]'::jsonb)) AS r(
+        type TEXT, severity TEXT, title TEXT, description TEXT, evidence JSONB,
+        goal_id INTEGER, indicator_id INTEGER, member_state_id INTEGER, region_id INTEGER,
+        generated_at TIMESTAMPTZ, etl_run_id INTEGER, generator TEXT
+    );
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    UPDATE insights SET is_active = FALSE
+    WHERE is_active AND batch_id IS DISTINCT FROM p_batch_id
+      AND (p_generators IS NULL OR generator = ANY(p_generators));
+
+    UPDATE data_state SET insights_batch_id = p_batch_id, updated_at = NOW() WHERE id;
+
+    RETURN v_count;
+END;
+$$;
+
+-- Indicator codes whose values a published data version changed
+CREATE OR REPLACE FUNCTION data_version_indicators(p_version_id INTEGER)
+RETURNS TABLE (code TEXT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT i.code
+    FROM indicators i
+    WHERE i.code IS NOT NULL
+      AND EXISTS (
+        SELECT 1 FROM value_deltas d
+        WHERE d.data_version_id = p_version_id AND d.indicator_id = i.id
+      );
+$$;
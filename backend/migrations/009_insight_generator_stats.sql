@@ -0,0 +1,7 @@
+-- ============================================================
+-- Insight Generator Stats — per-generator outcome and timing of the
+-- insights pass that followed an ETL run
+-- ============================================================
+
+-- [{"generator", "status": ok|error|timeout, "insights", "compute_ms", "duration_ms", "error"}]
+ALTER TABLE etl_runs ADD COLUMN IF NOT EXISTS insight_stats JSONB;
@@ -0,0 +1,88 @@
+-- ============================================================
+-- Insight Rules — threshold insights defined as data, evaluated
+-- together over the latest country × indicator matrix
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS insight_rules (
+    id SERIAL PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    indicator_code TEXT NOT NULL,
+    -- count: one insight when at least min_countries countries match
+    -- mean:  one insight when the continental average matches
+    -- each:  one insight per matching country (the top_n most extreme)
+    aggregation TEXT NOT NULL DEFAULT 'count' CHECK (aggregation IN ('count', 'mean', 'each')),
+    comparison TEXT NOT NULL CHECK (comparison IN ('>', '>=', '<', '<=')),
+    threshold NUMERIC NOT NULL,
+    min_countries INTEGER NOT NULL DEFAULT 1 CHECK (min_countries >= 1),
+    top_n INTEGER NOT NULL DEFAULT 5 CHECK (top_n >= 1),  -- countries named (count) or reported (each)
+    type TEXT NOT NULL DEFAULT 'alert' CHECK (type IN ('finding', 'alert', 'trend', 'recommendation', 'comparison', 'milestone')),
+    severity TEXT NOT NULL CHECK (severity IN ('positive', 'neutral', 'warning', 'critical')),
+    goal_number INTEGER CHECK (goal_number BETWEEN 1 AND 20),
+    title_template TEXT NOT NULL,
+    description_template TEXT NOT NULL,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+INSERT INTO insight_rules (
+    key, indicator_code, aggregation, comparison, threshold, min_countries, type, severity,
+    goal_number, title_template, description_template
+) VALUES
+    ('youth_unemployment_above_30', 'SL.UEM.1524.ZS', 'count', '>', 30, 1, 'alert', 'critical', 18,
+     '{count} AU countries have youth unemployment above {threshold:g}%',
+     'Critical youth employment crisis: {count} member states report youth unemployment rates exceeding {threshold:g}%. Highest: {countries}. The Agenda 2063 target is below {target:g}%.'),
+    ('maternal_mortality_above_500', 'SH.STA.MMRT', 'count', '>', 500, 1, 'alert', 'critical', 3,
+     '{count} AU countries have maternal mortality >{threshold:g} per 100,000',
+     '{count} member states report maternal mortality ratios exceeding {threshold:g} per 100,000 live births, critically above the Agenda 2063 target of {target:g}.'),
+    ('electricity_access_below_50', 'EG.ELC.ACCS.ZS', 'count', '<', 50, 11, 'alert', 'warning', 10,
+     '{count} AU countries have <{threshold:g}% electricity access',
+     'Electricity access remains below {threshold:g}% in {count} member states. Continental average is {mean:.1f}%. Universal electricity access is a prerequisite for Agenda 2063 Goal 10 (world-class infrastructure).'),
+    ('digital_infrastructure_below_25', 'IT.NET.USER.ZS', 'count', '<', 25, 5, 'recommendation', 'warning', 10,
+     'Accelerate digital infrastructure in {count} underconnected AU states',
+     '{count} AU member states have internet penetration below {threshold:g}%. Digital infrastructure investment is critical for Agenda 2063 Goal 10 and enabling e-governance, digital trade, and modern service delivery.')
+ON CONFLICT (key) DO NOTHING;
+
+-- The insights snapshot now carries the active rules as well
+CREATE OR REPLACE FUNCTION insights_snapshot()
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'data_version_id', (SELECT published_version_id FROM data_state WHERE id),
+        'values', (
+            SELECT json_build_object(
+                'indicator_id', COALESCE(json_agg(v.indicator_id ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json),
+                'member_state_id', COALESCE(json_agg(v.member_state_id ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json),
+                'year', COALESCE(json_agg(v.year ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json),
+                'value', COALESCE(json_agg(v.value ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json)
+            )
+            FROM indicator_values v
+        ),
+        'indicators', (
+            SELECT COALESCE(json_agg(json_build_object(
+                'id', i.id, 'code', i.code, 'name', i.name, 'unit', i.unit, 'goal_id', i.goal_id,
+                'baseline_value', i.baseline_value, 'target_value', i.target_value
+            ) ORDER BY i.id), '[]'::json)
+            FROM indicators i
+        ),
+        'countries', (
+            SELECT COALESCE(json_agg(json_build_object(
+                'id', ms.id, 'name', ms.name, 'iso_code', ms.iso_code,
+                'region_id', ms.region_id, 'region_name', r.name
+            ) ORDER BY ms.id), '[]'::json)
+            FROM member_states ms
+            LEFT JOIN regions r ON r.id = ms.region_id
+        ),
+        'goals', (
+            SELECT COALESCE(json_agg(json_build_object('id', g.id, 'number', g.number) ORDER BY g.number), '[]'::json)
+            FROM goals g
+        ),
+        'rules', (
+            SELECT COALESCE(json_agg(row_to_json(ir) ORDER BY ir.id), '[]'::json)
+            FROM insight_rules ir
+            WHERE ir.is_active
+        )
+    );
+$$;
@@ -0,0 +1,69 @@
+-- ============================================================
+-- Insight Fingerprints — an insight whose content has not changed
+-- keeps its row across runs; only new or changed insights are written
+-- ============================================================
+
+-- Hash of generator, type, severity, scope, indicator, countries and bucketed
+-- evidence numbers, computed by the engine. NULL on rows written before this migration.
+ALTER TABLE insights ADD COLUMN IF NOT EXISTS fingerprint TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_insights_active_fingerprint ON insights(fingerprint) WHERE is_active;
+
+-- Publish a batch by difference against the active set:
+--   retire active insights (in scope) whose fingerprint is not in the batch,
+--   insert batch insights whose fingerprint is not already active,
+--   leave matching rows untouched (same id, no write).
+-- The insights pointer in data_state only moves when something changed.
+DROP FUNCTION IF EXISTS publish_insight_batch(TEXT, JSONB, TEXT[]);
+
+CREATE OR REPLACE FUNCTION publish_insight_batch(p_batch_id TEXT, p_insights JSONB, p_generators TEXT[] DEFAULT NULL)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_fingerprints TEXT[];
+    v_retired INTEGER;
+    v_inserted INTEGER;
+BEGIN
+    PERFORM 1 FROM data_state WHERE id FOR UPDATE;
+
+    SELECT COALESCE(array_agg(DISTINCT e->>'fingerprint'), '{}')
+    INTO v_fingerprints
+    FROM jsonb_array_elements(COALESCE(p_insights, '[]'::jsonb)) AS e;
+
+    UPDATE insights SET is_active = FALSE
+    WHERE is_active
+      AND (p_generators IS NULL OR generator = ANY(p_generators))
+      AND (fingerprint IS NULL OR NOT (fingerprint = ANY(v_fingerprints)));
+    GET DIAGNOSTICS v_retired = ROW_COUNT;
+
+    INSERT INTO insights (
+        type, severity, title, description, evidence, goal_id, indicator_id,
+        member_state_id, region_id, generated_at, etl_run_id, is_active,
+        included_in_report, batch_id, generator, fingerprint
+    )
+    SELECT DISTINCT ON (r.fingerprint)
+           r.type, r.severity, r.title, r.description, r.evidence, r.goal_id, r.indicator_id,
+           r.member_state_id, r.region_id, COALESCE(r.generated_at, NOW()), r.etl_run_id, TRUE,
+           FALSE, p_batch_id, r.generator, r.fingerprint
+    FROM jsonb_to_recordset(COALESCE(p_insights, '[]'::jsonb)) AS r(
+        type TEXT, severity TEXT, title TEXT, description TEXT, evidence JSONB,
+        goal_id INTEGER, indicator_id INTEGER, member_state_id INTEGER, region_id INTEGER,
+        generated_at TIMESTAMPTZ, etl_run_id INTEGER, generator TEXT, fingerprint TEXT
+    )
+    WHERE NOT EXISTS (
+        SELECT 1 FROM insights i WHERE i.is_active AND i.fingerprint = r.fingerprint
+    )
+    ORDER BY r.fingerprint;
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    IF v_inserted > 0 OR v_retired > 0 THEN
+        UPDATE data_state SET insights_batch_id = p_batch_id, updated_at = NOW() WHERE id;
+    END IF;
+
+    RETURN json_build_object(
+        'inserted', v_inserted,
+        'unchanged', cardinality(v_fingerprints) - v_inserted,
+        'retired', v_retired
+    );
+END;
+$$;
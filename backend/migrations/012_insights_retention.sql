@@ -0,0 +1,102 @@
+-- ============================================================
+-- Insights Retention — inactive insights past a retention age move
+-- to a compact archive; per-run counts are kept as summaries
+-- ============================================================
+
+-- Compact copy of a retired insight: no description or report flags
+CREATE TABLE IF NOT EXISTS insights_archive (
+    id INTEGER PRIMARY KEY,  -- original insights.id
+    type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    title TEXT NOT NULL,
+    evidence JSONB,
+    goal_id INTEGER,
+    indicator_id INTEGER,
+    member_state_id INTEGER,
+    region_id INTEGER,
+    generator TEXT,
+    fingerprint TEXT,
+    batch_id TEXT,
+    etl_run_id INTEGER,
+    generated_at TIMESTAMPTZ,
+    archived_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_insights_archive_generated ON insights_archive(generated_at DESC);
+
+-- How many insights of each type and severity a run produced, kept after its rows are archived
+CREATE TABLE IF NOT EXISTS insight_run_summaries (
+    batch_id TEXT NOT NULL,  -- 'legacy' for insights written before batches existed
+    type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    etl_run_id INTEGER,
+    insights INTEGER NOT NULL DEFAULT 0,
+    first_generated_at TIMESTAMPTZ,
+    last_generated_at TIMESTAMPTZ,
+    PRIMARY KEY (batch_id, type, severity)
+);
+
+-- Live-table indexes cover only the active set, so reads and index size track
+-- active insights rather than history
+DROP INDEX IF EXISTS idx_insights_active;
+DROP INDEX IF EXISTS idx_insights_type;
+DROP INDEX IF EXISTS idx_insights_severity;
+DROP INDEX IF EXISTS idx_insights_goal;
+DROP INDEX IF EXISTS idx_insights_generated;
+DROP INDEX IF EXISTS idx_insights_batch;
+CREATE INDEX IF NOT EXISTS idx_insights_active_generated ON insights(generated_at DESC) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_insights_active_type ON insights(type, generated_at DESC) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_insights_active_severity ON insights(severity, generated_at DESC) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_insights_active_goal ON insights(goal_id) WHERE is_active;
+
+-- Lets the archiver find its candidates without scanning the table
+CREATE INDEX IF NOT EXISTS idx_insights_inactive_generated ON insights(generated_at) WHERE NOT is_active;
+
+-- Move up to p_batch_size inactive insights generated before p_cutoff into the
+-- archive and fold them into the run summaries, in one transaction.
+-- SKIP LOCKED lets several archivers run at once without waiting on each other.
+CREATE OR REPLACE FUNCTION archive_insights(p_cutoff TIMESTAMPTZ, p_batch_size INTEGER DEFAULT 5000)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    WITH candidates AS (
+        SELECT id FROM insights
+        WHERE NOT is_active AND generated_at < p_cutoff
+        ORDER BY generated_at
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    ), moved AS (
+        DELETE FROM insights i USING candidates c
+        WHERE i.id = c.id
+        RETURNING i.*
+    ), archived AS (
+        INSERT INTO insights_archive (
+            id, type, severity, title, evidence, goal_id, indicator_id, member_state_id,
+            region_id, generator, fingerprint, batch_id, etl_run_id, generated_at
+        )
+        SELECT id, type, severity, title, evidence, goal_id, indicator_id, member_state_id,
+               region_id, generator, fingerprint, batch_id, etl_run_id, generated_at
+        FROM moved
+        ON CONFLICT (id) DO NOTHING
+    ), summarized AS (
+        INSERT INTO insight_run_summaries AS s (
+            batch_id, type, severity, etl_run_id, insights, first_generated_at, last_generated_at
+        )
+        SELECT COALESCE(batch_id, 'legacy'), type, severity, MAX(etl_run_id), COUNT(*),
+               MIN(generated_at), MAX(generated_at)
+        FROM moved
+        GROUP BY COALESCE(batch_id, 'legacy'), type, severity
+        ON CONFLICT (batch_id, type, severity) DO UPDATE SET
+            insights = s.insights + EXCLUDED.insights,
+            etl_run_id = COALESCE(s.etl_run_id, EXCLUDED.etl_run_id),
+            first_generated_at = LEAST(s.first_generated_at, EXCLUDED.first_generated_at),
+            last_generated_at = GREATEST(s.last_generated_at, EXCLUDED.last_generated_at)
+    )
+    SELECT COUNT(*) INTO v_count FROM moved;
+
+    RETURN v_count;
+END;
+$$;
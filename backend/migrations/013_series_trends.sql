@@ -0,0 +1,53 @@
+-- ============================================================
+-- Series Trends — Mann-Kendall significance and Theil-Sen slope for
+-- every (indicator, country) series and every continental average,
+-- stored once per published data version
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS series_trends (
+    id SERIAL PRIMARY KEY,
+    data_version_id INTEGER NOT NULL REFERENCES data_versions(id) ON DELETE CASCADE,
+    indicator_id INTEGER NOT NULL REFERENCES indicators(id),
+    member_state_id INTEGER REFERENCES member_states(id),  -- NULL: continental average series
+    n_points INTEGER NOT NULL,
+    first_year INTEGER,
+    last_year INTEGER,
+    mk_s INTEGER,               -- Mann-Kendall S statistic
+    mk_z NUMERIC,
+    p_value NUMERIC,            -- two-sided
+    kendall_tau NUMERIC,
+    sen_slope NUMERIC,          -- Theil-Sen slope, units per year
+    sen_intercept NUMERIC,      -- fitted value at first_year
+    direction TEXT NOT NULL CHECK (direction IN ('increasing', 'decreasing', 'no_trend', 'insufficient_data')),
+    computed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_series_trends_series
+    ON series_trends(data_version_id, indicator_id, COALESCE(member_state_id, 0));
+
+-- Replace a version's trend results in one transaction
+CREATE OR REPLACE FUNCTION store_series_trends(p_version_id INTEGER, p_trends JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    DELETE FROM series_trends WHERE data_version_id = p_version_id;
+
+    INSERT INTO series_trends (
+        data_version_id, indicator_id, member_state_id, n_points, first_year, last_year,
+        mk_s, mk_z, p_value, kendall_tau, sen_slope, sen_intercept, direction
+    )
+    SELECT p_version_id, r.indicator_id, r.member_state_id, r.n_points, r.first_year, r.last_year,
+           r.mk_s, r.mk_z, r.p_value, r.kendall_tau, r.sen_slope, r.sen_intercept, r.direction
+    FROM jsonb_to_recordset(COALESCE(p_trends, '[]'::jsonb)) AS r(
+        indicator_id INTEGER, member_state_id INTEGER, n_points INTEGER, first_year INTEGER,
+        last_year INTEGER, mk_s INTEGER, mk_z NUMERIC, p_value NUMERIC, kendall_tau NUMERIC,
+        sen_slope NUMERIC, sen_intercept NUMERIC, direction TEXT
+    );
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    RETURN v_count;
+END;
+$$;
@@ -0,0 +1,45 @@
+-- ============================================================
+-- Data Quality Flags — values the anomaly detector found far outside
+-- their own history or their regional peers, stored per data version
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS data_quality_flags (
+    id SERIAL PRIMARY KEY,
+    data_version_id INTEGER NOT NULL REFERENCES data_versions(id) ON DELETE CASCADE,
+    indicator_id INTEGER NOT NULL REFERENCES indicators(id),
+    member_state_id INTEGER NOT NULL REFERENCES member_states(id),
+    year INTEGER NOT NULL,
+    value NUMERIC,
+    flag_type TEXT NOT NULL CHECK (flag_type IN ('history_outlier', 'peer_divergence')),
+    score NUMERIC NOT NULL,      -- robust z-score; sign gives the direction
+    expected NUMERIC,           -- trend value or regional median
+    flagged_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (data_version_id, indicator_id, member_state_id, year, flag_type)
+);
+
+CREATE INDEX IF NOT EXISTS idx_data_quality_flags_series
+    ON data_quality_flags(data_version_id, indicator_id, member_state_id);
+
+-- Replace a version's flags in one transaction
+CREATE OR REPLACE FUNCTION store_data_quality_flags(p_version_id INTEGER, p_flags JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    DELETE FROM data_quality_flags WHERE data_version_id = p_version_id;
+
+    INSERT INTO data_quality_flags (
+        data_version_id, indicator_id, member_state_id, year, value, flag_type, score, expected
+    )
+    SELECT p_version_id, r.indicator_id, r.member_state_id, r.year, r.value, r.flag_type, r.score, r.expected
+    FROM jsonb_to_recordset(COALESCE(p_flags, '[]'::jsonb)) AS r(
+        indicator_id INTEGER, member_state_id INTEGER, year INTEGER, value NUMERIC,
+        flag_type TEXT, score NUMERIC, expected NUMERIC
+    );
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    RETURN v_count;
+END;
+$$;
@@ -0,0 +1,103 @@
+-- ============================================================
+-- Projections — trend-line projections to 2030 and 2063, years to
+-- target and goal progress for every country, region and the continent,
+-- stored per data version. The continental goal progress is written
+-- back to goals.current_progress.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS series_projections (
+    id SERIAL PRIMARY KEY,
+    data_version_id INTEGER NOT NULL REFERENCES data_versions(id) ON DELETE CASCADE,
+    indicator_id INTEGER NOT NULL REFERENCES indicators(id),
+    scope TEXT NOT NULL CHECK (scope IN ('country', 'region', 'continent')),
+    member_state_id INTEGER REFERENCES member_states(id),
+    region_id INTEGER REFERENCES regions(id),
+    n_points INTEGER NOT NULL,     -- observations in the fit window
+    last_year INTEGER,
+    last_value NUMERIC,
+    slope NUMERIC,                 -- units per year
+    fitted NUMERIC,                -- trend-line value at last_year
+    target NUMERIC,
+    progress_pct NUMERIC(5,2),
+    projected_2030 NUMERIC,
+    progress_2030 NUMERIC(5,2),
+    projected_2063 NUMERIC,
+    progress_2063 NUMERIC(5,2),
+    years_to_target INTEGER,       -- 0 when met; NULL when the trend never reaches it
+    computed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_series_projections_series
+    ON series_projections(data_version_id, indicator_id, scope, COALESCE(member_state_id, 0), COALESCE(region_id, 0));
+
+CREATE TABLE IF NOT EXISTS goal_progress (
+    id SERIAL PRIMARY KEY,
+    data_version_id INTEGER NOT NULL REFERENCES data_versions(id) ON DELETE CASCADE,
+    goal_id INTEGER NOT NULL REFERENCES goals(id) ON DELETE CASCADE,
+    scope TEXT NOT NULL CHECK (scope IN ('country', 'region', 'continent')),
+    member_state_id INTEGER REFERENCES member_states(id),
+    region_id INTEGER REFERENCES regions(id),
+    indicators INTEGER NOT NULL,   -- targeted indicators averaged
+    progress_pct NUMERIC(5,2),
+    progress_2030 NUMERIC(5,2),
+    progress_2063 NUMERIC(5,2),
+    computed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_goal_progress_scope
+    ON goal_progress(data_version_id, goal_id, scope, COALESCE(member_state_id, 0), COALESCE(region_id, 0));
+
+-- Replace a version's projections and goal progress, and refresh goals.current_progress, in one transaction
+CREATE OR REPLACE FUNCTION store_projections(p_version_id INTEGER, p_projections JSONB, p_goal_progress JSONB)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_projections INTEGER;
+    v_goals INTEGER;
+BEGIN
+    DELETE FROM series_projections WHERE data_version_id = p_version_id;
+    DELETE FROM goal_progress WHERE data_version_id = p_version_id;
+
+    INSERT INTO series_projections (
+        data_version_id, indicator_id, scope, member_state_id, region_id, n_points, last_year, last_value,
+        slope, fitted, target, progress_pct, projected_2030, progress_2030, projected_2063, progress_2063,
+        years_to_target
+    )
+    SELECT p_version_id, r.indicator_id, r.scope, r.member_state_id, r.region_id, r.n_points, r.last_year,
+           r.last_value, r.slope, r.fitted, r.target, r.progress_pct, r.projected_2030, r.progress_2030,
+           r.projected_2063, r.progress_2063, r.years_to_target
+    FROM jsonb_to_recordset(COALESCE(p_projections, '[]'::jsonb)) AS r(
+        indicator_id INTEGER, scope TEXT, member_state_id INTEGER, region_id INTEGER, n_points INTEGER,
+        last_year INTEGER, last_value NUMERIC, slope NUMERIC, fitted NUMERIC, target NUMERIC,
+        progress_pct NUMERIC, projected_2030 NUMERIC, progress_2030 NUMERIC, projected_2063 NUMERIC,
+        progress_2063 NUMERIC, years_to_target INTEGER
+    );
+    GET DIAGNOSTICS v_projections = ROW_COUNT;
+
+    INSERT INTO goal_progress (
+        data_version_id, goal_id, scope, member_state_id, region_id, indicators,
+        progress_pct, progress_2030, progress_2063
+    )
+    SELECT p_version_id, r.goal_id, r.scope, r.member_state_id, r.region_id, r.indicators,
+           r.progress_pct, r.progress_2030, r.progress_2063
+    FROM jsonb_to_recordset(COALESCE(p_goal_progress, '[]'::jsonb)) AS r(
+        goal_id INTEGER, scope TEXT, member_state_id INTEGER, region_id INTEGER, indicators INTEGER,
+        progress_pct NUMERIC, progress_2030 NUMERIC, progress_2063 NUMERIC
+    );
+    GET DIAGNOSTICS v_goals = ROW_COUNT;
+
+    -- Only the published version speaks for goals.current_progress
+    IF p_version_id = (SELECT published_version_id FROM data_state WHERE id) THEN
+        UPDATE goals g
+        SET current_progress = COALESCE(gp.progress_pct, 0), updated_at = NOW()
+        FROM goals g2
+        LEFT JOIN goal_progress gp
+            ON gp.goal_id = g2.id AND gp.data_version_id = p_version_id AND gp.scope = 'continent'
+        WHERE g.id = g2.id
+          AND g.current_progress IS DISTINCT FROM COALESCE(gp.progress_pct, 0);
+    END IF;
+
+    RETURN json_build_object('projections', v_projections, 'goals', v_goals);
+END;
+$$;
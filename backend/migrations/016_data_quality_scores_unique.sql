@@ -0,0 +1,16 @@
+-- ============================================================
+-- Data Quality Scores — one row per (country, indicator), so a full
+-- assessment is a single bulk upsert instead of an ever-growing table
+-- ============================================================
+
+-- Keep only the most recent score for each pair
+DELETE FROM data_quality_scores d
+USING data_quality_scores newer
+WHERE newer.member_state_id = d.member_state_id
+  AND newer.indicator_id = d.indicator_id
+  AND (COALESCE(newer.assessed_at, '-infinity'), newer.id) > (COALESCE(d.assessed_at, '-infinity'), d.id);
+
+ALTER TABLE data_quality_scores
+    DROP CONSTRAINT IF EXISTS data_quality_scores_pair_key;
+ALTER TABLE data_quality_scores
+    ADD CONSTRAINT data_quality_scores_pair_key UNIQUE (member_state_id, indicator_id);
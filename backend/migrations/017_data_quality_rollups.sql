@@ -0,0 +1,118 @@
+-- ============================================================
+-- Data Quality Rollups — per-country, per-indicator and continental
+-- score totals, kept current by applying each rescore as a delta
+-- ============================================================
+
+-- Sums rather than averages so a rescore of a few pairs can be applied
+-- exactly: subtract the pairs' old scores, add the new ones. NUMERIC keeps
+-- the running sums free of rounding drift.
+CREATE TABLE IF NOT EXISTS data_quality_rollups (
+    scope TEXT NOT NULL CHECK (scope IN ('country', 'indicator', 'continent')),
+    scope_id INTEGER NOT NULL DEFAULT 0,        -- member_state_id / indicator_id; 0 for the continent
+    pairs INTEGER NOT NULL DEFAULT 0,           -- scored (country, indicator) pairs
+    overall_sum NUMERIC NOT NULL DEFAULT 0,
+    completeness_sum NUMERIC NOT NULL DEFAULT 0,
+    completeness_pairs INTEGER NOT NULL DEFAULT 0,
+    empty_pairs INTEGER NOT NULL DEFAULT 0,     -- pairs scored 0 (no data)
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (scope, scope_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_data_quality_scores_empty
+    ON data_quality_scores(member_state_id, indicator_id) WHERE overall_score = 0;
+
+-- Upsert scores for any set of pairs and move the rollups by the difference
+CREATE OR REPLACE FUNCTION store_quality_scores(p_scores JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    -- Concurrent rescores of the same pair would both subtract the same old score
+    PERFORM pg_advisory_xact_lock(hashtext('store_quality_scores'));
+
+    CREATE TEMP TABLE incoming_scores ON COMMIT DROP AS
+    SELECT DISTINCT ON (s.member_state_id, s.indicator_id) s.*
+    FROM jsonb_to_recordset(COALESCE(p_scores, '[]'::jsonb)) AS s(
+        member_state_id INTEGER, indicator_id INTEGER, completeness_pct NUMERIC(5,2),
+        timeliness_years INTEGER, consistency_score NUMERIC(5,2), overall_score NUMERIC(5,2),
+        assessed_at TIMESTAMPTZ
+    );
+
+    -- +1 × each new score, -1 × the score it replaces
+    INSERT INTO data_quality_rollups AS r (
+        scope, scope_id, pairs, overall_sum, completeness_sum, completeness_pairs, empty_pairs, updated_at
+    )
+    SELECT g.scope, g.scope_id,
+           SUM(d.sign),
+           SUM(d.sign * COALESCE(d.overall_score, 0)),
+           SUM(d.sign * COALESCE(d.completeness_pct, 0)),
+           SUM(CASE WHEN d.completeness_pct IS NOT NULL THEN d.sign ELSE 0 END),
+           SUM(CASE WHEN d.overall_score = 0 THEN d.sign ELSE 0 END),
+           NOW()
+    FROM (
+        SELECT 1 AS sign, member_state_id, indicator_id, overall_score, completeness_pct
+        FROM incoming_scores
+        UNION ALL
+        SELECT -1, q.member_state_id, q.indicator_id, q.overall_score, q.completeness_pct
+        FROM data_quality_scores q
+        JOIN incoming_scores USING (member_state_id, indicator_id)
+    ) d
+    CROSS JOIN LATERAL (
+        VALUES ('country', d.member_state_id), ('indicator', d.indicator_id), ('continent', 0)
+    ) AS g(scope, scope_id)
+    GROUP BY g.scope, g.scope_id
+    ON CONFLICT (scope, scope_id) DO UPDATE SET
+        pairs = r.pairs + EXCLUDED.pairs,
+        overall_sum = r.overall_sum + EXCLUDED.overall_sum,
+        completeness_sum = r.completeness_sum + EXCLUDED.completeness_sum,
+        completeness_pairs = r.completeness_pairs + EXCLUDED.completeness_pairs,
+        empty_pairs = r.empty_pairs + EXCLUDED.empty_pairs,
+        updated_at = EXCLUDED.updated_at;
+
+    INSERT INTO data_quality_scores (
+        member_state_id, indicator_id, completeness_pct, timeliness_years,
+        consistency_score, overall_score, assessed_at
+    )
+    SELECT member_state_id, indicator_id, completeness_pct, timeliness_years,
+           consistency_score, overall_score, COALESCE(assessed_at, NOW())
+    FROM incoming_scores
+    ON CONFLICT (member_state_id, indicator_id) DO UPDATE SET
+        completeness_pct = EXCLUDED.completeness_pct,
+        timeliness_years = EXCLUDED.timeliness_years,
+        consistency_score = EXCLUDED.consistency_score,
+        overall_score = EXCLUDED.overall_score,
+        assessed_at = EXCLUDED.assessed_at;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    DROP TABLE incoming_scores;
+    RETURN v_count;
+END;
+$$;
+
+-- (indicator_id, member_state_id) pairs with a cell changed by a published version
+CREATE OR REPLACE FUNCTION data_version_pairs(p_version_id INTEGER)
+RETURNS TABLE (indicator_id INTEGER, member_state_id INTEGER)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT DISTINCT d.indicator_id, d.member_state_id
+    FROM value_deltas d
+    WHERE d.data_version_id = p_version_id;
+$$;
+
+-- Rollups for the scores already stored
+INSERT INTO data_quality_rollups (scope, scope_id, pairs, overall_sum, completeness_sum, completeness_pairs, empty_pairs)
+SELECT g.scope, g.scope_id,
+       COUNT(*),
+       SUM(COALESCE(q.overall_score, 0)),
+       SUM(COALESCE(q.completeness_pct, 0)),
+       COUNT(q.completeness_pct),
+       COUNT(*) FILTER (WHERE q.overall_score = 0)
+FROM data_quality_scores q
+CROSS JOIN LATERAL (
+    VALUES ('country', q.member_state_id), ('indicator', q.indicator_id), ('continent', 0)
+) AS g(scope, scope_id)
+GROUP BY g.scope, g.scope_id
+ON CONFLICT (scope, scope_id) DO NOTHING;
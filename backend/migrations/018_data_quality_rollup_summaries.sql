@@ -0,0 +1,132 @@
+-- ============================================================
+-- Data Quality Rollup Summaries — names, averages and the continental
+-- headline figures precomputed on the rollup rows, so the overview
+-- endpoints and chat read a few dozen rows and nothing else
+-- ============================================================
+
+ALTER TABLE data_quality_rollups ADD COLUMN IF NOT EXISTS name TEXT;   -- country or indicator name
+ALTER TABLE data_quality_rollups ADD COLUMN IF NOT EXISTS code TEXT;   -- ISO code or indicator code
+ALTER TABLE data_quality_rollups ADD COLUMN IF NOT EXISTS avg_score NUMERIC
+    GENERATED ALWAYS AS (ROUND(overall_sum / NULLIF(pairs, 0), 1)) STORED;
+ALTER TABLE data_quality_rollups ADD COLUMN IF NOT EXISTS avg_completeness NUMERIC
+    GENERATED ALWAYS AS (ROUND(completeness_sum / NULLIF(completeness_pairs, 0), 1)) STORED;
+
+-- Continent row only
+ALTER TABLE data_quality_rollups ADD COLUMN IF NOT EXISTS country_avg_score NUMERIC;  -- mean of country averages
+ALTER TABLE data_quality_rollups ADD COLUMN IF NOT EXISTS countries_good INTEGER;     -- country average > 70
+ALTER TABLE data_quality_rollups ADD COLUMN IF NOT EXISTS countries_poor INTEGER;     -- country average < 40
+ALTER TABLE data_quality_rollups ADD COLUMN IF NOT EXISTS sample_gaps JSONB;          -- first 20 pairs scored 0
+
+-- Labels and continental figures from the current sums; ~80 rows of work
+CREATE OR REPLACE FUNCTION refresh_quality_rollup_summaries()
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE data_quality_rollups r
+    SET name = ms.name, code = ms.iso_code
+    FROM member_states ms
+    WHERE r.scope = 'country' AND ms.id = r.scope_id
+      AND (r.name, r.code) IS DISTINCT FROM (ms.name, ms.iso_code);
+
+    UPDATE data_quality_rollups r
+    SET name = i.name, code = i.code
+    FROM indicators i
+    WHERE r.scope = 'indicator' AND i.id = r.scope_id
+      AND (r.name, r.code) IS DISTINCT FROM (i.name, i.code);
+
+    UPDATE data_quality_rollups r
+    SET country_avg_score = c.avg_score,
+        countries_good = c.good,
+        countries_poor = c.poor,
+        sample_gaps = (
+            SELECT COALESCE(jsonb_agg(g), '[]'::jsonb)
+            FROM (
+                SELECT q.member_state_id, q.indicator_id
+                FROM data_quality_scores q
+                WHERE q.overall_score = 0
+                ORDER BY q.member_state_id, q.indicator_id
+                LIMIT 20
+            ) g
+        )
+    FROM (
+        SELECT AVG(overall_sum / pairs) AS avg_score,
+               COUNT(*) FILTER (WHERE overall_sum / pairs > 70) AS good,
+               COUNT(*) FILTER (WHERE overall_sum / pairs < 40) AS poor
+        FROM data_quality_rollups
+        WHERE scope = 'country' AND pairs > 0
+    ) c
+    WHERE r.scope = 'continent';
+$$;
+
+-- Same as 017, plus the summary refresh in the same transaction
+CREATE OR REPLACE FUNCTION store_quality_scores(p_scores JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    -- Concurrent rescores of the same pair would both subtract the same old score
+    PERFORM pg_advisory_xact_lock(hashtext('store_quality_scores'));
+
+    CREATE TEMP TABLE incoming_scores ON COMMIT DROP AS
+    SELECT DISTINCT ON (s.member_state_id, s.indicator_id) s.*
+    FROM jsonb_to_recordset(COALESCE(p_scores, '[]'::jsonb)) AS s(
+        member_state_id INTEGER, indicator_id INTEGER, completeness_pct NUMERIC(5,2),
+        timeliness_years INTEGER, consistency_score NUMERIC(5,2), overall_score NUMERIC(5,2),
+        assessed_at TIMESTAMPTZ
+    );
+
+    -- +1 × each new score, -1 × the score it replaces
+    INSERT INTO data_quality_rollups AS r (
+        scope, scope_id, pairs, overall_sum, completeness_sum, completeness_pairs, empty_pairs, updated_at
+    )
+    SELECT g.scope, g.scope_id,
+           SUM(d.sign),
+           SUM(d.sign * COALESCE(d.overall_score, 0)),
+           SUM(d.sign * COALESCE(d.completeness_pct, 0)),
+           SUM(CASE WHEN d.completeness_pct IS NOT NULL THEN d.sign ELSE 0 END),
+           SUM(CASE WHEN d.overall_score = 0 THEN d.sign ELSE 0 END),
+           NOW()
+    FROM (
+        SELECT 1 AS sign, member_state_id, indicator_id, overall_score, completeness_pct
+        FROM incoming_scores
+        UNION ALL
+        SELECT -1, q.member_state_id, q.indicator_id, q.overall_score, q.completeness_pct
+        FROM data_quality_scores q
+        JOIN incoming_scores USING (member_state_id, indicator_id)
+    ) d
+    CROSS JOIN LATERAL (
+        VALUES ('country', d.member_state_id), ('indicator', d.indicator_id), ('continent', 0)
+    ) AS g(scope, scope_id)
+    GROUP BY g.scope, g.scope_id
+    ON CONFLICT (scope, scope_id) DO UPDATE SET
+        pairs = r.pairs + EXCLUDED.pairs,
+        overall_sum = r.overall_sum + EXCLUDED.overall_sum,
+        completeness_sum = r.completeness_sum + EXCLUDED.completeness_sum,
+        completeness_pairs = r.completeness_pairs + EXCLUDED.completeness_pairs,
+        empty_pairs = r.empty_pairs + EXCLUDED.empty_pairs,
+        updated_at = EXCLUDED.updated_at;
+
+    INSERT INTO data_quality_scores (
+        member_state_id, indicator_id, completeness_pct, timeliness_years,
+        consistency_score, overall_score, assessed_at
+    )
+    SELECT member_state_id, indicator_id, completeness_pct, timeliness_years,
+           consistency_score, overall_score, COALESCE(assessed_at, NOW())
+    FROM incoming_scores
+    ON CONFLICT (member_state_id, indicator_id) DO UPDATE SET
+        completeness_pct = EXCLUDED.completeness_pct,
+        timeliness_years = EXCLUDED.timeliness_years,
+        consistency_score = EXCLUDED.consistency_score,
+        overall_score = EXCLUDED.overall_score,
+        assessed_at = EXCLUDED.assessed_at;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    DROP TABLE incoming_scores;
+    PERFORM refresh_quality_rollup_summaries();
+    RETURN v_count;
+END;
+$$;
+
+SELECT refresh_quality_rollup_summaries();
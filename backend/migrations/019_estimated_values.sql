@@ -0,0 +1,128 @@
+-- ============================================================
+-- Estimated Values — imputed cells live in indicator_values with
+-- data_quality = 'estimated', published as their own data version
+-- ============================================================
+
+ALTER TABLE data_versions DROP CONSTRAINT IF EXISTS data_versions_source_check;
+ALTER TABLE data_versions ADD CONSTRAINT data_versions_source_check
+    CHECK (source IN ('etl', 'upload', 'form', 'imputation'));
+
+CREATE INDEX IF NOT EXISTS idx_indicator_values_estimated
+    ON indicator_values(indicator_id, member_state_id, year) WHERE data_quality = 'estimated';
+
+-- Publish as in 005, plus: an estimated cell never replaces a reported one.
+-- (A reported cell always replaces an estimate: estimates have no source.)
+CREATE OR REPLACE FUNCTION publish_data_version(p_version_id INTEGER, p_checkpoint_interval INTEGER DEFAULT 20)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_changed INTEGER;
+    v_since_checkpoint INTEGER;
+BEGIN
+    PERFORM 1 FROM data_state WHERE id FOR UPDATE;
+
+    UPDATE data_versions SET status = 'published', published_at = NOW()
+    WHERE id = p_version_id AND status = 'staging';
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'data version % is not staged', p_version_id;
+    END IF;
+
+    INSERT INTO value_deltas (data_version_id, indicator_id, member_state_id, year, op, old_value, new_value)
+    SELECT p_version_id, s.indicator_id, s.member_state_id, s.year,
+           CASE WHEN iv.id IS NULL THEN 'I' ELSE 'U' END, iv.value, s.value
+    FROM indicator_values_staging s
+    LEFT JOIN indicator_values iv
+      ON iv.indicator_id = s.indicator_id
+     AND iv.member_state_id = s.member_state_id
+     AND iv.year = s.year
+    LEFT JOIN data_sources cur ON cur.id = iv.data_source_id
+    LEFT JOIN data_sources inc ON inc.id = s.data_source_id
+    WHERE s.data_version_id = p_version_id
+      AND (iv.id IS NULL OR iv.value IS DISTINCT FROM s.value OR iv.data_quality IS DISTINCT FROM s.data_quality
+           OR iv.data_source_id IS DISTINCT FROM s.data_source_id)
+      AND NOT (cur.id IS NOT NULL AND inc.id IS NOT NULL AND cur.priority < inc.priority)
+      AND NOT (s.data_quality = 'estimated' AND iv.id IS NOT NULL AND iv.data_quality IS DISTINCT FROM 'estimated');
+    GET DIAGNOSTICS v_changed = ROW_COUNT;
+
+    INSERT INTO indicator_values (indicator_id, member_state_id, year, value, data_quality, source_detail, data_source_id)
+    SELECT s.indicator_id, s.member_state_id, s.year, s.value, s.data_quality, s.source_detail, s.data_source_id
+    FROM indicator_values_staging s
+    JOIN value_deltas d
+      ON d.data_version_id = p_version_id
+     AND d.indicator_id = s.indicator_id
+     AND d.member_state_id = s.member_state_id
+     AND d.year = s.year
+    WHERE s.data_version_id = p_version_id
+    ON CONFLICT (indicator_id, member_state_id, year) DO UPDATE
+    SET value = EXCLUDED.value,
+        data_quality = EXCLUDED.data_quality,
+        source_detail = EXCLUDED.source_detail,
+        data_source_id = EXCLUDED.data_source_id;
+
+    DELETE FROM indicator_values_staging WHERE data_version_id = p_version_id;
+
+    SELECT COUNT(*) INTO v_since_checkpoint
+    FROM data_versions
+    WHERE status = 'published'
+      AND id > COALESCE((SELECT MAX(id) FROM data_versions WHERE is_checkpoint), 0);
+
+    IF v_since_checkpoint >= p_checkpoint_interval
+       OR NOT EXISTS (SELECT 1 FROM data_versions WHERE is_checkpoint) THEN
+        INSERT INTO value_checkpoints (data_version_id, indicator_id, member_state_id, year, value)
+        SELECT p_version_id, indicator_id, member_state_id, year, value FROM indicator_values;
+        UPDATE data_versions SET is_checkpoint = TRUE WHERE id = p_version_id;
+    END IF;
+
+    UPDATE data_versions SET records_published = v_changed, records_changed = v_changed
+    WHERE id = p_version_id;
+    UPDATE data_state SET published_version_id = p_version_id, updated_at = NOW() WHERE id;
+
+    RETURN v_changed;
+END;
+$$;
+
+-- Snapshot as in 010, with an `estimated` flag per value
+CREATE OR REPLACE FUNCTION insights_snapshot()
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'data_version_id', (SELECT published_version_id FROM data_state WHERE id),
+        'values', (
+            SELECT json_build_object(
+                'indicator_id', COALESCE(json_agg(v.indicator_id ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json),
+                'member_state_id', COALESCE(json_agg(v.member_state_id ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json),
+                'year', COALESCE(json_agg(v.year ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json),
+                'value', COALESCE(json_agg(v.value ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json),
+                'estimated', COALESCE(json_agg(v.data_quality = 'estimated' ORDER BY v.indicator_id, v.member_state_id, v.year), '[]'::json)
+            )
+            FROM indicator_values v
+        ),
+        'indicators', (
+            SELECT COALESCE(json_agg(json_build_object(
+                'id', i.id, 'code', i.code, 'name', i.name, 'unit', i.unit, 'goal_id', i.goal_id,
+                'baseline_value', i.baseline_value, 'target_value', i.target_value
+            ) ORDER BY i.id), '[]'::json)
+            FROM indicators i
+        ),
+        'countries', (
+            SELECT COALESCE(json_agg(json_build_object(
+                'id', ms.id, 'name', ms.name, 'iso_code', ms.iso_code,
+                'region_id', ms.region_id, 'region_name', r.name
+            ) ORDER BY ms.id), '[]'::json)
+            FROM member_states ms
+            LEFT JOIN regions r ON r.id = ms.region_id
+        ),
+        'goals', (
+            SELECT COALESCE(json_agg(json_build_object('id', g.id, 'number', g.number) ORDER BY g.number), '[]'::json)
+            FROM goals g
+        ),
+        'rules', (
+            SELECT COALESCE(json_agg(row_to_json(ir) ORDER BY ir.id), '[]'::json)
+            FROM insight_rules ir
+            WHERE ir.is_active
+        )
+    );
+$$;
@@ -0,0 +1,25 @@
+-- ============================================================
+-- Upload Jobs — large uploads accepted at once and loaded in the
+-- background, with progress a client can poll
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS upload_jobs (
+    id SERIAL PRIMARY KEY,
+    filename TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'parsing', 'publishing', 'completed', 'failed')),
+    rows_parsed INTEGER NOT NULL DEFAULT 0,
+    rows_loaded INTEGER NOT NULL DEFAULT 0,     -- staged; published when the job completes
+    rows_failed INTEGER NOT NULL DEFAULT 0,
+    errors JSONB NOT NULL DEFAULT '[]'::jsonb,  -- first 20 row errors
+    rows_per_sec NUMERIC,
+    data_version_id INTEGER REFERENCES data_versions(id),
+    records_changed INTEGER,                    -- cells the publish changed
+    error_message TEXT,                         -- why a failed job failed
+    created_by UUID,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_upload_jobs_created ON upload_jobs(created_at DESC);
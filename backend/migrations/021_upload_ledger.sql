@@ -0,0 +1,48 @@
+-- ============================================================
+-- Upload Ledger — every uploaded file fingerprinted by content hash,
+-- so a file sent again is recognised before any parsing, and the
+-- stored cells a changed file is compared against
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS upload_ledger (
+    id SERIAL PRIMARY KEY,
+    content_hash TEXT NOT NULL,                 -- sha256 of the file bytes, hex
+    filename TEXT NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'processing'
+        CHECK (status IN ('processing', 'completed', 'failed', 'duplicate')),
+    duplicate_of INTEGER REFERENCES upload_ledger(id),
+    rows_parsed INTEGER NOT NULL DEFAULT 0,
+    rows_loaded INTEGER NOT NULL DEFAULT 0,     -- rows that differed from the stored values
+    rows_unchanged INTEGER NOT NULL DEFAULT 0,  -- valid rows already stored as sent
+    rows_failed INTEGER NOT NULL DEFAULT 0,
+    data_version_id INTEGER REFERENCES data_versions(id),
+    upload_job_id INTEGER REFERENCES upload_jobs(id),
+    created_by UUID,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+-- A completed load of the same bytes is what short-circuits a new upload
+CREATE INDEX IF NOT EXISTS idx_upload_ledger_completed
+    ON upload_ledger(content_hash, id DESC) WHERE status = 'completed';
+
+ALTER TABLE upload_jobs ADD COLUMN IF NOT EXISTS rows_unchanged INTEGER NOT NULL DEFAULT 0;
+
+-- Stored value, quality flag and source for each of a set of cells (those stored at all)
+CREATE OR REPLACE FUNCTION stored_cells(p_cells JSONB)
+RETURNS TABLE (
+    indicator_id INTEGER, member_state_id INTEGER, year INTEGER,
+    value NUMERIC, data_quality TEXT, data_source_id INTEGER
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT iv.indicator_id, iv.member_state_id, iv.year, iv.value, iv.data_quality, iv.data_source_id
+    FROM jsonb_to_recordset(COALESCE(p_cells, '[]'::jsonb))
+         AS c(indicator_id INTEGER, member_state_id INTEGER, year INTEGER)
+    JOIN indicator_values iv
+      ON iv.indicator_id = c.indicator_id
+     AND iv.member_state_id = c.member_state_id
+     AND iv.year = c.year;
+$$;
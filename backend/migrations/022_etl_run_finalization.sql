@@ -0,0 +1,8 @@
+-- ============================================================
+-- ETL Run Finalization — publishing or discarding a closed sharded
+-- run's data version is held under a lease, so a worker that dies
+-- after closing the run does not leave the version staged forever
+-- ============================================================
+
+ALTER TABLE etl_runs ADD COLUMN IF NOT EXISTS finalize_lease_expires_at TIMESTAMPTZ;
+
@@ -0,0 +1,229 @@
+-- ============================================================
+-- Publish Sequence — history follows the order versions were
+-- published, not the order they were created. A long ETL run opens
+-- its version first and publishes it last, so ids are not that order.
+-- ============================================================
+
+ALTER TABLE data_versions ADD COLUMN IF NOT EXISTS publish_seq INTEGER;
+
+-- Versions published before this migration, in the order they were published
+UPDATE data_versions v
+SET publish_seq = o.seq
+FROM (
+    SELECT id, ROW_NUMBER() OVER (ORDER BY published_at, id) AS seq
+    FROM data_versions
+    WHERE status = 'published'
+) o
+WHERE v.id = o.id AND v.publish_seq IS NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_data_versions_publish_seq ON data_versions(publish_seq);
+CREATE INDEX IF NOT EXISTS idx_data_versions_checkpoint_seq ON data_versions(publish_seq) WHERE is_checkpoint;
+
+-- Publish as in 019, numbering each version under the data_state lock so the
+-- sequence is exactly the commit order. Checkpoints are counted by sequence.
+CREATE OR REPLACE FUNCTION publish_data_version(p_version_id INTEGER, p_checkpoint_interval INTEGER DEFAULT 20)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_changed INTEGER;
+    v_since_checkpoint INTEGER;
+    v_seq INTEGER;
+BEGIN
+    PERFORM 1 FROM data_state WHERE id FOR UPDATE;
+
+    SELECT COALESCE(MAX(publish_seq), 0) + 1 INTO v_seq FROM data_versions;
+
+    UPDATE data_versions SET status = 'published', published_at = NOW(), publish_seq = v_seq
+    WHERE id = p_version_id AND status = 'staging';
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'data version % is not staged', p_version_id;
+    END IF;
+
+    INSERT INTO value_deltas (data_version_id, indicator_id, member_state_id, year, op, old_value, new_value)
+    SELECT p_version_id, s.indicator_id, s.member_state_id, s.year,
+           CASE WHEN iv.id IS NULL THEN 'I' ELSE 'U' END, iv.value, s.value
+    FROM indicator_values_staging s
+    LEFT JOIN indicator_values iv
+      ON iv.indicator_id = s.indicator_id
+     AND iv.member_state_id = s.member_state_id
+     AND iv.year = s.year
+    LEFT JOIN data_sources cur ON cur.id = iv.data_source_id
+    LEFT JOIN data_sources inc ON inc.id = s.data_source_id
+    WHERE s.data_version_id = p_version_id
+      AND (iv.id IS NULL OR iv.value IS DISTINCT FROM s.value OR iv.data_quality IS DISTINCT FROM s.data_quality
+           OR iv.data_source_id IS DISTINCT FROM s.data_source_id)
+      AND NOT (cur.id IS NOT NULL AND inc.id IS NOT NULL AND cur.priority < inc.priority)
+      AND NOT (s.data_quality = 'estimated' AND iv.id IS NOT NULL AND iv.data_quality IS DISTINCT FROM 'estimated');
+    GET DIAGNOSTICS v_changed = ROW_COUNT;
+
+    INSERT INTO indicator_values (indicator_id, member_state_id, year, value, data_quality, source_detail, data_source_id)
+    SELECT s.indicator_id, s.member_state_id, s.year, s.value, s.data_quality, s.source_detail, s.data_source_id
+    FROM indicator_values_staging s
+    JOIN value_deltas d
+      ON d.data_version_id = p_version_id
+     AND d.indicator_id = s.indicator_id
+     AND d.member_state_id = s.member_state_id
+     AND d.year = s.year
+    WHERE s.data_version_id = p_version_id
+    ON CONFLICT (indicator_id, member_state_id, year) DO UPDATE
+    SET value = EXCLUDED.value,
+        data_quality = EXCLUDED.data_quality,
+        source_detail = EXCLUDED.source_detail,
+        data_source_id = EXCLUDED.data_source_id;
+
+    DELETE FROM indicator_values_staging WHERE data_version_id = p_version_id;
+
+    SELECT COUNT(*) INTO v_since_checkpoint
+    FROM data_versions
+    WHERE status = 'published'
+      AND publish_seq > COALESCE((SELECT MAX(publish_seq) FROM data_versions WHERE is_checkpoint), 0);
+
+    IF v_since_checkpoint >= p_checkpoint_interval
+       OR NOT EXISTS (SELECT 1 FROM data_versions WHERE is_checkpoint) THEN
+        INSERT INTO value_checkpoints (data_version_id, indicator_id, member_state_id, year, value)
+        SELECT p_version_id, indicator_id, member_state_id, year, value FROM indicator_values;
+        UPDATE data_versions SET is_checkpoint = TRUE WHERE id = p_version_id;
+    END IF;
+
+    UPDATE data_versions SET records_published = v_changed, records_changed = v_changed
+    WHERE id = p_version_id;
+    UPDATE data_state SET published_version_id = p_version_id, updated_at = NOW() WHERE id;
+
+    RETURN v_changed;
+END;
+$$;
+
+-- Position of a published version in publish order (0 = before the first version)
+CREATE OR REPLACE FUNCTION data_version_seq(p_version_id INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_seq INTEGER;
+BEGIN
+    IF p_version_id = 0 THEN
+        RETURN 0;
+    END IF;
+    SELECT publish_seq INTO v_seq FROM data_versions WHERE id = p_version_id AND status = 'published';
+    IF v_seq IS NULL THEN
+        RAISE EXCEPTION 'data version % is not published', p_version_id;
+    END IF;
+    RETURN v_seq;
+END;
+$$;
+
+-- As in 004, with checkpoints and deltas ranged and ordered by publish_seq
+CREATE OR REPLACE FUNCTION indicator_values_as_of(
+    p_version_id INTEGER,
+    p_indicator_id INTEGER DEFAULT NULL,
+    p_member_state_id INTEGER DEFAULT NULL
+)
+RETURNS TABLE (indicator_id INTEGER, member_state_id INTEGER, year INTEGER, value NUMERIC)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_seq INTEGER := data_version_seq(p_version_id);
+    v_checkpoint INTEGER;
+    v_checkpoint_seq INTEGER;
+BEGIN
+    SELECT id, publish_seq INTO v_checkpoint, v_checkpoint_seq
+    FROM data_versions WHERE is_checkpoint AND publish_seq <= v_seq
+    ORDER BY publish_seq DESC LIMIT 1;
+
+    IF v_checkpoint IS NOT NULL THEN
+        -- Forward: checkpoint, then the newest delta per cell up to the version
+        RETURN QUERY
+        SELECT DISTINCT ON (k.indicator_id, k.member_state_id, k.year)
+               k.indicator_id, k.member_state_id, k.year, k.value
+        FROM (
+            SELECT c.indicator_id, c.member_state_id, c.year, c.value, v_checkpoint_seq AS s
+            FROM value_checkpoints c
+            WHERE c.data_version_id = v_checkpoint
+              AND (p_indicator_id IS NULL OR c.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR c.member_state_id = p_member_state_id)
+            UNION ALL
+            SELECT d.indicator_id, d.member_state_id, d.year, d.new_value, dv.publish_seq
+            FROM value_deltas d
+            JOIN data_versions dv ON dv.id = d.data_version_id
+            WHERE dv.publish_seq > v_checkpoint_seq AND dv.publish_seq <= v_seq
+              AND (p_indicator_id IS NULL OR d.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR d.member_state_id = p_member_state_id)
+        ) k
+        ORDER BY k.indicator_id, k.member_state_id, k.year, k.s DESC;
+        RETURN;
+    END IF;
+
+    -- Backward: next checkpoint (or the live table), undoing the oldest delta
+    -- per cell made after the version. Cells first inserted later are dropped.
+    SELECT id, publish_seq INTO v_checkpoint, v_checkpoint_seq
+    FROM data_versions WHERE is_checkpoint AND publish_seq > v_seq
+    ORDER BY publish_seq ASC LIMIT 1;
+
+    RETURN QUERY
+    SELECT k.indicator_id, k.member_state_id, k.year, k.value
+    FROM (
+        SELECT DISTINCT ON (u.indicator_id, u.member_state_id, u.year)
+               u.indicator_id, u.member_state_id, u.year, u.value, u.dropped
+        FROM (
+            SELECT d.indicator_id, d.member_state_id, d.year, d.old_value AS value,
+                   d.op = 'I' AS dropped, dv.publish_seq AS s
+            FROM value_deltas d
+            JOIN data_versions dv ON dv.id = d.data_version_id
+            WHERE dv.publish_seq > v_seq
+              AND (v_checkpoint IS NULL OR dv.publish_seq <= v_checkpoint_seq)
+              AND (p_indicator_id IS NULL OR d.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR d.member_state_id = p_member_state_id)
+            UNION ALL
+            SELECT c.indicator_id, c.member_state_id, c.year, c.value, FALSE, 2147483647
+            FROM value_checkpoints c
+            WHERE v_checkpoint IS NOT NULL AND c.data_version_id = v_checkpoint
+              AND (p_indicator_id IS NULL OR c.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR c.member_state_id = p_member_state_id)
+            UNION ALL
+            SELECT iv.indicator_id, iv.member_state_id, iv.year, iv.value, FALSE, 2147483647
+            FROM indicator_values iv
+            WHERE v_checkpoint IS NULL
+              AND (p_indicator_id IS NULL OR iv.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR iv.member_state_id = p_member_state_id)
+        ) u
+        ORDER BY u.indicator_id, u.member_state_id, u.year, u.s ASC
+    ) k
+    WHERE NOT k.dropped
+    ORDER BY k.indicator_id, k.member_state_id, k.year;
+END;
+$$;
+
+-- Cells that differ between two published versions (p_from published before p_to)
+CREATE OR REPLACE FUNCTION data_version_diff(p_from INTEGER, p_to INTEGER)
+RETURNS TABLE (
+    indicator_id INTEGER, member_state_id INTEGER, year INTEGER,
+    from_value NUMERIC, to_value NUMERIC, is_new BOOLEAN
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH span AS (
+        SELECT d.indicator_id, d.member_state_id, d.year, d.op, d.old_value, d.new_value, dv.publish_seq AS s
+        FROM value_deltas d
+        JOIN data_versions dv ON dv.id = d.data_version_id
+        WHERE dv.publish_seq > data_version_seq(p_from) AND dv.publish_seq <= data_version_seq(p_to)
+    )
+    SELECT f.indicator_id, f.member_state_id, f.year, f.old_value, l.new_value, f.op = 'I'
+    FROM (
+        SELECT DISTINCT ON (indicator_id, member_state_id, year)
+               indicator_id, member_state_id, year, op, old_value
+        FROM span
+        ORDER BY indicator_id, member_state_id, year, s ASC
+    ) f
+    JOIN (
+        SELECT DISTINCT ON (indicator_id, member_state_id, year)
+               indicator_id, member_state_id, year, new_value
+        FROM span
+        ORDER BY indicator_id, member_state_id, year, s DESC
+    ) l USING (indicator_id, member_state_id, year)
+    WHERE f.op = 'I' OR f.old_value IS DISTINCT FROM l.new_value
+    ORDER BY f.indicator_id, f.member_state_id, f.year;
+$$;
@@ -0,0 +1,7 @@
+-- ============================================================
+-- Run Sources — the connectors an ETL run was limited to, so every
+-- shard of a sharded run extracts from the same sources
+-- ============================================================
+
+-- NULL = every active source with a registered connector
+ALTER TABLE etl_runs ADD COLUMN IF NOT EXISTS source_names TEXT[];
@@ -0,0 +1,13 @@
+-- ============================================================
+-- Version Analyses — when a data version's trend tests, anomaly
+-- flags and projections were stored, so an insight refresh of a
+-- version that already has them does not rewrite them
+-- ============================================================
+
+ALTER TABLE data_versions ADD COLUMN IF NOT EXISTS analyses_stored_at TIMESTAMPTZ;
+
+-- Versions that already have stored results
+UPDATE data_versions v
+SET analyses_stored_at = NOW()
+WHERE analyses_stored_at IS NULL
+  AND EXISTS (SELECT 1 FROM series_trends t WHERE t.data_version_id = v.id);
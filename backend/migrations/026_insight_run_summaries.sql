@@ -0,0 +1,145 @@
+-- ============================================================
+-- Insight Run Summaries — written when a batch is published, so
+-- every run has its counts from the start; archiving only records
+-- how many of a run's rows have since been moved to the archive
+-- ============================================================
+
+ALTER TABLE insight_run_summaries ADD COLUMN IF NOT EXISTS archived INTEGER NOT NULL DEFAULT 0;
+
+-- Summaries written by 012 counted archived rows only
+UPDATE insight_run_summaries SET archived = insights WHERE archived = 0;
+
+-- Runs whose rows are still in the live table
+INSERT INTO insight_run_summaries AS s (
+    batch_id, type, severity, etl_run_id, insights, first_generated_at, last_generated_at
+)
+SELECT COALESCE(batch_id, 'legacy'), type, severity, MAX(etl_run_id), COUNT(*),
+       MIN(generated_at), MAX(generated_at)
+FROM insights
+GROUP BY COALESCE(batch_id, 'legacy'), type, severity
+ON CONFLICT (batch_id, type, severity) DO UPDATE SET
+    insights = s.insights + EXCLUDED.insights,
+    etl_run_id = COALESCE(s.etl_run_id, EXCLUDED.etl_run_id),
+    first_generated_at = LEAST(s.first_generated_at, EXCLUDED.first_generated_at),
+    last_generated_at = GREATEST(s.last_generated_at, EXCLUDED.last_generated_at);
+
+CREATE INDEX IF NOT EXISTS idx_insight_run_summaries_generated ON insight_run_summaries(last_generated_at DESC);
+
+-- Publish as in 011, and record what the batch produced (unchanged insights
+-- included) per type and severity
+CREATE OR REPLACE FUNCTION publish_insight_batch(p_batch_id TEXT, p_insights JSONB, p_generators TEXT[] DEFAULT NULL)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_fingerprints TEXT[];
+    v_retired INTEGER;
+    v_inserted INTEGER;
+BEGIN
+    PERFORM 1 FROM data_state WHERE id FOR UPDATE;
+
+    SELECT COALESCE(array_agg(DISTINCT e->>'fingerprint'), '{}')
+    INTO v_fingerprints
+    FROM jsonb_array_elements(COALESCE(p_insights, '[]'::jsonb)) AS e;
+
+    UPDATE insights SET is_active = FALSE
+    WHERE is_active
+      AND (p_generators IS NULL OR generator = ANY(p_generators))
+      AND (fingerprint IS NULL OR NOT (fingerprint = ANY(v_fingerprints)));
+    GET DIAGNOSTICS v_retired = ROW_COUNT;
+
+    INSERT INTO insights (
+        type, severity, title, description, evidence, goal_id, indicator_id,
+        member_state_id, region_id, generated_at, etl_run_id, is_active,
+        included_in_report, batch_id, generator, fingerprint
+    )
+    SELECT DISTINCT ON (r.fingerprint)
+           r.type, r.severity, r.title, r.description, r.evidence, r.goal_id, r.indicator_id,
+           r.member_state_id, r.region_id, COALESCE(r.generated_at, NOW()), r.etl_run_id, TRUE,
+           FALSE, p_batch_id, r.generator, r.fingerprint
+    FROM jsonb_to_recordset(COALESCE(p_insights, '[]'::jsonb)) AS r(
+        type TEXT, severity TEXT, title TEXT, description TEXT, evidence JSONB,
+        goal_id INTEGER, indicator_id INTEGER, member_state_id INTEGER, region_id INTEGER,
+        generated_at TIMESTAMPTZ, etl_run_id INTEGER, generator TEXT, fingerprint TEXT
+    )
+    WHERE NOT EXISTS (
+        SELECT 1 FROM insights i WHERE i.is_active AND i.fingerprint = r.fingerprint
+    )
+    ORDER BY r.fingerprint;
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    INSERT INTO insight_run_summaries AS s (
+        batch_id, type, severity, etl_run_id, insights, first_generated_at, last_generated_at
+    )
+    SELECT p_batch_id, b.type, b.severity, MAX(b.etl_run_id), COUNT(*),
+           MIN(b.generated_at), MAX(b.generated_at)
+    FROM (
+        SELECT DISTINCT ON (r.fingerprint)
+               r.type, r.severity, r.etl_run_id, COALESCE(r.generated_at, NOW()) AS generated_at
+        FROM jsonb_to_recordset(COALESCE(p_insights, '[]'::jsonb)) AS r(
+            type TEXT, severity TEXT, etl_run_id INTEGER, generated_at TIMESTAMPTZ, fingerprint TEXT
+        )
+        ORDER BY r.fingerprint
+    ) b
+    GROUP BY b.type, b.severity
+    ON CONFLICT (batch_id, type, severity) DO UPDATE SET
+        insights = s.insights + EXCLUDED.insights,
+        etl_run_id = COALESCE(s.etl_run_id, EXCLUDED.etl_run_id),
+        first_generated_at = LEAST(s.first_generated_at, EXCLUDED.first_generated_at),
+        last_generated_at = GREATEST(s.last_generated_at, EXCLUDED.last_generated_at);
+
+    IF v_inserted > 0 OR v_retired > 0 THEN
+        UPDATE data_state SET insights_batch_id = p_batch_id, updated_at = NOW() WHERE id;
+    END IF;
+
+    RETURN json_build_object(
+        'inserted', v_inserted,
+        'unchanged', cardinality(v_fingerprints) - v_inserted,
+        'retired', v_retired
+    );
+END;
+$$;
+
+-- Archive as in 012; the moved rows only bump the archived count of the
+-- summary their batch wrote at publish
+CREATE OR REPLACE FUNCTION archive_insights(p_cutoff TIMESTAMPTZ, p_batch_size INTEGER DEFAULT 5000)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    WITH candidates AS (
+        SELECT id FROM insights
+        WHERE NOT is_active AND generated_at < p_cutoff
+        ORDER BY generated_at
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    ), moved AS (
+        DELETE FROM insights i USING candidates c
+        WHERE i.id = c.id
+        RETURNING i.*
+    ), archived AS (
+        INSERT INTO insights_archive (
+            id, type, severity, title, evidence, goal_id, indicator_id, member_state_id,
+            region_id, generator, fingerprint, batch_id, etl_run_id, generated_at
+        )
+        SELECT id, type, severity, title, evidence, goal_id, indicator_id, member_state_id,
+               region_id, generator, fingerprint, batch_id, etl_run_id, generated_at
+        FROM moved
+        ON CONFLICT (id) DO NOTHING
+    ), summarized AS (
+        UPDATE insight_run_summaries s
+        SET archived = s.archived + m.moved
+        FROM (
+            SELECT COALESCE(batch_id, 'legacy') AS batch_id, type, severity, COUNT(*) AS moved
+            FROM moved
+            GROUP BY COALESCE(batch_id, 'legacy'), type, severity
+        ) m
+        WHERE s.batch_id = m.batch_id AND s.type = m.type AND s.severity = m.severity
+    )
+    SELECT COUNT(*) INTO v_count FROM moved;
+
+    RETURN v_count;
+END;
+$$;
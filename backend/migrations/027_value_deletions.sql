@@ -0,0 +1,234 @@
+-- ============================================================
+-- Value Deletions — a version can remove estimated cells that no
+-- longer qualify, recorded in history like any other change
+-- ============================================================
+
+-- Staged row that removes its cell instead of writing it
+ALTER TABLE indicator_values_staging ADD COLUMN IF NOT EXISTS deleted BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- D = cell removed (old_value kept, new_value NULL)
+ALTER TABLE value_deltas DROP CONSTRAINT IF EXISTS value_deltas_op_check;
+ALTER TABLE value_deltas ADD CONSTRAINT value_deltas_op_check CHECK (op IN ('I', 'U', 'D'));
+
+-- Publish as in 023, then apply staged deletions. A deletion only removes a
+-- cell that is still an estimate, so it can never take out a reported value.
+CREATE OR REPLACE FUNCTION publish_data_version(p_version_id INTEGER, p_checkpoint_interval INTEGER DEFAULT 20)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_changed INTEGER;
+    v_deleted INTEGER;
+    v_since_checkpoint INTEGER;
+    v_seq INTEGER;
+BEGIN
+    PERFORM 1 FROM data_state WHERE id FOR UPDATE;
+
+    SELECT COALESCE(MAX(publish_seq), 0) + 1 INTO v_seq FROM data_versions;
+
+    UPDATE data_versions SET status = 'published', published_at = NOW(), publish_seq = v_seq
+    WHERE id = p_version_id AND status = 'staging';
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'data version % is not staged', p_version_id;
+    END IF;
+
+    INSERT INTO value_deltas (data_version_id, indicator_id, member_state_id, year, op, old_value, new_value)
+    SELECT p_version_id, s.indicator_id, s.member_state_id, s.year,
+           CASE WHEN iv.id IS NULL THEN 'I' ELSE 'U' END, iv.value, s.value
+    FROM indicator_values_staging s
+    LEFT JOIN indicator_values iv
+      ON iv.indicator_id = s.indicator_id
+     AND iv.member_state_id = s.member_state_id
+     AND iv.year = s.year
+    LEFT JOIN data_sources cur ON cur.id = iv.data_source_id
+    LEFT JOIN data_sources inc ON inc.id = s.data_source_id
+    WHERE s.data_version_id = p_version_id
+      AND NOT s.deleted
+      AND (iv.id IS NULL OR iv.value IS DISTINCT FROM s.value OR iv.data_quality IS DISTINCT FROM s.data_quality
+           OR iv.data_source_id IS DISTINCT FROM s.data_source_id)
+      AND NOT (cur.id IS NOT NULL AND inc.id IS NOT NULL AND cur.priority < inc.priority)
+      AND NOT (s.data_quality = 'estimated' AND iv.id IS NOT NULL AND iv.data_quality IS DISTINCT FROM 'estimated');
+    GET DIAGNOSTICS v_changed = ROW_COUNT;
+
+    INSERT INTO value_deltas (data_version_id, indicator_id, member_state_id, year, op, old_value, new_value)
+    SELECT p_version_id, iv.indicator_id, iv.member_state_id, iv.year, 'D', iv.value, NULL
+    FROM indicator_values_staging s
+    JOIN indicator_values iv
+      ON iv.indicator_id = s.indicator_id
+     AND iv.member_state_id = s.member_state_id
+     AND iv.year = s.year
+    WHERE s.data_version_id = p_version_id
+      AND s.deleted
+      AND iv.data_quality = 'estimated';
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+
+    INSERT INTO indicator_values (indicator_id, member_state_id, year, value, data_quality, source_detail, data_source_id)
+    SELECT s.indicator_id, s.member_state_id, s.year, s.value, s.data_quality, s.source_detail, s.data_source_id
+    FROM indicator_values_staging s
+    JOIN value_deltas d
+      ON d.data_version_id = p_version_id
+     AND d.indicator_id = s.indicator_id
+     AND d.member_state_id = s.member_state_id
+     AND d.year = s.year
+    WHERE s.data_version_id = p_version_id
+      AND d.op <> 'D'
+    ON CONFLICT (indicator_id, member_state_id, year) DO UPDATE
+    SET value = EXCLUDED.value,
+        data_quality = EXCLUDED.data_quality,
+        source_detail = EXCLUDED.source_detail,
+        data_source_id = EXCLUDED.data_source_id;
+
+    DELETE FROM indicator_values iv
+    USING value_deltas d
+    WHERE d.data_version_id = p_version_id
+      AND d.op = 'D'
+      AND iv.indicator_id = d.indicator_id
+      AND iv.member_state_id = d.member_state_id
+      AND iv.year = d.year;
+
+    DELETE FROM indicator_values_staging WHERE data_version_id = p_version_id;
+
+    SELECT COUNT(*) INTO v_since_checkpoint
+    FROM data_versions
+    WHERE status = 'published'
+      AND publish_seq > COALESCE((SELECT MAX(publish_seq) FROM data_versions WHERE is_checkpoint), 0);
+
+    IF v_since_checkpoint >= p_checkpoint_interval
+       OR NOT EXISTS (SELECT 1 FROM data_versions WHERE is_checkpoint) THEN
+        INSERT INTO value_checkpoints (data_version_id, indicator_id, member_state_id, year, value)
+        SELECT p_version_id, indicator_id, member_state_id, year, value FROM indicator_values;
+        UPDATE data_versions SET is_checkpoint = TRUE WHERE id = p_version_id;
+    END IF;
+
+    UPDATE data_versions SET records_published = v_changed, records_changed = v_changed + v_deleted
+    WHERE id = p_version_id;
+    UPDATE data_state SET published_version_id = p_version_id, updated_at = NOW() WHERE id;
+
+    RETURN v_changed + v_deleted;
+END;
+$$;
+
+-- As in 023; a cell whose newest delta up to the version is a deletion is left out
+CREATE OR REPLACE FUNCTION indicator_values_as_of(
+    p_version_id INTEGER,
+    p_indicator_id INTEGER DEFAULT NULL,
+    p_member_state_id INTEGER DEFAULT NULL
+)
+RETURNS TABLE (indicator_id INTEGER, member_state_id INTEGER, year INTEGER, value NUMERIC)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_seq INTEGER := data_version_seq(p_version_id);
+    v_checkpoint INTEGER;
+    v_checkpoint_seq INTEGER;
+BEGIN
+    SELECT id, publish_seq INTO v_checkpoint, v_checkpoint_seq
+    FROM data_versions WHERE is_checkpoint AND publish_seq <= v_seq
+    ORDER BY publish_seq DESC LIMIT 1;
+
+    IF v_checkpoint IS NOT NULL THEN
+        -- Forward: checkpoint, then the newest delta per cell up to the version
+        RETURN QUERY
+        SELECT k.indicator_id, k.member_state_id, k.year, k.value
+        FROM (
+            SELECT DISTINCT ON (u.indicator_id, u.member_state_id, u.year)
+                   u.indicator_id, u.member_state_id, u.year, u.value, u.dropped
+            FROM (
+                SELECT c.indicator_id, c.member_state_id, c.year, c.value, FALSE AS dropped, v_checkpoint_seq AS s
+                FROM value_checkpoints c
+                WHERE c.data_version_id = v_checkpoint
+                  AND (p_indicator_id IS NULL OR c.indicator_id = p_indicator_id)
+                  AND (p_member_state_id IS NULL OR c.member_state_id = p_member_state_id)
+                UNION ALL
+                SELECT d.indicator_id, d.member_state_id, d.year, d.new_value, d.op = 'D', dv.publish_seq
+                FROM value_deltas d
+                JOIN data_versions dv ON dv.id = d.data_version_id
+                WHERE dv.publish_seq > v_checkpoint_seq AND dv.publish_seq <= v_seq
+                  AND (p_indicator_id IS NULL OR d.indicator_id = p_indicator_id)
+                  AND (p_member_state_id IS NULL OR d.member_state_id = p_member_state_id)
+            ) u
+            ORDER BY u.indicator_id, u.member_state_id, u.year, u.s DESC
+        ) k
+        WHERE NOT k.dropped
+        ORDER BY k.indicator_id, k.member_state_id, k.year;
+        RETURN;
+    END IF;
+
+    -- Backward: next checkpoint (or the live table), undoing the oldest delta
+    -- per cell made after the version. Cells first inserted later are dropped;
+    -- cells deleted later come back with their old value.
+    SELECT id, publish_seq INTO v_checkpoint, v_checkpoint_seq
+    FROM data_versions WHERE is_checkpoint AND publish_seq > v_seq
+    ORDER BY publish_seq ASC LIMIT 1;
+
+    RETURN QUERY
+    SELECT k.indicator_id, k.member_state_id, k.year, k.value
+    FROM (
+        SELECT DISTINCT ON (u.indicator_id, u.member_state_id, u.year)
+               u.indicator_id, u.member_state_id, u.year, u.value, u.dropped
+        FROM (
+            SELECT d.indicator_id, d.member_state_id, d.year, d.old_value AS value,
+                   d.op = 'I' AS dropped, dv.publish_seq AS s
+            FROM value_deltas d
+            JOIN data_versions dv ON dv.id = d.data_version_id
+            WHERE dv.publish_seq > v_seq
+              AND (v_checkpoint IS NULL OR dv.publish_seq <= v_checkpoint_seq)
+              AND (p_indicator_id IS NULL OR d.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR d.member_state_id = p_member_state_id)
+            UNION ALL
+            SELECT c.indicator_id, c.member_state_id, c.year, c.value, FALSE, 2147483647
+            FROM value_checkpoints c
+            WHERE v_checkpoint IS NOT NULL AND c.data_version_id = v_checkpoint
+              AND (p_indicator_id IS NULL OR c.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR c.member_state_id = p_member_state_id)
+            UNION ALL
+            SELECT iv.indicator_id, iv.member_state_id, iv.year, iv.value, FALSE, 2147483647
+            FROM indicator_values iv
+            WHERE v_checkpoint IS NULL
+              AND (p_indicator_id IS NULL OR iv.indicator_id = p_indicator_id)
+              AND (p_member_state_id IS NULL OR iv.member_state_id = p_member_state_id)
+        ) u
+        ORDER BY u.indicator_id, u.member_state_id, u.year, u.s ASC
+    ) k
+    WHERE NOT k.dropped
+    ORDER BY k.indicator_id, k.member_state_id, k.year;
+END;
+$$;
+
+-- As in 023, with deleted cells: `is_deleted` when the cell existed at p_from
+-- but not at p_to. Cells added and removed in between are left out.
+DROP FUNCTION IF EXISTS data_version_diff(INTEGER, INTEGER);
+
+CREATE OR REPLACE FUNCTION data_version_diff(p_from INTEGER, p_to INTEGER)
+RETURNS TABLE (
+    indicator_id INTEGER, member_state_id INTEGER, year INTEGER,
+    from_value NUMERIC, to_value NUMERIC, is_new BOOLEAN, is_deleted BOOLEAN
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH span AS (
+        SELECT d.indicator_id, d.member_state_id, d.year, d.op, d.old_value, d.new_value, dv.publish_seq AS s
+        FROM value_deltas d
+        JOIN data_versions dv ON dv.id = d.data_version_id
+        WHERE dv.publish_seq > data_version_seq(p_from) AND dv.publish_seq <= data_version_seq(p_to)
+    )
+    SELECT f.indicator_id, f.member_state_id, f.year, f.old_value, l.new_value,
+           f.op = 'I', l.op = 'D'
+    FROM (
+        SELECT DISTINCT ON (indicator_id, member_state_id, year)
+               indicator_id, member_state_id, year, op, old_value
+        FROM span
+        ORDER BY indicator_id, member_state_id, year, s ASC
+    ) f
+    JOIN (
+        SELECT DISTINCT ON (indicator_id, member_state_id, year)
+               indicator_id, member_state_id, year, op, new_value
+        FROM span
+        ORDER BY indicator_id, member_state_id, year, s DESC
+    ) l USING (indicator_id, member_state_id, year)
+    WHERE (f.op = 'I') <> (l.op = 'D')
+       OR (f.op <> 'I' AND l.op <> 'D' AND f.old_value IS DISTINCT FROM l.new_value)
+    ORDER BY f.indicator_id, f.member_state_id, f.year;
+$$;
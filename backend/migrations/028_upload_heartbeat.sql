@@ -0,0 +1,21 @@
+-- ============================================================
+-- Upload Heartbeat — upload jobs and ledger entries are touched
+-- after every staged chunk, so only uploads whose process stopped
+-- touching them are failed as stale, however long a live one runs
+-- ============================================================
+
+ALTER TABLE upload_jobs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE upload_ledger ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+
+-- Existing rows last moved when they finished, started or were created
+UPDATE upload_jobs SET updated_at = COALESCE(finished_at, started_at, created_at) WHERE updated_at IS NULL;
+UPDATE upload_ledger SET updated_at = COALESCE(finished_at, created_at) WHERE updated_at IS NULL;
+
+ALTER TABLE upload_jobs ALTER COLUMN updated_at SET DEFAULT NOW();
+ALTER TABLE upload_ledger ALTER COLUMN updated_at SET DEFAULT NOW();
+
+-- The sweep looks for unfinished uploads that stopped beating
+CREATE INDEX IF NOT EXISTS idx_upload_jobs_unfinished
+    ON upload_jobs(updated_at) WHERE status IN ('queued', 'parsing', 'publishing');
+CREATE INDEX IF NOT EXISTS idx_upload_ledger_processing
+    ON upload_ledger(updated_at) WHERE status = 'processing';
@@ -0,0 +1,8 @@
+-- ============================================================
+-- Finalize Lease Owner — the worker finishing a closed run is
+-- recorded with its lease, so it can renew the lease for as long
+-- as publishing and the post-run work take, and notice if the run
+-- was handed to another worker after all
+-- ============================================================
+
+ALTER TABLE etl_runs ADD COLUMN IF NOT EXISTS finalize_lease_owner TEXT;
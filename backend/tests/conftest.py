@@ -0,0 +1,74 @@
+"""
+Shared fixtures: settings for an offline run, and a local stand-in server
+that answers for the World Bank, UN SDG and AfDB APIs.
+
+Run from backend/ with:
+
+    python -m pytest -q tests
+"""
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+
+
+class StandIn:
+    """
+    What the stand-in server serves: `routes` maps a path prefix to a handler
+    `(path, params) -> (status, body)`. Every request is recorded in `requests`.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.url = ""
+
+    def route(self, prefix: str, handler):
+        self.routes[prefix] = handler
+
+    def hits(self, prefix: str) -> list[tuple[str, dict]]:
+        return [(path, params) for path, params in self.requests if path.startswith(prefix)]
+
+
+@pytest.fixture
+def stand_in():
+    state = StandIn()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            params = parse_qs(parsed.query)
+            state.requests.append((parsed.path, params))
+            for prefix, handler in state.routes.items():
+                if parsed.path.startswith(prefix):
+                    status, body = handler(parsed.path, params)
+                    break
+            else:
+                status, body = 404, {"message": "no such route"}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    state.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield state
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,78 @@
+"""Robust z-scores and anomaly flags on small hand-built panels."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.anomaly_detection import (
+    MIN_RELATIVE_SCALE,
+    Z_THRESHOLD,
+    detect_anomalies,
+    robust_z,
+    scale_factor,
+)
+
+
+def panel(series: dict[tuple[int, int], list[float]], first_year: int = 2000) -> pd.DataFrame:
+    """(indicator_id, member_state_id) -> yearly values as an indicator_values frame."""
+    return pd.DataFrame([
+        {"indicator_id": ind, "member_state_id": ms, "year": first_year + i, "value": v}
+        for (ind, ms), values in series.items()
+        for i, v in enumerate(values)
+    ])
+
+
+def test_near_constant_series_is_not_flagged():
+    # 100.0 every year but one reading of 99.9: rounding, not an outlier
+    values = [100.0] * 15
+    values[10] = 99.9
+
+    flags = detect_anomalies(panel({(1, 1): values}), {1: None})
+
+    assert flags.empty
+
+
+def test_level_floor_applies_to_residuals():
+    residuals = np.array([[0.0] * 10 + [-0.1] + [0.0] * 4])
+
+    unfloored = robust_z(residuals, detrended=True)
+    floored = robust_z(residuals, detrended=True, level=np.array([100.0]))
+
+    assert abs(unfloored[0, 10]) > Z_THRESHOLD
+    # Scale is at least 1% of the level of 100, so -0.1 is a tenth of it
+    assert floored[0, 10] == pytest.approx(-0.1 / (MIN_RELATIVE_SCALE * 100))
+
+
+def test_clear_break_in_a_trending_series_is_flagged():
+    rng = np.random.default_rng(3)
+    values = list(50 + 2.0 * np.arange(20) + rng.normal(0, 0.5, 20))
+    values[12] += 25
+
+    flags = detect_anomalies(panel({(1, 1): values}), {1: None})
+
+    assert flags[["flag_type", "year"]].values.tolist() == [["history_outlier", 2012]]
+    assert flags["score"].iloc[0] > Z_THRESHOLD
+
+
+def test_too_short_history_gives_no_score():
+    assert np.isnan(robust_z(np.array([[1.0, 2.0, 3.0, 50.0]]))).all()
+
+
+@pytest.mark.parametrize("count, detrended, expected", [
+    (4, False, 10.89),
+    (10, False, 2.51),
+    (10, True, 3.58),
+    (30, True, 1.4),
+    (60, False, 1.15),
+    (2, False, 10.89),           # below the table: its first entry
+    (120, False, 1 + 0.15 / 2),  # past the table: decays as 1/n
+])
+def test_small_sample_factors(count, detrended, expected):
+    assert float(scale_factor(np.array(count), detrended)) == pytest.approx(expected)
+
+
+def test_small_sample_factor_keeps_clean_data_near_nominal_rate():
+    rng = np.random.default_rng(0)
+    z = robust_z(rng.normal(size=(20_000, 12)), min_count=4)
+
+    assert np.mean(np.abs(z) > Z_THRESHOLD) < 0.002
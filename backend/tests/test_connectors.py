@@ -0,0 +1,174 @@
+"""Source connectors against local stand-ins for each API: paging, parsing and errors."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.connectors.afdb import AfDBConnector
+from app.services.connectors.base import RateLimiter
+from app.services.connectors.registry import extract_all
+from app.services.connectors.un_sdg import UNSDGConnector
+from app.services.connectors.world_bank import WorldBankConnector
+
+
+def source(stand_in, connector: str, source_id: int, priority: int = 100) -> dict:
+    return {
+        "id": source_id,
+        "name": connector,
+        "api_url": f"{stand_in.url}/{connector}",
+        "connector": connector,
+        "priority": priority,
+        "rate_limit_per_sec": 1000,
+        "max_concurrency": 4,
+    }
+
+
+def extract(connector_cls, src: dict, indicator_code: str, countries: list[str], start_year=2000, end_year=2024):
+    async def _run():
+        async with httpx.AsyncClient(timeout=5) as client:
+            connector = connector_cls(src, client, RateLimiter(1000, burst=10))
+            return await connector.extract(indicator_code, countries, start_year, end_year)
+
+    return asyncio.run(_run())
+
+
+def world_bank_pages(path, params):
+    """Two pages; page 2 has a null value and a year outside the requested range."""
+    page = int(params["page"][0])
+    countries = path.split("/")[3].split(";")
+    if page == 1:
+        rows = [
+            {"countryiso3code": "NGA", "country": {"id": c}, "date": "2020", "value": 10.0 + i}
+            for i, c in enumerate(countries)
+        ]
+    else:
+        rows = [
+            {"countryiso3code": "NGA", "country": {"id": countries[0]}, "date": "2021", "value": None},
+            {"countryiso3code": "NGA", "country": {"id": countries[0]}, "date": "1990", "value": 1.0},
+            {"countryiso3code": "NGA", "country": {"id": countries[0]}, "date": "2022", "value": 12.5},
+        ]
+    return 200, [{"page": page, "pages": 2}, rows]
+
+
+def un_sdg_pages(path, params):
+    """Three pages; only the headline (all-population) series is kept."""
+    page = int(params["page"][0])
+    series = params["seriesCode"][0]
+    rows = {
+        1: [
+            {"series": series, "geoAreaCode": "566", "timePeriodStart": 2019.0, "value": "20", "dimensions": {"Sex": "BOTHSEX"}},
+            {"series": series, "geoAreaCode": "566", "timePeriodStart": 2019.0, "value": "99", "dimensions": {"Sex": "FEMALE"}},
+        ],
+        2: [
+            {"series": series, "geoAreaCode": "404", "timePeriodStart": 2020.0, "value": "NaN", "dimensions": {}},
+            {"series": series, "geoAreaCode": "999", "timePeriodStart": 2020.0, "value": "5", "dimensions": {}},
+        ],
+        3: [
+            {"series": series, "geoAreaCode": "404", "timePeriodStart": 2021.0, "value": "21.5", "dimensions": {}},
+        ],
+    }[page]
+    return 200, {"totalPages": 3, "data": rows}
+
+
+def afdb_pages(path, params):
+    page = int(params["page"][0])
+    rows = [{"country": "KEN", "period": f"{2015 + page}", "value": page * 1.5, "indicator": params["indicator"][0]}]
+    if page == 2:
+        rows.append({"country": "KEN", "period": "n/a", "value": 3, "indicator": params["indicator"][0]})
+    return 200, {"pages": 2, "data": rows}
+
+
+def test_world_bank_walks_every_page(stand_in):
+    stand_in.route("/world_bank/", world_bank_pages)
+
+    records = extract(WorldBankConnector, source(stand_in, "world_bank", 1), "NY.GDP.PCAP.CD", ["NG", "KE"])
+
+    assert [p["page"] for _, p in stand_in.hits("/world_bank/")] == [["1"], ["2"]]
+    assert all(p["date"] == ["2000:2024"] for _, p in stand_in.hits("/world_bank/"))
+    assert sorted((r["country_iso2"], r["year"], r["value"]) for r in records) == [
+        ("KE", 2020, 11.0), ("NG", 2020, 10.0), ("NG", 2022, 12.5),
+    ]
+    assert all(r["indicator_code"] == "NY.GDP.PCAP.CD" for r in records)
+
+
+def test_un_sdg_maps_codes_and_keeps_headline_series(stand_in):
+    stand_in.route("/un_sdg/", un_sdg_pages)
+
+    records = extract(UNSDGConnector, source(stand_in, "un_sdg", 2), "SH.STA.MMRT", ["NG", "KE"])
+
+    hits = stand_in.hits("/un_sdg/")
+    assert [p["page"] for _, p in hits] == [["1"], ["2"], ["3"]]
+    assert hits[0][1]["seriesCode"] == ["SH_STA_MORT"]
+    assert hits[0][1]["areaCode"] == ["566", "404"]
+    assert sorted((r["country_iso2"], r["year"], r["value"]) for r in records) == [("KE", 2021, 21.5), ("NG", 2019, 20.0)]
+
+
+def test_afdb_pages_and_drops_unparseable_rows(stand_in):
+    stand_in.route("/afdb/", afdb_pages)
+
+    records = extract(AfDBConnector, source(stand_in, "afdb", 3), "NY.GDP.PCAP.CD", ["KE"])
+
+    hits = stand_in.hits("/afdb/data/AFDBSEI")
+    assert [p["page"] for _, p in hits] == [["1"], ["2"]]
+    assert hits[0][1]["country"] == ["KEN"] and hits[0][1]["indicator"] == ["GDP_PC_USD"]
+    assert sorted((r["country_iso"], r["year"], r["value"]) for r in records) == [("KEN", 2016, 1.5), ("KEN", 2017, 3.0)]
+
+
+def test_unmapped_indicator_makes_no_request(stand_in):
+    stand_in.route("/afdb/", afdb_pages)
+
+    assert extract(AfDBConnector, source(stand_in, "afdb", 3), "SH.STA.MMRT", ["KE"]) == []
+    assert stand_in.requests == []
+
+
+def test_error_on_a_later_page_fails_the_indicator(stand_in):
+    def second_page_fails(path, params):
+        if params["page"] == ["2"]:
+            return 503, {"message": "unavailable"}
+        return world_bank_pages(path, params)
+
+    stand_in.route("/world_bank/", second_page_fails)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        extract(WorldBankConnector, source(stand_in, "world_bank", 1), "NY.GDP.PCAP.CD", ["NG"])
+
+
+def test_extract_all_keeps_other_sources_when_one_fails(stand_in, monkeypatch):
+    monkeypatch.setattr(settings, "ETL_GLOBAL_RATE_PER_SEC", 1000)
+    stand_in.route("/world_bank/", world_bank_pages)
+    stand_in.route("/afdb/", lambda path, params: (500, {"message": "boom"}))
+    stand_in.route("/un_sdg/", un_sdg_pages)
+    sources = [
+        source(stand_in, "world_bank", 1, priority=10),
+        source(stand_in, "un_sdg", 2, priority=20),
+        source(stand_in, "afdb", 3, priority=30),
+    ]
+
+    result = asyncio.run(extract_all(sources, ["NY.GDP.PCAP.CD", "SH.STA.MMRT"], ["NG", "KE"], 2000, 2024))
+
+    gdp = result["records"]["NY.GDP.PCAP.CD"]
+    assert {r["data_source_id"] for r in gdp} == {1}
+    assert all(r["priority"] == 10 and r["source_detail"] == "world_bank (NY.GDP.PCAP.CD)" for r in gdp)
+    assert [e.split(":")[0] for e in result["errors"]["NY.GDP.PCAP.CD"]] == ["afdb"]
+    assert {r["data_source_id"] for r in result["records"]["SH.STA.MMRT"]} == {1, 2}
+    assert result["errors"]["SH.STA.MMRT"] == []
+    assert result["sources"]["afdb"] == {"data_source_id": 3, "records": 0, "errors": 1}
+    assert result["sources"]["un_sdg"]["records"] == 2
+
+
+def test_source_rate_budget_spaces_requests(stand_in):
+    stand_in.route("/un_sdg/", un_sdg_pages)
+    src = {**source(stand_in, "un_sdg", 2), "rate_limit_per_sec": 20}
+
+    async def _run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with httpx.AsyncClient(timeout=5) as client:
+            connector = UNSDGConnector(src, client, RateLimiter(1000, burst=10))
+            await connector.extract("SH.STA.MMRT", ["NG"], 2000, 2024)
+        return loop.time() - started
+
+    # Three pages under a 20/s budget with a burst of one: at least two 50ms waits
+    assert asyncio.run(_run()) >= 0.09
@@ -0,0 +1,103 @@
+"""Per-series year bitsets: counts, gaps and missing years against plain sets of years."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.coverage_index import WORD_BITS, CoverageIndex
+
+WINDOW = (2000, 2023)
+
+
+def frame(rows: list[tuple[int, int, int, float | None]]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["indicator_id", "member_state_id", "year", "value"])
+
+
+@pytest.mark.parametrize("years, count, first_year, bitmap", [
+    # Bit k is first_year + k
+    ([2000, 2002], 2, 2000, "5"),
+    ([2023], 1, 2000, format(1 << 23, "x")),
+    # Backfilled history widens the bitset but not the window's count
+    ([1990, 2000], 1, 1990, format((1 << 10) | 1, "x")),
+    # More than WORD_BITS years: the bitset spans two words
+    ([1930, 2010], 1, 1930, format((1 << 80) | 1, "x")),
+    ([], 0, 2000, "0"),
+])
+def test_single_series(years, count, first_year, bitmap):
+    index = CoverageIndex(frame([(1, 1, y, 1.0) for y in years]), [1], [1], WINDOW)
+
+    assert index.first_year == first_year
+    assert index.years(1, 1) == years
+    assert index.counts()[0, 0] == count
+    assert index.bitmaps() == [[bitmap]]
+    assert len(index.missing_years(1, 1)) == WINDOW[1] - WINDOW[0] + 1 - count
+
+
+def test_two_words_are_laid_out_little_endian():
+    index = CoverageIndex(frame([(1, 1, 1930, 1.0), (1, 1, 1930 + WORD_BITS, 1.0)]), [1], [1], WINDOW)
+
+    assert index._bits.shape[-1] == 2
+    assert index._bits[0, 0].tolist() == [1, 1]
+
+
+def test_missing_values_ids_outside_the_index_and_duplicates():
+    index = CoverageIndex(
+        frame([
+            (1, 1, 2001, 1.0),
+            (1, 1, 2001, 2.0),   # same year twice
+            (1, 1, 2002, None),  # no value
+            (9, 1, 2003, 1.0),   # indicator not indexed
+            (1, 9, 2004, 1.0),   # country not indexed
+        ]),
+        [1, 2], [1, 2], WINDOW,
+    )
+
+    assert index.years(1, 1) == [2001]
+    assert index.years(9, 1) == []
+    assert index.gaps() == [(1, 2), (2, 1), (2, 2)]
+
+
+@pytest.mark.parametrize("first_year, last_year, expected", [
+    (None, None, 100 * 3 / 24),
+    (2000, 2009, 100 * 2 / 10),
+    (2010, 2010, 100.0),
+    (2011, 2011, 0.0),
+])
+def test_coverage_pct_within_a_window(first_year, last_year, expected):
+    index = CoverageIndex(frame([(1, 1, y, 1.0) for y in (2003, 2005, 2010, 2030)]), [1], [1], WINDOW)
+
+    np.testing.assert_allclose(index.coverage_pct(first_year, last_year)[0, 0], expected)
+
+
+def test_matches_sets_of_years():
+    rng = np.random.default_rng(11)
+    n = 3000
+    values = frame(list(zip(
+        rng.integers(1, 6, n).tolist(),
+        rng.integers(1, 9, n).tolist(),
+        rng.integers(1950, 2030, n).tolist(),
+        np.where(rng.random(n) < 0.1, np.nan, 1.0).tolist(),
+    )))
+    index = CoverageIndex(values, range(1, 7), range(1, 10), WINDOW)
+
+    expected = values.dropna().groupby(["indicator_id", "member_state_id"])["year"].apply(set).to_dict()
+    counts = index.counts()
+    for r, ind in enumerate(index.indicator_ids.tolist()):
+        for c, ms in enumerate(index.member_state_ids.tolist()):
+            years = expected.get((ind, ms), set())
+            assert index.years(ind, ms) == sorted(years)
+            assert counts[r, c] == len({y for y in years if WINDOW[0] <= y <= WINDOW[1]})
+    assert set(index.gaps()) == {
+        (ind, ms) for ind in range(1, 7) for ms in range(1, 10) if (ind, ms) not in expected
+    }
+
+
+def test_heatmap_payload():
+    index = CoverageIndex(frame([(2, 5, 2000, 1.0), (1, 5, 2001, 1.0)]), [2, 1], [5], WINDOW)
+
+    heatmap = index.heatmap()
+
+    assert heatmap["indicator_ids"] == [1, 2]
+    assert heatmap["member_state_ids"] == [5]
+    assert heatmap["bitmaps"] == [["2"], ["1"]]
+    assert heatmap["coverage_pct"] == [[4.2], [4.2]]
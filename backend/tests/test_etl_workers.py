@@ -0,0 +1,254 @@
+"""
+Sharded ETL workers: several workers on one run, and leases taken over from a
+dead worker.
+
+The lease tests run against a migrated PostgreSQL database named by
+TEST_DATABASE_URL and are skipped without one.
+"""
+
+import asyncio
+import os
+from unittest import mock
+
+import asyncpg
+import pytest
+
+from app.core import database
+from app.services import etl_workers
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "")
+
+needs_db = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+def run(coro):
+    """Run a test body against the test database, with a fresh pool for its loop."""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await database.close_pg_pool()
+
+    with mock.patch.object(database.settings, "DATABASE_URL", TEST_DATABASE_URL):
+        return asyncio.run(main())
+
+
+async def make_run(shards: int, run_status: str = "running", **shard_fields) -> int:
+    """An etl_runs row with a staged version and `shards` pending shards."""
+    pool = await database.get_pg_pool()
+    async with pool.acquire() as conn:
+        run_id = await conn.fetchval(
+            "INSERT INTO etl_runs (status, shards_total) VALUES ($1, $2) RETURNING id",
+            run_status, shards,
+        )
+        await conn.execute(
+            "INSERT INTO data_versions (etl_run_id, source, status) VALUES ($1, 'etl', 'staging')", run_id,
+        )
+        for i in range(shards):
+            await conn.execute(
+                """
+                INSERT INTO etl_shards (etl_run_id, shard_key, indicator_codes, start_year, end_year,
+                                        status, attempts, lease_owner, lease_expires_at)
+                VALUES ($1, $2, $3, 2000, 2020, $4, $5, $6, $7)
+                """,
+                run_id, f"s{i}", [f"IND.{i}"],
+                shard_fields.get("status", "pending"), shard_fields.get("attempts", 0),
+                shard_fields.get("lease_owner"), shard_fields.get("lease_expires_at"),
+            )
+    return run_id
+
+
+async def drop_run(run_id: int):
+    pool = await database.get_pg_pool()
+    async with pool.acquire() as conn:
+        await conn.execute("DELETE FROM data_versions WHERE etl_run_id = $1", run_id)
+        await conn.execute("DELETE FROM etl_runs WHERE id = $1", run_id)
+
+
+async def fetch_run(run_id: int) -> asyncpg.Record:
+    pool = await database.get_pg_pool()
+    async with pool.acquire() as conn:
+        return await conn.fetchrow("SELECT * FROM etl_runs WHERE id = $1", run_id)
+
+
+async def expire_finalize_lease(run_id: int, owner: str):
+    pool = await database.get_pg_pool()
+    async with pool.acquire() as conn:
+        await conn.execute(
+            """
+            UPDATE etl_runs SET status = 'completed', completed_at = NOW(), finalize_lease_owner = $2,
+                finalize_lease_expires_at = NOW() - INTERVAL '1 second'
+            WHERE id = $1
+            """,
+            run_id, owner,
+        )
+
+
+async def fake_load(indicator_codes, *args):
+    await asyncio.sleep(0.05)
+    return {"records_processed": len(indicator_codes), "records_failed": 0, "errors": []}
+
+
+@needs_db
+def test_two_workers_split_a_run_and_publish_it_once():
+    loaded, published = [], []
+
+    async def load(indicator_codes, *args):
+        loaded.append(indicator_codes[0])
+        return await fake_load(indicator_codes)
+
+    async def publish_run(etl_run_id, status):
+        published.append((etl_run_id, status))
+
+    async def body():
+        run_id = await make_run(6)
+        try:
+            counts = await asyncio.gather(
+                etl_workers.run_worker("worker-a", run_id, exit_when_idle=True),
+                etl_workers.run_worker("worker-b", run_id, exit_when_idle=True),
+            )
+            return run_id, counts, await fetch_run(run_id)
+        finally:
+            await drop_run(run_id)
+
+    with mock.patch.object(etl_workers, "load_indicators", load), \
+         mock.patch.object(etl_workers, "_publish_run", publish_run):
+        run_id, counts, row = run(body())
+
+    assert sorted(loaded) == [f"IND.{i}" for i in range(6)]
+    assert sum(counts) == 6 and all(counts)
+    assert [p for p in published if p[0] == run_id] == [(run_id, "completed")]
+    assert (row["status"], row["shards_completed"], row["records_processed"]) == ("completed", 6, 6)
+
+
+@needs_db
+def test_expired_shard_lease_is_taken_over():
+    async def body():
+        pool = await database.get_pg_pool()
+        async with pool.acquire() as conn:
+            expired = await conn.fetchval("SELECT NOW() - INTERVAL '1 second'")
+        run_id = await make_run(
+            1, status="running", attempts=1, lease_owner="dead", lease_expires_at=expired,
+        )
+        try:
+            shard = await etl_workers.claim_shard("live", run_id)
+            dead_beat = await etl_workers.heartbeat(shard["id"], "dead")
+            result = {"records_processed": 1, "records_failed": 0}
+            dead_done = await etl_workers.complete_shard(shard, "dead", result)
+            live_done = await etl_workers.complete_shard(shard, "live", result)
+            return shard, dead_beat, dead_done, live_done, await fetch_run(run_id)
+        finally:
+            await drop_run(run_id)
+
+    shard, dead_beat, dead_done, live_done, row = run(body())
+
+    assert shard["attempts"] == 2
+    assert dead_beat is False
+    assert dead_done is None
+    assert live_done == "completed"
+    assert (row["shards_completed"], row["finalize_lease_owner"]) == (1, "live")
+
+
+@needs_db
+def test_expired_finalize_lease_is_taken_over():
+    async def body():
+        run_id = await make_run(1)
+        try:
+            await expire_finalize_lease(run_id, "dead")
+            first = await etl_workers.claim_unfinalized_runs("live")
+            second = await etl_workers.claim_unfinalized_runs("other")
+            dead = await etl_workers.renew_finalize_lease(run_id, "dead")
+            live = await etl_workers.renew_finalize_lease(run_id, "live")
+            return run_id, first, second, dead, live
+        finally:
+            await drop_run(run_id)
+
+    run_id, first, second, dead, live = run(body())
+
+    assert (run_id, "completed") in first
+    assert run_id not in [r for r, _ in second]
+    assert (dead, live) == (False, True)
+
+
+@needs_db
+def test_finalize_lease_is_held_through_slow_post_run_work():
+    claims = []
+
+    async def publish_run(etl_run_id, status):
+        await asyncio.sleep(2.5)
+
+    async def body():
+        run_id = await make_run(1)
+        try:
+            await expire_finalize_lease(run_id, "live")
+            assert (run_id, "completed") in await etl_workers.claim_unfinalized_runs("live")
+            finishing = asyncio.create_task(etl_workers._on_run_finished(run_id, "completed", "live"))
+            while not finishing.done():
+                claims.extend(r for r, _ in await etl_workers.claim_unfinalized_runs("other"))
+                await asyncio.sleep(0.3)
+            await finishing
+            return run_id
+        finally:
+            await drop_run(run_id)
+
+    with mock.patch.object(etl_workers, "LEASE_SECONDS", 1), \
+         mock.patch.object(etl_workers, "HEARTBEAT_SECONDS", 0.2), \
+         mock.patch.object(etl_workers, "_publish_run", publish_run):
+        run_id = run(body())
+
+    assert run_id not in claims
+
+
+@needs_db
+def test_finalizer_stops_when_its_run_is_taken_over():
+    stopped = []
+
+    async def publish_run(etl_run_id, status):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            stopped.append(etl_run_id)
+            raise
+
+    async def body():
+        run_id = await make_run(1)
+        try:
+            await expire_finalize_lease(run_id, "live")
+            await etl_workers.claim_unfinalized_runs("live")
+            finishing = asyncio.create_task(etl_workers._on_run_finished(run_id, "completed", "live"))
+            await asyncio.sleep(0.1)
+            pool = await database.get_pg_pool()
+            async with pool.acquire() as conn:
+                await conn.execute("UPDATE etl_runs SET finalize_lease_owner = 'other' WHERE id = $1", run_id)
+            await asyncio.wait_for(finishing, 2)
+            return run_id
+        finally:
+            await drop_run(run_id)
+
+    with mock.patch.object(etl_workers, "HEARTBEAT_SECONDS", 0.2), \
+         mock.patch.object(etl_workers, "_publish_run", publish_run):
+        run_id = run(body())
+
+    assert stopped == [run_id]
+
+
+def test_worker_keeps_going_after_a_failed_iteration():
+    claims = iter([ConnectionError("connection reset"), None])
+
+    async def claim_shard(worker_id, etl_run_id=None):
+        result = next(claims)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def nothing(worker_id):
+        return []
+
+    with mock.patch.object(etl_workers, "claim_shard", claim_shard), \
+         mock.patch.object(etl_workers, "reap_expired_shards", nothing), \
+         mock.patch.object(etl_workers, "claim_unfinalized_runs", nothing), \
+         mock.patch.object(etl_workers, "POLL_SECONDS", 0):
+        processed = asyncio.run(etl_workers.run_worker("worker-a", exit_when_idle=True))
+
+    assert processed == 0
+    assert next(claims, "drained") == "drained"
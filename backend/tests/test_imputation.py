@@ -0,0 +1,167 @@
+"""Gap filling on hand-built panels, and which stored estimates a refresh restages or removes."""
+
+import pandas as pd
+import pytest
+
+from app.services.imputation import ESTIMATE_COLUMNS, estimate_changes, impute
+
+WINDOW = (2000, 2010)
+
+
+def panel(series: dict[int, dict[int, float]]) -> pd.DataFrame:
+    """member_state_id -> {year: value} for indicator 1, as an indicator_values frame."""
+    return pd.DataFrame(
+        [
+            {"indicator_id": 1, "member_state_id": ms, "year": year, "value": value}
+            for ms, values in series.items()
+            for year, value in values.items()
+        ],
+        columns=["indicator_id", "member_state_id", "year", "value"],
+    )
+
+
+def estimated(series: dict[int, dict[int, float]], regions: dict[int, int | None]) -> dict:
+    result = impute(panel(series), regions, WINDOW)
+    return {
+        (r.member_state_id, r.year): (round(r.value, 6), r.method)
+        for r in result.itertuples()
+    }
+
+
+def years(first: int, last: int, value: float) -> dict[int, float]:
+    return {y: value for y in range(first, last + 1)}
+
+
+CASES = {
+    # A straight line across a short gap; nothing after the last report anyone made
+    "interpolated": (
+        {1: {2000: 1.0, 2003: 4.0}},
+        {1: None},
+        {(1, 2001): (2.0, "interpolated"), (1, 2002): (3.0, "interpolated")},
+    ),
+    "longest bridged gap": (
+        {1: {2000: 0.0, 2006: 6.0}},
+        {1: None},
+        {(1, y): (float(y - 2000), "interpolated") for y in range(2001, 2006)},
+    ),
+    # One year too many to bridge: carried forward two years, then nothing without a region
+    "gap too long": (
+        {1: {2000: 1.0, 2007: 8.0}},
+        {1: None},
+        {(1, 2001): (1.0, "carried_forward"), (1, 2002): (1.0, "carried_forward")},
+    ),
+    "carried up to the horizon": (
+        {1: {2000: 5.0, 2001: 5.0, 2002: 6.0}, 2: years(2000, 2006, 1.0)},
+        {1: None, 2: None},
+        {(1, 2003): (6.0, "carried_forward"), (1, 2004): (6.0, "carried_forward")},
+    ),
+    # Regional median (20) plus the country's usual offset from it (+2.5: its own reports
+    # are in the median), once carrying forward runs out
+    "regional median": (
+        {1: {2000: 24.0, 2001: 25.0, 2002: 26.0},
+         2: years(2000, 2005, 10.0), 3: years(2000, 2005, 20.0), 4: years(2000, 2005, 30.0)},
+        {1: 10, 2: 10, 3: 10, 4: 10},
+        {(1, 2003): (26.0, "carried_forward"), (1, 2004): (26.0, "carried_forward"),
+         (1, 2005): (22.5, "regional_median")},
+    ),
+    # A country that never reported gets the median as is
+    "never reported": (
+        {2: years(2000, 2002, 10.0), 3: years(2000, 2002, 20.0), 4: years(2000, 2002, 30.0), 5: {}},
+        {2: 10, 3: 10, 4: 10, 5: 10},
+        {(5, y): (20.0, "regional_median") for y in range(2000, 2003)},
+    ),
+    "too few regional peers": (
+        {1: {2000: 24.0, 2001: 25.0, 2002: 26.0}, 2: years(2000, 2005, 10.0), 3: years(2000, 2005, 20.0)},
+        {1: 10, 2: 10, 3: 10},
+        {(1, 2003): (26.0, "carried_forward"), (1, 2004): (26.0, "carried_forward")},
+    ),
+    # Median 0 with an offset of -10 would be negative; the series never is
+    "floored at zero": (
+        {1: {2000: 0.0, 2001: 0.0, 2002: 0.0},
+         **{ms: {**years(2000, 2004, 10.0), 2005: 0.0} for ms in (2, 3, 4)}},
+        {1: 10, 2: 10, 3: 10, 4: 10},
+        {(1, 2003): (0.0, "carried_forward"), (1, 2004): (0.0, "carried_forward"),
+         (1, 2005): (0.0, "regional_median")},
+    ),
+    # History before the window bridges into it, but only the window is estimated
+    "bridged into the window": (
+        {1: {1995: 1.0, 2001: 7.0}},
+        {1: None},
+        {(1, 2000): (6.0, "interpolated")},
+    ),
+    "reports past the window are ignored": (
+        {1: {2009: 1.0, 2012: 4.0}},
+        {1: None},
+        {},
+    ),
+}
+
+
+@pytest.mark.parametrize("series, regions, expected", CASES.values(), ids=CASES.keys())
+def test_impute(series, regions, expected):
+    assert estimated(series, regions) == expected
+
+
+def test_impute_nothing_reported():
+    result = impute(panel({}), {1: 10}, WINDOW)
+
+    assert result.empty
+    assert list(result.columns) == ESTIMATE_COLUMNS
+
+
+def stored(estimates: pd.DataFrame) -> pd.DataFrame:
+    """Estimates as refresh_estimates reads them back: KEYS and value."""
+    return estimates[["indicator_id", "member_state_id", "year", "value"]].copy()
+
+
+def test_changes_restage_only_new_and_moved_estimates():
+    fresh = pd.DataFrame([
+        {"indicator_id": 1, "member_state_id": 1, "year": 2001, "value": 1.0, "method": "interpolated"},
+        {"indicator_id": 1, "member_state_id": 1, "year": 2002, "value": 2.0, "method": "interpolated"},
+        {"indicator_id": 1, "member_state_id": 1, "year": 2003, "value": 3.0, "method": "carried_forward"},
+    ])
+    current = pd.DataFrame([
+        {"indicator_id": 1, "member_state_id": 1, "year": 2001, "value": 1.0000004},  # within rounding
+        {"indicator_id": 1, "member_state_id": 1, "year": 2002, "value": 2.5},
+    ])
+
+    rows, removed = estimate_changes(fresh, current)
+
+    assert [(r["year"], r["value"], r["source_detail"]) for r in rows] == [
+        (2002, 2.0, "Estimated: interpolated"),
+        (2003, 3.0, "Estimated: carried forward"),
+    ]
+    assert all(r["data_quality"] == "estimated" for r in rows)
+    assert removed == []
+
+
+@pytest.mark.parametrize("before, after, regions, removed", [
+    # The region drops below MIN_REGIONAL_PEERS: country 5's regional estimates go
+    (
+        {2: years(2000, 2002, 10.0), 3: years(2000, 2002, 20.0), 4: years(2000, 2002, 30.0), 5: {}},
+        {2: years(2000, 2002, 10.0), 3: years(2000, 2002, 20.0), 4: {}, 5: {}},
+        {2: 10, 3: 10, 4: 10, 5: 10},
+        [(5, 2000), (5, 2001), (5, 2002)],
+    ),
+    # A report is withdrawn and the gap grows past what is bridged and carried
+    (
+        {1: {2000: 1.0, 2006: 7.0, 2007: 8.0}},
+        {1: {2000: 1.0, 2007: 8.0}},
+        {1: None},
+        [(1, 2003), (1, 2004), (1, 2005)],
+    ),
+])
+def test_changes_remove_estimates_that_no_longer_qualify(before, after, regions, removed):
+    current = stored(impute(panel(before), regions, WINDOW))
+
+    rows, dropped = estimate_changes(impute(panel(after), regions, WINDOW), current)
+
+    assert [(c["member_state_id"], c["year"]) for c in dropped] == removed
+    assert not {(r["member_state_id"], r["year"]) for r in rows} & set(removed)
+
+
+def test_changes_on_an_unchanged_panel_are_empty():
+    series = {1: {2000: 1.0, 2003: 4.0}, 2: years(2000, 2006, 2.0)}
+    current = stored(impute(panel(series), {1: None, 2: None}, WINDOW))
+
+    assert estimate_changes(impute(panel(series), {1: None, 2: None}, WINDOW), current) == ([], [])
@@ -0,0 +1,58 @@
+"""The work after a publish: the stored analyses end up under the version readers see."""
+
+import asyncio
+from unittest import mock
+
+from app.services import post_load
+
+
+class Published:
+    """Stand-in for data_state.published_version_id and the per-version analyses."""
+
+    def __init__(self, version_id: int):
+        self.version_id = version_id
+        self.analyses = set()
+        self.calls = []
+
+
+def run_sequence(state: Published, load_version: int, imputation_version: int | None) -> dict:
+    async def refresh_estimates():
+        state.calls.append("estimates")
+        if imputation_version is not None:
+            state.version_id = imputation_version
+        return {"data_version_id": imputation_version}
+
+    async def refresh_insights_for_version(version_id, etl_run_id=None):
+        state.calls.append(("insights", version_id, etl_run_id))
+        # generate_all_insights stores trends, flags and projections for the snapshot's version
+        state.analyses.add(state.version_id)
+        return {"total": 0}
+
+    async def rescore_version(version_id):
+        state.calls.append(("rescore", version_id))
+        return {"scope": "pairs"}
+
+    with mock.patch.object(post_load, "refresh_estimates", refresh_estimates), \
+         mock.patch.object(post_load, "refresh_insights_for_version", refresh_insights_for_version), \
+         mock.patch.object(post_load, "rescore_version", rescore_version):
+        return asyncio.run(post_load.refresh_after_publish(load_version, etl_run_id=7))
+
+
+def test_analyses_are_stored_for_the_imputation_version_readers_see():
+    state = Published(10)
+
+    result = run_sequence(state, load_version=10, imputation_version=11)
+
+    assert state.calls == ["estimates", ("insights", 10, 7), ("rescore", 10)]
+    assert state.version_id == 11
+    assert state.version_id in state.analyses
+    assert result["estimates"]["data_version_id"] == 11
+
+
+def test_without_new_estimates_analyses_stay_on_the_load_version():
+    state = Published(10)
+
+    run_sequence(state, load_version=10, imputation_version=None)
+
+    assert state.version_id == 10
+    assert state.analyses == {10}
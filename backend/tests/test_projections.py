@@ -0,0 +1,131 @@
+"""Batched line fits, progress toward target and years-to-target on hand-built series."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.projections import FIT_YEARS, MIN_POINTS, fit_lines, goal_progress, progress_pct, project_series
+
+nan = np.nan
+
+
+def series(ind: int, ms: int, first_year: int, values: list[float]) -> list[dict]:
+    return [
+        {"indicator_id": ind, "member_state_id": ms, "year": first_year + k, "value": v}
+        for k, v in enumerate(values)
+    ]
+
+
+@pytest.mark.parametrize("value, target, baseline, inverted, expected", [
+    # Higher is better: the value as a share of the target, capped at 0-100
+    (50, 100, nan, False, 50.0),
+    (150, 100, nan, False, 100.0),
+    (-5, 100, nan, False, 0.0),
+    (10, 0, nan, False, 0.0),
+    # Lower is better: the way from the baseline down to the target
+    (30, 10, 50, True, 50.0),
+    (5, 10, 50, True, 100.0),
+    (60, 10, 50, True, 0.0),
+    # ... from twice the value when there is no baseline
+    (20, 10, nan, True, 100 * 20 / 30),
+    # ... met or missed outright when the baseline is already at or below the target
+    (8, 10, 9, True, 100.0),
+    (12, 10, 9, True, 0.0),
+    (nan, 100, nan, False, nan),
+    (50, nan, nan, False, nan),
+])
+def test_progress_pct(value, target, baseline, inverted, expected):
+    np.testing.assert_allclose(progress_pct(value, target, baseline, inverted), expected)
+
+
+@pytest.mark.parametrize("row, n_points, slope, fitted", [
+    # An exact line: slope 2, fitted value at the last year
+    ([2.0 * k + 1 for k in range(10)], 10, 2.0, 19.0),
+    # Only the last FIT_YEARS years are fitted: the early noise is ignored
+    ([500.0, -300.0, 80.0] + [3.0 * k for k in range(FIT_YEARS)], FIT_YEARS, 3.0, 27.0),
+    # Gaps inside the window are skipped
+    ([nan, 1.0, nan, 3.0, nan, 5.0, nan, nan, nan, 9.0], 4, 1.0, 9.0),
+    # Fewer than MIN_POINTS observations are counted but not fitted
+    ([nan] * 8 + [1.0, 2.0], MIN_POINTS - 1, nan, nan),
+    ([nan] * 10, 0, nan, nan),
+])
+def test_fit_lines(row, n_points, slope, fitted):
+    years = np.arange(2000, 2000 + len(row))
+
+    fit = {k: v[0] for k, v in fit_lines(np.array([row]), years).items()}
+
+    assert fit["n_points"] == n_points
+    np.testing.assert_allclose(fit["slope"], slope)
+    np.testing.assert_allclose(fit["fitted"], fitted)
+
+
+def test_fit_lines_last_year_and_value():
+    fit = fit_lines(np.array([[1.0, 2.0, nan, 4.0, nan], [nan] * 5]), np.arange(2010, 2015))
+
+    np.testing.assert_array_equal(fit["last_year"], [2013, nan])
+    np.testing.assert_array_equal(fit["last_value"], [4.0, nan])
+
+
+INDICATORS = {
+    "RISING": {"id": 1, "goal_id": 1, "target_value": 100, "baseline_value": None},
+    # In INVERTED_INDICATORS: lower is better
+    "SH.STA.MMRT": {"id": 2, "goal_id": 1, "target_value": 70, "baseline_value": 500},
+    "UNTARGETED": {"id": 3, "goal_id": 2, "target_value": None, "baseline_value": None},
+}
+
+
+@pytest.fixture
+def projected() -> pd.DataFrame:
+    values = pd.DataFrame(
+        series(1, 1, 2014, [10.0 + 5 * k for k in range(10)])        # 10 → 55, +5 a year
+        + series(1, 2, 2014, [120.0] * 10)                           # target already met
+        + series(1, 3, 2014, [60.0 - 2 * k for k in range(10)])      # moving away from the target
+        + series(2, 1, 2014, [400.0 - 10 * k for k in range(10)])    # 400 → 310, -10 a year
+        + series(3, 1, 2014, [1.0] * 10)
+    )
+    return project_series(values, INDICATORS, {1: 10, 2: 10, 3: 20}).set_index(
+        ["indicator_id", "scope", "member_state_id"],
+    ).sort_index()
+
+
+@pytest.mark.parametrize("key, column, expected", [
+    ((1, "country", 1), "projected_2030", 90.0),
+    ((1, "country", 1), "progress_pct", 55.0),
+    ((1, "country", 1), "progress_2030", 90.0),
+    ((1, "country", 1), "progress_2063", 100.0),
+    ((1, "country", 1), "years_to_target", 9.0),
+    ((1, "country", 2), "years_to_target", 0.0),
+    ((1, "country", 3), "years_to_target", nan),
+    # Never negative before, so not projected below zero
+    ((1, "country", 3), "projected_2063", 0.0),
+    ((2, "country", 1), "projected_2030", 240.0),
+    ((2, "country", 1), "projected_2063", 0.0),
+    ((2, "country", 1), "progress_pct", 100 * (500 - 310) / (500 - 70)),
+    ((2, "country", 1), "years_to_target", 24.0),
+    ((3, "country", 1), "years_to_target", nan),
+    ((3, "country", 1), "progress_pct", nan),
+])
+def test_project_series(projected, key, column, expected):
+    np.testing.assert_allclose(projected.loc[key, column], expected)
+
+
+def test_project_series_rolls_up_regions_and_continent(projected):
+    scopes = projected.reset_index().groupby("indicator_id")["scope"].value_counts().unstack(fill_value=0)
+
+    # Indicator 1: three countries, two regions, one continent
+    assert scopes.loc[1].to_dict() == {"continent": 1, "country": 3, "region": 2}
+    continent = projected.loc[(1, "continent", pd.NA)]
+    np.testing.assert_allclose(continent["last_value"], (55.0 + 120.0 + 42.0) / 3)
+
+
+def test_goal_progress_averages_targeted_indicators(projected):
+    progress = goal_progress(projected.reset_index(), INDICATORS)
+
+    country = progress[(progress["scope"] == "country") & (progress["member_state_id"] == 1)].set_index("goal_id")
+    assert list(country.index) == [1]
+    np.testing.assert_allclose(country.loc[1, "progress_pct"], (55.0 + 100 * 190 / 430) / 2)
+    assert country.loc[1, "indicators"] == 2
+
+
+def test_project_series_empty():
+    assert project_series(pd.DataFrame(columns=["indicator_id", "member_state_id", "year", "value"]), {}, {}).empty
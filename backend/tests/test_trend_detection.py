@@ -0,0 +1,128 @@
+"""Batched Mann-Kendall tests and Theil-Sen slopes, against hand-worked series and a pairwise loop."""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.trend_detection import MIN_POINTS, detect_trends, mann_kendall, row_medians, trend_of
+
+nan = np.nan
+YEARS = np.arange(2000, 2010)
+
+
+def reference(years: np.ndarray, values: np.ndarray) -> dict:
+    """Mann-Kendall S, tie-corrected variance and Theil-Sen slope of one series, pair by pair."""
+    keep = ~np.isnan(values)
+    t, x = years[keep].astype(float), values[keep]
+    n = len(x)
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    s = sum(np.sign(x[j] - x[i]) for i, j in pairs)
+    ties = sum(c * (c - 1) * (2 * c + 5) for c in pd.Series(x).value_counts())
+    variance = (n * (n - 1) * (2 * n + 5) - ties) / 18
+    slope = float(np.median([(x[j] - x[i]) / (t[j] - t[i]) for i, j in pairs])) if pairs else nan
+    return {"n": n, "s": s, "variance": variance, "slope": slope}
+
+
+@pytest.mark.parametrize("values, direction, s, slope, intercept", [
+    # Strictly rising: every pair counts +1, slope exactly 1 a year
+    (np.arange(1.0, 11.0), "increasing", 45, 1.0, 1.0),
+    (np.arange(10.0, 0.0, -1.0), "decreasing", -45, -1.0, 10.0),
+    # All values tied: the variance is zero, so z is 0 and nothing is significant
+    (np.full(10, 5.0), "no_trend", 0, 0.0, 5.0),
+    # Pairs of ties: S drops by the 5 tied pairs and the variance by the tie correction
+    (np.repeat([1.0, 2.0, 3.0, 4.0, 5.0], 2), "increasing", 40, 0.5, 0.75),
+    # Monotone but only MIN_POINTS values over a gap-ridden decade: not significant at 5%
+    (np.array([1, nan, 3, nan, nan, 5, nan, nan, nan, 6]), "no_trend", 6, 11 / 18, 25 / 18),
+    # Below MIN_POINTS: counted, never tested
+    (np.array([1, nan, 2, nan, 3, nan, nan, nan, nan, nan]), "insufficient_data", 3, nan, nan),
+    (np.full(10, nan), "insufficient_data", 0, nan, nan),
+])
+def test_hand_worked_series(values, direction, s, slope, intercept):
+    result = {k: v[0] for k, v in mann_kendall(values[None, :], YEARS).items()}
+
+    assert result["direction"] == direction
+    assert result["mk_s"] == s
+    assert result["n_points"] == (~np.isnan(values)).sum()
+    np.testing.assert_allclose(result["sen_slope"], slope)
+    np.testing.assert_allclose(result["sen_intercept"], intercept)
+    if result["n_points"] < MIN_POINTS:
+        assert np.isnan(result["mk_z"]) and np.isnan(result["p_value"])
+
+
+def test_first_and_last_year_skip_missing_ends():
+    values = np.array([nan, nan, 4, 5, 7, 6, 8, nan, 9, nan])
+
+    result = mann_kendall(values[None, :], YEARS)
+
+    assert (result["first_year"][0], result["last_year"][0]) == (2002, 2008)
+
+
+def test_batch_matches_pairwise_loop():
+    rng = np.random.default_rng(7)
+    matrix = np.round(rng.normal(0, 1, (200, 12)).cumsum(axis=1), 1)  # rounding makes ties
+    matrix[rng.random(matrix.shape) < 0.3] = nan
+    years = np.arange(2008, 2020)
+
+    result = mann_kendall(matrix, years)
+
+    for row, values in enumerate(matrix):
+        expected = reference(years, values)
+        assert result["n_points"][row] == expected["n"]
+        assert result["mk_s"][row] == expected["s"]
+        if expected["n"] < MIN_POINTS:
+            continue
+        np.testing.assert_allclose(result["sen_slope"][row], expected["slope"])
+        z = (expected["s"] - np.sign(expected["s"])) / math.sqrt(expected["variance"]) if expected["variance"] > 0 else 0
+        np.testing.assert_allclose(result["mk_z"][row], z)
+        np.testing.assert_allclose(result["p_value"][row], math.erfc(abs(z) / math.sqrt(2)))
+
+
+def test_chunked_batch_matches_one_pass(monkeypatch):
+    rng = np.random.default_rng(3)
+    matrix = rng.normal(0, 1, (50, 8)).cumsum(axis=1)
+    matrix[rng.random(matrix.shape) < 0.2] = nan
+    years = np.arange(2010, 2018)
+    whole = mann_kendall(matrix, years)
+
+    monkeypatch.setattr("app.services.trend_detection.CHUNK_CELLS", 1)
+    chunked = mann_kendall(matrix, years)
+
+    for key, value in whole.items():
+        np.testing.assert_array_equal(chunked[key], value)
+
+
+@pytest.mark.parametrize("values, expected", [
+    ([[3, 1, 2]], [2]),
+    ([[4, 1, 3, 2]], [2.5]),
+    ([[nan, 5, nan, 1]], [3]),
+    ([[nan, nan]], [nan]),
+])
+def test_row_medians(values, expected):
+    np.testing.assert_allclose(row_medians(np.array(values, dtype=float)), expected)
+
+
+def test_trend_of_single_series_with_gaps():
+    result = trend_of([2001, 2003, 2004, 2008, 2010], [1.0, 2.0, 2.5, 4.0, 5.0])
+
+    assert result["n_points"] == 5
+    assert (result["first_year"], result["last_year"]) == (2001, 2010)
+    assert result["mk_s"] == 10
+    assert result["direction"] == "increasing"
+    assert trend_of([], []) == {"n_points": 0, "direction": "insufficient_data"}
+
+
+def test_detect_trends_adds_a_continental_row_per_indicator():
+    values = pd.DataFrame([
+        {"indicator_id": 1, "member_state_id": ms, "year": 2000 + y, "value": ms * 10 + y}
+        for ms in (1, 2) for y in range(6)
+    ] + [{"indicator_id": 1, "member_state_id": 3, "year": 2000, "value": None}])
+
+    trends = detect_trends(values)
+
+    assert len(trends) == 3
+    continental = trends[trends["member_state_id"].isna()].iloc[0]
+    assert continental["direction"] == "increasing"
+    np.testing.assert_allclose(continental["sen_slope"], 1.0)
+    assert detect_trends(values.iloc[:0]).empty
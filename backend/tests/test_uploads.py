@@ -0,0 +1,164 @@
+"""Upload chunks: row validation, per-row digests, packed cell keys and the unchanged-row filter."""
+
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import uploads
+from app.services.uploads import (
+    MissingColumnsError,
+    cell_keys,
+    drop_unchanged,
+    iter_upload_chunks,
+    row_digests,
+    staging_records,
+    validate_rows,
+)
+
+COUNTRIES = {"KE": 1, "NG": 2}
+INDICATORS = {"NY.GDP": 10, "SP.POP": 11}
+
+
+def chunk(*rows) -> pd.DataFrame:
+    return pd.DataFrame(list(rows), columns=["country_iso", "indicator_code", "year", "value"])
+
+
+@pytest.mark.parametrize("row, error", [
+    (("KE", "NY.GDP", 2020, 1.5), None),
+    # Codes are trimmed and ISO codes upper-cased before lookup
+    ((" ke ", " NY.GDP ", "2020", "1.5"), None),
+    # An empty value is a valid null, not an error
+    (("KE", "NY.GDP", 2020, None), None),
+    (("XX", "NY.GDP", 2020, 1.5), "Unknown country: XX"),
+    (("KE", "NOPE", 2020, 1.5), "Unknown indicator: NOPE"),
+    (("KE", "NY.GDP", "20x0", 1.5), "Invalid year: 20x0"),
+    (("KE", "NY.GDP", 2020.5, 1.5), "Invalid year: 2020.5"),
+    (("KE", "NY.GDP", None, 1.5), "Invalid year: "),
+    (("KE", "NY.GDP", 1959, 1.5), "Year out of range: 1959"),
+    (("KE", "NY.GDP", uploads.MAX_UPLOAD_YEAR + 1, 1.5), f"Year out of range: {uploads.MAX_UPLOAD_YEAR + 1}"),
+    (("KE", "NY.GDP", 2020, "n/a"), "Invalid value: n/a"),
+    # Only the first problem is reported, in the order a user would fix them
+    (("XX", "NOPE", "bad", "n/a"), "Unknown country: XX"),
+    (("KE", "NOPE", 1800, "n/a"), "Unknown indicator: NOPE"),
+])
+def test_validate_row(row, error):
+    valid, errors = validate_rows(chunk(row), COUNTRIES, INDICATORS, "test")
+
+    if error is None:
+        assert errors.empty
+        assert valid[["indicator_id", "member_state_id", "year"]].iloc[0].tolist() == [10, 1, 2020]
+    else:
+        assert valid.empty
+        assert errors.to_dict("records") == [{"row": 2, "error": error}]
+
+
+def test_validate_rows_numbers_rows_file_wide_and_keeps_the_last_repeat():
+    df = chunk(
+        ("KE", "NY.GDP", 2020, 1.0),
+        ("XX", "NY.GDP", 2020, 2.0),
+        ("KE", "NY.GDP", 2020, 3.0),
+        ("NG", "SP.POP", 2021, 4.0),
+    )
+    df.index = range(20000, 20004)  # the second chunk of a file
+
+    valid, errors = validate_rows(df, COUNTRIES, INDICATORS, "Manual upload: f.csv")
+
+    assert errors["row"].tolist() == [20003]
+    assert valid[["member_state_id", "year", "value"]].values.tolist() == [[1, 2020, 3.0], [2, 2021, 4.0]]
+    assert set(valid["data_quality"]) == {"verified"}
+    assert set(valid["source_detail"]) == {"Manual upload: f.csv"}
+
+
+def test_staging_records_turn_nan_into_null():
+    valid, _ = validate_rows(chunk(("KE", "NY.GDP", 2020, None)), COUNTRIES, INDICATORS, "test")
+
+    assert staging_records(valid) == [{
+        "indicator_id": 10, "member_state_id": 1, "year": 2020, "value": None,
+        "data_quality": "verified", "source_detail": "test",
+    }]
+
+
+def cells(*rows) -> pd.DataFrame:
+    return pd.DataFrame(list(rows), columns=["indicator_id", "member_state_id", "year", "value", "data_quality"])
+
+
+@pytest.mark.parametrize("a, b, same", [
+    ((10, 1, 2020, 1.5, "verified"), (10, 1, 2020, 1.5, "verified"), True),
+    # Stored values come back as numbers of any width; the digest does not care
+    ((10, 1, 2020, 2.0, "verified"), (10.0, 1, 2020, 2, "verified"), True),
+    ((10, 1, 2020, None, "verified"), (10, 1, 2020, np.nan, "verified"), True),
+    ((10, 1, 2020, 1.5, "verified"), (10, 1, 2020, 1.6, "verified"), False),
+    ((10, 1, 2020, 1.5, "verified"), (10, 1, 2020, 1.5, "estimated"), False),
+    ((10, 1, 2020, 1.5, "verified"), (10, 1, 2021, 1.5, "verified"), False),
+    ((10, 1, 2020, 1.5, "verified"), (10, 2, 2020, 1.5, "verified"), False),
+])
+def test_row_digests(a, b, same):
+    assert bool(row_digests(cells(a))[0] == row_digests(cells(b))[0]) is same
+
+
+@pytest.mark.parametrize("row, key", [
+    ((1, 1, 2020), (1 << 40) | (1 << 16) | 2020),
+    ((0, 0, 0), 0),
+    # Each field has its own bits: the largest ids and years do not overlap
+    ((1, 0, 65535), (1 << 40) | 65535),
+    ((0, (1 << 24) - 1, 0), ((1 << 24) - 1) << 16),
+])
+def test_cell_keys(row, key):
+    df = pd.DataFrame([row], columns=["indicator_id", "member_state_id", "year"])
+
+    assert cell_keys(df).tolist() == [key]
+
+
+def test_cell_keys_are_unique_per_cell():
+    ind, ms, yr = np.meshgrid(np.arange(1, 30), np.arange(1, 60), np.arange(1960, 2031), indexing="ij")
+    df = pd.DataFrame({"indicator_id": ind.ravel(), "member_state_id": ms.ravel(), "year": yr.ravel()})
+
+    assert len(np.unique(cell_keys(df))) == len(df)
+
+
+def test_drop_unchanged():
+    valid, _ = validate_rows(
+        chunk(
+            ("KE", "NY.GDP", 2020, 1.0),  # stored as is: dropped
+            ("KE", "NY.GDP", 2021, 2.0),  # stored with another value
+            ("KE", "NY.GDP", 2022, 3.0),  # stored the same, but from a connector source
+            ("KE", "NY.GDP", 2023, 4.0),  # stored the same, but staged from an earlier chunk
+            ("NG", "NY.GDP", 2020, 5.0),  # not stored
+        ),
+        COUNTRIES, INDICATORS, "test",
+    )
+    stored = pd.DataFrame([
+        (10, 1, 2020, "1.0", "verified", None),
+        (10, 1, 2021, "2.5", "verified", None),
+        (10, 1, 2022, "3.0", "verified", 4),
+        (10, 1, 2023, "4.0", "verified", None),
+    ], columns=["indicator_id", "member_state_id", "year", "value", "data_quality", "data_source_id"])
+    staged = np.sort(cell_keys(pd.DataFrame([(10, 1, 2023)], columns=["indicator_id", "member_state_id", "year"])))
+
+    with mock.patch.object(uploads, "stored_cells", return_value=stored):
+        kept, dropped = drop_unchanged(None, valid, staged)
+
+    assert dropped == 1
+    assert kept[["member_state_id", "year"]].values.tolist() == [[1, 2021], [1, 2022], [1, 2023], [2, 2020]]
+
+
+def test_iter_upload_chunks_checks_the_header(tmp_path):
+    path = tmp_path / "f.csv"
+    path.write_text("country_iso,indicator_code,value\nKE,NY.GDP,1\n")
+
+    with pytest.raises(MissingColumnsError):
+        next(iter_upload_chunks(str(path), "f.csv"))
+
+
+def test_iter_upload_chunks_keeps_row_positions(tmp_path):
+    path = tmp_path / "f.csv"
+    pd.DataFrame({
+        "country_iso": ["KE"] * 5, "indicator_code": ["NY.GDP"] * 5,
+        "year": range(2000, 2005), "value": range(5),
+    }).to_csv(path, index=False)
+
+    chunks = list(iter_upload_chunks(str(path), "f.csv", chunk_size=2))
+
+    assert [c.index.tolist() for c in chunks] == [[0, 1], [2, 3], [4]]